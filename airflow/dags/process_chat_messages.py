@@ -92,7 +92,7 @@ def create_tables_if_not_exists(**context):
     create_tables_sql = """
     -- 處理後的留言表
     CREATE TABLE IF NOT EXISTS processed_chat_messages (
-        message_id VARCHAR(255) PRIMARY KEY,
+        message_id VARCHAR(255) NOT NULL,
         live_stream_id VARCHAR(255) NOT NULL,
         original_message TEXT NOT NULL,
         processed_message TEXT NOT NULL,
@@ -102,8 +102,19 @@ def create_tables_if_not_exists(**context):
         author_name VARCHAR(255) NOT NULL,
         author_id VARCHAR(255) NOT NULL,
         published_at TIMESTAMP WITH TIME ZONE NOT NULL,
-        processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-    );
+        processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (message_id, published_at)
+    ) PARTITION BY RANGE (published_at);
+
+    -- 每月分區由 maintain_partitions 建立；範圍外的資料寫入 default 分區
+    DO $do$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_class WHERE oid = 'processed_chat_messages'::regclass AND relkind = 'p')
+           AND to_regclass('processed_chat_messages_default') IS NULL THEN
+            CREATE TABLE processed_chat_messages_default PARTITION OF processed_chat_messages DEFAULT;
+        END IF;
+    END;
+    $do$;
 
     -- ETL 檢查點表
     CREATE TABLE IF NOT EXISTS processed_chat_checkpoint (
@@ -116,9 +127,8 @@ def create_tables_if_not_exists(**context):
     -- 創建索引
     CREATE INDEX IF NOT EXISTS idx_processed_chat_stream_published ON processed_chat_messages(live_stream_id, published_at);
     CREATE INDEX IF NOT EXISTS idx_processed_chat_published_at ON processed_chat_messages(published_at);
-    CREATE INDEX IF NOT EXISTS idx_processed_chat_author_id ON processed_chat_messages(author_id);
-    CREATE INDEX IF NOT EXISTS idx_processed_chat_tokens ON processed_chat_messages USING GIN(tokens);
-    CREATE INDEX IF NOT EXISTS idx_processed_chat_emojis ON processed_chat_messages USING GIN(unicode_emojis);
+    CREATE INDEX IF NOT EXISTS idx_processed_chat_published_at_brin ON processed_chat_messages USING BRIN (published_at)
+        WITH (pages_per_range = 32);
     """
 
     pg_hook.run(create_tables_sql)
@@ -240,7 +250,7 @@ def upsert_batch(pg_hook, processed_messages: List[Dict[str, Any]]) -> int:
             (message_id, live_stream_id, original_message, processed_message,
              tokens, unicode_emojis, youtube_emotes, author_name, author_id, published_at)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (message_id)
+        ON CONFLICT (message_id, published_at)
         DO UPDATE SET
             processed_message = EXCLUDED.processed_message,
             tokens = EXCLUDED.tokens,
@@ -0,0 +1,130 @@
+"""
+Analysis Data Source
+====================
+analysis/ 腳本共用的資料來源：正式環境 Postgres，或匯出的 Parquet（DuckDB）。
+
+Parquet 目錄結構與 dashboard/backend/scripts/archive_streams.py export 的輸出、
+以及冷封存目錄 ARCHIVE_DIR 相同：
+
+    <dir>/<video_id>/chat_messages.parquet
+    <dir>/<video_id>/processed_chat_messages.parquet
+    <dir>/<video_id>/stream_stats.parquet
+
+connect(parquet_dir) 把每張表跨所有直播載入 DuckDB in-memory table
+（比直接查 Parquet view 快數倍，逐筆查詢的腳本尤其明顯），
+表名、欄位與 Postgres 相同，腳本的 SQL 不需修改即可離線執行。
+JSONB 欄位（raw_data、author_images、emotes、youtube_emotes 等）在 Parquet 中是 JSON 字串，
+DuckDB 可用 json_extract_string() 取值。
+"""
+
+import os
+import re
+from pathlib import Path
+
+TABLES = ('chat_messages', 'processed_chat_messages', 'stream_stats')
+ENV_PATH = Path(__file__).parent.parent / '.env'
+
+
+def load_env(path: Path = ENV_PATH) -> dict:
+    """從 .env 檔讀取 key=value，忽略註解與空行。"""
+    env = {}
+    if not path.exists():
+        return env
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        k, _, v = line.partition('=')
+        env[k.strip()] = v.strip()
+    return env
+
+
+def connect_postgres(db_url: str | None = None):
+    """連線正式環境 Postgres（DATABASE_URL，否則讀專案根目錄 .env）"""
+    import psycopg2
+
+    db_url = db_url or os.environ.get('DATABASE_URL')
+    if db_url:
+        return psycopg2.connect(db_url)
+    env = load_env()
+    return psycopg2.connect(
+        host=env.get('POSTGRES_HOST', 'localhost'),
+        port=int(env.get('POSTGRES_PORT', 5432)),
+        dbname=env.get('POSTGRES_DB', 'hermes'),
+        user=env.get('POSTGRES_USER', 'hermes'),
+        password=env.get('POSTGRES_PASSWORD', 'hermes'),
+    )
+
+
+class DuckDBCursor:
+    """psycopg2 風格的 cursor：接受 %s 參數，讓同一份 SQL 可在兩種來源執行"""
+
+    _PLACEHOLDER = re.compile(r'%([s%])')
+
+    def __init__(self, conn):
+        self._cur = conn.cursor()
+
+    def execute(self, sql: str, params=None):
+        if params is None:
+            self._cur.execute(sql)
+        else:
+            # psycopg2 only expands %s / %% when parameters are passed
+            sql = self._PLACEHOLDER.sub(lambda m: '?' if m.group(1) == 's' else '%', sql)
+            self._cur.execute(sql, list(params))
+        return self
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+
+class DuckDBConnection:
+    """DuckDB in-memory 連線，Parquet 檔載入成同名資料表"""
+
+    def __init__(self, parquet_dir: str):
+        import duckdb
+
+        self.parquet_dir = parquet_dir
+        self.conn = duckdb.connect()
+        self.conn.execute("SET TimeZone = 'UTC'")
+        self.tables = []
+        for table in TABLES:
+            # A single stream's directory or a directory of stream directories
+            pattern = os.path.join(parquet_dir, '**', f'{table}.parquet')
+            if not list(Path(parquet_dir).rglob(f'{table}.parquet')):
+                continue
+            self.conn.execute(
+                f"CREATE TABLE {table} AS "
+                f"SELECT * FROM read_parquet('{pattern}', union_by_name = true)"
+            )
+            self.tables.append(table)
+        if not self.tables:
+            raise FileNotFoundError(f"No exported Parquet files under {parquet_dir}")
+
+    def cursor(self) -> DuckDBCursor:
+        return DuckDBCursor(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+def connect(parquet_dir: str | None = None, db_url: str | None = None):
+    """
+    取得資料來源連線
+
+    Args:
+        parquet_dir: 匯出的 Parquet 目錄；有值時改用 DuckDB 離線查詢
+        db_url: Postgres 連線字串（預設 DATABASE_URL / .env）
+    """
+    if parquet_dir:
+        return DuckDBConnection(parquet_dir)
+    return connect_postgres(db_url)
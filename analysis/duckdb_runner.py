@@ -0,0 +1,75 @@
+"""
+DuckDB Analysis Runner
+======================
+在匯出的 Parquet 上執行 SQL，不連正式環境資料庫。
+
+先匯出直播（或直接指向冷封存目錄 ARCHIVE_DIR）：
+    cd dashboard/backend
+    python scripts/archive_streams.py export dQw4w9WgXcQ --output ../../analysis/data
+
+再查詢（表名、欄位與 Postgres 相同）：
+    python duckdb_runner.py data                       # 列出可用資料表與筆數
+    python duckdb_runner.py data -e "SELECT author_name, COUNT(*) FROM chat_messages GROUP BY 1 ORDER BY 2 DESC LIMIT 20"
+    python duckdb_runner.py data -f query.sql --csv result.csv
+
+其他 analysis 腳本以 --parquet data 切換到同一個離線來源。
+"""
+
+import argparse
+import csv
+import sys
+import time
+
+from datasource import DuckDBConnection
+
+
+def print_rows(columns: list[str], rows: list[tuple], limit: int):
+    widths = [
+        min(40, max([len(str(c))] + [len(str(r[i])) for r in rows[:limit]]))
+        for i, c in enumerate(columns)
+    ]
+    print('  '.join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    print('  '.join('-' * w for w in widths))
+    for row in rows[:limit]:
+        print('  '.join(str(v)[:w].ljust(w) for v, w in zip(row, widths)))
+    if len(rows) > limit:
+        print(f"... {len(rows) - limit} more rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在匯出的 Parquet 上以 DuckDB 執行 SQL')
+    parser.add_argument('parquet_dir', help='匯出目錄或 ARCHIVE_DIR')
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument('-e', '--execute', help='要執行的 SQL')
+    query.add_argument('-f', '--file', help='SQL 檔案路徑')
+    parser.add_argument('--csv', help='結果另存成 CSV')
+    parser.add_argument('--limit', type=int, default=50, help='最多顯示幾列（預設: 50）')
+    args = parser.parse_args()
+
+    db = DuckDBConnection(args.parquet_dir)
+
+    if not args.execute and not args.file:
+        for table in db.tables:
+            count = db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            print(f"{table:<26} {count:>12,} rows")
+        return
+
+    sql = args.execute or open(args.file, encoding='utf-8').read()
+    started = time.perf_counter()
+    cur = db.conn.execute(sql)
+    rows = cur.fetchall()
+    columns = [d[0] for d in cur.description]
+    elapsed = time.perf_counter() - started
+
+    print_rows(columns, rows, args.limit)
+    print(f"\n{len(rows)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,51 +1,113 @@
 import argparse
 import json
-import os
 import re
 import sys
-from datetime import datetime
+from collections import Counter
 from pathlib import Path
 
-import psycopg2
+from datasource import connect
 
 
 # ── 設定 ────────────────────────────────────────────────────────────────────
 
 PATTERN = re.compile(r'([\u4e00-\u9fff]{2,6})代表上香')
-ENV_PATH = Path(__file__).parent.parent / '.env'
+INCENSE_EXTRACTOR = 'incense'  # dashboard ETL 的 mention_extractors 名稱
 
 
-def load_env(path: Path) -> dict:
-    """從 .env 檔讀取 key=value，忽略註解與空行。"""
-    env = {}
+def mention_coverage(conn, extractor: str = INCENSE_EXTRACTOR):
+    """
+    extracted_mentions 已涵蓋到的 published_at（擷取器已回填時為 ETL checkpoint），否則 None
+
+    匯出的 Parquet（DuckDB）沒有 extracted_mentions，一律回傳 None 改掃原始留言
+    """
+    if getattr(conn, 'tables', None) is not None:
+        return None
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('mention_extractors') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        cur.close()
+        return None
+    cur.execute("""
+        SELECT
+            (SELECT backfilled_at FROM mention_extractors WHERE name = %s),
+            (SELECT last_processed_timestamp FROM processed_chat_checkpoint
+             ORDER BY updated_at DESC LIMIT 1)
+    """, [extractor])
+    backfilled_at, checkpoint = cur.fetchone()
+    cur.close()
+    return checkpoint if backfilled_at else None
+
+
+def iter_matches(conn, stream: str | None = None):
+    """逐筆產生「XX代表上香」留言中的地區詞（已處理的留言讀 extracted_mentions，其餘以 regex 比對）"""
+    cur = conn.cursor()
+    covered_until = mention_coverage(conn)
+    stream_filter = " AND live_stream_id = %s" if stream else ""
+
+    if covered_until is not None:
+        params = [INCENSE_EXTRACTOR, covered_until] + ([stream] if stream else [])
+        cur.execute(
+            "SELECT value FROM extracted_mentions WHERE extractor = %s AND published_at <= %s" + stream_filter,
+            params,
+        )
+        for (value,) in cur.fetchall():
+            yield value
+
+    sql = "SELECT message FROM chat_messages WHERE message LIKE %s" + stream_filter
+    params = ['%代表上香%'] + ([stream] if stream else [])
+    if covered_until is not None:
+        sql += " AND published_at > %s"
+        params.append(covered_until)
+    cur.execute(sql, params)
+    for (message,) in cur.fetchall():
+        match = PATTERN.search(message)
+        if match:
+            yield match.group(1)
+    cur.close()
+
+
+# ── 子命令 ───────────────────────────────────────────────────────────────────
+
+def cmd_extract(conn, stream: str | None, output: str):
+    """提取候選地區詞（依出現次數排序），寫入 JSON 供人工核准"""
+    counts = Counter(iter_matches(conn, stream))
+    total = sum(counts.values())
+    candidates = [{'word': w, 'count': c} for w, c in counts.most_common()]
+    Path(output).write_text(json.dumps(candidates, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    print(f"符合留言: {total}，候選詞: {len(candidates)}（已寫入 {output}）")
+    for item in candidates[:30]:
+        print(f"  {item['word']:<8} {item['count']:>6}")
+
+
+def cmd_analyze(conn, stream: str | None, approved_path: str):
+    """統計已核准地區的上香次數與佔比"""
+    path = Path(approved_path)
     if not path.exists():
-        return env
-    for line in path.read_text().splitlines():
-        line = line.strip()
-        if not line or line.startswith('#') or '=' not in line:
-            continue
-        k, _, v = line.partition('=')
-        env[k.strip()] = v.strip()
-    return env
-
-
-def get_connection():
-    env = load_env(ENV_PATH)
-    return psycopg2.connect(
-        host=env.get('POSTGRES_HOST', 'localhost'),
-        port=int(env.get('POSTGRES_PORT', 5432)),
-        dbname=env.get('POSTGRES_DB', 'hermes'),
-        user=env.get('POSTGRES_USER', 'hermes'),
-        password=env.get('POSTGRES_PASSWORD', 'hermes'),
-    )
+        sys.exit(f"找不到核准地區檔: {approved_path}（先執行 extract 並挑選地區）")
+    approved = json.loads(path.read_text(encoding='utf-8'))
+    approved = {item['word'] if isinstance(item, dict) else item for item in approved}
+
+    counts = Counter(word for word in iter_matches(conn, stream) if word in approved)
+    total = sum(counts.values())
+    print(f"已核准地區: {len(approved)}，上香次數: {total}")
+    for word, count in counts.most_common():
+        print(f"  {word:<8} {count:>6}  {count / total * 100:5.1f}%")
 
 
 # ── 主程式入口 ───────────────────────────────────────────────────────────────
 
 def main():
     parser = argparse.ArgumentParser(description='地區上香分析工具')
+    parser.add_argument('--parquet', help='改用匯出的 Parquet 目錄（DuckDB）而非正式環境資料庫')
+    parser.add_argument('--stream', help='只分析指定直播 ID')
     sub = parser.add_subparsers(dest='command', required=True)
-    sub.add_parser('extract', help='提取候選地區詞')
+    p_extract = sub.add_parser('extract', help='提取候選地區詞')
+    p_extract.add_argument(
+        '--output',
+        default='candidates.json',
+        help='候選詞輸出路徑（預設: candidates.json）',
+    )
     p_analyze = sub.add_parser('analyze', help='分析已核准地區分布')
     p_analyze.add_argument(
         '--approved',
@@ -54,10 +116,14 @@ def main():
     )
     args = parser.parse_args()
 
-    if args.command == 'extract':
-        cmd_extract()
-    elif args.command == 'analyze':
-        cmd_analyze(args.approved)
+    conn = connect(args.parquet)
+    try:
+        if args.command == 'extract':
+            cmd_extract(conn, args.stream, args.output)
+        elif args.command == 'analyze':
+            cmd_analyze(conn, args.stream, args.approved)
+    finally:
+        conn.close()
 
 
 if __name__ == '__main__':
@@ -1,7 +1,15 @@
 import os
+import asyncio
 import logging
+import threading
+import time
+import weakref
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+
+import anyio.to_thread
+from anyio import CapacityLimiter
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from app.models import Base
@@ -9,7 +17,7 @@ from app.models import Base
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    def __init__(self, database_url=None):
+    def __init__(self, database_url=None, read_only=False):
         self.database_url = database_url or os.getenv('DATABASE_URL')
         if not self.database_url:
             raise ValueError("DATABASE_URL environment variable is required")
@@ -24,6 +32,8 @@ class DatabaseManager:
                 "pool_recycle": 1800,
                 "pool_reset_on_return": "rollback",
             })
+            if read_only:
+                engine_args["connect_args"] = {"options": "-c default_transaction_read_only=on"}
 
         self.engine = create_engine(self.database_url, **engine_args)
 
@@ -80,3 +90,220 @@ def get_db_session():
 def get_db():
     with get_db_session() as session:
         yield session
+
+
+# ========== Read replica ==========
+# DATABASE_READ_URL (optional) points read-only analytics routes at a replica.
+# A replica lagging more than REPLICA_MAX_LAG_SECONDS is skipped in favour of
+# the primary until it catches up. Setting it to DATABASE_URL (one instance as
+# both) is valid: a primary always reports zero lag.
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '30'))
+REPLICA_LAG_CHECK_INTERVAL_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL_SECONDS', '5'))
+
+# Seconds behind the primary; 0 on a primary or a replica that has replayed
+# everything it received (an idle primary leaves the replay timestamp old)
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def get_read_database_url():
+    return os.getenv('DATABASE_READ_URL') or None
+
+
+class ReplicaLagGuard:
+    """
+    Replica 延遲檢查（結果快取 check_interval 秒）
+
+    查不到延遲（replica 連不上）或延遲超過 max_lag_seconds 時視為不可用，
+    讀取改走 primary。
+    """
+
+    def __init__(self, max_lag_seconds=None, check_interval=None):
+        self.max_lag_seconds = REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+        self.check_interval = REPLICA_LAG_CHECK_INTERVAL_SECONDS if check_interval is None else check_interval
+        self.lag_seconds = None
+        self.usable = False
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def needs_check(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def record(self, lag_seconds):
+        """Store a lag measurement (None = check failed)."""
+        usable = lag_seconds is not None and lag_seconds <= self.max_lag_seconds
+        if usable != self.usable:
+            if usable:
+                logger.info(f"Routing analytics reads to replica (lag {lag_seconds:.1f}s)")
+            else:
+                logger.warning(f"Read replica unavailable or lagging (lag {lag_seconds}s), using primary")
+        self.lag_seconds = lag_seconds
+        self.usable = usable
+        self._checked_at = time.monotonic()
+
+    def check(self, engine) -> bool:
+        """Whether reads may go to the replica behind engine."""
+        if self.needs_check() and self._lock.acquire(blocking=False):
+            try:
+                try:
+                    with engine.connect() as conn:
+                        lag = float(conn.execute(REPLICA_LAG_SQL).scalar())
+                except Exception as e:
+                    logger.error(f"Replica lag check failed: {e}")
+                    lag = None
+                self.record(lag)
+            finally:
+                self._lock.release()
+        return self.usable
+
+    async def check_async(self, engine) -> bool:
+        """check() for an AsyncEngine."""
+        if self.needs_check() and self._lock.acquire(blocking=False):
+            try:
+                try:
+                    async with engine.connect() as conn:
+                        lag = float((await conn.execute(REPLICA_LAG_SQL)).scalar())
+                except Exception as e:
+                    logger.error(f"Replica lag check failed: {e}")
+                    lag = None
+                self.record(lag)
+            finally:
+                self._lock.release()
+        return self.usable
+
+
+replica_guard = ReplicaLagGuard()
+read_db_manager = None
+
+def get_read_db_manager():
+    """DatabaseManager for DATABASE_READ_URL, or None when no replica is configured."""
+    global read_db_manager
+    if read_db_manager is None:
+        read_url = get_read_database_url()
+        if not read_url:
+            return None
+        read_db_manager = DatabaseManager(read_url, read_only=True)
+    return read_db_manager
+
+def get_read_db():
+    """
+    Session for read-only analytics routes.
+
+    Uses the replica when DATABASE_READ_URL is set and within the lag
+    threshold, otherwise the primary (same as get_db).
+    """
+    manager = get_read_db_manager()
+    if manager is None or not replica_guard.check(manager.engine):
+        yield from get_db()
+        return
+
+    session = manager.get_session()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+def to_async_database_url(database_url: str) -> str:
+    """postgresql:// (or postgresql+psycopg2://) -> postgresql+asyncpg://"""
+    scheme, sep, rest = database_url.partition("://")
+    if scheme in ("postgresql", "postgres", "postgresql+psycopg2"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return database_url
+
+
+class AsyncDatabaseManager:
+    """
+    asyncpg 引擎，專供長時間的分析查詢（回放 snapshots、文字雲）
+
+    與 DatabaseManager 的連線池分開：分析查詢再多也只會佔滿這個池，
+    /health、/api/stream-info 等短查詢使用的同步連線池不受影響；
+    async handler 等待查詢時也不佔用 threadpool thread。
+    """
+
+    def __init__(self, database_url=None, read_only=False):
+        database_url = database_url or os.getenv('DATABASE_URL')
+        if not database_url:
+            raise ValueError("DATABASE_URL environment variable is required")
+        self.database_url = to_async_database_url(database_url)
+
+        engine_args = {}
+        if read_only:
+            engine_args["connect_args"] = {"server_settings": {"default_transaction_read_only": "on"}}
+
+        self.engine = create_async_engine(
+            self.database_url,
+            echo=False,
+            pool_size=int(os.getenv('ANALYTICS_DB_POOL_SIZE', '5')),
+            max_overflow=int(os.getenv('ANALYTICS_DB_MAX_OVERFLOW', '5')),
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            **engine_args,
+        )
+        self.SessionLocal = async_sessionmaker(
+            self.engine, autoflush=False, expire_on_commit=False
+        )
+
+    async def close(self):
+        await self.engine.dispose()
+        logger.info("Analytics database connections closed")
+
+
+async_db_manager = None
+async_read_db_manager = None
+
+def get_async_db_manager():
+    global async_db_manager
+    if async_db_manager is None:
+        async_db_manager = AsyncDatabaseManager()
+    return async_db_manager
+
+def get_async_read_db_manager():
+    """AsyncDatabaseManager for DATABASE_READ_URL, or None when no replica is configured."""
+    global async_read_db_manager
+    if async_read_db_manager is None:
+        read_url = get_read_database_url()
+        if not read_url:
+            return None
+        async_read_db_manager = AsyncDatabaseManager(read_url, read_only=True)
+    return async_read_db_manager
+
+async def close_async_db():
+    global async_db_manager, async_read_db_manager
+    for manager in (async_db_manager, async_read_db_manager):
+        if manager is not None:
+            await manager.close()
+    async_db_manager = async_read_db_manager = None
+
+# CPU-heavy analytics steps (word counting, snapshot loops) share this many
+# worker threads, so they cannot take the whole threadpool / GIL from short requests
+ANALYTICS_THREADS = int(os.getenv('ANALYTICS_THREADS', '2'))
+_analytics_limiters = weakref.WeakKeyDictionary()
+
+async def run_analytics_in_thread(fn, *args):
+    """Run fn(*args) in a worker thread, at most ANALYTICS_THREADS at a time."""
+    loop = asyncio.get_running_loop()
+    limiter = _analytics_limiters.get(loop)
+    if limiter is None:
+        limiter = _analytics_limiters[loop] = CapacityLimiter(ANALYTICS_THREADS)
+    return await anyio.to_thread.run_sync(fn, *args, limiter=limiter)
+
+async def get_analytics_db():
+    """
+    Read-only AsyncSession from the analytics pool (rolled back on close).
+
+    Reads from DATABASE_READ_URL when set and the replica is within the lag
+    threshold, otherwise from the primary.
+    """
+    manager = get_async_read_db_manager()
+    if manager is None or not await replica_guard.check_async(manager.engine):
+        manager = get_async_db_manager()
+    async with manager.SessionLocal() as session:
+        yield session
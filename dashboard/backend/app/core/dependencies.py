@@ -2,8 +2,11 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
 
+from .database import get_read_db
 from .security import verify_access_token, TokenError
+from .settings import get_current_video_id
 
 # Optional bearer token - allows unauthenticated access
 optional_bearer = HTTPBearer(auto_error=False)
@@ -61,3 +64,13 @@ def require_admin(
         )
 
     return {"role": "admin"}
+
+
+def current_video_id(db: Session = Depends(get_read_db)) -> Optional[str]:
+    """
+    Video ID of the stream the dashboard is showing (youtube_url setting).
+
+    Served from the process-wide settings cache, so most requests do not
+    query system_settings.
+    """
+    return get_current_video_id(db)
@@ -1,24 +1,60 @@
 import re
-from typing import Optional
+import threading
+import time
+from typing import Optional, Tuple
 from sqlalchemy.orm import Session
 
 from app.models import SystemSetting
 
+# 目前 video ID 幾乎每個 request 都會用到，process 內快取；
+# 本 process 寫入 system_settings 時立即失效，其他 worker 最多延遲 TTL 秒
+VIDEO_ID_CACHE_TTL_SECONDS = 5.0
+
+_video_id_cache: Optional[Tuple[float, Optional[str]]] = None  # (loaded_at, video_id)
+_cache_generation = 0
+_cache_lock = threading.Lock()
+
+
 def get_video_id_from_url(url: str) -> Optional[str]:
     """從 YouTube URL 提取 video ID"""
     match = re.search(r'(?:v=|/)([a-zA-Z0-9_-]{11})', url)
     return match.group(1) if match else None
 
 
+def invalidate_settings_cache():
+    """清除快取的設定值（寫入 system_settings 後呼叫）"""
+    global _video_id_cache, _cache_generation
+    with _cache_lock:
+        _video_id_cache = None
+        _cache_generation += 1
+
+
+def _load_current_video_id(db: Session) -> Optional[str]:
+    setting = db.query(SystemSetting).filter(
+        SystemSetting.key == 'youtube_url'
+    ).first()
+
+    if setting and setting.value:
+        return get_video_id_from_url(setting.value)
+    return None
+
+
 def get_current_video_id(db: Session) -> Optional[str]:
-    """從 system_settings 取得當前 video ID"""
-    try:
-        setting = db.query(SystemSetting).filter(
-            SystemSetting.key == 'youtube_url'
-        ).first()
+    """從 system_settings 取得當前 video ID（快取 VIDEO_ID_CACHE_TTL_SECONDS 秒）"""
+    global _video_id_cache
+    cached = _video_id_cache
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < VIDEO_ID_CACHE_TTL_SECONDS:
+        return cached[1]
 
-        if setting and setting.value:
-            return get_video_id_from_url(setting.value)
+    generation = _cache_generation
+    try:
+        video_id = _load_current_video_id(db)
     except Exception:
-        pass
-    return None
+        return None
+
+    with _cache_lock:
+        # A write invalidated the cache while we were reading; don't store the old value
+        if generation == _cache_generation:
+            _video_id_cache = (now, video_id)
+    return video_id
@@ -0,0 +1,212 @@
+"""
+ETL Job Queue Module
+手動觸發任務的 DB 佇列（etl_job_queue）
+
+API worker 只負責寫入佇列（enqueue_job）與回報狀態；
+ETL worker（app/etl/worker.py）以 FOR UPDATE SKIP LOCKED 領取任務，
+多個 worker 同時輪詢時每筆任務只會被其中一個領取。
+
+函式皆使用呼叫端傳入的連線（Connection 或 Session），不自行 commit。
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# 佇列狀態
+QUEUED = 'queued'
+RUNNING = 'running'
+FINISHED_STATUSES = ('completed', 'failed', 'skipped', 'cancelled')
+
+# worker 停止回報心跳超過此秒數即視為已終止（見 fail_stale_jobs）
+STALE_AFTER_SECONDS = 300
+
+
+def enqueue_job(conn, job_id: str, job_name: str) -> Optional[Dict[str, Any]]:
+    """
+    將手動觸發的任務排入佇列
+
+    同時建立 status = 'queued' 的 etl_execution_log，管理介面可立即看到該筆紀錄；
+    worker 領取時改為 'running' 並重設 started_at。
+
+    唯一索引 uq_etl_job_queue_pending_job 保證同一任務最多一筆排隊或執行中，
+    兩個請求同時觸發時只有一個會成功。
+
+    Returns:
+        {'queue_id': ..., 'etl_log_id': ...}，同一任務已在排隊或執行中時回傳 None
+    """
+    queue_id = conn.execute(text("""
+        INSERT INTO etl_job_queue (job_id, status, enqueued_at)
+        VALUES (:job_id, 'queued', NOW())
+        ON CONFLICT (job_id) WHERE status IN ('queued', 'running') DO NOTHING
+        RETURNING id
+    """), {"job_id": job_id}).scalar()
+    if queue_id is None:
+        return None
+    etl_log_id = conn.execute(text("""
+        INSERT INTO etl_execution_log (job_id, job_name, status, trigger_type, started_at)
+        VALUES (:job_id, :job_name, 'queued', 'manual', NOW())
+        RETURNING id
+    """), {"job_id": job_id, "job_name": job_name}).scalar()
+    conn.execute(text("""
+        UPDATE etl_job_queue SET etl_log_id = :etl_log_id WHERE id = :id
+    """), {"id": queue_id, "etl_log_id": etl_log_id})
+    logger.info(f"Enqueued ETL job {job_id} (queue_id={queue_id}, etl_log_id={etl_log_id})")
+    return {'queue_id': queue_id, 'etl_log_id': etl_log_id}
+
+
+def find_pending_job(conn, job_id: str) -> Optional[Dict[str, Any]]:
+    """同一任務已在排隊或執行中時回傳該筆佇列紀錄"""
+    row = conn.execute(text("""
+        SELECT id, status, etl_log_id
+        FROM etl_job_queue
+        WHERE job_id = :job_id AND status IN ('queued', 'running')
+        ORDER BY id
+        LIMIT 1
+    """), {"job_id": job_id}).fetchone()
+    if row is None:
+        return None
+    return {'queue_id': row[0], 'status': row[1], 'etl_log_id': row[2]}
+
+
+def claim_next_job(conn, worker_id: str) -> Optional[Dict[str, Any]]:
+    """
+    領取最早排入的任務
+
+    SKIP LOCKED 略過其他 worker 正在領取的列，因此不會重複領取也不會互相等待。
+
+    Returns:
+        {'queue_id', 'job_id', 'etl_log_id'}，佇列為空時回傳 None
+    """
+    row = conn.execute(text("""
+        UPDATE etl_job_queue
+        SET status = 'running', started_at = NOW(), heartbeat_at = NOW(), worker_id = :worker_id
+        WHERE id = (
+            SELECT id FROM etl_job_queue
+            WHERE status = 'queued'
+            ORDER BY enqueued_at, id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, job_id, etl_log_id
+    """), {"worker_id": worker_id}).fetchone()
+    if row is None:
+        return None
+    if row[2] is not None:
+        conn.execute(text("""
+            UPDATE etl_execution_log SET status = 'running', started_at = NOW()
+            WHERE id = :id
+        """), {"id": row[2]})
+    return {'queue_id': row[0], 'job_id': row[1], 'etl_log_id': row[2]}
+
+
+def finish_job(conn, queue_id: int, status: str, error_message: Optional[str] = None) -> None:
+    """記錄佇列任務的結果（etl_execution_log 由任務本身更新）"""
+    if status not in FINISHED_STATUSES:
+        status = 'completed'
+    conn.execute(text("""
+        UPDATE etl_job_queue
+        SET status = :status, finished_at = NOW(), error_message = :error
+        WHERE id = :id
+    """), {"id": queue_id, "status": status, "error": str(error_message)[:500] if error_message else None})
+
+
+def heartbeat(conn, queue_ids: List[int]) -> None:
+    """更新執行中任務的心跳"""
+    if not queue_ids:
+        return
+    conn.execute(text("""
+        UPDATE etl_job_queue SET heartbeat_at = NOW()
+        WHERE id = ANY(:ids) AND status = 'running'
+    """), {"ids": list(queue_ids)})
+
+
+def fail_stale_jobs(conn, stale_after: int = STALE_AFTER_SECONDS) -> List[int]:
+    """
+    將心跳逾時的執行中任務標記為失敗
+
+    worker 當機或被強制終止時任務會停在 'running'，唯一索引會讓同一任務無法再被觸發；
+    存活的 worker 定期呼叫本函式回收這些任務。
+
+    Returns:
+        被標記為失敗的 queue id
+    """
+    rows = conn.execute(text("""
+        UPDATE etl_job_queue
+        SET status = 'failed', finished_at = NOW(), error_message = 'ETL worker stopped responding'
+        WHERE status = 'running'
+          AND COALESCE(heartbeat_at, started_at) < NOW() - make_interval(secs => :stale_after)
+        RETURNING id, job_id, etl_log_id, worker_id
+    """), {"stale_after": stale_after}).fetchall()
+    for queue_id, job_id, etl_log_id, worker_id in rows:
+        logger.warning(f"ETL job {job_id} (queue_id={queue_id}) lost its worker {worker_id}; marked as failed")
+        if etl_log_id is not None:
+            conn.execute(text("""
+                UPDATE etl_execution_log
+                SET status = 'failed', completed_at = NOW(),
+                    duration_seconds = EXTRACT(EPOCH FROM (NOW() - started_at))::INTEGER,
+                    error_message = 'ETL worker stopped responding'
+                WHERE id = :id AND status = 'running'
+            """), {"id": etl_log_id})
+    return [row[0] for row in rows]
+
+
+def cancel_run(conn, etl_log_id: int) -> Optional[str]:
+    """
+    取消手動觸發的任務
+
+    排隊中的任務直接標記為 'cancelled'；執行中的任務（手動或排程觸發）設定 cancel_requested_at，
+    由任務在下一次回報進度時停止（見 app/etl/progress.py）。
+
+    Returns:
+        'cancelled'、'cancelling'、'finished'（已結束，無法取消），找不到紀錄時回傳 None
+    """
+    # 與 claim_next_job 相同的鎖定順序：先佇列列、再執行紀錄
+    queued = conn.execute(text("""
+        SELECT id FROM etl_job_queue
+        WHERE etl_log_id = :id AND status = 'queued'
+        FOR UPDATE
+    """), {"id": etl_log_id}).fetchone()
+    log = conn.execute(text("""
+        SELECT status FROM etl_execution_log WHERE id = :id FOR UPDATE
+    """), {"id": etl_log_id}).fetchone()
+    if log is None:
+        return None
+
+    if queued is not None:
+        conn.execute(text("""
+            UPDATE etl_job_queue
+            SET status = 'cancelled', finished_at = NOW(), error_message = 'Cancelled by admin'
+            WHERE id = :id
+        """), {"id": queued[0]})
+        conn.execute(text("""
+            UPDATE etl_execution_log
+            SET status = 'cancelled', completed_at = NOW(), duration_seconds = 0,
+                cancel_requested_at = NOW(), error_message = 'Cancelled by admin'
+            WHERE id = :id
+        """), {"id": etl_log_id})
+        logger.info(f"Cancelled queued ETL log {etl_log_id}")
+        return 'cancelled'
+
+    if log[0] in (QUEUED, RUNNING):
+        conn.execute(text("""
+            UPDATE etl_execution_log
+            SET cancel_requested_at = COALESCE(cancel_requested_at, NOW())
+            WHERE id = :id
+        """), {"id": etl_log_id})
+        logger.info(f"Requested cancellation of ETL log {etl_log_id}")
+        return 'cancelling'
+    return 'finished'
+
+
+def queue_summary(conn) -> Dict[str, int]:
+    """排隊中與執行中的任務數"""
+    counts = dict(conn.execute(text("""
+        SELECT status, COUNT(*) FROM etl_job_queue
+        WHERE status IN ('queued', 'running')
+        GROUP BY status
+    """)).fetchall())
+    return {'queued': counts.get(QUEUED, 0), 'running': counts.get(RUNNING, 0)}
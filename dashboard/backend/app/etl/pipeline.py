@@ -0,0 +1,240 @@
+"""
+ETL Pipeline Module
+任務相依（DAG）與資料水位：取代固定的 cron 錯開時間
+
+排程器只排程沒有上游的根任務（目前為 process_chat_messages，每小時一次）；
+下游任務在上游完成後才觸發，例如 AI 詞彙發現只分析已處理完的留言，
+處理時間較長時也不會與下一個 cron 時段重疊。
+
+每個任務可宣告資料水位（Watermark）：
+- source：上游可用資料的最新時間（可只查 checkpoint 之後的資料，沒有新資料時為 NULL）
+- checkpoint：本任務已消化到的時間
+source 沒有超過 checkpoint 代表沒有新資料，該次執行直接略過（不建立 ETL 記錄）。
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.etl.config import ETLConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """資料水位：兩個各回傳單一時間的查詢"""
+    source: str
+    checkpoint: str
+
+    def read(self, conn) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """讀取 (source, checkpoint)；在 savepoint 中執行，查詢失敗不影響呼叫端的 transaction"""
+        with conn.begin_nested():
+            source = conn.execute(text(self.source)).scalar()
+            checkpoint = conn.execute(text(self.checkpoint)).scalar()
+        return source, checkpoint
+
+
+@dataclass(frozen=True)
+class PipelineJob:
+    """DAG 中的一個任務（job_id 對應 TASK_REGISTRY）"""
+    job_id: str
+    upstream: Tuple[str, ...] = ()
+    watermark: Optional[Watermark] = None
+    # 兩次執行的最短間隔（以 etl_execution_log 中最近一次執行的開始時間計算）
+    min_interval: Optional[timedelta] = None
+
+
+_PROCESSED_CHECKPOINT = """
+    SELECT last_processed_timestamp FROM processed_chat_checkpoint
+    ORDER BY updated_at DESC LIMIT 1
+"""
+
+# 等待重置時視為尚未處理任何留言
+_PROCESS_CHAT_CHECKPOINT = f"""
+    SELECT CASE
+        WHEN EXISTS (
+            SELECT 1 FROM etl_settings
+            WHERE key = 'PROCESS_CHAT_RESET' AND LOWER(value) = 'true'
+        ) THEN NULL
+        ELSE ({_PROCESSED_CHECKPOINT})
+    END
+"""
+
+PIPELINE: Dict[str, PipelineJob] = {
+    job.job_id: job for job in [
+        PipelineJob(
+            'process_chat_messages',
+            watermark=Watermark(
+                # 只看檢查點之後的留言：索引與分區裁剪只需讀取最新的部分，不掃描整張表；
+                # 沒有新留言時為 NULL（略過）
+                source=f"""
+                    SELECT MAX(published_at) FROM chat_messages
+                    WHERE published_at > COALESCE(({_PROCESS_CHAT_CHECKPOINT}), '-infinity')
+                """,
+                checkpoint=_PROCESS_CHAT_CHECKPOINT,
+            ),
+        ),
+        PipelineJob(
+            'discover_new_words',
+            upstream=('process_chat_messages',),
+            watermark=Watermark(
+                source=_PROCESSED_CHECKPOINT,
+                checkpoint="""
+                    SELECT last_analyzed_timestamp FROM word_analysis_checkpoint
+                    ORDER BY updated_at DESC LIMIT 1
+                """,
+            ),
+            # 與原本每 3 小時一次的 Gemini 呼叫頻率相同
+            min_interval=timedelta(hours=3),
+        ),
+    ]
+}
+
+
+def _validate(pipeline: Dict[str, PipelineJob]) -> None:
+    """上游必須存在且不可有循環"""
+    visiting, done = set(), set()
+
+    def visit(job_id: str):
+        if job_id in done:
+            return
+        if job_id in visiting:
+            raise ValueError(f"ETL pipeline has a cycle through {job_id!r}")
+        visiting.add(job_id)
+        for upstream in pipeline[job_id].upstream:
+            if upstream not in pipeline:
+                raise ValueError(f"Unknown upstream {upstream!r} of ETL job {job_id!r}")
+            visit(upstream)
+        visiting.discard(job_id)
+        done.add(job_id)
+
+    for job_id in pipeline:
+        visit(job_id)
+
+
+_validate(PIPELINE)
+
+
+def root_jobs() -> List[str]:
+    """沒有上游、由排程器觸發的任務"""
+    return [job_id for job_id, job in PIPELINE.items() if not job.upstream]
+
+
+def downstream_jobs(job_id: str) -> List[str]:
+    """直接依賴 job_id 的任務"""
+    return [j.job_id for j in PIPELINE.values() if job_id in j.upstream]
+
+
+def _last_started_at(conn, job_id: str) -> Optional[datetime]:
+    return conn.execute(text("""
+        SELECT MAX(started_at) FROM etl_execution_log
+        WHERE job_id = :job_id AND status IN ('running', 'completed')
+    """), {"job_id": job_id}).scalar()
+
+
+def check_job(conn, job: PipelineJob, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    檢查任務是否該執行
+
+    Returns:
+        {'ready': bool, 'reason': 略過原因, 'source': ..., 'checkpoint': ...}
+        水位查詢失敗（例如表尚未建立）時視為有新資料，交由任務本身處理
+    """
+    state: Dict[str, Any] = {'ready': True, 'reason': None, 'source': None, 'checkpoint': None}
+    if job.watermark is not None:
+        try:
+            source, checkpoint = job.watermark.read(conn)
+        except Exception as e:
+            logger.warning(f"[{job.job_id}] Failed to read watermark, running anyway: {e}")
+        else:
+            state.update(source=source, checkpoint=checkpoint)
+            if source is None or (checkpoint is not None and source <= checkpoint):
+                state.update(ready=False, reason='no new data')
+                return state
+
+    if job.min_interval is not None:
+        last = _last_started_at(conn, job.job_id)
+        now = now or datetime.now(timezone.utc)
+        if last is not None and now - last < job.min_interval:
+            state.update(ready=False, reason=f'last run started at {last.isoformat()}')
+    return state
+
+
+def run_pipeline_job(job_id: str, etl_log_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    排程入口：有新資料時執行任務，完成後觸發下游任務
+
+    手動觸發（佇列任務帶有 etl_log_id）時不檢查水位線，一律執行，完成後同樣觸發下游任務。
+
+    Args:
+        job_id: PIPELINE 中的任務 ID
+        etl_log_id: 手動觸發時預先建立的執行記錄 ID
+    """
+    from app.etl.tasks import TASK_REGISTRY
+
+    job = PIPELINE[job_id]
+    engine = ETLConfig.get_engine()
+    if etl_log_id is None and engine is not None:
+        with engine.connect() as conn:
+            state = check_job(conn, job)
+        if not state['ready']:
+            logger.info(f"[{job_id}] Skipped by pipeline: {state['reason']}")
+            return {'status': 'skipped', 'reason': state['reason']}
+
+    task = TASK_REGISTRY[job_id]
+    result = task() if etl_log_id is None else task(etl_log_id=etl_log_id)
+    # 未取得 advisory lock（其他 worker 正在執行）或失敗時不觸發下游
+    if result.get('status', 'completed') == 'completed':
+        for downstream in downstream_jobs(job_id):
+            trigger_pipeline_job(downstream)
+    return result
+
+
+def trigger_pipeline_job(job_id: str) -> None:
+    """
+    觸發下游任務
+
+    排程器執行中時排入一次性任務（於執行緒池中執行，上游的執行緒即可結束）；
+    否則直接在目前的執行緒執行。
+    """
+    from app.etl.scheduler import get_scheduler
+    from app.etl.tasks import JOB_NAMES
+
+    scheduler = get_scheduler()
+    if scheduler is not None and scheduler.running:
+        scheduler.add_job(
+            run_pipeline_job,
+            'date',
+            args=[job_id],
+            id=job_id,
+            name=JOB_NAMES.get(job_id, job_id),
+            replace_existing=True,
+        )
+        logger.info(f"[{job_id}] Triggered by upstream completion")
+    else:
+        run_pipeline_job(job_id)
+
+
+def describe_pipeline(conn) -> List[Dict[str, Any]]:
+    """列出 DAG 中的任務、相依關係與目前水位（/api/admin/etl/jobs）"""
+    from app.etl.tasks import JOB_NAMES
+
+    nodes = []
+    for job_id, job in PIPELINE.items():
+        state = check_job(conn, job)
+        nodes.append({
+            'id': job_id,
+            'name': JOB_NAMES.get(job_id, job_id),
+            'upstream': list(job.upstream),
+            'downstream': downstream_jobs(job_id),
+            'source_watermark': state['source'].isoformat() if state['source'] else None,
+            'checkpoint': state['checkpoint'].isoformat() if state['checkpoint'] else None,
+            'min_interval_minutes': int(job.min_interval.total_seconds() // 60) if job.min_interval else None,
+            'ready': state['ready'],
+            'skip_reason': state['reason'],
+        })
+    return nodes
@@ -16,6 +16,7 @@ from .text_processor import (
 from .chat_processor import ChatProcessor
 from .word_discovery import WordDiscoveryProcessor
 from .dict_importer import DictImporter
+from .playback_cache import PlaybackCacheBuilder
 
 __all__ = [
     # Text processing functions
@@ -31,4 +32,5 @@ __all__ = [
     'ChatProcessor',
     'WordDiscoveryProcessor',
     'DictImporter',
+    'PlaybackCacheBuilder',
 ]
@@ -12,7 +12,15 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 
 from app.etl.config import ETLConfig
+from app.etl.progress import JobCancelled, ProgressReporter
+from app.services.author_activity import count_author_activity, add_author_activity
+from app.services.emoji_rollup import count_emojis, add_emoji_counts
+from app.services.mentions import add_mention_tables
+from app.services.word_group_hits import load_group_matcher, count_group_hits, add_group_hits
 from .text_processor import process_messages_batch
+from .extractors import MessageRow, load_extractor_set
+from .mention_backfill import MentionBackfiller
+from .word_group_hits import WordGroupHitIndexer
 
 logger = logging.getLogger(__name__)
 
@@ -30,17 +38,23 @@ class ChatProcessor:
     3. 提取 Unicode emoji 和 YouTube emotes
     4. 使用 jieba 進行斷詞
     5. 寫入 processed_chat_messages 表
+    6. 累加詞彙群組每小時命中數（word_group_hourly_counts）
+    7. 累加每小時 emoji 留言數（emoji_counts_by_hour）
+    8. 累加每小時作者留言數（author_activity_hourly）
+    9. 套用留言擷取器（extractors 註冊表）寫入 extracted_mentions
     """
 
-    def __init__(self, database_url: Optional[str] = None):
+    def __init__(self, database_url: Optional[str] = None, progress: Optional[ProgressReporter] = None):
         """
         初始化處理器
 
         Args:
             database_url: 資料庫連線字串，預設從環境變數讀取
+            progress: 每批次回報進度（並檢查是否被取消）
         """
         self.database_url = database_url or ETLConfig.get('DATABASE_URL')
         self._engine: Optional[Engine] = None
+        self.progress = progress
 
     def get_engine(self) -> Engine:
         """取得資料庫連線引擎"""
@@ -78,7 +92,11 @@ class ChatProcessor:
             # 4. 載入字典
             replace_dict, special_words = self._load_dictionaries()
 
-            # 5. 循環處理所有批次
+            # 5. 回填新建或修改過的詞彙群組（之後的批次才會累加這些群組）
+            self._backfill_word_groups()
+            self._backfill_mentions()
+
+            # 6. 循環處理所有批次
             result = self._process_all_batches(replace_dict, special_words)
 
             # 計算執行時間
@@ -95,6 +113,8 @@ class ChatProcessor:
                 'execution_time_seconds': execution_time
             }
 
+        except JobCancelled:
+            raise
         except Exception as e:
             logger.error(f"process_chat_messages failed: {e}")
             return {
@@ -118,6 +138,13 @@ class ChatProcessor:
             with engine.connect() as conn:
                 conn.execute(text("TRUNCATE TABLE processed_chat_messages;"))
                 conn.execute(text("TRUNCATE TABLE processed_chat_checkpoint;"))
+                # 斷詞結果將重新產生，已物化的 wordcloud timeline 一併失效
+                conn.execute(text("DELETE FROM playback_snapshot_cache WHERE kind = 'wordcloud';"))
+                # 詞彙群組命中數與 processed_chat_messages 同步，隨之清空後重新累加
+                conn.execute(text("TRUNCATE TABLE word_group_hourly_counts;"))
+                conn.execute(text("TRUNCATE TABLE emoji_counts_by_hour;"))
+                conn.execute(text("TRUNCATE TABLE author_activity_hourly;"))
+                conn.execute(text("TRUNCATE TABLE extracted_mentions;"))
                 conn.commit()
 
             # 重設 reset flag 為 false
@@ -136,7 +163,7 @@ class ChatProcessor:
         create_tables_sql = """
         -- 處理後的留言表
         CREATE TABLE IF NOT EXISTS processed_chat_messages (
-            message_id VARCHAR(255) PRIMARY KEY,
+            message_id VARCHAR(255) NOT NULL,
             live_stream_id VARCHAR(255) NOT NULL,
             original_message TEXT NOT NULL,
             processed_message TEXT NOT NULL,
@@ -146,8 +173,19 @@ class ChatProcessor:
             author_name VARCHAR(255) NOT NULL,
             author_id VARCHAR(255) NOT NULL,
             published_at TIMESTAMP WITH TIME ZONE NOT NULL,
-            processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-        );
+            processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (message_id, published_at)
+        ) PARTITION BY RANGE (published_at);
+
+        -- 每月分區由 maintain_partitions 建立；範圍外的資料寫入 default 分區
+        DO $do$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_class WHERE oid = 'processed_chat_messages'::regclass AND relkind = 'p')
+               AND to_regclass('processed_chat_messages_default') IS NULL THEN
+                CREATE TABLE processed_chat_messages_default PARTITION OF processed_chat_messages DEFAULT;
+            END IF;
+        END;
+        $do$;
 
         -- ETL 檢查點表
         CREATE TABLE IF NOT EXISTS processed_chat_checkpoint (
@@ -160,9 +198,73 @@ class ChatProcessor:
         -- 創建索引
         CREATE INDEX IF NOT EXISTS idx_processed_chat_stream_published ON processed_chat_messages(live_stream_id, published_at);
         CREATE INDEX IF NOT EXISTS idx_processed_chat_published_at ON processed_chat_messages(published_at);
-        CREATE INDEX IF NOT EXISTS idx_processed_chat_author_id ON processed_chat_messages(author_id);
-        CREATE INDEX IF NOT EXISTS idx_processed_chat_tokens ON processed_chat_messages USING GIN(tokens);
-        CREATE INDEX IF NOT EXISTS idx_processed_chat_emojis ON processed_chat_messages USING GIN(unicode_emojis);
+        CREATE INDEX IF NOT EXISTS idx_processed_chat_published_at_brin ON processed_chat_messages USING BRIN (published_at)
+            WITH (pages_per_range = 32);
+
+        -- 詞彙群組每小時命中數
+        ALTER TABLE word_trend_groups ADD COLUMN IF NOT EXISTS hits_indexed_at TIMESTAMP WITH TIME ZONE;
+        CREATE TABLE IF NOT EXISTS word_group_hourly_counts (
+            group_id INTEGER NOT NULL REFERENCES word_trend_groups(id) ON DELETE CASCADE,
+            live_stream_id VARCHAR(255) NOT NULL,
+            hour TIMESTAMP WITH TIME ZONE NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (group_id, live_stream_id, hour)
+        );
+        CREATE INDEX IF NOT EXISTS idx_word_group_hourly_counts_group_hour ON word_group_hourly_counts(group_id, hour);
+
+        -- 每小時 emoji 留言數
+        CREATE TABLE IF NOT EXISTS emoji_counts_by_hour (
+            live_stream_id VARCHAR(255) NOT NULL,
+            hour TIMESTAMP WITH TIME ZONE NOT NULL,
+            is_youtube BOOLEAN NOT NULL,
+            emoji TEXT NOT NULL,
+            image_url TEXT,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (live_stream_id, hour, is_youtube, emoji)
+        );
+        CREATE INDEX IF NOT EXISTS idx_emoji_counts_by_hour_hour ON emoji_counts_by_hour(hour);
+
+        -- 每小時作者留言數
+        CREATE TABLE IF NOT EXISTS author_activity_hourly (
+            live_stream_id VARCHAR(255) NOT NULL,
+            hour TIMESTAMP WITH TIME ZONE NOT NULL,
+            author_id VARCHAR(255) NOT NULL,
+            author_name VARCHAR(255) NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            paid_count INTEGER NOT NULL DEFAULT 0,
+            first_seen TIMESTAMP WITH TIME ZONE NOT NULL,
+            last_seen TIMESTAMP WITH TIME ZONE NOT NULL,
+            PRIMARY KEY (live_stream_id, hour, author_id, author_name)
+        );
+        CREATE INDEX IF NOT EXISTS idx_author_activity_hourly_author_hour ON author_activity_hourly(author_id, hour);
+        CREATE INDEX IF NOT EXISTS idx_author_activity_hourly_hour ON author_activity_hourly(hour);
+
+        -- 留言擷取器與擷取結果
+        CREATE TABLE IF NOT EXISTS mention_extractors (
+            name VARCHAR(64) PRIMARY KEY,
+            kind VARCHAR(20) NOT NULL DEFAULT 'regex',
+            pattern TEXT,
+            description TEXT,
+            enabled BOOLEAN NOT NULL DEFAULT TRUE,
+            backfilled_at TIMESTAMP WITH TIME ZONE,
+            backfill_cursor TIMESTAMP WITH TIME ZONE,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        ALTER TABLE mention_extractors ADD COLUMN IF NOT EXISTS kind VARCHAR(20) NOT NULL DEFAULT 'regex';
+        ALTER TABLE mention_extractors ADD COLUMN IF NOT EXISTS enabled BOOLEAN NOT NULL DEFAULT TRUE;
+        ALTER TABLE mention_extractors ADD COLUMN IF NOT EXISTS backfill_cursor TIMESTAMP WITH TIME ZONE;
+        ALTER TABLE mention_extractors ALTER COLUMN pattern DROP NOT NULL;
+        CREATE TABLE IF NOT EXISTS extracted_mentions (
+            extractor VARCHAR(64) NOT NULL REFERENCES mention_extractors(name) ON DELETE CASCADE,
+            message_id VARCHAR(255) NOT NULL,
+            published_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            live_stream_id VARCHAR(255) NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (extractor, message_id, published_at)
+        );
+        CREATE INDEX IF NOT EXISTS idx_extracted_mentions_extractor_stream_published
+            ON extracted_mentions(extractor, live_stream_id, published_at) INCLUDE (value);
         """
 
         with engine.connect() as conn:
@@ -273,6 +375,18 @@ class ChatProcessor:
             # 預設從 7 天前開始
             return datetime.now(timezone.utc) - timedelta(days=7)
 
+    def _count_pending(self, checkpoint_time: datetime, end_time: datetime) -> int:
+        """處理範圍內的留言數（含已處理的，作為進度的預估總數）"""
+        engine = self.get_engine()
+        with engine.connect() as conn:
+            return conn.execute(
+                text("""
+                    SELECT COUNT(*) FROM chat_messages
+                    WHERE published_at >= :checkpoint_time AND published_at <= :end_time
+                """),
+                {"checkpoint_time": checkpoint_time, "end_time": end_time}
+            ).scalar() or 0
+
     def _fetch_batch(self, checkpoint_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
         """
         獲取一批待處理的留言
@@ -289,9 +403,10 @@ class ChatProcessor:
 
         fetch_sql = """
             SELECT cm.message_id, cm.live_stream_id, cm.message, cm.emotes,
-                   cm.author_name, cm.author_id, cm.published_at
+                   cm.author_name, cm.author_id, cm.published_at, cm.message_type
             FROM chat_messages cm
-            LEFT JOIN processed_chat_messages pcm ON cm.message_id = pcm.message_id
+            LEFT JOIN processed_chat_messages pcm
+              ON cm.message_id = pcm.message_id AND cm.published_at = pcm.published_at
             WHERE cm.published_at >= :checkpoint_time
               AND cm.published_at <= :end_time
               AND pcm.message_id IS NULL
@@ -319,7 +434,8 @@ class ChatProcessor:
                 'emotes': row[3],
                 'author_name': row[4],
                 'author_id': row[5],
-                'published_at': row[6].isoformat() if row[6] else None
+                'published_at': row[6].isoformat() if row[6] else None,
+                'message_type': row[7]
             })
 
         return messages_data
@@ -342,7 +458,7 @@ class ChatProcessor:
                  tokens, unicode_emojis, youtube_emotes, author_name, author_id, published_at)
             VALUES (:message_id, :live_stream_id, :original_message, :processed_message,
                     :tokens, :unicode_emojis, :youtube_emotes, :author_name, :author_id, :published_at)
-            ON CONFLICT (message_id)
+            ON CONFLICT (message_id, published_at)
             DO UPDATE SET
                 processed_message = EXCLUDED.processed_message,
                 tokens = EXCLUDED.tokens,
@@ -368,10 +484,52 @@ class ChatProcessor:
                 for msg in processed_messages
             ]
             conn.execute(text(upsert_sql), params)
+
+            # 同一個 transaction 內累加每小時彙總，與 processed_chat_messages 保持一致
+            matcher = load_group_matcher(conn)
+            counts = count_group_hits(matcher, (
+                (msg['live_stream_id'], datetime.fromisoformat(msg['published_at']), msg['original_message'])
+                for msg in processed_messages
+            ))
+            add_group_hits(conn, counts)
+            add_emoji_counts(conn, count_emojis(processed_messages))
+            add_author_activity(conn, count_author_activity(processed_messages))
+            add_mention_tables(conn, load_extractor_set(conn).extract(
+                MessageRow(msg['message_id'], msg['live_stream_id'], msg['published_at'],
+                           msg['original_message'], msg['author_id'])
+                for msg in processed_messages
+            ))
             conn.commit()
 
         return len(processed_messages)
 
+    def _backfill_word_groups(self):
+        """
+        回填待處理的詞彙群組
+
+        API 觸發的回填若因本任務持有 lock 而被略過，會在這裡補上；
+        失敗時僅記錄警告，不影響留言處理（群組維持待處理，stats 會改掃原始留言）。
+        """
+        try:
+            result = WordGroupHitIndexer(self.database_url, engine=self.get_engine()).backfill_pending()
+            if result['groups_indexed']:
+                logger.info(f"Backfilled {result['groups_indexed']} word group(s)")
+        except Exception as e:
+            logger.warning(f"Word group backfill failed, will retry next run: {e}")
+
+    def _backfill_mentions(self):
+        """
+        回填待處理的留言擷取器
+
+        失敗時僅記錄警告，不影響留言處理（擷取器維持待處理，API 會改掃原始留言）。
+        """
+        try:
+            result = MentionBackfiller(self.database_url, engine=self.get_engine()).backfill_pending()
+            if result['extractors_backfilled']:
+                logger.info(f"Backfilled {result['extractors_backfilled']} mention extractor(s)")
+        except Exception as e:
+            logger.warning(f"Mention backfill failed, will retry next run: {e}")
+
     def _update_checkpoint_record(self, last_message_id: str, last_published_at: str):
         """
         更新檢查點記錄
@@ -432,6 +590,9 @@ class ChatProcessor:
 
         logger.info(f"Processing range: {checkpoint_time} -> {end_time}")
 
+        if self.progress:
+            self.progress.set_total(self._count_pending(checkpoint_time, end_time))
+
         total_processed = 0
         batch_count = 0
 
@@ -465,6 +626,9 @@ class ChatProcessor:
             )
 
             logger.info(f"Batch {batch_count} completed: {upserted} messages upserted")
+            if self.progress:
+                # 檢查點已更新：在此取消不會遺漏或重複處理
+                self.progress.advance(len(messages))
 
             # 釋放記憶體
             del messages
@@ -0,0 +1,204 @@
+"""
+Extractor Registry Module
+留言擷取器註冊表：在 ETL 斷詞的同一輪批次中擷取留言片段
+
+擷取器有兩種：
+1. regex（kind = 'regex'）：由管理員透過 /api/admin/extractors 建立，pattern 存在 mention_extractors
+2. builtin（kind = 'builtin'）：程式內以 @register_extractor 註冊的 Python 函式，
+   啟動 ETL 時同步一筆 mention_extractors 紀錄（保存回填狀態）
+
+每個擷取器宣告輸出表（目前為 extracted_mentions），每則留言最多產生一筆擷取值。
+同一批次所有 regex 擷取器先以一個合併後的 regex 預篩，絕大多數沒有命中的留言只比對一次。
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Pattern
+
+from sqlalchemy import text
+
+from app.etl.config import ETLConfig
+from app.services.mentions import MENTION_TABLES
+
+logger = logging.getLogger(__name__)
+
+KIND_REGEX = 'regex'
+KIND_BUILTIN = 'builtin'
+
+DEFAULT_OUTPUT_TABLE = 'extracted_mentions'
+
+# 含 backreference 的 pattern 合併後 group 編號會改變，不納入預篩
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class MessageRow(NamedTuple):
+    """擷取器的輸入：一則留言"""
+    message_id: str
+    live_stream_id: str
+    published_at: datetime
+    message: Optional[str]
+    author_id: Optional[str]
+
+
+ExtractFunc = Callable[[MessageRow], Optional[str]]
+
+
+@dataclass(frozen=True)
+class BuiltinExtractor:
+    """程式內註冊的擷取器；factory 每次載入時呼叫一次，回傳逐筆擷取的函式（可先讀取設定）"""
+    name: str
+    factory: Callable[[], ExtractFunc]
+    description: str
+    output_table: str = DEFAULT_OUTPUT_TABLE
+
+
+BUILTIN_EXTRACTORS: Dict[str, BuiltinExtractor] = {}
+
+
+def register_extractor(name: str, description: str = '', output_table: str = DEFAULT_OUTPUT_TABLE):
+    """
+    註冊 builtin 擷取器
+
+    被裝飾的函式為 factory：不接受參數，回傳 (MessageRow) -> Optional[str] 的擷取函式
+    """
+    if output_table not in MENTION_TABLES:
+        raise ValueError(f"Unknown output table for extractor {name!r}: {output_table}")
+
+    def decorator(factory: Callable[[], ExtractFunc]):
+        BUILTIN_EXTRACTORS[name] = BuiltinExtractor(name, factory, description, output_table)
+        return factory
+    return decorator
+
+
+@register_extractor('editor', '追蹤作者（MENTION_EDITOR_AUTHOR_IDS）的留言，擷取值為 author_id')
+def editor_extractor() -> ExtractFunc:
+    """小編留言：作者在 MENTION_EDITOR_AUTHOR_IDS（逗號分隔）中"""
+    author_ids = {
+        author_id.strip()
+        for author_id in str(ETLConfig.get('MENTION_EDITOR_AUTHOR_IDS', '') or '').split(',')
+        if author_id.strip()
+    }
+    return lambda row: row.author_id if row.author_id in author_ids else None
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """載入後的擷取器：regex 或函式擇一"""
+    name: str
+    pattern: Optional[Pattern] = None
+    func: Optional[ExtractFunc] = None
+    output_table: str = DEFAULT_OUTPUT_TABLE
+
+    def extract(self, row: MessageRow) -> Optional[str]:
+        if self.func is not None:
+            return self.func(row)
+        if not row.message:
+            return None
+        match = self.pattern.search(row.message)
+        return match_value(match) if match else None
+
+
+def compile_pattern(pattern: str) -> Pattern:
+    """Compile an extractor pattern (raises re.error if invalid)."""
+    return re.compile(pattern)
+
+
+def match_value(match: re.Match) -> str:
+    """The extracted value: the first group, or the whole match for patterns without groups."""
+    return match.group(1) if match.re.groups else match.group(0)
+
+
+def build_extractor(name: str, kind: str, pattern: Optional[str]) -> Optional[Extractor]:
+    """由 mention_extractors 紀錄建立擷取器；pattern 無效或 builtin 已不存在時回傳 None"""
+    if kind == KIND_BUILTIN:
+        builtin = BUILTIN_EXTRACTORS.get(name)
+        if builtin is None:
+            logger.warning(f"Skipping unknown builtin mention extractor {name!r}")
+            return None
+        return Extractor(name, func=builtin.factory(), output_table=builtin.output_table)
+    try:
+        return Extractor(name, pattern=compile_pattern(pattern))
+    except (re.error, TypeError) as e:
+        logger.warning(f"Skipping mention extractor {name!r} with invalid pattern: {e}")
+        return None
+
+
+class ExtractorSet:
+    """
+    一組擷取器，對每則留言各取第一個擷取值
+
+    regex 擷取器合併成一個 alternation 預篩：合併 regex 沒有命中的留言不可能被任一擷取器命中，
+    只有命中的留言才逐一比對各擷取器（取得各自的第一個 group）。
+    """
+
+    def __init__(self, extractors: Iterable[Extractor]):
+        self.extractors = list(extractors)
+        regexes = [e for e in self.extractors if e.pattern is not None]
+        combinable = [e for e in regexes if not _BACKREFERENCE.search(e.pattern.pattern)]
+        self.prefilter: Optional[Pattern] = None
+        if len(combinable) > 1:
+            try:
+                self.prefilter = re.compile('|'.join(f'(?:{e.pattern.pattern})' for e in combinable))
+            except re.error as e:
+                logger.info(f"Mention extractors not combinable, matching separately: {e}")
+        if self.prefilter is None:
+            combinable = []
+        self._filtered = combinable
+        filtered_names = {e.name for e in combinable}
+        self._always = [e for e in self.extractors if e.name not in filtered_names]
+
+    @property
+    def empty(self) -> bool:
+        return not self.extractors
+
+    @property
+    def names(self) -> List[str]:
+        return [e.name for e in self.extractors]
+
+    def extract(self, rows: Iterable[MessageRow]) -> Dict[str, List[Dict]]:
+        """
+        擷取一批留言
+
+        Returns:
+            {output_table: [mention dict, ...]}
+        """
+        mentions: Dict[str, List[Dict]] = {}
+        if self.empty:
+            return mentions
+        for row in rows:
+            candidates = self._always
+            if self._filtered and row.message and self.prefilter.search(row.message):
+                candidates = self._filtered + self._always
+            for extractor in candidates:
+                value = extractor.extract(row)
+                if value:
+                    mentions.setdefault(extractor.output_table, []).append({
+                        "extractor": extractor.name,
+                        "message_id": row.message_id,
+                        "published_at": row.published_at,
+                        "live_stream_id": row.live_stream_id,
+                        "value": value,
+                    })
+        return mentions
+
+
+def sync_builtin_extractors(conn) -> None:
+    """為程式內註冊、資料庫尚無紀錄的 builtin 擷取器建立紀錄（待回填）"""
+    for builtin in BUILTIN_EXTRACTORS.values():
+        conn.execute(text("""
+            INSERT INTO mention_extractors (name, kind, description, enabled)
+            VALUES (:name, :kind, :description, TRUE)
+            ON CONFLICT (name) DO NOTHING
+        """), {"name": builtin.name, "kind": KIND_BUILTIN, "description": builtin.description})
+
+
+def load_extractor_set(conn, backfilled_only: bool = True) -> ExtractorSet:
+    """載入啟用中的擷取器（預設只含已回填者，由 ETL 逐批累加）"""
+    query = "SELECT name, kind, pattern FROM mention_extractors WHERE enabled"
+    if backfilled_only:
+        query += " AND backfilled_at IS NOT NULL"
+    query += " ORDER BY name"
+    extractors = (build_extractor(*row) for row in conn.execute(text(query)))
+    return ExtractorSet(e for e in extractors if e is not None)
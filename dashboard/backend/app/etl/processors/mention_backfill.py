@@ -0,0 +1,209 @@
+"""
+Mention Backfill Module
+回填留言擷取結果（extracted_mentions）
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.etl.config import ETLConfig
+from app.etl.progress import JobCancelled, ProgressReporter
+from app.services.mentions import add_mention_tables
+from .extractors import ExtractorSet, MessageRow, build_extractor, sync_builtin_extractors
+
+logger = logging.getLogger(__name__)
+
+# 每個回填視窗涵蓋的時間長度；每個視窗一個 transaction 並記錄進度
+BACKFILL_WINDOW = timedelta(days=1)
+
+
+class MentionBackfiller:
+    """
+    留言擷取器回填器
+
+    功能：
+    1. 找出啟用中且 backfilled_at 為 NULL（新建、修改或重新啟用）的擷取器
+    2. 依 published_at 每 BACKFILL_WINDOW 掃描一段 processed_chat_messages，同時套用所有待回填擷取器
+    3. 每段寫入後提交並把擷取器的 backfill_cursor 推進到段尾；中斷後下次從 cursor 接續
+    4. 掃到最新的已處理留言後標記 backfilled_at，之後由 process_chat_messages 逐批擷取
+
+    必須與 process_chat_messages 互斥執行（共用同一個 advisory lock），
+    否則回填期間新處理的留言會被漏算。
+    """
+
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        engine: Optional[Engine] = None,
+        progress: Optional[ProgressReporter] = None,
+    ):
+        """
+        初始化回填器
+
+        Args:
+            database_url: 資料庫連線字串，預設從環境變數讀取
+            engine: 共用既有的連線引擎（由 ChatProcessor 呼叫時傳入）
+            progress: 每個視窗回報進度（並檢查是否被取消）
+        """
+        self.database_url = database_url or ETLConfig.get('DATABASE_URL')
+        self._engine: Optional[Engine] = engine
+        self.progress = progress
+
+    def get_engine(self) -> Engine:
+        """取得資料庫連線引擎"""
+        if self._engine is None:
+            self._engine = create_engine(
+                self.database_url,
+                pool_size=1,
+                max_overflow=1,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                pool_reset_on_return="rollback",
+            )
+        return self._engine
+
+    def run(self) -> Dict[str, Any]:
+        """
+        執行回填
+
+        Returns:
+            執行結果摘要
+        """
+        logger.info("Starting backfill_mentions...")
+        try:
+            result = self.backfill_pending()
+            logger.info(
+                f"backfill_mentions completed: extractors={result['extractors_backfilled']}, "
+                f"messages={result['messages_scanned']}"
+            )
+            return {'status': 'completed', **result}
+        except JobCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"backfill_mentions failed: {e}")
+            return {'status': 'failed', 'error': str(e)}
+
+    def backfill_pending(self) -> Dict[str, Any]:
+        """
+        回填所有待處理擷取器
+
+        每個擷取器記下讀取時的 updated_at；推進 cursor 與標記 backfilled_at 都以 updated_at 未變為條件，
+        回填期間被修改的擷取器退出本次回填（修改時 cursor 已被清空，下次從頭開始）。
+        pattern 無法編譯的擷取器維持待處理。
+        """
+        engine = self.get_engine()
+        with Session(engine) as session:
+            sync_builtin_extractors(session)
+            session.commit()
+
+            pending: Dict[str, Dict[str, Any]] = {}
+            for name, kind, pattern, cursor, updated_at in session.execute(text("""
+                SELECT name, kind, pattern, backfill_cursor, updated_at
+                FROM mention_extractors
+                WHERE enabled AND backfilled_at IS NULL
+                ORDER BY name
+            """)):
+                extractor = build_extractor(name, kind, pattern)
+                if extractor is not None:
+                    pending[name] = {'extractor': extractor, 'cursor': cursor, 'updated_at': updated_at}
+            if not pending:
+                return {'extractors_backfilled': 0, 'messages_scanned': 0, 'mentions_written': 0}
+
+            first, last = session.execute(text(
+                "SELECT MIN(published_at), MAX(published_at) FROM processed_chat_messages"
+            )).fetchone()
+
+            # 沒有 cursor 的擷取器從頭開始：清掉先前（修改前）留下的資料
+            fresh = [name for name, state in pending.items() if state['cursor'] is None]
+            if fresh:
+                session.execute(
+                    text("DELETE FROM extracted_mentions WHERE extractor = ANY(:names)"),
+                    {"names": fresh},
+                )
+                for name in fresh:
+                    pending[name]['cursor'] = first
+                session.commit()
+
+            logger.info(f"Backfilling mentions for extractors: {list(pending)}")
+            scanned = 0
+            written = 0
+            cursors = [state['cursor'] for state in pending.values() if state['cursor'] is not None]
+            window_start = min(cursors) if cursors else None
+            if self.progress and window_start is not None:
+                self.progress.set_total(session.execute(
+                    text("SELECT COUNT(*) FROM processed_chat_messages WHERE published_at >= :start"),
+                    {"start": window_start},
+                ).scalar())
+            while window_start is not None and last is not None and window_start <= last and pending:
+                window_end = window_start + BACKFILL_WINDOW
+                active = {name: state for name, state in pending.items() if state['cursor'] < window_end}
+                rows = session.execute(text("""
+                    SELECT message_id, live_stream_id, published_at, original_message, author_id
+                    FROM processed_chat_messages
+                    WHERE published_at >= :start AND published_at < :end
+                """), {"start": window_start, "end": window_end}).fetchall()
+                scanned += len(rows)
+
+                # cursor 在視窗起點以前的擷取器一起比對整段；cursor 落在視窗中的只比對 cursor 之後
+                whole = [state['extractor'] for state in active.values() if state['cursor'] <= window_start]
+                written += add_mention_tables(session, ExtractorSet(whole).extract(MessageRow(*row) for row in rows))
+                for state in active.values():
+                    if state['cursor'] > window_start:
+                        partial = (MessageRow(*row) for row in rows if row[2] >= state['cursor'])
+                        written += add_mention_tables(session, ExtractorSet([state['extractor']]).extract(partial))
+
+                for name in self._advance_cursors(session, active, window_end):
+                    pending.pop(name)
+                session.commit()
+                window_start = window_end
+                if self.progress:
+                    # 視窗與 cursor 已提交：取消後下次從 cursor 接續
+                    self.progress.advance(len(rows))
+
+            backfilled = self._mark_backfilled(session, pending)
+            session.commit()
+
+        return {'extractors_backfilled': len(backfilled), 'messages_scanned': scanned, 'mentions_written': written}
+
+    @staticmethod
+    def _advance_cursors(session: Session, active: Dict[str, Dict[str, Any]], cursor) -> List[str]:
+        """把 updated_at 未變動的擷取器 cursor 推進到 cursor，回傳期間被修改的名稱"""
+        changed = []
+        for name, state in active.items():
+            row = session.execute(text("""
+                UPDATE mention_extractors
+                SET backfill_cursor = :cursor
+                WHERE name = :name
+                  AND backfilled_at IS NULL
+                  AND updated_at IS NOT DISTINCT FROM :updated_at
+                RETURNING name
+            """), {"name": name, "cursor": cursor, "updated_at": state['updated_at']}).fetchone()
+            if row:
+                state['cursor'] = cursor
+            else:
+                changed.append(name)
+        if changed:
+            logger.info(f"{len(changed)} mention extractor(s) changed during backfill, left pending")
+        return changed
+
+    @staticmethod
+    def _mark_backfilled(session: Session, pending: Dict[str, Dict[str, Any]]) -> List[str]:
+        """標記 updated_at 未變動的擷取器為已回填，回傳成功標記的名稱"""
+        backfilled = []
+        for name, state in pending.items():
+            row = session.execute(text("""
+                UPDATE mention_extractors
+                SET backfilled_at = NOW(), backfill_cursor = NULL
+                WHERE name = :name
+                  AND backfilled_at IS NULL
+                  AND updated_at IS NOT DISTINCT FROM :updated_at
+                RETURNING name
+            """), {"name": name, "updated_at": state['updated_at']}).fetchone()
+            if row:
+                backfilled.append(row[0])
+        return backfilled
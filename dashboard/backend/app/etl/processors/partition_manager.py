@@ -0,0 +1,129 @@
+"""
+Partition Manager Module
+預先建立 chat_messages / processed_chat_messages 的每月分區
+"""
+
+import logging
+from datetime import date, datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.etl.config import ETLConfig
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ('chat_messages', 'processed_chat_messages')
+DEFAULT_MONTHS_AHEAD = 3
+
+
+def month_starts(start: date, count: int) -> List[date]:
+    """從 start 所在月份起連續 count 個月的月初日期"""
+    year, month = start.year, start.month
+    months = []
+    for _ in range(count):
+        months.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def is_partitioned(session: Session, table: str) -> bool:
+    """資料表是否已是分區表（migration 29 之前仍是一般資料表）"""
+    return bool(session.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_class WHERE oid = to_regclass(:t) AND relkind = 'p')"),
+        {"t": table},
+    ).scalar())
+
+
+def create_monthly_partition(session: Session, table: str, month: date) -> Optional[str]:
+    """
+    建立 table 在 month 的分區（已存在則略過）
+
+    Returns:
+        新分區名稱；已存在時為 None
+    """
+    return session.execute(
+        text("SELECT create_monthly_partition(:parent, :month)"),
+        {"parent": table, "month": month},
+    ).scalar()
+
+
+class PartitionManager:
+    """
+    分區維護
+
+    功能：
+    1. 為每張分區表建立本月起 PARTITION_MONTHS_AHEAD 個月的分區
+    2. 建立時把已落入 default 分區的同月資料搬進新分區
+    3. 回報仍留在 default 分區的筆數（分區未及時建立的警訊）
+    """
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url or ETLConfig.get('DATABASE_URL')
+        self._engine: Optional[Engine] = None
+
+    def get_engine(self) -> Engine:
+        """取得資料庫連線引擎"""
+        if self._engine is None:
+            self._engine = create_engine(
+                self.database_url,
+                pool_size=1,
+                max_overflow=1,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                pool_reset_on_return="rollback",
+            )
+        return self._engine
+
+    def run(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """
+        執行分區維護
+
+        Args:
+            today: 基準日期（預設為今天，UTC）
+
+        Returns:
+            執行結果摘要
+        """
+        logger.info("Starting maintain_partitions...")
+
+        today = today or datetime.now(timezone.utc).date()
+        months_ahead = int(ETLConfig.get('PARTITION_MONTHS_AHEAD', DEFAULT_MONTHS_AHEAD))
+        months = month_starts(today, months_ahead + 1)
+
+        created: List[str] = []
+        default_rows: Dict[str, int] = {}
+        try:
+            with Session(self.get_engine()) as session:
+                for table in PARTITIONED_TABLES:
+                    if not is_partitioned(session, table):
+                        logger.warning(f"{table} is not partitioned yet; run migration 29 first")
+                        continue
+                    for month in months:
+                        name = create_monthly_partition(session, table, month)
+                        # Commit per partition: ATTACH holds locks until commit
+                        session.commit()
+                        if name:
+                            created.append(name)
+                            logger.info(f"Created partition {name}")
+
+                    default_rows[table] = session.execute(
+                        text(f"SELECT COUNT(*) FROM {table}_default")
+                    ).scalar()
+                    if default_rows[table]:
+                        logger.warning(
+                            f"{default_rows[table]} rows of {table} are outside every monthly partition"
+                        )
+
+            logger.info(f"maintain_partitions completed: created={len(created)}")
+            return {
+                'status': 'completed',
+                'partitions_created': len(created),
+                'created': created,
+                'default_rows': default_rows,
+            }
+        except Exception as e:
+            logger.error(f"maintain_partitions failed: {e}")
+            return {'status': 'failed', 'error': str(e)}
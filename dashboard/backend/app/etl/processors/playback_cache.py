@@ -0,0 +1,250 @@
+"""
+Playback Cache Builder Module
+直播結束後預先計算回放快照 timeline，寫入 playback_snapshot_cache
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.etl.config import ETLConfig
+from app.services.playback_cache import (
+    KIND_STATS,
+    KIND_WORDCLOUD,
+    MATERIALIZED_STEPS,
+    CACHE_WORD_LIMIT,
+    encode_payload,
+    compute_etag,
+    resample_timeline,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PlaybackCacheBuilder:
+    """
+    回放快取建立器
+
+    功能：
+    1. 找出 live_broadcast_content = 'none'（已結束）且快取不完整的直播
+    2. 以最細的 step 計算整場直播的 stats / wordcloud timeline
+    3. 由最細 timeline 重新取樣出較粗的 step
+    4. gzip 壓縮後寫入 playback_snapshot_cache
+    """
+
+    def __init__(self, database_url: Optional[str] = None):
+        self.database_url = database_url or ETLConfig.get('DATABASE_URL')
+        self._engine: Optional[Engine] = None
+
+    def get_engine(self) -> Engine:
+        """取得資料庫連線引擎"""
+        if self._engine is None:
+            self._engine = create_engine(
+                self.database_url,
+                pool_size=1,
+                max_overflow=1,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                pool_reset_on_return="rollback",
+            )
+        return self._engine
+
+    def run(self) -> Dict[str, Any]:
+        """
+        執行快取建立
+
+        Returns:
+            執行結果摘要
+        """
+        logger.info("Starting build_playback_cache...")
+
+        enabled = ETLConfig.get('PLAYBACK_CACHE_ENABLED', True)
+        if not enabled:
+            logger.info("Playback cache is disabled")
+            return {'status': 'skipped', 'reason': 'playback_cache_disabled'}
+
+        try:
+            streams = self._get_pending_streams()
+            timelines_built = 0
+            for video_id in streams:
+                timelines_built += self.build_stream(video_id)
+
+            logger.info(
+                f"build_playback_cache completed: streams={len(streams)}, timelines={timelines_built}"
+            )
+            return {
+                'status': 'completed',
+                'streams_built': len(streams),
+                'timelines_built': timelines_built,
+            }
+        except Exception as e:
+            logger.error(f"build_playback_cache failed: {e}")
+            return {'status': 'failed', 'error': str(e)}
+
+    @staticmethod
+    def expected_keys() -> Set[Tuple[str, int, int]]:
+        """所有應被物化的 (kind, step_seconds, window_hours) 組合"""
+        from app.routers.playback_wordcloud import VALID_WINDOW_HOURS
+
+        keys = {(KIND_STATS, step, 0) for step in MATERIALIZED_STEPS}
+        keys |= {
+            (KIND_WORDCLOUD, step, window)
+            for step in MATERIALIZED_STEPS
+            for window in VALID_WINDOW_HOURS
+        }
+        return keys
+
+    def _get_pending_streams(self) -> List[str]:
+        """
+        取得已結束且快取不完整的直播
+
+        只處理最後一則留言已完成斷詞的直播，避免 wordcloud timeline 缺資料。
+        """
+        engine = self.get_engine()
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT ls.video_id
+                FROM live_streams ls
+                WHERE ls.live_broadcast_content = 'none'
+                  AND (
+                      SELECT COUNT(*) FROM playback_snapshot_cache c
+                      WHERE c.live_stream_id = ls.video_id
+                  ) < :expected
+                  AND EXISTS (
+                      SELECT 1 FROM processed_chat_messages pcm
+                      WHERE pcm.message_id = (
+                          SELECT cm.message_id FROM chat_messages cm
+                          WHERE cm.live_stream_id = ls.video_id
+                          ORDER BY cm.published_at DESC
+                          LIMIT 1
+                      )
+                  )
+                ORDER BY ls.video_id
+            """), {"expected": len(self.expected_keys())}).fetchall()
+        return [row[0] for row in rows]
+
+    def _get_stream_range(self, session: Session, video_id: str) -> Optional[Tuple[datetime, datetime]]:
+        """取得直播留言時間範圍，對齊到整分鐘"""
+        row = session.execute(text("""
+            SELECT MIN(published_at), MAX(published_at)
+            FROM chat_messages
+            WHERE live_stream_id = :video_id
+        """), {"video_id": video_id}).fetchone()
+        if not row or row[0] is None:
+            return None
+
+        first = row[0].astimezone(timezone.utc)
+        last = row[1].astimezone(timezone.utc)
+        start = first.replace(second=0, microsecond=0)
+        end = last.replace(second=0, microsecond=0)
+        if end < last:
+            end += timedelta(minutes=1)
+        return start, end
+
+    def build_stream(self, video_id: str) -> int:
+        """
+        建立單一直播缺少的 timeline
+
+        Returns:
+            寫入的 timeline 數量
+        """
+        from app.routers.playback import compute_playback_snapshots
+        from app.routers.playback_wordcloud import _compute_all_snapshots, DEFAULT_EXCLUDED
+
+        engine = self.get_engine()
+        with Session(engine) as session:
+            stream_range = self._get_stream_range(session, video_id)
+            if stream_range is None:
+                return 0
+            start, end = stream_range
+
+            existing = {
+                (row[0], row[1], row[2])
+                for row in session.execute(text("""
+                    SELECT kind, step_seconds, window_hours
+                    FROM playback_snapshot_cache
+                    WHERE live_stream_id = :video_id
+                """), {"video_id": video_id})
+            }
+            missing = self.expected_keys() - existing
+            if not missing:
+                return 0
+
+            finest = MATERIALIZED_STEPS[0]
+            built = 0
+            for kind, window in sorted({(k, w) for k, _, w in missing}):
+                logger.info(f"Building playback cache: video={video_id} kind={kind} window={window}h")
+                if kind == KIND_STATS:
+                    timeline = compute_playback_snapshots(
+                        session, start, end, finest, video_id, round_revenue=False
+                    )
+                else:
+                    timeline = _compute_all_snapshots(
+                        db=session,
+                        start_time=start,
+                        end_time=end,
+                        step_seconds=finest,
+                        window_hours=window,
+                        video_id=video_id,
+                        excluded=set(DEFAULT_EXCLUDED),
+                        replace_dict={},
+                        word_limit=CACHE_WORD_LIMIT,
+                    )
+
+                for step in MATERIALIZED_STEPS:
+                    if (kind, step, window) not in missing:
+                        continue
+                    snapshots = timeline if step == finest else resample_timeline(
+                        timeline, start, finest, start, end, step
+                    )
+                    self._save_timeline(session, video_id, kind, step, window, start, snapshots)
+                    built += 1
+
+            session.commit()
+        return built
+
+    def _save_timeline(
+        self,
+        session: Session,
+        video_id: str,
+        kind: str,
+        step_seconds: int,
+        window_hours: int,
+        start: datetime,
+        snapshots: List[Dict[str, Any]],
+    ):
+        """寫入（或覆蓋）一條 timeline"""
+        payload = encode_payload(snapshots)
+        end = start + timedelta(seconds=step_seconds * max(len(snapshots) - 1, 0))
+        session.execute(text("""
+            INSERT INTO playback_snapshot_cache
+                (live_stream_id, kind, step_seconds, window_hours, start_time, end_time,
+                 snapshot_count, payload, etag)
+            VALUES (:video_id, :kind, :step, :window, :start, :end, :count, :payload, :etag)
+            ON CONFLICT (live_stream_id, kind, step_seconds, window_hours)
+            DO UPDATE SET
+                start_time = EXCLUDED.start_time,
+                end_time = EXCLUDED.end_time,
+                snapshot_count = EXCLUDED.snapshot_count,
+                payload = EXCLUDED.payload,
+                etag = EXCLUDED.etag,
+                created_at = NOW();
+        """), {
+            "video_id": video_id,
+            "kind": kind,
+            "step": step_seconds,
+            "window": window_hours,
+            "start": start,
+            "end": end,
+            "count": len(snapshots),
+            "payload": payload,
+            "etag": compute_etag(payload),
+        })
+        logger.info(
+            f"Saved playback cache: video={video_id} kind={kind} step={step_seconds}s "
+            f"window={window_hours}h snapshots={len(snapshots)} bytes={len(payload)}"
+        )
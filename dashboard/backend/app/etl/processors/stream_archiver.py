@@ -0,0 +1,464 @@
+"""
+Stream Archiver Module
+已結束直播的冷封存：原始留言匯出成檔案、資料庫只保留彙總
+"""
+
+import glob
+import logging
+import os
+import re
+import shutil
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.etl.config import ETLConfig
+from app.etl.processors.partition_manager import (
+    PARTITIONED_TABLES,
+    create_monthly_partition,
+    is_partitioned,
+)
+from app.models import PAID_MESSAGE_TYPES, ChatMessage, ProcessedChatMessage, StreamArchive, StreamStats
+from app.services.stream_archive import (
+    FORMAT_JSONL,
+    FORMAT_PARQUET,
+    count_file_rows,
+    read_manifest,
+    read_table_file,
+    table_path,
+    write_manifest,
+    write_table_file,
+)
+
+logger = logging.getLogger(__name__)
+
+# (table, time column); every row of an archived stream in these tables is
+# exported and deleted. paid_message_ledger is not exported: the chat_messages
+# insert trigger rebuilds it on restore.
+ARCHIVED_TABLES = (
+    (ChatMessage.__table__, 'published_at'),
+    (ProcessedChatMessage.__table__, 'published_at'),
+    (StreamStats.__table__, 'collected_at'),
+)
+
+DEFAULT_ARCHIVE_DIR = '/data/archive'
+DEFAULT_BACKUP_DIR = '/data/backup'
+
+
+def month_floor(value: datetime) -> date:
+    """value 所在月份的月初（UTC）"""
+    value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+class StreamArchiver:
+    """
+    冷封存
+
+    功能：
+    1. 找出已結束、最後一則留言超過 RETENTION_ARCHIVE_AFTER_DAYS 天且已完成斷詞的直播
+    2. 寫入 stream_hourly_rollups / stream_token_counts 彙總
+    3. 匯出 chat_messages / processed_chat_messages / stream_stats 到 ARCHIVE_DIR/<video_id>/
+    4. 確認檔案筆數後刪除原始資料與付費帳本，記錄到 stream_archives
+    5. 卸除並刪除已清空的舊月份分區，清理過期的 ETL 執行記錄
+    """
+
+    def __init__(self, database_url: Optional[str] = None, archive_dir: Optional[str] = None):
+        self.database_url = database_url or ETLConfig.get('DATABASE_URL')
+        self.archive_dir = archive_dir or os.getenv('ARCHIVE_DIR', DEFAULT_ARCHIVE_DIR)
+        self.backup_dir = os.getenv('CHAT_BACKUP_DIR', DEFAULT_BACKUP_DIR)
+        self._engine: Optional[Engine] = None
+
+    def get_engine(self) -> Engine:
+        """取得資料庫連線引擎"""
+        if self._engine is None:
+            self._engine = create_engine(
+                self.database_url,
+                pool_size=1,
+                max_overflow=1,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                pool_reset_on_return="rollback",
+            )
+        return self._engine
+
+    def stream_dir(self, video_id: str) -> str:
+        return os.path.join(self.archive_dir, video_id)
+
+    def run(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        執行冷封存
+
+        Args:
+            now: 基準時間（預設為現在）
+
+        Returns:
+            執行結果摘要
+        """
+        logger.info("Starting archive_streams...")
+
+        if not ETLConfig.get('RETENTION_ENABLED', False):
+            logger.info("Retention is disabled")
+            return {'status': 'skipped', 'reason': 'retention_disabled'}
+
+        now = now or datetime.now(timezone.utc)
+        after_days = int(ETLConfig.get('RETENTION_ARCHIVE_AFTER_DAYS', 90))
+        file_format = ETLConfig.get('RETENTION_ARCHIVE_FORMAT', FORMAT_PARQUET)
+        limit = int(ETLConfig.get('RETENTION_MAX_STREAMS_PER_RUN', 5))
+        cutoff = now - timedelta(days=after_days)
+
+        try:
+            archived: List[str] = []
+            failed: Dict[str, str] = {}
+            for video_id in self.get_candidates(cutoff, now, limit):
+                try:
+                    self.archive_stream(video_id, file_format)
+                    archived.append(video_id)
+                except Exception as e:
+                    logger.error(f"Failed to archive {video_id}: {e}")
+                    failed[video_id] = str(e)
+
+            with Session(self.get_engine()) as session:
+                dropped = self.drop_empty_partitions(session, month_floor(cutoff))
+                logs_deleted = self.prune_etl_logs(session, now)
+
+            logger.info(
+                f"archive_streams completed: archived={len(archived)}, failed={len(failed)}, "
+                f"partitions_dropped={len(dropped)}, etl_logs_deleted={logs_deleted}"
+            )
+            return {
+                'status': 'failed' if failed and not archived else 'completed',
+                'streams_archived': len(archived),
+                'archived': archived,
+                'failed': failed,
+                'partitions_dropped': dropped,
+                'etl_logs_deleted': logs_deleted,
+                'error': '; '.join(f"{k}: {v}" for k, v in failed.items()) or None,
+            }
+        except Exception as e:
+            logger.error(f"archive_streams failed: {e}")
+            return {'status': 'failed', 'error': str(e)}
+
+    def get_candidates(self, cutoff: datetime, now: datetime, limit: int) -> List[str]:
+        """
+        取得可封存的直播
+
+        已結束、最後一則留言早於 cutoff、每則留言都已斷詞、回放快取已建立
+        （PLAYBACK_CACHE_ENABLED 時）；
+        還原過的直播要過了 RETENTION_RESTORE_HOLD_DAYS 才會再封存。
+        collector 備份目錄仍有未匯入檔案的直播先略過，避免匯入時寫回已封存的直播。
+        """
+        hold_days = int(ETLConfig.get('RETENTION_RESTORE_HOLD_DAYS', 7))
+        with Session(self.get_engine()) as session:
+            rows = session.execute(text("""
+                SELECT ls.video_id
+                FROM live_streams ls
+                LEFT JOIN stream_archives sa ON sa.live_stream_id = ls.video_id
+                WHERE ls.live_broadcast_content = 'none'
+                  AND (sa.live_stream_id IS NULL
+                       OR (sa.status = 'restored' AND sa.restored_at < :restored_before))
+                  AND EXISTS (
+                      SELECT 1 FROM chat_messages cm WHERE cm.live_stream_id = ls.video_id
+                  )
+                  AND NOT EXISTS (
+                      SELECT 1 FROM chat_messages cm
+                      WHERE cm.live_stream_id = ls.video_id AND cm.published_at >= :cutoff
+                  )
+                  AND (NOT :require_cache OR EXISTS (
+                      SELECT 1 FROM playback_snapshot_cache c WHERE c.live_stream_id = ls.video_id
+                  ))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM chat_messages cm
+                      LEFT JOIN processed_chat_messages pcm
+                        ON cm.message_id = pcm.message_id AND cm.published_at = pcm.published_at
+                      WHERE cm.live_stream_id = ls.video_id AND pcm.message_id IS NULL
+                  )
+                ORDER BY ls.video_id
+            """), {
+                "cutoff": cutoff,
+                "restored_before": now - timedelta(days=hold_days),
+                "require_cache": bool(ETLConfig.get('PLAYBACK_CACHE_ENABLED', True)),
+            }).fetchall()
+
+        candidates = []
+        for (video_id,) in rows:
+            if glob.glob(os.path.join(self.backup_dir, video_id, 'chat_buffer_backup_*.json')):
+                logger.warning(f"Skipping {video_id}: collector backup files are not imported yet")
+                continue
+            candidates.append(video_id)
+            if len(candidates) >= limit:
+                break
+        return candidates
+
+    def archive_stream(self, video_id: str, file_format: str = FORMAT_PARQUET) -> Dict[str, Any]:
+        """
+        封存單一直播（同一個 transaction 內彙總、匯出、刪除）
+
+        Returns:
+            manifest 內容
+        """
+        if file_format not in (FORMAT_PARQUET, FORMAT_JSONL):
+            raise ValueError(f"Unknown archive format: {file_format}")
+
+        stream_dir = self.stream_dir(video_id)
+        os.makedirs(stream_dir, exist_ok=True)
+
+        with Session(self.get_engine()) as session:
+            first, last = session.execute(text("""
+                SELECT MIN(published_at), MAX(published_at)
+                FROM chat_messages WHERE live_stream_id = :video_id
+            """), {"video_id": video_id}).fetchone()
+
+            self._write_rollups(session, video_id)
+
+            row_counts: Dict[str, int] = {}
+            size_bytes = 0
+            for table, time_column in ARCHIVED_TABLES:
+                path = table_path(stream_dir, table, file_format)
+                written = self._export_table(session, table, time_column, video_id, path, file_format)
+
+                deleted = session.execute(
+                    table.delete().where(table.c.live_stream_id == video_id)
+                ).rowcount
+                if deleted != written:
+                    raise RuntimeError(f"{table.name}: exported {written} rows but deleting {deleted}")
+
+                row_counts[table.name] = written
+                size_bytes += os.path.getsize(path)
+
+            # No FK from the ledger to chat_messages; the trigger rebuilds it on restore
+            session.execute(
+                text("DELETE FROM paid_message_ledger WHERE live_stream_id = :video_id"),
+                {"video_id": video_id},
+            )
+
+            manifest = {
+                'live_stream_id': video_id,
+                'file_format': file_format,
+                'row_counts': row_counts,
+                'first_published_at': first,
+                'last_published_at': last,
+                'archived_at': datetime.now(timezone.utc),
+            }
+            write_manifest(stream_dir, manifest)
+            self._move_backup_files(video_id, stream_dir)
+
+            stmt = insert(StreamArchive.__table__).values(
+                live_stream_id=video_id,
+                status='archived',
+                archive_path=stream_dir,
+                file_format=file_format,
+                row_counts=row_counts,
+                size_bytes=size_bytes,
+                first_published_at=first,
+                last_published_at=last,
+                archived_at=func.now(),
+                restored_at=None,
+            )
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['live_stream_id'],
+                set_={c: stmt.excluded[c] for c in (
+                    'status', 'archive_path', 'file_format', 'row_counts', 'size_bytes',
+                    'first_published_at', 'last_published_at', 'archived_at', 'restored_at',
+                )},
+            ))
+            session.commit()
+
+        logger.info(f"Archived {video_id}: {row_counts} ({size_bytes} bytes, {file_format})")
+        return manifest
+
+    def export_stream(self, video_id: str, output_dir: str, file_format: str = FORMAT_PARQUET) -> Dict[str, Any]:
+        """
+        匯出單一直播的原始資料到 output_dir/<video_id>/（不刪除、不寫入 stream_archives）
+
+        目錄結構與封存相同，離線分析（analysis/duckdb_runner.py）可直接讀取
+        匯出目錄或 ARCHIVE_DIR。
+
+        Returns:
+            manifest 內容
+        """
+        stream_dir = os.path.join(output_dir, video_id)
+        os.makedirs(stream_dir, exist_ok=True)
+
+        row_counts: Dict[str, int] = {}
+        with Session(self.get_engine()) as session:
+            first, last = session.execute(text("""
+                SELECT MIN(published_at), MAX(published_at)
+                FROM chat_messages WHERE live_stream_id = :video_id
+            """), {"video_id": video_id}).fetchone()
+            for table, time_column in ARCHIVED_TABLES:
+                path = table_path(stream_dir, table, file_format)
+                row_counts[table.name] = self._export_table(
+                    session, table, time_column, video_id, path, file_format
+                )
+
+        manifest = {
+            'live_stream_id': video_id,
+            'file_format': file_format,
+            'row_counts': row_counts,
+            'first_published_at': first,
+            'last_published_at': last,
+            'exported_at': datetime.now(timezone.utc),
+        }
+        write_manifest(stream_dir, manifest)
+        logger.info(f"Exported {video_id} to {stream_dir}: {row_counts}")
+        return manifest
+
+    def _export_table(self, session: Session, table, time_column: str, video_id: str,
+                      path: str, file_format: str) -> int:
+        """匯出一張表中該直播的資料列，確認檔案筆數後回傳"""
+        result = session.execute(
+            table.select()
+            .where(table.c.live_stream_id == video_id)
+            .order_by(table.c[time_column])
+            .execution_options(yield_per=5000)
+        )
+        written = write_table_file(path, table, (dict(row._mapping) for row in result), file_format)
+        if count_file_rows(path, file_format) != written:
+            raise RuntimeError(f"{path} does not contain the {written} exported rows")
+        return written
+
+    def restore_stream(self, video_id: str) -> Dict[str, int]:
+        """
+        由封存檔還原單一直播的原始資料（已存在的資料列略過）
+
+        Returns:
+            {table: 還原筆數}
+        """
+        stream_dir = self.stream_dir(video_id)
+        manifest = read_manifest(stream_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"No archive manifest in {stream_dir}")
+        file_format = manifest['file_format']
+
+        restored: Dict[str, int] = {}
+        with Session(self.get_engine()) as session:
+            # Old months may have been dropped after archiving; recreate them
+            # so restored rows do not pile up in the default partition
+            if manifest.get('first_published_at'):
+                first = datetime.fromisoformat(manifest['first_published_at'])
+                last = datetime.fromisoformat(manifest['last_published_at'])
+                for table in PARTITIONED_TABLES:
+                    if not is_partitioned(session, table):
+                        continue
+                    month = month_floor(first)
+                    while month <= month_floor(last):
+                        create_monthly_partition(session, table, month)
+                        month = next_month(month)
+
+            for table, _ in ARCHIVED_TABLES:
+                path = table_path(stream_dir, table, file_format)
+                restored[table.name] = 0
+                for batch in read_table_file(path, table, file_format):
+                    result = session.execute(insert(table).on_conflict_do_nothing(), batch)
+                    restored[table.name] += result.rowcount
+
+            session.execute(text("""
+                UPDATE stream_archives SET status = 'restored', restored_at = NOW()
+                WHERE live_stream_id = :video_id
+            """), {"video_id": video_id})
+            session.commit()
+
+        logger.info(f"Restored {video_id}: {restored}")
+        return restored
+
+    def _write_rollups(self, session: Session, video_id: str):
+        """
+        寫入封存後仍保留在資料庫的彙總（重複封存時覆寫）
+
+        斷詞數與文字雲相同，同一則留言中的同一個詞只算一次。
+        """
+        session.execute(text("""
+            INSERT INTO stream_hourly_rollups
+                (live_stream_id, hour, message_count, paid_message_count, author_count, revenue_twd)
+            SELECT cm.live_stream_id, date_trunc('hour', cm.published_at),
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE cm.message_type = ANY(:paid_types)),
+                   COUNT(DISTINCT cm.author_id),
+                   COALESCE(SUM(l.amount_twd), 0)
+            FROM chat_messages cm
+            LEFT JOIN paid_message_ledger l ON l.message_id = cm.message_id
+            WHERE cm.live_stream_id = :video_id
+            GROUP BY cm.live_stream_id, date_trunc('hour', cm.published_at)
+            ON CONFLICT (live_stream_id, hour) DO UPDATE SET
+                message_count = EXCLUDED.message_count,
+                paid_message_count = EXCLUDED.paid_message_count,
+                author_count = EXCLUDED.author_count,
+                revenue_twd = EXCLUDED.revenue_twd
+        """), {"video_id": video_id, "paid_types": PAID_MESSAGE_TYPES})
+
+        session.execute(text("""
+            INSERT INTO stream_token_counts (live_stream_id, token, count)
+            SELECT p.live_stream_id, token, COUNT(DISTINCT p.message_id)
+            FROM processed_chat_messages p, unnest(p.tokens) AS token
+            WHERE p.live_stream_id = :video_id
+            GROUP BY p.live_stream_id, token
+            HAVING COUNT(DISTINCT p.message_id) >= :min_count
+            ON CONFLICT (live_stream_id, token) DO UPDATE SET count = EXCLUDED.count
+        """), {"video_id": video_id, "min_count": int(ETLConfig.get('RETENTION_TOKEN_MIN_COUNT', 2))})
+
+    def _move_backup_files(self, video_id: str, stream_dir: str):
+        """collector 備份目錄中該直播的剩餘檔案（filtered_messages 等）移入封存目錄"""
+        source = os.path.join(self.backup_dir, video_id)
+        if not os.path.isdir(source):
+            return
+        target = os.path.join(stream_dir, 'backup')
+        os.makedirs(target, exist_ok=True)
+        for name in os.listdir(source):
+            shutil.move(os.path.join(source, name), os.path.join(target, name))
+        os.rmdir(source)
+
+    def drop_empty_partitions(self, session: Session, before: date) -> List[str]:
+        """
+        卸除並刪除 before 之前、已經沒有資料的月份分區
+
+        Returns:
+            被刪除的分區名稱
+        """
+        dropped = []
+        for parent in PARTITIONED_TABLES:
+            if not is_partitioned(session, parent):
+                continue
+            pattern = re.compile(rf'^{parent}_(\d{{4}})_(\d{{2}})$')
+            partitions = session.execute(text("""
+                SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = CAST(:parent AS regclass)
+                ORDER BY c.relname
+            """), {"parent": parent}).scalars().all()
+            for name in partitions:
+                match = pattern.match(name)
+                if not match:
+                    continue
+                year, month = int(match.group(1)), int(match.group(2))
+                month_end = next_month(date(year, month, 1))
+                if month_end > before:
+                    continue
+                if session.execute(text(f'SELECT EXISTS (SELECT 1 FROM "{name}")')).scalar():
+                    continue
+                session.execute(text(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"'))
+                session.execute(text(f'DROP TABLE "{name}"'))
+                # Commit per partition: DETACH holds an exclusive lock on the parent
+                session.commit()
+                dropped.append(name)
+                logger.info(f"Dropped empty partition {name}")
+        return dropped
+
+    def prune_etl_logs(self, session: Session, now: datetime) -> int:
+        """刪除超過 ETL_LOG_RETENTION_DAYS 的 ETL 執行記錄（仍被 word_analysis_log 參照的保留）"""
+        days = int(ETLConfig.get('ETL_LOG_RETENTION_DAYS', 90))
+        deleted = session.execute(text("""
+            DELETE FROM etl_execution_log l
+            WHERE l.started_at < :before
+              AND l.status <> 'running'
+              AND NOT EXISTS (SELECT 1 FROM word_analysis_log w WHERE w.etl_log_id = l.id)
+        """), {"before": now - timedelta(days=days)}).rowcount
+        session.commit()
+        return deleted
@@ -336,6 +336,7 @@ def process_messages_batch(
             'youtube_emotes': youtube_emotes,
             'author_name': msg['author_name'],
             'author_id': msg['author_id'],
-            'published_at': msg['published_at']
+            'published_at': msg['published_at'],
+            'message_type': msg.get('message_type')
         })
     return results
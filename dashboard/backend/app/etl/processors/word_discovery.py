@@ -379,12 +379,18 @@ class WordDiscoveryProcessor:
             row = result.fetchone()
             last_analyzed_time = row[0] if row else datetime.now(timezone.utc) - timedelta(hours=3)
 
-            # 計算待處理留言數量
+            # 計算待處理留言數量（只分析 process_chat_messages 已處理到的範圍）
             result = conn.execute(
                 text("""
                     SELECT COUNT(*)
                     FROM chat_messages
                     WHERE published_at > :checkpoint_time
+                    AND published_at <= COALESCE((
+                        SELECT last_processed_timestamp
+                        FROM processed_chat_checkpoint
+                        ORDER BY updated_at DESC
+                        LIMIT 1
+                    ), 'infinity')
                     AND live_stream_id = (
                         SELECT live_stream_id
                         FROM chat_messages
@@ -453,6 +459,12 @@ class WordDiscoveryProcessor:
                     SELECT message_id, message, author_name, published_at
                     FROM chat_messages
                     WHERE published_at > :checkpoint_time
+                    AND published_at <= COALESCE((
+                        SELECT last_processed_timestamp
+                        FROM processed_chat_checkpoint
+                        ORDER BY updated_at DESC
+                        LIMIT 1
+                    ), 'infinity')
                     AND live_stream_id = (
                         SELECT live_stream_id
                         FROM chat_messages
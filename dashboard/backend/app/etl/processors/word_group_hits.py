@@ -0,0 +1,149 @@
+"""
+Word Group Hit Indexer Module
+回填詞彙群組每小時命中數（word_group_hourly_counts）
+"""
+
+import logging
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.etl.config import ETLConfig
+from app.services.multi_pattern import GroupMatcher
+from app.services.word_group_hits import count_group_hits, add_group_hits
+
+logger = logging.getLogger(__name__)
+
+# 回填時每次從 server-side cursor 取回的筆數
+BACKFILL_FETCH_SIZE = 5000
+
+
+class WordGroupHitIndexer:
+    """
+    詞彙群組命中數回填器
+
+    功能：
+    1. 找出 hits_indexed_at 為 NULL（新建或 words / exclude_words 被修改）的群組
+    2. 一次掃描 processed_chat_messages，以 Aho-Corasick 同時比對所有待回填群組
+    3. 覆寫這些群組在 word_group_hourly_counts 的資料並標記 hits_indexed_at
+
+    必須與 process_chat_messages 互斥執行（共用同一個 advisory lock），
+    否則回填期間新處理的留言會被重複計算或漏算。
+    """
+
+    def __init__(self, database_url: Optional[str] = None, engine: Optional[Engine] = None):
+        """
+        初始化回填器
+
+        Args:
+            database_url: 資料庫連線字串，預設從環境變數讀取
+            engine: 共用既有的連線引擎（由 ChatProcessor 呼叫時傳入）
+        """
+        self.database_url = database_url or ETLConfig.get('DATABASE_URL')
+        self._engine: Optional[Engine] = engine
+
+    def get_engine(self) -> Engine:
+        """取得資料庫連線引擎"""
+        if self._engine is None:
+            self._engine = create_engine(
+                self.database_url,
+                pool_size=1,
+                max_overflow=1,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+                pool_reset_on_return="rollback",
+            )
+        return self._engine
+
+    def run(self) -> Dict[str, Any]:
+        """
+        執行回填
+
+        Returns:
+            執行結果摘要
+        """
+        logger.info("Starting backfill_word_group_hits...")
+        try:
+            result = self.backfill_pending()
+            logger.info(
+                f"backfill_word_group_hits completed: groups={result['groups_indexed']}, "
+                f"messages={result['messages_scanned']}"
+            )
+            return {'status': 'completed', **result}
+        except Exception as e:
+            logger.error(f"backfill_word_group_hits failed: {e}")
+            return {'status': 'failed', 'error': str(e)}
+
+    def backfill_pending(self) -> Dict[str, Any]:
+        """
+        回填所有待處理群組
+
+        每個群組記下讀取時的 updated_at；寫入前以 updated_at 未變為條件標記
+        hits_indexed_at（同時鎖住群組列），回填期間又被修改的群組維持待處理，
+        留待下一次回填。
+        """
+        engine = self.get_engine()
+        with Session(engine) as session:
+            pending = session.execute(text("""
+                SELECT id, words, exclude_words, updated_at
+                FROM word_trend_groups
+                WHERE hits_indexed_at IS NULL
+                ORDER BY id
+            """)).fetchall()
+            if not pending:
+                return {'groups_indexed': 0, 'messages_scanned': 0, 'rows_written': 0}
+
+            logger.info(f"Backfilling word group hits for groups: {[row[0] for row in pending]}")
+            matcher = GroupMatcher((row[0], row[1], row[2]) for row in pending)
+
+            scanned = 0
+
+            def rows():
+                nonlocal scanned
+                result = session.execute(
+                    text("""
+                        SELECT live_stream_id, published_at, original_message
+                        FROM processed_chat_messages
+                    """).execution_options(stream_results=True, yield_per=BACKFILL_FETCH_SIZE)
+                )
+                for row in result:
+                    scanned += 1
+                    yield row
+
+            counts = count_group_hits(matcher, rows())
+
+            indexed = self._mark_indexed(session, pending)
+            if indexed:
+                session.execute(
+                    text("DELETE FROM word_group_hourly_counts WHERE group_id = ANY(:ids)"),
+                    {"ids": indexed},
+                )
+            indexed_ids = set(indexed)
+            written = add_group_hits(session, {
+                key: count for key, count in counts.items() if key[0] in indexed_ids
+            })
+            session.commit()
+
+        skipped = len(pending) - len(indexed)
+        if skipped:
+            logger.info(f"{skipped} word group(s) changed during backfill, left pending")
+        return {'groups_indexed': len(indexed), 'messages_scanned': scanned, 'rows_written': written}
+
+    @staticmethod
+    def _mark_indexed(session: Session, pending) -> List[int]:
+        """標記 updated_at 未變動的群組為已回填，回傳成功標記的群組 ID"""
+        indexed = []
+        for group_id, _, _, updated_at in pending:
+            row = session.execute(text("""
+                UPDATE word_trend_groups
+                SET hits_indexed_at = NOW()
+                WHERE id = :id
+                  AND hits_indexed_at IS NULL
+                  AND updated_at IS NOT DISTINCT FROM :updated_at
+                RETURNING id
+            """), {"id": group_id, "updated_at": updated_at}).fetchone()
+            if row:
+                indexed.append(row[0])
+        return indexed
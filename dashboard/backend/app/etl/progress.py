@@ -0,0 +1,116 @@
+"""
+ETL Progress Module
+長時間任務的進度回報與取消
+
+任務以 ProgressReporter 定期把進度寫入 etl_execution_log.metadata['progress']
+（已完成批次、筆數、每秒筆數、預估剩餘秒數），records_processed 同步更新，
+管理介面輪詢 /api/admin/etl/logs 即可顯示即時進度。
+
+取消為協作式：API 設定 etl_execution_log.cancel_requested_at，
+任務在下一次寫入進度時收到 JobCancelled，於批次之間停止（已提交的批次保留）。
+"""
+
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.etl.config import ETLConfig
+
+logger = logging.getLogger(__name__)
+
+# 兩次寫入進度的最短間隔（秒）；也是取消生效的最長延遲（加上一個批次的時間）
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+class JobCancelled(Exception):
+    """管理員取消了執行中的任務"""
+
+
+class ProgressReporter:
+    """
+    任務進度回報器
+
+    每個批次呼叫 advance()；距上次寫入超過 interval 秒時寫入一次進度並檢查是否被取消。
+    """
+
+    def __init__(
+        self,
+        etl_log_id: int,
+        interval: float = PROGRESS_INTERVAL_SECONDS,
+        engine: Optional[Engine] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.etl_log_id = etl_log_id
+        self.interval = interval
+        self._engine = engine
+        self._clock = clock
+        self._started = clock()
+        self._last_flush: Optional[float] = None
+        self.total: Optional[int] = None
+        self.batches = 0
+        self.rows = 0
+
+    def set_total(self, total: Optional[int]):
+        """設定預估總筆數並立即寫入（任務開始前即可被取消）"""
+        self.total = total
+        self.flush()
+
+    def advance(self, rows: int, batches: int = 1):
+        """完成一個批次"""
+        self.rows += rows
+        self.batches += batches
+        if self._last_flush is None or self._clock() - self._last_flush >= self.interval:
+            self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """目前進度（rows_per_sec 以任務開始至今的平均計算）"""
+        elapsed = self._clock() - self._started
+        rate = self.rows / elapsed if elapsed > 0 else None
+        eta = None
+        if self.total is not None and rate:
+            eta = max(self.total - self.rows, 0) / rate
+        return {
+            'batches_done': self.batches,
+            'rows_done': self.rows,
+            'rows_total': self.total,
+            'rows_per_sec': round(rate, 1) if rate is not None else None,
+            'eta_seconds': int(eta) if eta is not None else None,
+            'elapsed_seconds': int(elapsed),
+        }
+
+    def flush(self, check_cancel: bool = True):
+        """
+        寫入進度
+
+        Raises:
+            JobCancelled: check_cancel 且管理員已要求取消
+        """
+        self._last_flush = self._clock()
+        engine = self._engine or ETLConfig.get_engine()
+        if engine is None:
+            return
+        try:
+            with engine.connect() as conn:
+                cancel_requested_at = conn.execute(text("""
+                    UPDATE etl_execution_log
+                    SET metadata = COALESCE(metadata, '{}'::jsonb) || jsonb_build_object('progress', CAST(:progress AS jsonb)),
+                        records_processed = :rows
+                    WHERE id = :id
+                    RETURNING cancel_requested_at
+                """), {
+                    "id": self.etl_log_id,
+                    "progress": json.dumps(self.snapshot()),
+                    "rows": self.rows,
+                }).scalar()
+                conn.commit()
+        except Exception as e:
+            # 進度只供顯示，寫入失敗不影響任務
+            logger.warning(f"Failed to report progress for ETL log {self.etl_log_id}: {e}")
+            return
+        if check_cancel and cancel_requested_at is not None:
+            logger.info(f"ETL log {self.etl_log_id} cancelled after {self.batches} batches")
+            raise JobCancelled(f"Cancelled after {self.batches} batches ({self.rows} rows)")
@@ -81,34 +81,26 @@ def register_jobs():
         raise RuntimeError("Scheduler not initialized. Call init_scheduler first.")
 
     # 延遲匯入避免循環依賴
+    from app.etl.pipeline import run_pipeline_job
     from app.etl.tasks import (
-        run_process_chat_messages,
-        run_discover_new_words,
         run_monitor_collector,
+        run_build_playback_cache,
+        run_maintain_partitions,
+        run_archive_streams,
     )
 
-    # 註冊處理聊天訊息任務（每小時執行）
+    # 註冊處理聊天訊息任務（每小時執行，有新留言時才處理）
+    # 下游任務（AI 詞彙發現）不另外排程，由 app.etl.pipeline 在處理完成後觸發
     _scheduler.add_job(
-        run_process_chat_messages,
+        run_pipeline_job,
         'cron',
         minute=5,  # 每小時的第 5 分鐘
+        args=['process_chat_messages'],
         id='process_chat_messages',
         name='處理聊天訊息',
         replace_existing=True
     )
-    logger.info("Registered job: process_chat_messages (hourly at :05)")
-
-    # 註冊 AI 詞彙發現任務（每 3 小時執行）
-    _scheduler.add_job(
-        run_discover_new_words,
-        'cron',
-        hour='*/3',
-        minute=15,  # 每 3 小時的第 15 分鐘
-        id='discover_new_words',
-        name='AI 詞彙發現',
-        replace_existing=True
-    )
-    logger.info("Registered job: discover_new_words (every 3 hours at :15)")
+    logger.info("Registered job: process_chat_messages (hourly at :05, triggers downstream pipeline jobs)")
 
     # 註冊 Collector 監控任務
     import os
@@ -123,10 +115,49 @@ def register_jobs():
     )
     logger.info(f"Registered job: monitor_collector (every {monitor_interval} minutes)")
 
+    # 註冊回放快取建立任務（直播結束後預先計算 playback timeline）
+    _scheduler.add_job(
+        run_build_playback_cache,
+        'interval',
+        minutes=30,
+        id='build_playback_cache',
+        name='建立回放快取',
+        replace_existing=True
+    )
+    logger.info("Registered job: build_playback_cache (every 30 minutes)")
+
+    # 註冊分區維護任務（每天預先建立未來數個月的 chat_messages 分區）
+    _scheduler.add_job(
+        run_maintain_partitions,
+        'cron',
+        hour=4,
+        minute=30,
+        id='maintain_partitions',
+        name='維護分區表',
+        replace_existing=True
+    )
+    logger.info("Registered job: maintain_partitions (daily at 04:30)")
 
-def start_scheduler():
+    # 註冊冷封存任務（每天封存已結束且超過保留天數的直播）
+    _scheduler.add_job(
+        run_archive_streams,
+        'cron',
+        hour=5,
+        minute=0,
+        id='archive_streams',
+        name='封存已結束直播',
+        replace_existing=True
+    )
+    logger.info("Registered job: archive_streams (daily at 05:00)")
+
+
+def start_scheduler(paused: bool = False):
     """
     啟動排程器
+
+    Args:
+        paused: 只連接 jobstore、不執行任務（API 程序在 ETL worker 另外部署時使用，
+            管理介面仍可列出、暫停與恢復排程，由 ETL worker 執行）
     """
     global _scheduler
 
@@ -134,12 +165,36 @@ def start_scheduler():
         raise RuntimeError("Scheduler not initialized. Call init_scheduler first.")
 
     if not _scheduler.running:
-        _scheduler.start()
+        _scheduler.start(paused=paused)
+        if paused:
+            logger.info("ETL Scheduler attached to jobstore (jobs run in the ETL worker)")
+            return
+        _remove_stale_pipeline_jobs()
         logger.info("ETL Scheduler started")
     else:
         logger.warning("Scheduler is already running")
 
 
+def _remove_stale_pipeline_jobs():
+    """
+    移除 jobstore 中殘留的下游任務排程
+
+    下游任務（如 discover_new_words）過去以 cron 排程並持久化在 jobstore；
+    改由上游觸發後，只保留上游排入的一次性（date）任務。
+    jobstore 在排程器啟動後才會被查詢，因此於啟動後執行。
+    """
+    from apscheduler.triggers.date import DateTrigger
+    from app.etl.pipeline import PIPELINE
+
+    for job_id, pipeline_job in PIPELINE.items():
+        if not pipeline_job.upstream:
+            continue
+        job = _scheduler.get_job(job_id)
+        if job is not None and not isinstance(job.trigger, DateTrigger):
+            _scheduler.remove_job(job_id)
+            logger.info(f"Removed stale schedule of downstream job: {job_id}")
+
+
 def get_scheduler() -> Optional[BackgroundScheduler]:
     """
     取得排程器實例
@@ -14,6 +14,7 @@ from sqlalchemy import text
 from sqlalchemy.engine import make_url
 
 from app.etl.config import ETLConfig
+from app.etl.progress import JobCancelled, ProgressReporter
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +39,11 @@ JOB_NAMES = {
     'discover_new_words': 'AI 詞彙發現',
     'import_dicts': '匯入字典',
     'monitor_collector': '監控 Collector 狀態',
+    'build_playback_cache': '建立回放快取',
+    'backfill_word_group_hits': '回填詞彙群組命中數',
+    'maintain_partitions': '維護分區表',
+    'archive_streams': '封存已結束直播',
+    'backfill_mentions': '回填留言擷取結果',
 }
 
 # Advisory lock keys for distributed lock (prevent duplicate execution across workers)
@@ -46,6 +52,13 @@ ETL_LOCK_KEYS = {
     'discover_new_words': 737002,
     'import_dicts': 737003,
     'monitor_collector': 737004,
+    'build_playback_cache': 737005,
+    # 與 process_chat_messages 共用：回填與增量累加必須互斥，否則會重複或漏算
+    'backfill_word_group_hits': 737001,
+    'maintain_partitions': 737006,
+    'archive_streams': 737007,
+    # 與 process_chat_messages 共用：回填期間新處理的留言才不會漏算
+    'backfill_mentions': 737001,
 }
 
 
@@ -174,9 +187,9 @@ def update_etl_log_status(
     
     Args:
         etl_log_id: ETL 記錄 ID
-        status: 新狀態 ('completed', 'failed', 'skipped')
+        status: 新狀態 ('completed', 'failed', 'skipped', 'cancelled')
         records_processed: 處理的記錄數
-        error_message: 錯誤訊息（用於 failed/skipped 狀態）
+        error_message: 錯誤訊息（用於 failed/skipped/cancelled 狀態）
     
     Returns:
         是否成功
@@ -226,6 +239,20 @@ def update_etl_log_status(
                     """),
                     {"id": etl_log_id, "error": skip_msg}
                 )
+            elif status == 'cancelled':
+                conn.execute(
+                    text("""
+                        UPDATE etl_execution_log
+                        SET status = 'cancelled',
+                            completed_at = NOW(),
+                            records_processed = :records,
+                            error_message = :error,
+                            duration_seconds = EXTRACT(EPOCH FROM (NOW() - started_at))::INTEGER
+                        WHERE id = :id;
+                    """),
+                    {"id": etl_log_id, "records": records_processed,
+                     "error": str(error_message)[:500] if error_message else 'Cancelled by admin'}
+                )
             conn.commit()
             logger.info(f"Updated ETL log {etl_log_id}: status={status}")
             return True
@@ -234,6 +261,13 @@ def update_etl_log_status(
         return False
 
 
+def _mark_cancelled(etl_log_id: int, progress: ProgressReporter, reason: JobCancelled) -> Dict[str, Any]:
+    """任務被管理員取消：記錄已完成的筆數"""
+    logger.info(f"ETL log {etl_log_id} cancelled: {reason}")
+    update_etl_log_status(etl_log_id, 'cancelled', records_processed=progress.rows, error_message=str(reason))
+    return {'status': 'cancelled', 'reason': str(reason), 'total_processed': progress.rows}
+
+
 @with_advisory_lock(ETL_LOCK_KEYS['process_chat_messages'])
 def run_process_chat_messages(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
     """
@@ -256,7 +290,7 @@ def run_process_chat_messages(etl_log_id: Optional[int] = None) -> Dict[str, Any
     try:
         from app.etl.processors.chat_processor import ChatProcessor
 
-        processor = ChatProcessor()
+        processor = ChatProcessor(progress=ProgressReporter(etl_log_id) if etl_log_id else None)
         result = processor.run()
 
         if etl_log_id:
@@ -267,6 +301,8 @@ def run_process_chat_messages(etl_log_id: Optional[int] = None) -> Dict[str, Any
             )
 
         return result
+    except JobCancelled as e:
+        return _mark_cancelled(etl_log_id, processor.progress, e)
     except Exception as e:
         logger.error(f"process_chat_messages failed: {e}")
         if etl_log_id:
@@ -282,7 +318,7 @@ def run_discover_new_words(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
     Args:
         etl_log_id: 已存在的 ETL 記錄 ID（手動觸發時傳入）
 
-    排程時間：每 3 小時執行
+    排程：process_chat_messages 完成且有新處理的留言時觸發（最短間隔 3 小時，見 app.etl.pipeline）
     """
     logger.info("=" * 60)
     logger.info("Running task: discover_new_words")
@@ -395,12 +431,221 @@ def run_monitor_collector(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
         return {'status': 'failed', 'error': str(e)}
 
 
+@with_advisory_lock(ETL_LOCK_KEYS['build_playback_cache'])
+def run_build_playback_cache(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    執行回放快取建立任務
+
+    Args:
+        etl_log_id: 已存在的 ETL 記錄 ID（手動觸發時傳入）
+
+    排程時間：每 30 分鐘執行
+    """
+    logger.info("=" * 60)
+    logger.info("Running task: build_playback_cache")
+    logger.info("=" * 60)
+
+    # Create ETL log if not provided
+    if etl_log_id is None:
+        etl_log_id = create_etl_log('build_playback_cache', 'scheduled')
+
+    try:
+        from app.etl.processors.playback_cache import PlaybackCacheBuilder
+
+        builder = PlaybackCacheBuilder()
+        result = builder.run()
+
+        if etl_log_id:
+            update_etl_log_status(
+                etl_log_id,
+                result.get('status', 'completed'),
+                records_processed=result.get('timelines_built', 0),
+                error_message=result.get('error') or result.get('reason')
+            )
+
+        return result
+    except Exception as e:
+        logger.error(f"build_playback_cache failed: {e}")
+        if etl_log_id:
+            update_etl_log_status(etl_log_id, 'failed', error_message=str(e))
+        return {'status': 'failed', 'error': str(e)}
+
+
+@with_advisory_lock(ETL_LOCK_KEYS['backfill_word_group_hits'])
+def run_backfill_word_group_hits(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    執行詞彙群組命中數回填任務
+
+    Args:
+        etl_log_id: 已存在的 ETL 記錄 ID（手動觸發時傳入）
+
+    新建或修改詞彙群組時由 API 在背景觸發；若 process_chat_messages 正在執行而略過，
+    該任務下次執行時會一併回填
+    """
+    logger.info("=" * 60)
+    logger.info("Running task: backfill_word_group_hits")
+    logger.info("=" * 60)
+
+    # Create ETL log if not provided
+    if etl_log_id is None:
+        etl_log_id = create_etl_log('backfill_word_group_hits', 'manual')
+
+    try:
+        from app.etl.processors.word_group_hits import WordGroupHitIndexer
+
+        indexer = WordGroupHitIndexer()
+        result = indexer.run()
+
+        if etl_log_id:
+            update_etl_log_status(
+                etl_log_id,
+                result.get('status', 'completed'),
+                records_processed=result.get('messages_scanned', 0),
+                error_message=result.get('error')
+            )
+
+        return result
+    except Exception as e:
+        logger.error(f"backfill_word_group_hits failed: {e}")
+        if etl_log_id:
+            update_etl_log_status(etl_log_id, 'failed', error_message=str(e))
+        return {'status': 'failed', 'error': str(e)}
+
+
+@with_advisory_lock(ETL_LOCK_KEYS['maintain_partitions'])
+def run_maintain_partitions(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    執行分區維護任務
+
+    Args:
+        etl_log_id: 已存在的 ETL 記錄 ID（手動觸發時傳入）
+
+    排程時間：每天執行（預先建立未來數個月的分區）
+    """
+    logger.info("=" * 60)
+    logger.info("Running task: maintain_partitions")
+    logger.info("=" * 60)
+
+    # Create ETL log if not provided
+    if etl_log_id is None:
+        etl_log_id = create_etl_log('maintain_partitions', 'scheduled')
+
+    try:
+        from app.etl.processors.partition_manager import PartitionManager
+
+        manager = PartitionManager()
+        result = manager.run()
+
+        if etl_log_id:
+            update_etl_log_status(
+                etl_log_id,
+                result.get('status', 'completed'),
+                records_processed=result.get('partitions_created', 0),
+                error_message=result.get('error')
+            )
+
+        return result
+    except Exception as e:
+        logger.error(f"maintain_partitions failed: {e}")
+        if etl_log_id:
+            update_etl_log_status(etl_log_id, 'failed', error_message=str(e))
+        return {'status': 'failed', 'error': str(e)}
+
+
+
+@with_advisory_lock(ETL_LOCK_KEYS['archive_streams'])
+def run_archive_streams(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    執行冷封存任務
+
+    Args:
+        etl_log_id: 已存在的 ETL 記錄 ID（手動觸發時傳入）
+
+    排程時間：每天執行（RETENTION_ENABLED 開啟時才會封存）
+    """
+    logger.info("=" * 60)
+    logger.info("Running task: archive_streams")
+    logger.info("=" * 60)
+
+    # Create ETL log if not provided
+    if etl_log_id is None:
+        etl_log_id = create_etl_log('archive_streams', 'scheduled')
+
+    try:
+        from app.etl.processors.stream_archiver import StreamArchiver
+
+        archiver = StreamArchiver()
+        result = archiver.run()
+
+        if etl_log_id:
+            update_etl_log_status(
+                etl_log_id,
+                result.get('status', 'completed'),
+                records_processed=result.get('streams_archived', 0),
+                error_message=result.get('error') or result.get('reason')
+            )
+
+        return result
+    except Exception as e:
+        logger.error(f"archive_streams failed: {e}")
+        if etl_log_id:
+            update_etl_log_status(etl_log_id, 'failed', error_message=str(e))
+        return {'status': 'failed', 'error': str(e)}
+
+
+@with_advisory_lock(ETL_LOCK_KEYS['backfill_mentions'])
+def run_backfill_mentions(etl_log_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    執行留言擷取結果回填任務
+
+    Args:
+        etl_log_id: 已存在的 ETL 記錄 ID（手動觸發時傳入）
+
+    新建或修改擷取器後手動觸發；若 process_chat_messages 正在執行而略過，
+    該任務下次執行時會一併回填
+    """
+    logger.info("=" * 60)
+    logger.info("Running task: backfill_mentions")
+    logger.info("=" * 60)
+
+    # Create ETL log if not provided
+    if etl_log_id is None:
+        etl_log_id = create_etl_log('backfill_mentions', 'manual')
+
+    try:
+        from app.etl.processors.mention_backfill import MentionBackfiller
+
+        backfiller = MentionBackfiller(progress=ProgressReporter(etl_log_id) if etl_log_id else None)
+        result = backfiller.run()
+
+        if etl_log_id:
+            update_etl_log_status(
+                etl_log_id,
+                result.get('status', 'completed'),
+                records_processed=result.get('messages_scanned', 0),
+                error_message=result.get('error')
+            )
+
+        return result
+    except JobCancelled as e:
+        return _mark_cancelled(etl_log_id, backfiller.progress, e)
+    except Exception as e:
+        logger.error(f"backfill_mentions failed: {e}")
+        if etl_log_id:
+            update_etl_log_status(etl_log_id, 'failed', error_message=str(e))
+        return {'status': 'failed', 'error': str(e)}
+
 # Task registry - functions now accept optional etl_log_id
 TASK_REGISTRY: Dict[str, Callable[..., Dict[str, Any]]] = {
     'process_chat_messages': run_process_chat_messages,
     'discover_new_words': run_discover_new_words,
     'import_dicts': run_import_dicts,
     'monitor_collector': run_monitor_collector,
+    'build_playback_cache': run_build_playback_cache,
+    'backfill_word_group_hits': run_backfill_word_group_hits,
+    'maintain_partitions': run_maintain_partitions,
+    'archive_streams': run_archive_streams,
+    'backfill_mentions': run_backfill_mentions,
 }
 
 # Manual tasks list
@@ -410,5 +655,17 @@ MANUAL_TASKS = [
         'name': '匯入字典',
         'description': '將 text_analysis/ 目錄下的字典檔匯入資料庫',
         'type': 'manual'
+    },
+    {
+        'id': 'backfill_word_group_hits',
+        'name': '回填詞彙群組命中數',
+        'description': '重新計算新建或修改過的詞彙群組每小時命中數（群組變更時會自動觸發）',
+        'type': 'manual'
+    },
+    {
+        'id': 'backfill_mentions',
+        'name': '回填留言擷取結果',
+        'description': '以新建或修改過的擷取器（如上香地圖）重新掃描歷史留言，寫入 extracted_mentions',
+        'type': 'manual'
     }
 ]
@@ -0,0 +1,240 @@
+"""
+ETL Worker Module
+獨立的 ETL 執行程序：python -m app.etl.worker
+
+ETL worker 擁有排程器（APScheduler）與任務執行緒，並輪詢 etl_job_queue 執行手動觸發的任務；
+API（uvicorn）設定 ENABLE_ETL_SCHEDULER=false 時只寫入佇列、不執行任何 ETL，
+jieba 斷詞等 CPU 密集的任務不再與 API 請求搶同一個程序。
+
+ENABLE_ETL_SCHEDULER=true（預設）時 API 程序內也會啟動同一套排程器與佇列輪詢（單一程序部署）。
+
+每個程序以固定數量（ETL_WORKER_CONCURRENCY）的執行緒領取任務，並定期回報心跳；
+心跳逾時的任務（worker 當機）由其他 worker 標記為失敗，同一任務即可再次觸發。
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from app.etl.config import ETLConfig
+from app.etl.job_queue import STALE_AFTER_SECONDS, claim_next_job, fail_stale_jobs, finish_job, heartbeat
+
+logger = logging.getLogger(__name__)
+
+# 佇列為空時的輪詢間隔（秒）
+POLL_INTERVAL_SECONDS = float(os.getenv('ETL_WORKER_POLL_INTERVAL_SECONDS', '5'))
+
+# 同時執行的佇列任務數（固定的執行緒數）
+CONCURRENCY = int(os.getenv('ETL_WORKER_CONCURRENCY', '2'))
+
+# 回報心跳與回收逾時任務的間隔（秒）
+HEARTBEAT_INTERVAL_SECONDS = 30
+
+
+def worker_identity() -> str:
+    """記錄在 etl_job_queue.worker_id 的 worker 識別"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueueRunner:
+    """
+    佇列輪詢器
+
+    concurrency 個背景執行緒各自領取並執行 etl_job_queue 中的任務；佇列為空時每 poll_interval 秒檢查一次，
+    第一個執行緒同時喚醒排程器，讓 API 在 jobstore 中恢復或修改的排程立即生效。
+    另一個執行緒定期更新執行中任務的心跳並回收心跳逾時的任務。
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        worker_id: Optional[str] = None,
+        concurrency: int = CONCURRENCY,
+        heartbeat_interval: float = HEARTBEAT_INTERVAL_SECONDS,
+    ):
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or worker_identity()
+        self.concurrency = max(1, concurrency)
+        self.heartbeat_interval = heartbeat_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Set[int] = set()
+        self._running_lock = threading.Lock()
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """
+        領取並執行一個任務
+
+        Returns:
+            任務結果，佇列為空時回傳 None
+        """
+        from app.etl.pipeline import PIPELINE, run_pipeline_job
+        from app.etl.tasks import TASK_REGISTRY, update_etl_log_status
+
+        engine = ETLConfig.get_engine()
+        if engine is None:
+            return None
+        with engine.connect() as conn:
+            job = claim_next_job(conn, self.worker_id)
+            conn.commit()
+        if job is None:
+            return None
+
+        logger.info(f"Running queued ETL job {job['job_id']} (queue_id={job['queue_id']})")
+        task = TASK_REGISTRY.get(job['job_id'])
+        with self._running_lock:
+            self._running.add(job['queue_id'])
+        try:
+            if task is None:
+                raise ValueError(f"Task '{job['job_id']}' not found")
+            if job['job_id'] in PIPELINE:
+                # 依賴圖中的任務完成後需觸發下游任務（如 process_chat_messages → discover_new_words）
+                result = run_pipeline_job(job['job_id'], etl_log_id=job['etl_log_id'])
+            else:
+                result = task(etl_log_id=job['etl_log_id'])
+        except Exception as e:
+            logger.error(f"Queued ETL job {job['job_id']} failed: {e}")
+            if job['etl_log_id']:
+                update_etl_log_status(job['etl_log_id'], 'failed', error_message=str(e))
+            result = {'status': 'failed', 'error': str(e)}
+        finally:
+            with self._running_lock:
+                self._running.discard(job['queue_id'])
+
+        with engine.connect() as conn:
+            finish_job(
+                conn, job['queue_id'], result.get('status', 'completed'),
+                error_message=result.get('error') or result.get('reason'),
+            )
+            conn.commit()
+        return result
+
+    def running_jobs(self) -> List[int]:
+        """本程序執行中的 queue id"""
+        with self._running_lock:
+            return sorted(self._running)
+
+    def beat(self) -> List[int]:
+        """
+        更新本程序執行中任務的心跳，並回收其他 worker 心跳逾時的任務
+
+        Returns:
+            被標記為失敗的 queue id
+        """
+        engine = ETLConfig.get_engine()
+        if engine is None:
+            return []
+        with engine.connect() as conn:
+            heartbeat(conn, self.running_jobs())
+            stale = fail_stale_jobs(conn, STALE_AFTER_SECONDS)
+            conn.commit()
+        return stale
+
+    def _loop(self, wake_scheduler: bool):
+        from app.etl.scheduler import get_scheduler
+
+        while not self._stop.is_set():
+            try:
+                if self.run_once() is not None:
+                    continue
+            except Exception as e:
+                logger.error(f"ETL job queue polling failed: {e}")
+            if wake_scheduler:
+                scheduler = get_scheduler()
+                if scheduler is not None and scheduler.running:
+                    scheduler.wakeup()
+            self._stop.wait(self.poll_interval)
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self.beat()
+            except Exception as e:
+                logger.error(f"ETL job queue heartbeat failed: {e}")
+
+    def start(self):
+        """啟動背景輪詢執行緒"""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, args=(i == 0,), name=f'etl-job-queue-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        self._threads.append(threading.Thread(target=self._heartbeat_loop, name='etl-job-queue-heartbeat', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"ETL job queue runner started (worker_id={self.worker_id}, concurrency={self.concurrency})")
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止輪詢（等待執行中的任務結束，最多 timeout 秒）"""
+        self._stop.set()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        self._threads = []
+        logger.info("ETL job queue runner stopped")
+
+
+_runner: Optional[JobQueueRunner] = None
+
+
+def start_queue_runner() -> JobQueueRunner:
+    """啟動本程序的佇列輪詢器"""
+    global _runner
+    if _runner is None:
+        _runner = JobQueueRunner()
+    _runner.start()
+    return _runner
+
+
+def stop_queue_runner(timeout: Optional[float] = None):
+    """停止本程序的佇列輪詢器"""
+    global _runner
+    if _runner is not None:
+        _runner.stop(timeout)
+        _runner = None
+
+
+def main():
+    """ETL worker 進入點：啟動排程器與佇列輪詢，收到 SIGTERM / SIGINT 後等待執行中的任務結束"""
+    from app.core.database import get_db_manager
+    from app.etl.processors.extractors import sync_builtin_extractors
+    from app.etl.scheduler import init_scheduler, register_jobs, start_scheduler, shutdown_scheduler
+
+    logging.basicConfig(level=logging.INFO)
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        raise SystemExit("DATABASE_URL not set")
+
+    # 與 API 啟動時相同：建立或確認資料表（含 etl_job_queue）與 builtin 擷取器紀錄
+    db_manager = get_db_manager()
+    db_manager.create_tables()
+    with db_manager.engine.begin() as conn:
+        sync_builtin_extractors(conn)
+
+    ETLConfig.init_engine(database_url)
+    init_scheduler(database_url)
+    register_jobs()
+    start_scheduler()
+    start_queue_runner()
+    logger.info(f"✓ ETL worker started ({worker_identity()})")
+
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.set())
+    while not stopping.wait(1):
+        pass
+
+    logger.info("Stopping ETL worker...")
+    stop_queue_runner()
+    shutdown_scheduler(wait=True)
+    logger.info("✓ ETL worker stopped")
+
+
+if __name__ == '__main__':
+    main()
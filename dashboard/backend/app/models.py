@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, BigInteger, DateTime, JSON, Numeric, Boolean, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, BigInteger, DateTime, JSON, Numeric, Boolean, LargeBinary, UniqueConstraint, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -10,12 +10,14 @@ PAID_MESSAGE_TYPES = ['paid_message', 'ticker_paid_message_item']
 
 class ChatMessage(Base):
     __tablename__ = 'chat_messages'
+    # 依 published_at 每月分區（見 database/init/21_partition_chat_messages.sql）；分區表的主鍵必須包含分區鍵
+    __table_args__ = {'postgresql_partition_by': 'RANGE (published_at)'}
 
     message_id = Column(String(255), primary_key=True)
     live_stream_id = Column(String(255), nullable=False)
     message = Column(Text, nullable=False)
     timestamp = Column(BigInteger, nullable=False)
-    published_at = Column(DateTime(timezone=True), nullable=False)
+    published_at = Column(DateTime(timezone=True), primary_key=True)
     author_name = Column(String(255), nullable=False)
     author_id = Column(String(255), nullable=False)
     author_images = Column(JSONB)
@@ -25,6 +27,9 @@ class ChatMessage(Base):
     raw_data = Column(JSONB)
     created_at = Column(DateTime(timezone=True), default=func.current_timestamp())
 
+    # message_id stays the ORM identity (published_at is derived from the message's timestamp)
+    __mapper_args__ = {'primary_key': [message_id]}
+
     @classmethod
     def from_chat_data(cls, chat_data, live_stream_id):
         published_at = datetime.datetime.fromtimestamp(
@@ -179,6 +184,40 @@ class CurrencyRate(Base):
     def __repr__(self):
         return f"<CurrencyRate(currency={self.currency}, rate={self.rate_to_twd})>"
 
+class PaidMessageLedger(Base):
+    """付費留言帳本：入庫時由 chat_messages trigger 寫入，金額已解析並換算台幣"""
+    __tablename__ = 'paid_message_ledger'
+
+    # No FK to chat_messages: a partitioned table can only be referenced by
+    # (message_id, published_at), and moving rows out of the default partition
+    # would cascade. Whoever deletes chat_messages deletes the ledger rows too.
+    message_id = Column(String(255), primary_key=True)
+    live_stream_id = Column(String(255), nullable=False)
+    author_id = Column(String(255), nullable=False)
+    author_name = Column(String(255), nullable=False)
+    published_at = Column(DateTime(timezone=True), nullable=False)
+    timestamp = Column(BigInteger, nullable=False)
+    message_type = Column(String(50), nullable=False)
+    currency = Column(String(50), nullable=False)
+    amount = Column(Numeric, nullable=False)
+    amount_twd = Column(Numeric, nullable=True)  # NULL = currency not in currency_rates
+
+    __table_args__ = (
+        Index('idx_paid_message_ledger_stream_published', 'live_stream_id', 'published_at'),
+        Index('idx_paid_message_ledger_published_at', 'published_at'),
+        Index('idx_paid_message_ledger_currency', 'currency'),
+    )
+
+    def __repr__(self):
+        return f"<PaidMessageLedger(id={self.message_id}, {self.amount} {self.currency}, twd={self.amount_twd})>"
+
+
+# Ledger maintenance lives in the database so every writer of chat_messages
+# (collector, backup import) and currency_rates is covered: the triggers are
+# defined only in database/init/20_create_paid_message_ledger.sql (and
+# migrations/28 for existing databases).
+
+
 class SystemSetting(Base):
     __tablename__ = 'system_settings'
 
@@ -225,6 +264,7 @@ class WordTrendGroup(Base):
     words = Column(JSON, nullable=False)  # Array of strings: ["holo", "cover", "星街"]
     exclude_words = Column(JSON, nullable=True)  # Optional: messages matching any exclude word are not counted
     color = Column(String(20), default='#5470C6')
+    hits_indexed_at = Column(DateTime(timezone=True), nullable=True)  # NULL until word_group_hourly_counts is backfilled
     created_at = Column(DateTime(timezone=True), default=func.current_timestamp())
     updated_at = Column(DateTime(timezone=True), default=func.current_timestamp(), onupdate=func.current_timestamp())
 
@@ -232,6 +272,56 @@ class WordTrendGroup(Base):
         return f"<WordTrendGroup(id={self.id}, name={self.name}, words_count={len(self.words) if self.words else 0})>"
 
 
+class WordGroupHourlyCount(Base):
+    """詞彙群組每小時命中數，由 ETL 在斷詞時累加（只涵蓋 processed_chat_messages）"""
+    __tablename__ = 'word_group_hourly_counts'
+
+    group_id = Column(Integer, ForeignKey('word_trend_groups.id', ondelete='CASCADE'), primary_key=True)
+    live_stream_id = Column(String(255), primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<WordGroupHourlyCount(group={self.group_id}, stream={self.live_stream_id}, hour={self.hour}, count={self.count})>"
+
+
+class EmojiCountByHour(Base):
+    """每小時各 emoji 出現的留言數，由 ETL 在斷詞時累加（只涵蓋 processed_chat_messages）"""
+    __tablename__ = 'emoji_counts_by_hour'
+
+    live_stream_id = Column(String(255), primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    is_youtube = Column(Boolean, primary_key=True)
+    emoji = Column(Text, primary_key=True)  # Unicode emoji character or YouTube emote name
+    image_url = Column(Text, nullable=True)  # YouTube emotes only
+    message_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<EmojiCountByHour(stream={self.live_stream_id}, hour={self.hour}, emoji={self.emoji}, count={self.message_count})>"
+
+
+class AuthorActivityHourly(Base):
+    """每小時各作者（依顯示名稱）的留言數，由 ETL 在斷詞時累加（只涵蓋 processed_chat_messages）"""
+    __tablename__ = 'author_activity_hourly'
+
+    live_stream_id = Column(String(255), primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    author_id = Column(String(255), primary_key=True)
+    author_name = Column(String(255), primary_key=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    paid_count = Column(Integer, nullable=False, default=0)
+    first_seen = Column(DateTime(timezone=True), nullable=False)
+    last_seen = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('idx_author_activity_hourly_author_hour', 'author_id', 'hour'),
+        Index('idx_author_activity_hourly_hour', 'hour'),
+    )
+
+    def __repr__(self):
+        return f"<AuthorActivityHourly(stream={self.live_stream_id}, hour={self.hour}, author={self.author_id}, count={self.message_count})>"
+
+
 class ETLSetting(Base):
     __tablename__ = 'etl_settings'
 
@@ -261,12 +351,38 @@ class ETLExecutionLog(Base):
     duration_seconds = Column(Integer)
     records_processed = Column(Integer, default=0)
     error_message = Column(Text)
-    log_metadata = Column('metadata', JSONB)  # Map to 'metadata' column in DB
+    log_metadata = Column('metadata', JSONB)  # Map to 'metadata' column in DB; 'progress' = 執行中任務的進度
+    cancel_requested_at = Column(DateTime(timezone=True))  # 管理員要求取消，任務於下一次回報進度時停止
 
     def __repr__(self):
         return f"<ETLExecutionLog(id={self.id}, job_id={self.job_id}, status={self.status}, trigger={self.trigger_type})>"
 
 
+class ETLJobQueue(Base):
+    """手動觸發的 ETL 任務佇列：API 寫入，ETL worker 以 FOR UPDATE SKIP LOCKED 領取執行（見 app/etl/job_queue.py）"""
+    __tablename__ = 'etl_job_queue'
+    __table_args__ = (
+        Index('idx_etl_job_queue_queued', 'enqueued_at', postgresql_where=text("status = 'queued'")),
+        # 同一任務最多一筆排隊或執行中（多個 API worker 同時觸發時只會排入一次）
+        Index('uq_etl_job_queue_pending_job', 'job_id', unique=True,
+              postgresql_where=text("status IN ('queued', 'running')")),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String(100), nullable=False)
+    status = Column(String(20), nullable=False, default='queued')  # queued, running, completed, failed, skipped, cancelled
+    etl_log_id = Column(Integer, ForeignKey('etl_execution_log.id'))
+    enqueued_at = Column(DateTime(timezone=True), default=func.current_timestamp())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    worker_id = Column(String(255))  # 領取的 worker（hostname:pid）
+    heartbeat_at = Column(DateTime(timezone=True))  # 執行中由 worker 定期更新；過久未更新視為 worker 已中斷
+    error_message = Column(Text)
+
+    def __repr__(self):
+        return f"<ETLJobQueue(id={self.id}, job_id={self.job_id}, status={self.status})>"
+
+
 class PromptTemplate(Base):
     __tablename__ = 'prompt_templates'
 
@@ -286,6 +402,7 @@ class PromptTemplate(Base):
 class ProcessedChatMessage(Base):
     """處理後的聊天留言表，包含斷詞結果和 emoji 解析"""
     __tablename__ = 'processed_chat_messages'
+    __table_args__ = {'postgresql_partition_by': 'RANGE (published_at)'}
 
     message_id = Column(String(255), primary_key=True)
     live_stream_id = Column(String(255), nullable=False)
@@ -296,13 +413,22 @@ class ProcessedChatMessage(Base):
     youtube_emotes = Column(JSONB)  # JSONB in PostgreSQL
     author_name = Column(String(255), nullable=False)
     author_id = Column(String(255), nullable=False)
-    published_at = Column(DateTime(timezone=True), nullable=False)
+    published_at = Column(DateTime(timezone=True), primary_key=True)
     processed_at = Column(DateTime(timezone=True), default=func.current_timestamp())
 
+    __mapper_args__ = {'primary_key': [message_id]}
+
     def __repr__(self):
         return f"<ProcessedChatMessage(id={self.message_id}, author={self.author_name})>"
 
 
+# chat_messages / processed_chat_messages are range-partitioned by month on
+# published_at. create_monthly_partition() (database/init/21_partition_chat_messages.sql)
+# is called ahead of time by the maintain_partitions ETL task; rows outside every
+# monthly partition land in <table>_default and are moved when their month's
+# partition is created.
+
+
 class ProcessedChatCheckpoint(Base):
     """ETL 處理檢查點，記錄最後處理的位置"""
     __tablename__ = 'processed_chat_checkpoint'
@@ -385,4 +511,112 @@ class WordAnalysisCheckpoint(Base):
     updated_at = Column(DateTime(timezone=True), default=func.current_timestamp())
 
     def __repr__(self):
-        return f"<WordAnalysisCheckpoint(id={self.id}, last_analyzed_timestamp={self.last_analyzed_timestamp})>"
\ No newline at end of file
+        return f"<WordAnalysisCheckpoint(id={self.id}, last_analyzed_timestamp={self.last_analyzed_timestamp})>"
+
+class PlaybackSnapshotCache(Base):
+    """已結束直播的回放快照快取，gzip 壓縮後的 JSON timeline"""
+    __tablename__ = 'playback_snapshot_cache'
+    __table_args__ = (
+        UniqueConstraint('live_stream_id', 'kind', 'step_seconds', 'window_hours',
+                         name='uq_playback_snapshot_cache_key'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    live_stream_id = Column(String(255), nullable=False)
+    kind = Column(String(20), nullable=False)  # stats, wordcloud
+    step_seconds = Column(Integer, nullable=False)
+    window_hours = Column(Integer, nullable=False, default=0)  # 0 for stats timelines
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    snapshot_count = Column(Integer, nullable=False, default=0)
+    payload = Column(LargeBinary, nullable=False)  # gzip-compressed JSON array of snapshots
+    etag = Column(String(64), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=func.current_timestamp())
+
+    def __repr__(self):
+        return (
+            f"<PlaybackSnapshotCache(stream={self.live_stream_id}, kind={self.kind}, "
+            f"step={self.step_seconds}, window={self.window_hours})>"
+        )
+
+
+class StreamArchive(Base):
+    """已冷封存直播：原始留言已匯出到 ARCHIVE_DIR 並從資料庫刪除，可隨時還原"""
+    __tablename__ = 'stream_archives'
+
+    live_stream_id = Column(String(255), primary_key=True)
+    status = Column(String(20), nullable=False, default='archived')  # archived, restored
+    archive_path = Column(Text, nullable=False)
+    file_format = Column(String(20), nullable=False)  # parquet, jsonl
+    row_counts = Column(JSONB, nullable=False)  # {table: rows}
+    size_bytes = Column(BigInteger, nullable=False, default=0)
+    first_published_at = Column(DateTime(timezone=True))
+    last_published_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), default=func.current_timestamp())
+    restored_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<StreamArchive(stream={self.live_stream_id}, status={self.status}, format={self.file_format})>"
+
+
+class StreamHourlyRollup(Base):
+    """直播每小時留言 / 付費留言 / 作者數與營收，封存時寫入，原始留言刪除後 /api/stats/comments 改讀此表"""
+    __tablename__ = 'stream_hourly_rollups'
+
+    live_stream_id = Column(String(255), primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    message_count = Column(Integer, nullable=False, default=0)
+    paid_message_count = Column(Integer, nullable=False, default=0)
+    author_count = Column(Integer, nullable=False, default=0)
+    revenue_twd = Column(Numeric, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<StreamHourlyRollup(stream={self.live_stream_id}, hour={self.hour}, count={self.message_count})>"
+
+
+class StreamTokenCount(Base):
+    """直播各斷詞出現的留言數，封存時由 processed_chat_messages 彙總，供 /api/wordcloud 使用"""
+    __tablename__ = 'stream_token_counts'
+
+    live_stream_id = Column(String(255), primary_key=True)
+    token = Column(Text, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<StreamTokenCount(stream={self.live_stream_id}, token={self.token}, count={self.count})>"
+
+
+class MentionExtractor(Base):
+    """在 ETL 斷詞時擷取留言片段的擷取器（如「XX代表上香」的地區詞），見 app/etl/processors/extractors.py"""
+    __tablename__ = 'mention_extractors'
+
+    name = Column(String(64), primary_key=True)
+    kind = Column(String(20), nullable=False, default='regex')  # regex, builtin
+    pattern = Column(Text)  # regex 擷取器的 Python regex; value = 第一個 group（沒有 group 時取整段）
+    description = Column(Text)
+    enabled = Column(Boolean, nullable=False, default=True)
+    backfilled_at = Column(DateTime(timezone=True), nullable=True)  # NULL until extracted_mentions is backfilled
+    backfill_cursor = Column(DateTime(timezone=True), nullable=True)  # 回填進度：此時間以前已擷取
+    created_at = Column(DateTime(timezone=True), default=func.current_timestamp())
+    updated_at = Column(DateTime(timezone=True), default=func.current_timestamp(), onupdate=func.current_timestamp())
+
+    def __repr__(self):
+        return f"<MentionExtractor(name={self.name}, pattern={self.pattern})>"
+
+
+class ExtractedMention(Base):
+    """擷取器命中的留言與擷取值，由 ETL 在寫入 processed_chat_messages 時同一個 transaction 寫入"""
+    __tablename__ = 'extracted_mentions'
+    __table_args__ = (
+        Index('idx_extracted_mentions_extractor_stream_published',
+              'extractor', 'live_stream_id', 'published_at', postgresql_include=['value']),
+    )
+
+    extractor = Column(String(64), ForeignKey('mention_extractors.name', ondelete='CASCADE'), primary_key=True)
+    message_id = Column(String(255), primary_key=True)
+    published_at = Column(DateTime(timezone=True), primary_key=True)
+    live_stream_id = Column(String(255), nullable=False)
+    value = Column(Text, nullable=False)
+
+    def __repr__(self):
+        return f"<ExtractedMention(extractor={self.extractor}, message={self.message_id}, value={self.value})>"
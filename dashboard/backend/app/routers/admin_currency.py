@@ -6,6 +6,7 @@ import logging
 from app.core.database import get_db
 from app.core.dependencies import require_admin
 from app.models import CurrencyRate
+from app.services.playback_cache import invalidate_playback_cache, KIND_STATS
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin", tags=["admin-currency"])
@@ -63,7 +64,11 @@ def upsert_currency_rate(
             )
             db.add(new_rate)
             message = f"Currency rate for {currency} added successfully"
-        
+
+        # paid_message_ledger.amount_twd is re-derived for this currency by the
+        # currency_rates trigger; cached playback revenue curves used the old rate
+        invalidate_playback_cache(db, KIND_STATS)
+
         db.commit()
         
         return {
@@ -82,36 +87,29 @@ def upsert_currency_rate(
 
 @router.get("/currency-rates/unknown")
 def get_unknown_currencies(db: Session = Depends(get_db)):
+    """Currencies of paid messages without a rate (ledger rows with NULL amount_twd)."""
     try:
         result = db.execute(text("""
-            SELECT DISTINCT raw_data->'money'->>'currency' as currency,
-                   COUNT(*) as message_count
-            FROM chat_messages
-            WHERE raw_data->'money' IS NOT NULL
-              AND raw_data->'money'->>'currency' IS NOT NULL
+            SELECT currency, COUNT(*) AS message_count
+            FROM paid_message_ledger
+            WHERE amount_twd IS NULL
             GROUP BY currency
-            ORDER BY message_count DESC
+            ORDER BY message_count DESC, currency
         """))
-        
-        all_currencies = [(row[0], row[1]) for row in result if row[0]]
-        
-        existing_rates = db.query(CurrencyRate.currency).all()
-        existing_currency_set = {rate[0] for rate in existing_rates}
-        
+
         unknown = [
             {
-                "currency": curr,
-                "message_count": count
+                "currency": row.currency,
+                "message_count": row.message_count
             }
-            for curr, count in all_currencies
-            if curr not in existing_currency_set
+            for row in result
         ]
-        
+
         return {
             "unknown_currencies": unknown,
             "total": len(unknown)
         }
-        
+
     except Exception as e:
         logger.error(f"Error fetching unknown currencies: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,189 @@
+"""Router for managing mention extractors.
+
+Regex extractors are created and edited here; builtin extractors are
+registered in code (app/etl/processors/extractors.py) and can only be
+enabled or disabled. Creating an extractor, or changing its pattern or
+re-enabling it, marks it pending and queues a backfill_mentions job for the
+ETL worker; endpoints scan chat_messages for it meanwhile.
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import List, Optional
+from pydantic import BaseModel, Field
+import logging
+import re
+
+from app.core.database import get_db
+from app.core.dependencies import require_admin
+from app.etl.processors.extractors import (
+    BUILTIN_EXTRACTORS, KIND_BUILTIN, KIND_REGEX, compile_pattern,
+)
+from app.etl.job_queue import enqueue_job
+from app.etl.tasks import JOB_NAMES
+from app.models import ExtractedMention, MentionExtractor
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/admin/extractors", tags=["admin-extractors"])
+
+NAME_PATTERN = r'^[a-z][a-z0-9_]{0,63}$'
+
+
+class ExtractorCreate(BaseModel):
+    """Schema for creating a regex extractor."""
+    name: str = Field(..., pattern=NAME_PATTERN)
+    pattern: str = Field(..., min_length=1)
+    description: Optional[str] = None
+    enabled: bool = True
+
+
+class ExtractorUpdate(BaseModel):
+    """Schema for updating an extractor (builtin extractors: description / enabled only)."""
+    pattern: Optional[str] = Field(None, min_length=1)
+    description: Optional[str] = None
+    enabled: Optional[bool] = None
+
+
+class ExtractorResponse(BaseModel):
+    """Schema for extractor response."""
+    name: str
+    kind: str
+    pattern: Optional[str]
+    description: Optional[str]
+    enabled: bool
+    status: str  # ready, backfilling, pending, disabled
+    backfilled_at: Optional[str]
+    backfill_cursor: Optional[str]
+    mention_count: int
+
+
+def _status(extractor: MentionExtractor) -> str:
+    if not extractor.enabled:
+        return "disabled"
+    if extractor.backfilled_at is not None:
+        return "ready"
+    return "backfilling" if extractor.backfill_cursor is not None else "pending"
+
+
+def _response(extractor: MentionExtractor, mention_count: int = 0) -> ExtractorResponse:
+    return ExtractorResponse(
+        name=extractor.name,
+        kind=extractor.kind,
+        pattern=extractor.pattern,
+        description=extractor.description,
+        enabled=extractor.enabled,
+        status=_status(extractor),
+        backfilled_at=extractor.backfilled_at.isoformat() if extractor.backfilled_at else None,
+        backfill_cursor=extractor.backfill_cursor.isoformat() if extractor.backfill_cursor else None,
+        mention_count=mention_count,
+    )
+
+
+def _validate_pattern(pattern: str) -> str:
+    try:
+        compile_pattern(pattern)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regex pattern: {e}")
+    return pattern
+
+
+def _mark_pending(extractor: MentionExtractor):
+    """Existing mentions are replaced by the next backfill."""
+    extractor.backfilled_at = None
+    extractor.backfill_cursor = None
+
+
+def _queue_backfill(db: Session):
+    """
+    Queue backfill_mentions for the ETL worker (committed with the extractor change).
+
+    Skipped if one is already queued or running; the next process_chat_messages
+    run also picks up pending extractors.
+    """
+    enqueue_job(db, 'backfill_mentions', JOB_NAMES['backfill_mentions'])
+
+
+@router.get("", response_model=List[ExtractorResponse])
+def list_extractors(db: Session = Depends(get_db)):
+    """List regex and builtin extractors with their backfill status.
+
+    Builtin rows are created at startup (API and ETL worker), so this stays read-only.
+    """
+    counts = dict(
+        db.query(ExtractedMention.extractor, func.count())
+        .group_by(ExtractedMention.extractor)
+        .all()
+    )
+    extractors = db.query(MentionExtractor).order_by(MentionExtractor.name).all()
+    return [_response(e, counts.get(e.name, 0)) for e in extractors]
+
+
+@router.post("", response_model=ExtractorResponse, status_code=201, dependencies=[Depends(require_admin)])
+def create_extractor(
+    data: ExtractorCreate,
+    db: Session = Depends(get_db),
+):
+    """Create a regex extractor and queue the backfill of its mentions."""
+    if data.name in BUILTIN_EXTRACTORS or db.get(MentionExtractor, data.name) is not None:
+        raise HTTPException(status_code=400, detail="Extractor name already exists")
+
+    extractor = MentionExtractor(
+        name=data.name,
+        kind=KIND_REGEX,
+        pattern=_validate_pattern(data.pattern),
+        description=data.description,
+        enabled=data.enabled,
+    )
+    db.add(extractor)
+    db.flush()
+    if extractor.enabled:
+        _queue_backfill(db)
+    return _response(extractor)
+
+
+@router.put("/{name}", response_model=ExtractorResponse, dependencies=[Depends(require_admin)])
+def update_extractor(
+    name: str,
+    data: ExtractorUpdate,
+    db: Session = Depends(get_db),
+):
+    """
+    Update an extractor.
+
+    A new pattern, or re-enabling (messages processed while disabled were not
+    extracted), invalidates its mentions; the ETL worker re-extracts them.
+    """
+    extractor = db.get(MentionExtractor, name)
+    if extractor is None:
+        raise HTTPException(status_code=404, detail="Extractor not found")
+
+    if data.pattern is not None and data.pattern != extractor.pattern:
+        if extractor.kind == KIND_BUILTIN:
+            raise HTTPException(status_code=400, detail="Builtin extractors have no editable pattern")
+        extractor.pattern = _validate_pattern(data.pattern)
+        _mark_pending(extractor)
+    if data.description is not None:
+        extractor.description = data.description
+    if data.enabled is not None and data.enabled != extractor.enabled:
+        extractor.enabled = data.enabled
+        _mark_pending(extractor)
+    db.flush()
+
+    if extractor.enabled and extractor.backfilled_at is None:
+        _queue_backfill(db)
+    mention_count = db.query(func.count()).filter(ExtractedMention.extractor == name).scalar()
+    return _response(extractor, mention_count)
+
+
+@router.delete("/{name}", dependencies=[Depends(require_admin)])
+def delete_extractor(name: str, db: Session = Depends(get_db)):
+    """Delete a regex extractor and its mentions."""
+    extractor = db.get(MentionExtractor, name)
+    if extractor is None:
+        raise HTTPException(status_code=404, detail="Extractor not found")
+    if extractor.kind == KIND_BUILTIN:
+        raise HTTPException(status_code=400, detail="Builtin extractors can only be disabled")
+
+    db.delete(extractor)
+    db.flush()
+    return {"message": "Extractor deleted successfully", "name": name}
@@ -6,7 +6,7 @@ import logging
 
 from app.core.database import get_db
 from app.core.dependencies import require_admin
-from app.core.settings import get_video_id_from_url
+from app.core.settings import get_video_id_from_url, invalidate_settings_cache
 from app.models import SystemSetting, LiveStream
 from app.services.youtube_api import fetch_video_metadata, build_live_stream_from_api
 
@@ -95,6 +95,7 @@ def upsert_setting(
             message = f"Setting '{key}' created successfully"
         
         db.commit()
+        invalidate_settings_cache()
 
         # When youtube_url is saved, fetch video metadata from YouTube API
         if key == "youtube_url" and value:
@@ -142,6 +143,7 @@ def delete_setting(key: str, db: Session = Depends(get_db)):
         
         db.delete(setting)
         db.commit()
+        invalidate_settings_cache()
         
         return {
             "success": True,
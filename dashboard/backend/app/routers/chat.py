@@ -1,12 +1,26 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import func, text
 from datetime import datetime, timedelta
+from typing import Optional
 import logging
 
 from app.core.database import get_db
-from app.core.settings import get_current_video_id
+from app.core.dependencies import current_video_id
 from app.models import ChatMessage, PAID_MESSAGE_TYPES
+from app.services.author_activity import author_activity_source
+from app.services.search import contains_filter, count_matches
+from app.services.pagination import (
+    PAGINATION_OFFSET,
+    PAGINATION_CURSOR,
+    VALID_PAGINATION,
+    TOTAL_EXACT,
+    TOTAL_APPROXIMATE,
+    TOTAL_NONE,
+    VALID_TOTAL_MODES,
+    apply_keyset,
+    encode_cursor,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/chat", tags=["chat"])
@@ -60,8 +74,98 @@ def _extract_badges(raw_data):
     return normalized
 
 
+def _at_least_seen(total: int, offset: int, limit: int, page_size: int) -> int:
+    """Keep an estimated total consistent with the page that was actually returned."""
+    seen = offset + page_size
+    if page_size == limit:
+        # A full page means there may be more; keep offset-based loops going
+        seen += 1
+    return max(total, seen)
+
+
+def _serialize_message(msg: ChatMessage) -> dict:
+    return {
+        "id": msg.message_id,
+        "time": msg.published_at.isoformat() if msg.published_at else None,
+        "author": msg.author_name,
+        "author_id": msg.author_id,
+        "message": msg.message,
+        "emotes": msg.emotes if msg.emotes else [],
+        "badges": _extract_badges(msg.raw_data),
+        "message_type": msg.message_type,
+        "money": msg.raw_data.get('money') if msg.raw_data else None
+    }
+
+
+def _fetch_message_page(
+    db: Session,
+    query,
+    limit: int,
+    offset: int,
+    pagination: str,
+    cursor: Optional[str],
+    total_mode: Optional[str],
+    offset_order: tuple,
+    default_total: str = TOTAL_EXACT,
+):
+    """
+    Fetch one page of messages in offset or cursor (keyset) mode.
+
+    Cursor mode orders by (published_at, message_id) DESC and reads limit + 1
+    rows to know whether another page exists, so each page costs the same no
+    matter how deep it is. Its total defaults to 'none'; offset mode keeps
+    default_total.
+
+    Returns:
+        (messages, pagination fields for the response)
+    """
+    if pagination not in VALID_PAGINATION:
+        raise HTTPException(status_code=400, detail=f"pagination must be one of {VALID_PAGINATION}")
+    if total_mode is not None and total_mode not in VALID_TOTAL_MODES:
+        raise HTTPException(status_code=400, detail=f"total_mode must be one of {VALID_TOTAL_MODES}")
+    if cursor:
+        pagination = PAGINATION_CURSOR
+
+    page_info = {}
+    if pagination == PAGINATION_CURSOR:
+        try:
+            page_query = apply_keyset(query, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        rows = page_query.limit(limit + 1).all()
+        messages = rows[:limit]
+        has_more = len(rows) > limit
+        mode = total_mode or TOTAL_NONE
+    else:
+        messages = query.order_by(*offset_order).limit(limit).offset(offset).all()
+        mode = total_mode or default_total
+
+    if mode == TOTAL_EXACT:
+        total, total_is_estimate = query.count(), False
+    elif mode == TOTAL_APPROXIMATE:
+        total, total_is_estimate = count_matches(db, query)
+        if total_is_estimate and pagination == PAGINATION_OFFSET:
+            total = _at_least_seen(total, offset, limit, len(messages))
+    else:
+        total, total_is_estimate = None, False
+
+    page_info["total"] = total
+    page_info["total_is_estimate"] = total_is_estimate
+    page_info["limit"] = limit
+    if pagination == PAGINATION_CURSOR:
+        page_info["cursor"] = cursor or None
+        page_info["next_cursor"] = (
+            encode_cursor(messages[-1].published_at, messages[-1].message_id) if has_more else None
+        )
+        page_info["has_more"] = has_more
+    else:
+        page_info["offset"] = offset
+    return messages, page_info
+
+
 def _build_chat_scope_query(
     db: Session,
+    video_id: Optional[str],
     start_time: datetime = None,
     end_time: datetime = None,
     author_filter: str = None,
@@ -75,7 +179,6 @@ def _build_chat_scope_query(
         effective_start = datetime.utcnow() - timedelta(hours=12)
 
     query = db.query(ChatMessage)
-    video_id = get_current_video_id(db)
     if video_id:
         query = query.filter(ChatMessage.live_stream_id == video_id)
 
@@ -85,9 +188,9 @@ def _build_chat_scope_query(
         query = query.filter(ChatMessage.published_at <= end_time)
 
     if author_filter:
-        query = query.filter(ChatMessage.author_name.ilike(f'%{author_filter}%'))
+        query = query.filter(contains_filter(ChatMessage.author_name, author_filter))
     if message_filter:
-        query = query.filter(ChatMessage.message.ilike(f'%{message_filter}%'))
+        query = query.filter(contains_filter(ChatMessage.message, message_filter))
 
     if paid_message_filter == 'paid_only':
         query = query.filter(ChatMessage.message_type.in_(PAID_MESSAGE_TYPES))
@@ -106,47 +209,48 @@ def get_chat_messages(
     author_filter: str = None,
     message_filter: str = None,
     paid_message_filter: str = 'all',
+    pagination: str = PAGINATION_OFFSET,
+    cursor: Optional[str] = None,
+    total_mode: Optional[str] = None,
+    video_id: Optional[str] = Depends(current_video_id),
     db: Session = Depends(get_db)
 ):
+    """Get chat messages, newest first.
+
+    pagination='cursor' (or passing a cursor) switches to keyset pagination:
+    follow next_cursor until has_more is false. total_mode chooses between an
+    exact count, an approximate (capped + estimated) count, or no total.
+    """
     try:
         if limit > 500:
             limit = 500
 
         query = _build_chat_scope_query(
             db=db,
+            video_id=video_id,
             start_time=start_time,
             end_time=end_time,
             author_filter=author_filter,
             message_filter=message_filter,
             paid_message_filter=paid_message_filter
-        ).order_by(ChatMessage.published_at.desc())
-
-        total = query.count()
+        )
 
-        messages = query.limit(limit).offset(offset).all()
+        # Text filters can match a large share of the table; cap the exact count there
+        messages, page_info = _fetch_message_page(
+            db, query, limit, offset, pagination, cursor, total_mode,
+            offset_order=(ChatMessage.published_at.desc(),),
+            default_total=TOTAL_APPROXIMATE if (author_filter or message_filter) else TOTAL_EXACT,
+        )
 
         result = {
-            "messages": [
-                {
-                    "id": msg.message_id,
-                    "time": msg.published_at.isoformat() if msg.published_at else None,
-                    "author": msg.author_name,
-                    "author_id": msg.author_id,
-                    "message": msg.message,
-                    "emotes": msg.emotes if msg.emotes else [],
-                    "badges": _extract_badges(msg.raw_data),
-                    "message_type": msg.message_type,
-                    "money": msg.raw_data.get('money') if msg.raw_data else None
-                }
-                for msg in messages
-            ],
-            "total": total,
-            "limit": limit,
-            "offset": offset
+            "messages": [_serialize_message(msg) for msg in messages],
+            **page_info
         }
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching chat messages: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -160,6 +264,7 @@ def get_message_stats(
     author_filter: str = None,
     message_filter: str = None,
     paid_message_filter: str = 'all',
+    video_id: Optional[str] = Depends(current_video_id),
     db: Session = Depends(get_db)
 ):
     """Get hourly message counts with the same filters as the messages endpoint.
@@ -179,6 +284,7 @@ def get_message_stats(
         # Use SQL aggregation with DATE_TRUNC for O(1) memory usage
         query = _build_chat_scope_query(
             db=db,
+            video_id=video_id,
             start_time=effective_start,
             end_time=end_time,
             author_filter=author_filter,
@@ -209,6 +315,110 @@ def get_message_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _default_last_12h(start_time: datetime, end_time: datetime) -> Optional[datetime]:
+    """Effective start of author queries: last 12 hours when no range is given."""
+    if not start_time and not end_time:
+        return datetime.utcnow() - timedelta(hours=12)
+    return start_time
+
+
+def _top_authors_from_activity(
+    db: Session, video_id: Optional[str], start_time: datetime, end_time: datetime
+):
+    """
+    Top authors (with ties at 5th place) from the hourly author rollup.
+
+    Returns:
+        ([(author_id, author_name, count)], total_authors)
+    """
+    params: dict = {}
+    source = author_activity_source(
+        db, _default_last_12h(start_time, end_time), end_time, video_id, params,
+    )
+    # RANK() <= 5 keeps everyone tied with the 5th author
+    rows = db.execute(text(f"""
+        WITH activity AS ({source}),
+        totals AS (
+            SELECT author_id, SUM(message_count) AS count
+            FROM activity
+            GROUP BY author_id
+        ),
+        ranked AS (
+            SELECT author_id, count,
+                   RANK() OVER (ORDER BY count DESC) AS rnk,
+                   COUNT(*) OVER () AS total_authors
+            FROM totals
+        ),
+        names AS (
+            SELECT DISTINCT ON (author_id) author_id, author_name
+            FROM activity
+            WHERE author_id IN (SELECT author_id FROM ranked WHERE rnk <= 5)
+            ORDER BY author_id, last_seen DESC
+        )
+        SELECT r.author_id, n.author_name, r.count, r.total_authors
+        FROM ranked r
+        LEFT JOIN names n ON n.author_id = r.author_id
+        WHERE r.rnk <= 5
+        ORDER BY r.count DESC, r.author_id ASC
+    """), params).fetchall()
+    total_authors = rows[0].total_authors if rows else 0
+    return [(r.author_id, r.author_name, int(r.count)) for r in rows], total_authors
+
+
+def _top_authors_from_messages(query, db: Session):
+    """Top authors (with ties at 5th place) aggregated from filtered chat_messages."""
+    # Single subquery: aggregate counts by author_id
+    count_subquery = query.with_entities(
+        ChatMessage.author_id.label('author_id'),
+        func.count().label('count')
+    ).group_by(ChatMessage.author_id).subquery()
+
+    # Total distinct authors from count subquery
+    total_authors = db.query(func.count()).select_from(count_subquery).scalar()
+
+    # Fetch top 6 to detect ties at 5th position (avoids loading all authors)
+    top_rows = db.query(
+        count_subquery.c.author_id,
+        count_subquery.c.count
+    ).order_by(
+        count_subquery.c.count.desc(),
+        count_subquery.c.author_id.asc()
+    ).limit(6).all()
+
+    if not top_rows:
+        return [], total_authors
+
+    # Handle ties at 5th position
+    if len(top_rows) > 5 and top_rows[4].count == top_rows[5].count:
+        fifth_count = top_rows[4].count
+        top_rows = db.query(
+            count_subquery.c.author_id,
+            count_subquery.c.count
+        ).filter(
+            count_subquery.c.count >= fifth_count
+        ).order_by(
+            count_subquery.c.count.desc(),
+            count_subquery.c.author_id.asc()
+        ).all()
+    else:
+        top_rows = top_rows[:5]
+
+    # Resolve display names: DISTINCT ON picks latest author_name per author_id
+    top_author_ids = [r.author_id for r in top_rows]
+    name_rows = query.with_entities(
+        ChatMessage.author_id,
+        ChatMessage.author_name
+    ).filter(
+        ChatMessage.author_id.in_(top_author_ids)
+    ).distinct(ChatMessage.author_id).order_by(
+        ChatMessage.author_id,
+        ChatMessage.published_at.desc()
+    ).all()
+    name_map = {r.author_id: r.author_name for r in name_rows}
+
+    return [(r.author_id, name_map.get(r.author_id), r.count) for r in top_rows], total_authors
+
+
 @router.get("/top-authors")
 def get_top_authors(
     start_time: datetime = None,
@@ -217,87 +427,41 @@ def get_top_authors(
     message_filter: str = None,
     paid_message_filter: str = 'all',
     include_meta: bool = False,
+    video_id: Optional[str] = Depends(current_video_id),
     db: Session = Depends(get_db)
 ):
     """Get top 5 authors by message count with tie handling.
     
     Returns authors sorted by message count descending. If there are ties
     at the 5th position, all authors with that count are included.
+
+    Without author/message/paid filters the counts come from the
+    author_activity_hourly rollup (raw messages only for partial hours);
+    filtered queries aggregate chat_messages.
     """
     try:
-        query = _build_chat_scope_query(
-            db=db,
-            start_time=start_time,
-            end_time=end_time,
-            author_filter=author_filter,
-            message_filter=message_filter,
-            paid_message_filter=paid_message_filter,
-            apply_default_last_12h=True
-        )
-
-        # Single subquery: aggregate counts by author_id
-        count_subquery = query.with_entities(
-            ChatMessage.author_id.label('author_id'),
-            func.count().label('count')
-        ).group_by(ChatMessage.author_id).subquery()
-
-        # Total distinct authors from count subquery
-        total_authors = db.query(func.count()).select_from(count_subquery).scalar()
-
-        # Fetch top 6 to detect ties at 5th position (avoids loading all authors)
-        top_rows = db.query(
-            count_subquery.c.author_id,
-            count_subquery.c.count
-        ).order_by(
-            count_subquery.c.count.desc(),
-            count_subquery.c.author_id.asc()
-        ).limit(6).all()
-
-        if not top_rows:
-            if include_meta:
-                return {
-                    "top_authors": [],
-                    "total_authors": 0,
-                    "displayed_authors": 0,
-                    "tie_extended": False
-                }
-            return []
-
-        # Handle ties at 5th position
-        if len(top_rows) > 5 and top_rows[4].count == top_rows[5].count:
-            fifth_count = top_rows[4].count
-            top_rows = db.query(
-                count_subquery.c.author_id,
-                count_subquery.c.count
-            ).filter(
-                count_subquery.c.count >= fifth_count
-            ).order_by(
-                count_subquery.c.count.desc(),
-                count_subquery.c.author_id.asc()
-            ).all()
+        if not author_filter and not message_filter and paid_message_filter == 'all':
+            top_rows, total_authors = _top_authors_from_activity(db, video_id, start_time, end_time)
         else:
-            top_rows = top_rows[:5]
-
-        # Resolve display names: DISTINCT ON picks latest author_name per author_id
-        top_author_ids = [r.author_id for r in top_rows]
-        name_rows = query.with_entities(
-            ChatMessage.author_id,
-            ChatMessage.author_name
-        ).filter(
-            ChatMessage.author_id.in_(top_author_ids)
-        ).distinct(ChatMessage.author_id).order_by(
-            ChatMessage.author_id,
-            ChatMessage.published_at.desc()
-        ).all()
-        name_map = {r.author_id: r.author_name for r in name_rows}
+            query = _build_chat_scope_query(
+                db=db,
+                video_id=video_id,
+                start_time=start_time,
+                end_time=end_time,
+                author_filter=author_filter,
+                message_filter=message_filter,
+                paid_message_filter=paid_message_filter,
+                apply_default_last_12h=True
+            )
+            top_rows, total_authors = _top_authors_from_messages(query, db)
 
         top_authors = [
             {
-                "author_id": r.author_id,
-                "author": name_map.get(r.author_id) or "Unknown",
-                "count": r.count
+                "author_id": author_id,
+                "author": author_name or "Unknown",
+                "count": count
             }
-            for r in top_rows
+            for author_id, author_name, count in top_rows
         ]
 
         if include_meta:
@@ -320,35 +484,33 @@ def get_author_summary(
     author_id: str,
     start_time: datetime = None,
     end_time: datetime = None,
+    video_id: Optional[str] = Depends(current_video_id),
     db: Session = Depends(get_db)
 ):
-    """Get author summary by stable author_id."""
-    try:
-        effective_start = start_time
-        if not effective_start and not end_time:
-            effective_start = datetime.utcnow() - timedelta(hours=12)
-        video_id = get_current_video_id(db)
+    """Get author summary by stable author_id.
 
-        author_query = _build_chat_scope_query(
-            db=db,
-            start_time=start_time,
-            end_time=end_time,
-            apply_default_last_12h=True
-        ).filter(ChatMessage.author_id == author_id)
-
-        summary = author_query.with_entities(
-            func.count().label('total_messages'),
-            func.min(ChatMessage.published_at).label('first_seen'),
-            func.max(ChatMessage.published_at).label('last_seen'),
-            func.sum(
-                case(
-                    (ChatMessage.message_type.in_(PAID_MESSAGE_TYPES), 1),
-                    else_=0
-                )
-            ).label('paid_messages')
-        ).first()
-
-        total_messages = summary.total_messages if summary else 0
+    Counts and aliases come from the author_activity_hourly rollup (raw
+    messages only for partial hours); the latest message is fetched by its
+    timestamp for the avatar and badges.
+    """
+    try:
+        effective_start = _default_last_12h(start_time, end_time)
+
+        params: dict = {}
+        source = author_activity_source(db, effective_start, end_time, video_id, params, author_id=author_id)
+        aliases = db.execute(text(f"""
+            WITH activity AS ({source})
+            SELECT author_name AS name,
+                   MIN(first_seen) AS first_seen,
+                   MAX(last_seen) AS last_seen,
+                   SUM(message_count) AS message_count,
+                   SUM(paid_count) AS paid_count
+            FROM activity
+            GROUP BY author_name
+            ORDER BY MIN(first_seen) ASC, author_name ASC
+        """), params).fetchall()
+
+        total_messages = sum(int(row.message_count) for row in aliases)
         if total_messages == 0:
             scope_parts = []
             if video_id:
@@ -371,42 +533,40 @@ def get_author_summary(
                 detail=f"查無作者資料：{author_id}。可能不在目前直播或時間範圍內。查詢範圍：{scope_text}"
             )
 
-        latest = author_query.with_entities(
+        first_seen = min(row.first_seen for row in aliases)
+        last_seen = max(row.last_seen for row in aliases)
+        latest = _build_chat_scope_query(
+            db=db,
+            video_id=video_id,
+            start_time=start_time,
+            end_time=end_time,
+            apply_default_last_12h=True
+        ).filter(
+            ChatMessage.author_id == author_id,
+            ChatMessage.published_at == last_seen
+        ).with_entities(
             ChatMessage.author_name,
             ChatMessage.author_images,
             ChatMessage.raw_data
         ).order_by(
-            ChatMessage.published_at.desc(),
             ChatMessage.timestamp.desc()
         ).first()
 
-        aliases = author_query.with_entities(
-            ChatMessage.author_name.label('name'),
-            func.min(ChatMessage.published_at).label('first_seen'),
-            func.max(ChatMessage.published_at).label('last_seen'),
-            func.count().label('message_count')
-        ).group_by(
-            ChatMessage.author_name
-        ).order_by(
-            func.min(ChatMessage.published_at).asc(),
-            ChatMessage.author_name.asc()
-        ).all()
-
         return {
             "author_id": author_id,
             "display_name": latest.author_name if latest else "Unknown",
             "author_images": latest.author_images if latest else [],
             "badges": _extract_badges(latest.raw_data if latest else None),
             "total_messages": total_messages,
-            "paid_messages": int(summary.paid_messages or 0),
-            "first_seen": summary.first_seen.isoformat() if summary.first_seen else None,
-            "last_seen": summary.last_seen.isoformat() if summary.last_seen else None,
+            "paid_messages": sum(int(row.paid_count) for row in aliases),
+            "first_seen": first_seen.isoformat() if first_seen else None,
+            "last_seen": last_seen.isoformat() if last_seen else None,
             "aliases": [
                 {
                     "name": row.name or "Unknown",
                     "first_seen": row.first_seen.isoformat() if row.first_seen else None,
                     "last_seen": row.last_seen.isoformat() if row.last_seen else None,
-                    "message_count": row.message_count
+                    "message_count": int(row.message_count)
                 }
                 for row in aliases
             ]
@@ -425,46 +585,37 @@ def get_author_messages(
     offset: int = 0,
     start_time: datetime = None,
     end_time: datetime = None,
+    pagination: str = PAGINATION_OFFSET,
+    cursor: Optional[str] = None,
+    total_mode: Optional[str] = None,
+    video_id: Optional[str] = Depends(current_video_id),
     db: Session = Depends(get_db)
 ):
-    """Get paginated messages for one author_id."""
+    """Get paginated messages for one author_id (offset or cursor pagination)."""
     try:
         if limit > 200:
             limit = 200
 
         query = _build_chat_scope_query(
             db=db,
+            video_id=video_id,
             start_time=start_time,
             end_time=end_time,
             apply_default_last_12h=True
         ).filter(ChatMessage.author_id == author_id)
 
-        total = query.count()
-        messages = query.order_by(
-            ChatMessage.published_at.desc(),
-            ChatMessage.timestamp.desc()
-        ).limit(limit).offset(offset).all()
+        messages, page_info = _fetch_message_page(
+            db, query, limit, offset, pagination, cursor, total_mode,
+            offset_order=(ChatMessage.published_at.desc(), ChatMessage.timestamp.desc()),
+        )
 
         return {
             "author_id": author_id,
-            "messages": [
-                {
-                    "id": msg.message_id,
-                    "time": msg.published_at.isoformat() if msg.published_at else None,
-                    "author": msg.author_name,
-                    "author_id": msg.author_id,
-                    "message": msg.message,
-                    "emotes": msg.emotes if msg.emotes else [],
-                    "badges": _extract_badges(msg.raw_data),
-                    "message_type": msg.message_type,
-                    "money": msg.raw_data.get('money') if msg.raw_data else None
-                }
-                for msg in messages
-            ],
-            "total": total,
-            "limit": limit,
-            "offset": offset
+            "messages": [_serialize_message(msg) for msg in messages],
+            **page_info
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching author messages for {author_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -475,32 +626,28 @@ def get_author_message_trend(
     author_id: str,
     start_time: datetime = None,
     end_time: datetime = None,
+    video_id: Optional[str] = Depends(current_video_id),
     db: Session = Depends(get_db)
 ):
-    """Get hourly message trend for one author_id."""
+    """Get hourly message trend for one author_id (from the author_activity_hourly rollup)."""
     try:
-        query = _build_chat_scope_query(
-            db=db,
-            start_time=start_time,
-            end_time=end_time,
-            apply_default_last_12h=True
-        ).filter(
-            ChatMessage.author_id == author_id
-        ).with_entities(
-            func.date_trunc('hour', ChatMessage.published_at).label('hour'),
-            func.count().label('count')
+        params: dict = {}
+        source = author_activity_source(
+            db, _default_last_12h(start_time, end_time), end_time, video_id, params,
+            author_id=author_id,
         )
-
-        hourly_counts = query.group_by(
-            func.date_trunc('hour', ChatMessage.published_at)
-        ).order_by(
-            func.date_trunc('hour', ChatMessage.published_at)
-        ).all()
+        hourly_counts = db.execute(text(f"""
+            WITH activity AS ({source})
+            SELECT hour, SUM(message_count) AS count
+            FROM activity
+            GROUP BY hour
+            ORDER BY hour
+        """), params).fetchall()
 
         return [
             {
                 "hour": row.hour.isoformat() if row.hour else None,
-                "count": row.count
+                "count": int(row.count)
             }
             for row in hourly_counts
         ]
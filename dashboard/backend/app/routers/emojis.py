@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.core.settings import get_current_video_id
+from app.services.hourly_rollup import split_rollup_ranges, time_ranges_condition
+from app.services.search import escape_like
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/emojis", tags=["emojis"])
@@ -19,97 +21,117 @@ def get_emoji_stats(
     offset: int = 0,
     filter: str = None,
     type_filter: str = 'all',  # 'all', 'youtube', 'unicode'
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get emoji statistics for messages within the time range.
 
-    Uses the processed_chat_messages table (pre-extracted by ETL) with
-    SQL aggregation to avoid loading all messages into memory.
+    Whole hours the ETL has already processed are read from the
+    emoji_counts_by_hour rollup; only the partial hours at the edges of the
+    range are aggregated from processed_chat_messages. Name filtering,
+    sorting and pagination all happen in SQL, so the cost follows the number
+    of distinct emojis rather than chat volume.
     """
     if limit > 500:
         limit = 500
 
+    include_unicode = type_filter in ('all', 'unicode')
+    include_youtube = type_filter in ('all', 'youtube')
+    if not include_unicode and not include_youtube:
+        return {"emojis": [], "total": 0, "limit": limit, "offset": offset}
+
     video_id = get_current_video_id(db)
 
-    # Build WHERE conditions
-    conditions = []
-    params = {}
+    if not start_time and not end_time:
+        start_time = datetime.now(timezone.utc) - timedelta(hours=12)
 
+    params = {}
+    stream_clause = ""
     if video_id:
-        conditions.append("p.live_stream_id = :video_id")
+        stream_clause = " AND {alias}.live_stream_id = :video_id"
         params["video_id"] = video_id
 
-    if start_time:
-        conditions.append("p.published_at >= :start_time")
-        params["start_time"] = start_time
-    if end_time:
-        conditions.append("p.published_at <= :end_time")
-        params["end_time"] = end_time
-
-    if not start_time and not end_time:
-        conditions.append("p.published_at >= :default_start")
-        params["default_start"] = datetime.utcnow() - timedelta(hours=12)
-
-    where_clause = (" AND " + " AND ".join(conditions)) if conditions else ""
-
-    emoji_list = []
+    # Split the range into rollup hours and raw edges
+    hour_range, raw_ranges = split_rollup_ranges(db, start_time, end_time)
+    raw_clause = time_ranges_condition("p.published_at", raw_ranges, params)
+
+    sources = []
+    if hour_range:
+        params["rollup_lo"], params["rollup_hi"] = hour_range
+        type_clause = "" if include_unicode and include_youtube else f" AND r.is_youtube = {'TRUE' if include_youtube else 'FALSE'}"
+        sources.append(f"""
+            SELECT r.emoji AS name, r.is_youtube, r.image_url, r.message_count
+            FROM emoji_counts_by_hour r
+            WHERE r.hour >= :rollup_lo AND r.hour < :rollup_hi
+              {stream_clause.format(alias='r')}{type_clause}
+        """)
 
-    # Query Unicode emojis via unnest on TEXT[] column
-    if type_filter in ('all', 'unicode'):
-        unicode_sql = text(f"""
-            SELECT e.emoji_char AS name,
+    # Unicode emojis via unnest on TEXT[] column
+    if include_unicode:
+        sources.append(f"""
+            SELECT e.emoji_char AS name, FALSE AS is_youtube, NULL::text AS image_url,
                    COUNT(DISTINCT p.message_id) AS message_count
             FROM processed_chat_messages p,
                  unnest(p.unicode_emojis) AS e(emoji_char)
-            WHERE TRUE {where_clause}
+            WHERE {raw_clause}{stream_clause.format(alias='p')}
             GROUP BY e.emoji_char
         """)
-        rows = db.execute(unicode_sql, params).fetchall()
-        for row in rows:
-            emoji_list.append({
-                'name': row.name,
-                'image_url': None,
-                'is_youtube_emoji': False,
-                'message_count': row.message_count,
-            })
-
-    # Query YouTube emotes via jsonb_array_elements on JSONB column
-    if type_filter in ('all', 'youtube'):
-        yt_sql = text(f"""
-            SELECT emote->>'name' AS name,
-                   MAX(emote->>'url') AS image_url,
+
+    # YouTube emotes via jsonb_array_elements on JSONB column
+    if include_youtube:
+        sources.append(f"""
+            SELECT emote->>'name' AS name, TRUE AS is_youtube, MAX(emote->>'url') AS image_url,
                    COUNT(DISTINCT p.message_id) AS message_count
             FROM processed_chat_messages p,
                  jsonb_array_elements(p.youtube_emotes) AS emote
             WHERE p.youtube_emotes IS NOT NULL
               AND jsonb_array_length(p.youtube_emotes) > 0
-              {where_clause}
+              AND {raw_clause}{stream_clause.format(alias='p')}
             GROUP BY emote->>'name'
         """)
-        rows = db.execute(yt_sql, params).fetchall()
-        for row in rows:
-            emoji_list.append({
-                'name': row.name,
-                'image_url': row.image_url,
-                'is_youtube_emoji': True,
-                'message_count': row.message_count,
-            })
 
-    # Apply name filter
+    filter_clause = ""
     if filter:
-        filter_lower = filter.lower()
-        emoji_list = [e for e in emoji_list if filter_lower in e['name'].lower()]
-
-    # Sort by message_count descending
-    emoji_list.sort(key=lambda x: x['message_count'], reverse=True)
-
-    total = len(emoji_list)
-
-    # Apply pagination
-    paginated_list = emoji_list[offset:offset + limit]
+        filter_clause = "WHERE lower(name) LIKE :name_pattern ESCAPE '\\'"
+        params["name_pattern"] = f"%{escape_like(filter.lower())}%"
+
+    counts_cte = f"WITH counts AS ({' UNION ALL '.join(sources)})"
+    params["limit"] = limit
+    params["offset"] = offset
+    rows = db.execute(text(f"""
+        {counts_cte}
+        SELECT name, is_youtube, MAX(image_url) AS image_url,
+               SUM(message_count) AS message_count,
+               COUNT(*) OVER () AS total
+        FROM counts
+        {filter_clause}
+        GROUP BY name, is_youtube
+        ORDER BY message_count DESC, is_youtube, name
+        LIMIT :limit OFFSET :offset
+    """), params).fetchall()
+
+    if rows:
+        total = rows[0].total
+    elif offset > 0:
+        # Paged past the end: the window total is unavailable, count separately
+        total = db.execute(text(f"""
+            {counts_cte}
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM counts {filter_clause} GROUP BY name, is_youtube
+            ) t
+        """), params).scalar() or 0
+    else:
+        total = 0
 
     return {
-        "emojis": paginated_list,
+        "emojis": [
+            {
+                'name': row.name,
+                'image_url': row.image_url,
+                'is_youtube_emoji': row.is_youtube,
+                'message_count': int(row.message_count),
+            }
+            for row in rows
+        ],
         "total": total,
         "limit": limit,
         "offset": offset
@@ -3,15 +3,19 @@ ETL Jobs Router
 ETL 任務管理 API
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import logging
 
+from apscheduler.schedulers.base import STATE_PAUSED
+
 from app.core.database import get_db
 from app.core.dependencies import require_admin
+from app.etl.job_queue import cancel_run, enqueue_job, find_pending_job, queue_summary
+from app.etl.pipeline import describe_pipeline
 from app.etl.scheduler import (
     get_scheduler,
     get_all_jobs,
@@ -20,20 +24,21 @@ from app.etl.scheduler import (
     resume_job,
     trigger_job,
 )
-from app.etl.tasks import TASK_REGISTRY, MANUAL_TASKS
+from app.etl.tasks import TASK_REGISTRY, MANUAL_TASKS, JOB_NAMES
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin/etl", tags=["etl-jobs"])
 
 
 @router.get("/jobs")
-def list_jobs() -> Dict[str, Any]:
+def list_jobs(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
     列出所有 ETL 任務
 
     Returns:
         - scheduled: 排程任務列表
         - manual: 手動任務列表
+        - pipeline: 任務相依（DAG）與資料水位
     """
     try:
         # 取得排程任務
@@ -44,7 +49,8 @@ def list_jobs() -> Dict[str, Any]:
 
         return {
             "scheduled": scheduled_jobs,
-            "manual": manual_jobs
+            "manual": manual_jobs,
+            "pipeline": describe_pipeline(db)
         }
     except Exception as e:
         logger.error(f"Error listing jobs: {e}")
@@ -87,80 +93,54 @@ def get_job_detail(job_id: str) -> Dict[str, Any]:
 
 
 @router.post("/jobs/{job_id}/trigger", dependencies=[Depends(require_admin)])
-async def trigger_job_endpoint(
+def trigger_job_endpoint(
     job_id: str,
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     手動觸發任務
-    
-    1. 創建 'running' 狀態記錄到 etl_execution_log（trigger_type='manual'）
-    2. 在背景執行任務，傳入 etl_log_id
-    3. 任務完成時更新狀態為 'completed' 或 'failed'
+
+    API 不執行任務，只寫入 etl_job_queue：
+    1. 創建 'queued' 狀態記錄到 etl_execution_log（trigger_type='manual'）
+    2. ETL worker 領取後改為 'running' 並執行
+    3. 任務完成時更新狀態為 'completed'、'failed'、'skipped' 或 'cancelled'
 
     Args:
         job_id: 任務 ID
         db: 資料庫連線
 
     Returns:
-        觸發結果，包含 etl_log_id
+        觸發結果，包含 queue_id 與 etl_log_id
     """
     try:
         # 檢查任務是否存在於註冊表
         if job_id not in TASK_REGISTRY:
             raise HTTPException(status_code=404, detail=f"Task '{job_id}' not found")
 
-        # 1. 創建 ETL 記錄
-        from app.etl.tasks import create_etl_log, update_etl_log_status
-        
-        etl_log_id = create_etl_log(job_id, trigger_type='manual')
-        if not etl_log_id:
-            raise HTTPException(status_code=500, detail="Failed to create ETL log")
-        
-        logger.info(f"Created ETL log: {job_id} (etl_log_id={etl_log_id})")
-
-        # 2. 檢查是否已經在執行
-        if hasattr(trigger_job_endpoint, '_running_jobs'):
-            running_jobs = trigger_job_endpoint._running_jobs
-        else:
-            trigger_job_endpoint._running_jobs = set()
-            running_jobs = trigger_job_endpoint._running_jobs
-        
-        if job_id in running_jobs:
-            update_etl_log_status(etl_log_id, 'skipped', error_message='Skipped: task is already running on this worker')
+        # 同一任務已在排隊或執行中則不重複排入（唯一索引保證同時觸發時只排入一筆）
+        queued = enqueue_job(db, job_id, JOB_NAMES.get(job_id, job_id))
+        if queued is None:
+            pending = find_pending_job(db, job_id) or {'status': 'queued', 'queue_id': None, 'etl_log_id': None}
             return {
                 "success": False,
-                "status": "already_running",
+                "status": "already_running" if pending['status'] == 'running' else "already_queued",
                 "job_id": job_id,
-                "etl_log_id": etl_log_id,
-                "message": f"任務 '{job_id}' 已經在執行中，請稍候再試"
+                "queue_id": pending['queue_id'],
+                "etl_log_id": pending['etl_log_id'],
+                "message": f"任務 '{job_id}' 已經在排隊或執行中，請稍候再試"
             }
-        
-        # 3. 直接在背景執行，傳入 etl_log_id
-        # 注意：不使用 APScheduler 觸發，因為它無法傳遞 etl_log_id 參數
-        from concurrent.futures import ThreadPoolExecutor
-        
-        running_jobs.add(job_id)
-        executor = ThreadPoolExecutor(max_workers=1)
-        task_func = TASK_REGISTRY[job_id]
-        
-        def wrapped_task():
-            try:
-                task_func(etl_log_id=etl_log_id)
-            finally:
-                running_jobs.discard(job_id)
-        
-        executor.submit(wrapped_task)
-
-        logger.info(f"Task '{job_id}' triggered manually (etl_log_id={etl_log_id})")
+        db.commit()
+
+        logger.info(f"Task '{job_id}' queued manually (queue_id={queued['queue_id']}, etl_log_id={queued['etl_log_id']})")
 
         return {
             "success": True,
-            "status": "running",
+            "status": "queued",
             "job_id": job_id,
-            "etl_log_id": etl_log_id,
+            "queue_id": queued['queue_id'],
+            "etl_log_id": queued['etl_log_id'],
             "triggered_at": datetime.now().isoformat(),
-            "message": f"任務 '{job_id}' 已開始在背景執行"
+            "message": f"任務 '{job_id}' 已排入佇列，將由 ETL worker 執行"
         }
     except HTTPException:
         raise
@@ -240,11 +220,12 @@ def get_execution_logs(
     """
     取得 ETL 執行記錄
     
-    所有任務狀態（running, completed, failed, skipped）都記錄在 etl_execution_log
+    所有任務狀態（queued, running, completed, failed, skipped, cancelled）都記錄在 etl_execution_log；
+    支援進度回報的任務執行中時 progress 為最近一次回報的進度
 
     Args:
         job_id: 篩選特定任務
-        status: 篩選狀態 (running, completed, failed, skipped)
+        status: 篩選狀態 (queued, running, completed, failed, skipped, cancelled)
         limit: 返回數量
 
     Returns:
@@ -253,7 +234,8 @@ def get_execution_logs(
     try:
         query = """
             SELECT id, job_id, job_name, status, trigger_type, started_at, completed_at,
-                   duration_seconds, records_processed, error_message
+                   duration_seconds, records_processed, error_message,
+                   metadata -> 'progress', cancel_requested_at
             FROM etl_execution_log
             WHERE 1=1
         """
@@ -284,7 +266,9 @@ def get_execution_logs(
                 "completed_at": row[6].isoformat() if row[6] else None,
                 "duration_seconds": row[7],
                 "records_processed": row[8],
-                "error_message": row[9]
+                "error_message": row[9],
+                "progress": row[10],
+                "cancel_requested": row[11] is not None
             })
 
         return {"logs": logs, "total": len(logs)}
@@ -294,6 +278,49 @@ def get_execution_logs(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/logs/{etl_log_id}/cancel", dependencies=[Depends(require_admin)])
+def cancel_run_endpoint(
+    etl_log_id: int,
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    取消排隊中或執行中的任務
+
+    排隊中的任務立即取消；執行中的任務於下一次回報進度時停止（已完成的批次保留）。
+    不回報進度的任務無法中途停止，會執行到結束。
+
+    Args:
+        etl_log_id: ETL 執行記錄 ID
+        db: 資料庫連線
+
+    Returns:
+        取消結果（status: 'cancelled' 或 'cancelling'）
+    """
+    try:
+        result = cancel_run(db, etl_log_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"ETL log {etl_log_id} not found")
+        if result == 'finished':
+            return {
+                "success": False,
+                "status": "finished",
+                "etl_log_id": etl_log_id,
+                "message": "任務已結束，無法取消"
+            }
+        db.commit()
+        return {
+            "success": True,
+            "status": result,
+            "etl_log_id": etl_log_id,
+            "message": "任務已取消" if result == 'cancelled' else "已要求停止，任務將於目前批次完成後停止"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error cancelling ETL log {etl_log_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/settings")
 def get_etl_settings(
     category: Optional[str] = Query(None, description="篩選分類"),
@@ -399,21 +426,25 @@ def update_etl_setting(
 
 
 @router.get("/status")
-def get_scheduler_status() -> Dict[str, Any]:
+def get_scheduler_status(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
     取得排程器狀態
 
     Returns:
         排程器狀態資訊
+        - mode: 'embedded'（本程序執行 ETL）或 'worker'（由獨立的 ETL worker 執行）
+        - queue: 手動觸發佇列中排隊與執行中的任務數
     """
     try:
         scheduler = get_scheduler()
+        queue = queue_summary(db)
 
         if scheduler is None:
             return {
                 "status": "not_initialized",
                 "running": False,
-                "jobs_count": 0
+                "jobs_count": 0,
+                "queue": queue
             }
 
         jobs = scheduler.get_jobs()
@@ -421,6 +452,8 @@ def get_scheduler_status() -> Dict[str, Any]:
         return {
             "status": "running" if scheduler.running else "stopped",
             "running": scheduler.running,
+            "mode": "worker" if scheduler.state == STATE_PAUSED else "embedded",
+            "queue": queue,
             "jobs_count": len(jobs),
             "jobs": [
                 {
@@ -1,13 +1,51 @@
+import logging
+from collections import Counter
 from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.core.database import get_db
 from app.core.settings import get_current_video_id
+from app.etl.processors.extractors import KIND_REGEX, Extractor, MessageRow, build_extractor
+from app.services.mentions import mention_coverage
 
+logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/incense-map", tags=["incense-map"])
 
+# mention_extractors 中「XX代表上香」的擷取器
+INCENSE_EXTRACTOR = "incense"
+# 擷取器紀錄不存在（或 pattern 無效）時使用，與 init SQL 建立的預設 pattern 相同
+DEFAULT_INCENSE_PATTERN = r'([\u4e00-\u9fff]{2,6})代表上香'
+
+
+def _incense_extractor(db: Session) -> Extractor:
+    """目前儲存的 incense 擷取器（管理員可透過 /api/admin/extractors 修改 pattern）"""
+    row = db.execute(
+        text("SELECT kind, pattern FROM mention_extractors WHERE name = :name"),
+        {"name": INCENSE_EXTRACTOR},
+    ).fetchone()
+    extractor = build_extractor(INCENSE_EXTRACTOR, row.kind, row.pattern) if row else None
+    return extractor or build_extractor(INCENSE_EXTRACTOR, KIND_REGEX, DEFAULT_INCENSE_PATTERN)
+
+
+def _raw_prefilter(db: Session, extractor: Extractor) -> Optional[str]:
+    """
+    尾段留言的 SQL 預篩條件（message ~ :pattern），只取可能命中的留言到 Python 比對
+
+    pattern 使用 PostgreSQL 不支援的 Python 語法（如 (?P<name>...)）時回傳 None。
+    """
+    if extractor.pattern is None:
+        return None
+    try:
+        with db.begin_nested():
+            db.execute(text("SELECT '' ~ :pattern"), {"pattern": extractor.pattern.pattern})
+    except DBAPIError as e:
+        logger.info(f"Incense pattern is not a PostgreSQL regex, matching the tail in Python: {e.orig}")
+        return None
+    return " AND message ~ :pattern"
+
 
 @router.get("/candidates")
 def get_incense_candidates(
@@ -16,37 +54,60 @@ def get_incense_candidates(
     db: Session = Depends(get_db),
 ):
     video_id = get_current_video_id(db)
+    counts: Counter = Counter()
 
-    where = "message ~ '[\\u4e00-\\u9fff]{2,6}代表上香' AND live_stream_id = :video_id"
+    time_filter = ""
     params: dict = {"video_id": video_id}
-
     if start_time:
-        where += " AND published_at >= :start_time"
+        time_filter += " AND published_at >= :start_time"
         params["start_time"] = start_time
     if end_time:
-        where += " AND published_at <= :end_time"
+        time_filter += " AND published_at <= :end_time"
         params["end_time"] = end_time
 
-    sql = text(f"""
-        SELECT
-            (regexp_match(message, '([\\u4e00-\\u9fff]{{2,6}})代表上香'))[1] AS word,
-            COUNT(*) AS count
-        FROM chat_messages
-        WHERE {where}
-        GROUP BY word
-        ORDER BY count DESC
-    """)
+    # 已處理的留言直接讀 extracted_mentions；ETL 尚未處理的尾段（或擷取器尚未回填時全部）
+    # 以同一個儲存的 pattern 先在 SQL 預篩、再於 Python 比對，修改 pattern 後兩段結果不會混用新舊 pattern
+    covered_until = mention_coverage(db, INCENSE_EXTRACTOR)
+    raw_filter = time_filter
+    if covered_until is not None:
+        rows = db.execute(text(f"""
+            SELECT value AS word, COUNT(*) AS count
+            FROM extracted_mentions
+            WHERE extractor = :extractor
+              AND live_stream_id = :video_id
+              AND published_at <= :covered_until{time_filter}
+            GROUP BY value
+        """), {**params, "extractor": INCENSE_EXTRACTOR, "covered_until": covered_until})
+        counts.update({r.word: r.count for r in rows})
+        raw_filter += " AND published_at > :covered_until"
+        params["covered_until"] = covered_until
 
-    rows = db.execute(sql, params).fetchall()
-    total = sum(r.count for r in rows)
+    extractor = _incense_extractor(db)
+    prefilter = _raw_prefilter(db, extractor)
+    if prefilter is not None:
+        raw_filter += prefilter
+        params["pattern"] = extractor.pattern.pattern
+    elif covered_until is None:
+        # 無法預篩又尚未回填：整場直播都得逐筆比對，等 ETL 回填後再查
+        raise HTTPException(status_code=409, detail="Incense extractor is not backfilled yet")
+
+    rows = db.execute(text(f"""
+        SELECT message_id, live_stream_id, published_at, message, author_id
+        FROM chat_messages
+        WHERE live_stream_id = :video_id{raw_filter}
+    """), params)
+    counts.update(
+        value for value in (extractor.extract(MessageRow(*row)) for row in rows) if value is not None
+    )
 
+    total = sum(counts.values())
     candidates = [
         {
-            "word": r.word,
-            "count": r.count,
-            "percentage": round(r.count / total * 100, 2) if total > 0 else 0,
+            "word": word,
+            "count": count,
+            "percentage": round(count / total * 100, 2) if total > 0 else 0,
         }
-        for r in rows
+        for word, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
     ]
 
     return {
@@ -1,15 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List
+from typing import Any, NamedTuple, Optional, List, Tuple
 from collections import defaultdict
 import bisect
 import logging
 import time
 
-from app.core.database import get_db
+from app.core.database import get_analytics_db, run_analytics_in_thread
 from app.core.settings import get_current_video_id
-from app.models import StreamStats, ChatMessage, CurrencyRate, PAID_MESSAGE_TYPES
+from app.models import StreamStats, ChatMessage, PaidMessageLedger
+from app.services.query_guard import (
+    PLAYBACK_SNAPSHOTS,
+    QueryTimedOut,
+    apply_statement_timeout_async,
+    is_statement_timeout,
+)
+from app.services.playback_cache import (
+    KIND_STATS,
+    find_cache_entry,
+    load_stats_snapshots,
+    build_response_etag,
+    etag_matches,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/playback", tags=["playback"])
@@ -54,11 +69,12 @@ def _find_nearest_viewer(
 
 
 @router.get("/snapshots")
-def get_playback_snapshots(
+async def get_playback_snapshots(
+    request: Request,
     start_time: datetime = Query(..., description="Start time for playback"),
     end_time: datetime = Query(..., description="End time for playback"),
     step_seconds: int = Query(300, description="Time interval between snapshots in seconds"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_analytics_db)
 ):
     """
     Get aggregated snapshots for playback within a time range.
@@ -71,6 +87,9 @@ def get_playback_snapshots(
     - revenue_twd: Cumulative revenue in TWD from start
 
     Time Complexity: O(n + s*log(v)) where n = messages, s = snapshots, v = viewer stats
+
+    Queries run on the analytics pool (asyncpg) and the snapshot loop runs in
+    the threadpool, so long ranges do not hold up the event loop.
     """
     try:
         # Validate parameters
@@ -94,7 +113,8 @@ def get_playback_snapshots(
         if end_time.tzinfo is None:
             end_time = end_time.replace(tzinfo=timezone.utc)
 
-        video_id = get_current_video_id(db)
+        await apply_statement_timeout_async(db, PLAYBACK_SNAPSHOTS)
+        video_id = await db.run_sync(get_current_video_id)
 
         t_total = time.monotonic()
         logger.info(
@@ -103,185 +123,274 @@ def get_playback_snapshots(
             step_seconds, video_id,
         )
 
-        # Get viewer stats — only needed columns (avoids loading raw_response JSONB)
-        viewer_query = db.query(
-            StreamStats.collected_at, StreamStats.concurrent_viewers
-        ).filter(
-            StreamStats.collected_at >= start_time,
-            StreamStats.collected_at <= end_time
-        ).order_by(StreamStats.collected_at)
-
-        if video_id:
-            viewer_query = viewer_query.filter(StreamStats.live_stream_id == video_id)
-
-        t_q = time.monotonic()
-        viewer_rows = viewer_query.all()
-        t_viewer = time.monotonic() - t_q
-        # Pre-compute sorted timestamp arrays for binary search
-        viewer_times = [normalize_dt(r.collected_at).timestamp() for r in viewer_rows]
-        viewer_counts = [r.concurrent_viewers for r in viewer_rows]
-
-        # Query A: timestamps only (for hourly counting) — avoids loading raw_data, message, etc.
-        ts_query = db.query(ChatMessage.published_at).filter(
-            ChatMessage.published_at >= start_time,
-            ChatMessage.published_at <= end_time
+        # Finished streams are served from the precomputed timeline
+        cache_entry = await db.run_sync(
+            find_cache_entry, video_id, KIND_STATS, start_time, end_time, step_seconds
         )
-        if video_id:
-            ts_query = ts_query.filter(ChatMessage.live_stream_id == video_id)
-        ts_query = ts_query.order_by(ChatMessage.published_at)
-
-        t_q = time.monotonic()
-        sorted_timestamps = [
-            normalize_dt(row.published_at)
-            for row in ts_query.all()
-            if row.published_at
-        ]
-        t_ts = time.monotonic() - t_q
-
-        # Query B: paid messages only (~5% of total) — need raw_data for revenue
-        paid_query = db.query(
-            ChatMessage.published_at, ChatMessage.message_type, ChatMessage.raw_data
-        ).filter(
-            ChatMessage.published_at >= start_time,
-            ChatMessage.published_at <= end_time,
-            ChatMessage.message_type.in_(PAID_MESSAGE_TYPES)
+        if cache_entry is not None:
+            etag = build_response_etag(
+                cache_entry, start_time=start_time.isoformat(),
+                end_time=end_time.isoformat(), step_seconds=step_seconds,
+            )
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
+            snapshots = await run_analytics_in_thread(
+                load_stats_snapshots, cache_entry, start_time, end_time, step_seconds
+            )
+            # Viewer stats are tiny; re-resolve them so edge snapshots only see
+            # samples inside the requested range, as the live path does
+            viewer_times, viewer_counts = await db.run_sync(_load_viewer_series, start_time, end_time, video_id)
+            for snapshot in snapshots:
+                target_ts = datetime.fromisoformat(snapshot["timestamp"]).timestamp()
+                snapshot["viewer_count"] = _find_nearest_viewer(viewer_times, viewer_counts, target_ts)
+            logger.info(
+                "playback-snapshots served from cache: snapshots=%d total=%.3fs",
+                len(snapshots), time.monotonic() - t_total,
+            )
+            return JSONResponse(
+                content=_build_response(snapshots, start_time, end_time, step_seconds, video_id, cached=True),
+                headers={"ETag": etag, "Cache-Control": "no-cache"},
+            )
+
+        inputs = await db.run_sync(load_playback_inputs, start_time, end_time, video_id)
+        snapshots = await run_analytics_in_thread(
+            build_playback_snapshots, inputs, start_time, end_time, step_seconds
         )
-        if video_id:
-            paid_query = paid_query.filter(ChatMessage.live_stream_id == video_id)
-        paid_query = paid_query.order_by(ChatMessage.published_at)
-
-        t_q = time.monotonic()
-        paid_messages = [
-            (normalize_dt(row.published_at), row.message_type, row.raw_data)
-            for row in paid_query.all()
-            if row.published_at
-        ]
-        t_paid = time.monotonic() - t_q
-
-        logger.info(
-            "playback queries: viewer=%d/%.3fs timestamps=%d/%.3fs paid=%d/%.3fs",
-            len(viewer_rows), t_viewer,
-            len(sorted_timestamps), t_ts,
-            len(paid_messages), t_paid,
-        )
-
-        # Get currency rates for revenue calculation
-        rates_query = db.query(CurrencyRate).all()
-        rate_map = {rate.currency: float(rate.rate_to_twd) if rate.rate_to_twd else 0.0 for rate in rates_query}
-
-        # Helper to calculate revenue for a paid message tuple
-        def get_message_revenue(msg_type, raw_data):
-            if not raw_data or 'money' not in raw_data:
-                return 0.0
-            money_data = raw_data.get('money', {})
-            currency = money_data.get('currency')
-            amount_str = money_data.get('amount')
-            if not currency or not amount_str:
-                return 0.0
-            try:
-                amount_str = str(amount_str).replace(',', '').replace('$', '').strip()
-                amount = float(amount_str)
-                return amount * rate_map.get(currency, 0.0)
-            except (ValueError, TypeError):
-                return 0.0
-
-        # ========== O(n) Pre-computation: Build hourly message buckets ==========
-        hourly_buckets = defaultdict(int)
-        for ts in sorted_timestamps:
-            bucket_key = get_hour_bucket_key(ts)
-            hourly_buckets[bucket_key] += 1
-
-        # ========== Generate snapshots at each step ==========
-        snapshots = []
-        current_time = start_time
-        step_delta = timedelta(seconds=step_seconds)
-
-        # Track cumulative values from start_time
-        cumulative_paid_count = 0
-        cumulative_revenue = 0.0
-        paid_index = 0  # Track position in paid messages for cumulative
-        hour_message_index = 0  # Track position for hourly counting
-        last_hour_start = None  # Track when we enter a new hour
-        hourly_message_count = 0  # Count messages in current partial hour
-
-        while current_time <= end_time:
-            current_norm = normalize_dt(current_time)
-
-            # Find nearest viewer count via binary search O(log v)
-            target_ts = current_norm.timestamp()
-            viewer_count = _find_nearest_viewer(viewer_times, viewer_counts, target_ts)
-
-            # ========== Calculate hourly_messages ==========
-            current_hour_key = get_hour_bucket_key(current_time)
-            is_exact_hour = (current_time.minute == 0 and current_time.second == 0 and current_time.microsecond == 0)
-
-            if is_exact_hour and current_time > start_time:
-                # Exact hour boundary: Show previous hour's COMPLETE count (O(1) lookup)
-                prev_hour_key = current_hour_key - timedelta(hours=1)
-                hourly_messages = hourly_buckets.get(prev_hour_key, 0)
-            else:
-                # Mid-hour: Count messages from hour_start to current_time
-                # Reset counter when entering a new hour
-                if last_hour_start != current_hour_key:
-                    last_hour_start = current_hour_key
-                    hourly_message_count = 0
-                    # Find starting index for this hour via binary search O(log n)
-                    hour_message_index = bisect.bisect_left(sorted_timestamps, current_hour_key)
-
-                # Count messages from hour_start to current_time
-                while hour_message_index < len(sorted_timestamps):
-                    ts = sorted_timestamps[hour_message_index]
-                    ts_bucket = get_hour_bucket_key(ts)
-                    if ts_bucket != current_hour_key:
-                        break
-                    if ts < current_norm:
-                        hourly_message_count += 1
-                        hour_message_index += 1
-                    else:
-                        break
-
-                hourly_messages = hourly_message_count
-
-            # Update cumulative paid values
-            while paid_index < len(paid_messages):
-                pub_time, msg_type, raw_data = paid_messages[paid_index]
-                if pub_time <= current_norm:
-                    revenue = get_message_revenue(msg_type, raw_data)
-                    if revenue > 0:
-                        cumulative_paid_count += 1
-                        cumulative_revenue += revenue
-                    paid_index += 1
-                else:
-                    break
-
-            snapshots.append({
-                "timestamp": current_time.isoformat(),
-                "viewer_count": viewer_count,
-                "hourly_messages": hourly_messages,
-                "paid_message_count": cumulative_paid_count,
-                "revenue_twd": round(cumulative_revenue, 2)
-            })
-
-            current_time += step_delta
 
         logger.info(
             "playback-snapshots done: snapshots=%d total=%.3fs",
             len(snapshots), time.monotonic() - t_total,
         )
 
-        return {
-            "snapshots": snapshots,
-            "metadata": {
-                "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
-                "step_seconds": step_seconds,
-                "total_snapshots": len(snapshots),
-                "video_id": video_id
-            }
-        }
+        return _build_response(snapshots, start_time, end_time, step_seconds, video_id)
 
     except HTTPException:
         raise
     except Exception as e:
+        if is_statement_timeout(e):
+            logger.warning("playback-snapshots query timed out")
+            raise QueryTimedOut(PLAYBACK_SNAPSHOTS)
         logger.error(f"Error generating playback snapshots: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _load_viewer_series(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    video_id: Optional[str],
+) -> Tuple[List[float], List[Optional[int]]]:
+    """Load sorted (timestamp, concurrent_viewers) arrays for binary search."""
+    # Only needed columns (avoids loading raw_response JSONB)
+    viewer_query = db.query(
+        StreamStats.collected_at, StreamStats.concurrent_viewers
+    ).filter(
+        StreamStats.collected_at >= start_time,
+        StreamStats.collected_at <= end_time
+    ).order_by(StreamStats.collected_at)
+
+    if video_id:
+        viewer_query = viewer_query.filter(StreamStats.live_stream_id == video_id)
+
+    viewer_rows = viewer_query.all()
+    viewer_times = [normalize_dt(r.collected_at).timestamp() for r in viewer_rows]
+    viewer_counts = [r.concurrent_viewers for r in viewer_rows]
+    return viewer_times, viewer_counts
+
+
+def _build_response(
+    snapshots: List[dict],
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    video_id: Optional[str],
+    cached: bool = False,
+) -> dict:
+    return {
+        "snapshots": snapshots,
+        "metadata": {
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "step_seconds": step_seconds,
+            "total_snapshots": len(snapshots),
+            "video_id": video_id,
+            "cached": cached,
+        }
+    }
+
+
+class PlaybackInputs(NamedTuple):
+    """Rows a playback timeline is computed from."""
+    viewer_times: List[float]
+    viewer_counts: List[Optional[int]]
+    message_rows: List[Any]  # (published_at,) ordered by published_at
+    paid_rows: List[Any]  # (published_at, amount_twd) ordered by published_at
+
+
+def compute_playback_snapshots(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    video_id: Optional[str],
+    round_revenue: bool = True,
+) -> List[dict]:
+    """
+    Compute playback snapshots from raw stats and chat messages.
+
+    Args:
+        round_revenue: Round revenue_twd to 2 decimals. The cache builder keeps
+            full precision so cached timelines can be rebased without drift.
+    """
+    inputs = load_playback_inputs(db, start_time, end_time, video_id)
+    return build_playback_snapshots(inputs, start_time, end_time, step_seconds, round_revenue)
+
+
+def load_playback_inputs(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    video_id: Optional[str],
+) -> PlaybackInputs:
+    """Run the playback queries; rows are converted later, off the event loop."""
+    t_q = time.monotonic()
+    viewer_times, viewer_counts = _load_viewer_series(db, start_time, end_time, video_id)
+    t_viewer = time.monotonic() - t_q
+
+    # Query A: timestamps only (for hourly counting) — avoids loading raw_data, message, etc.
+    ts_query = db.query(ChatMessage.published_at).filter(
+        ChatMessage.published_at >= start_time,
+        ChatMessage.published_at <= end_time
+    )
+    if video_id:
+        ts_query = ts_query.filter(ChatMessage.live_stream_id == video_id)
+    # Fetched in batches: on the async engine each batch yields to the event loop
+    ts_query = ts_query.order_by(ChatMessage.published_at).yield_per(10000)
+
+    t_q = time.monotonic()
+    message_rows = ts_query.all()
+    t_ts = time.monotonic() - t_q
+
+    # Query B: paid messages with revenue, already converted to TWD in the ledger
+    paid_query = db.query(
+        PaidMessageLedger.published_at, PaidMessageLedger.amount_twd
+    ).filter(
+        PaidMessageLedger.published_at >= start_time,
+        PaidMessageLedger.published_at <= end_time,
+        PaidMessageLedger.amount_twd > 0
+    )
+    if video_id:
+        paid_query = paid_query.filter(PaidMessageLedger.live_stream_id == video_id)
+    paid_query = paid_query.order_by(PaidMessageLedger.published_at).yield_per(10000)
+
+    t_q = time.monotonic()
+    paid_rows = paid_query.all()
+    t_paid = time.monotonic() - t_q
+
+    logger.info(
+        "playback queries: viewer=%d/%.3fs timestamps=%d/%.3fs paid=%d/%.3fs",
+        len(viewer_times), t_viewer,
+        len(message_rows), t_ts,
+        len(paid_rows), t_paid,
+    )
+    return PlaybackInputs(viewer_times, viewer_counts, message_rows, paid_rows)
+
+
+def build_playback_snapshots(
+    inputs: PlaybackInputs,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    round_revenue: bool = True,
+) -> List[dict]:
+    """Generate the snapshots from loaded rows. CPU only, no database access."""
+    viewer_times, viewer_counts = inputs.viewer_times, inputs.viewer_counts
+    sorted_timestamps = [
+        normalize_dt(row.published_at)
+        for row in inputs.message_rows
+        if row.published_at
+    ]
+    paid_messages = [
+        (normalize_dt(row.published_at), float(row.amount_twd))
+        for row in inputs.paid_rows
+    ]
+
+    # ========== O(n) Pre-computation: Build hourly message buckets ==========
+    hourly_buckets = defaultdict(int)
+    for ts in sorted_timestamps:
+        bucket_key = get_hour_bucket_key(ts)
+        hourly_buckets[bucket_key] += 1
+
+    # ========== Generate snapshots at each step ==========
+    snapshots = []
+    current_time = start_time
+    step_delta = timedelta(seconds=step_seconds)
+
+    # Track cumulative values from start_time
+    cumulative_paid_count = 0
+    cumulative_revenue = 0.0
+    paid_index = 0  # Track position in paid messages for cumulative
+    hour_message_index = 0  # Track position for hourly counting
+    last_hour_start = None  # Track when we enter a new hour
+    hourly_message_count = 0  # Count messages in current partial hour
+
+    while current_time <= end_time:
+        current_norm = normalize_dt(current_time)
+
+        # Find nearest viewer count via binary search O(log v)
+        target_ts = current_norm.timestamp()
+        viewer_count = _find_nearest_viewer(viewer_times, viewer_counts, target_ts)
+
+        # ========== Calculate hourly_messages ==========
+        current_hour_key = get_hour_bucket_key(current_time)
+        is_exact_hour = (current_time.minute == 0 and current_time.second == 0 and current_time.microsecond == 0)
+
+        if is_exact_hour and current_time > start_time:
+            # Exact hour boundary: Show previous hour's COMPLETE count (O(1) lookup)
+            prev_hour_key = current_hour_key - timedelta(hours=1)
+            hourly_messages = hourly_buckets.get(prev_hour_key, 0)
+        else:
+            # Mid-hour: Count messages from hour_start to current_time
+            # Reset counter when entering a new hour
+            if last_hour_start != current_hour_key:
+                last_hour_start = current_hour_key
+                hourly_message_count = 0
+                # Find starting index for this hour via binary search O(log n)
+                hour_message_index = bisect.bisect_left(sorted_timestamps, current_hour_key)
+
+            # Count messages from hour_start to current_time
+            while hour_message_index < len(sorted_timestamps):
+                ts = sorted_timestamps[hour_message_index]
+                ts_bucket = get_hour_bucket_key(ts)
+                if ts_bucket != current_hour_key:
+                    break
+                if ts < current_norm:
+                    hourly_message_count += 1
+                    hour_message_index += 1
+                else:
+                    break
+
+            hourly_messages = hourly_message_count
+
+        # Update cumulative paid values
+        while paid_index < len(paid_messages):
+            pub_time, revenue = paid_messages[paid_index]
+            if pub_time <= current_norm:
+                cumulative_paid_count += 1
+                cumulative_revenue += revenue
+                paid_index += 1
+            else:
+                break
+
+        snapshots.append({
+            "timestamp": current_time.isoformat(),
+            "viewer_count": viewer_count,
+            "hourly_messages": hourly_messages,
+            "paid_message_count": cumulative_paid_count,
+            "revenue_twd": round(cumulative_revenue, 2) if round_revenue else cumulative_revenue
+        })
+
+        current_time += step_delta
+
+    return snapshots
@@ -3,18 +3,37 @@
 Provides word frequency snapshots for dynamic word cloud visualization
 in playback mode.
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
 from collections import Counter, defaultdict
+import json
 import logging
+import math
 import time
 
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.core.settings import get_current_video_id
 from app.models import ExclusionWordlist, ReplacementWordlist
+from app.services.query_guard import (
+    WORD_FREQUENCY_SNAPSHOTS,
+    QueryTimedOut,
+    QueryTooExpensive,
+    apply_statement_timeout,
+    estimate_cost,
+    is_statement_timeout,
+)
+from app.services.sliding_topk import SlidingTopK
+from app.services.playback_cache import (
+    KIND_WORDCLOUD,
+    find_cache_entry,
+    load_wordcloud_snapshots,
+    build_response_etag,
+    etag_matches,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/playback", tags=["playback-wordcloud"])
@@ -22,6 +41,14 @@ router = APIRouter(prefix="/api/playback", tags=["playback-wordcloud"])
 # Valid window hours options
 VALID_WINDOW_HOURS = [1, 4, 8, 12, 24]
 
+# Response formats: one JSON document, or newline-delimited JSON streamed per snapshot
+VALID_FORMATS = ["json", "ndjson"]
+
+# Snapshot encodings: full word objects, or a shared word table plus index/size arrays
+VALID_ENCODINGS = ["full", "columnar"]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 # Default excluded punctuation and special characters
 DEFAULT_EXCLUDED = {
     '~', ':', ',', '!', '?', '.', ';', '"', "'", '`',
@@ -53,6 +80,7 @@ def build_replace_dict(replacements: List[Dict]) -> Dict[str, str]:
 
 @router.get("/word-frequency-snapshots")
 def get_word_frequency_snapshots(
+    request: Request,
     start_time: datetime = Query(..., description="Start time for playback"),
     end_time: datetime = Query(..., description="End time for playback"),
     step_seconds: int = Query(300, description="Time interval between snapshots in seconds"),
@@ -61,7 +89,9 @@ def get_word_frequency_snapshots(
     exclude_words: str = Query(default="", description="Comma-separated words to exclude"),
     wordlist_id: Optional[int] = Query(default=None, description="Exclusion wordlist ID to use"),
     replacement_wordlist_id: Optional[int] = Query(default=None, description="Replacement wordlist ID to use"),
-    db: Session = Depends(get_db)
+    format: str = Query("json", description="Response format: json or ndjson (streamed)"),
+    encoding: str = Query("full", description="Snapshot encoding: full or columnar"),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get word frequency snapshots for dynamic word cloud playback.
@@ -78,9 +108,17 @@ def get_word_frequency_snapshots(
         exclude_words: Comma-separated exclusion words
         wordlist_id: ID of saved exclusion wordlist to use
         replacement_wordlist_id: ID of replacement wordlist to use
+        format: "json" returns one document; "ndjson" streams a metadata line
+            followed by one line per snapshot as soon as it is computed
+        encoding: "full" returns {word, size} objects; "columnar" returns
+            word_ids/sizes arrays indexing into a shared word table
     
     Returns:
-        Dictionary with snapshots array and metadata
+        Dictionary with snapshots array and metadata (or an NDJSON stream)
+
+    When the planner's cost estimate for the range is over budget, the range
+    is cut short (metadata.partial = true, metadata.requested_end_time holds
+    the original end); a 422 is returned if not even one snapshot fits.
     """
     try:
         # Validate parameters
@@ -98,6 +136,12 @@ def get_word_frequency_snapshots(
                 status_code=400, 
                 detail=f"window_hours must be one of {VALID_WINDOW_HOURS}"
             )
+
+        if format not in VALID_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {VALID_FORMATS}")
+
+        if encoding not in VALID_ENCODINGS:
+            raise HTTPException(status_code=400, detail=f"encoding must be one of {VALID_ENCODINGS}")
         
         # Limit total duration to prevent excessive data
         max_duration = timedelta(days=30)
@@ -109,6 +153,8 @@ def get_word_frequency_snapshots(
             start_time = start_time.replace(tzinfo=timezone.utc)
         if end_time.tzinfo is None:
             end_time = end_time.replace(tzinfo=timezone.utc)
+
+        apply_statement_timeout(db, WORD_FREQUENCY_SNAPSHOTS)
         
         # Build exclusion set
         excluded = set(DEFAULT_EXCLUDED)
@@ -144,8 +190,54 @@ def get_word_frequency_snapshots(
             step_seconds, window_hours, word_limit, video_id,
         )
 
-        # Generate all snapshots via single-query sliding window
-        snapshots = _compute_all_snapshots(
+        # Finished streams with default filters are served from the precomputed timeline
+        uses_defaults = not exclude_words and not wordlist_id and not replacement_wordlist_id
+        cache_entry = find_cache_entry(
+            db, video_id, KIND_WORDCLOUD, start_time, end_time, step_seconds, window_hours
+        ) if uses_defaults else None
+        if cache_entry is not None:
+            etag = build_response_etag(
+                cache_entry, start_time=start_time.isoformat(), end_time=end_time.isoformat(),
+                step_seconds=step_seconds, word_limit=word_limit,
+                format=format, encoding=encoding,
+            )
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers={"ETag": etag})
+
+            snapshots = load_wordcloud_snapshots(
+                cache_entry, start_time, end_time, step_seconds, word_limit
+            )
+            logger.info(
+                "word-frequency-snapshots served from cache: snapshots=%d total=%.3fs",
+                len(snapshots), time.monotonic() - t_total,
+            )
+            headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            metadata = _build_metadata(
+                start_time, end_time, step_seconds, window_hours, word_limit, video_id,
+                len(snapshots), encoding, cached=True,
+            )
+            if format == "ndjson":
+                return StreamingResponse(
+                    _iter_ndjson(metadata, snapshots, encoding),
+                    media_type=NDJSON_MEDIA_TYPE,
+                    headers=headers,
+                )
+            return JSONResponse(
+                content=_build_response(snapshots, metadata, encoding),
+                headers=headers,
+            )
+
+        requested_end_time = end_time
+        end_time = _fit_cost_budget(db, start_time, end_time, step_seconds, window_hours, video_id)
+        if end_time != requested_end_time:
+            logger.warning(
+                "word-frequency-snapshots over cost budget: range cut to %s~%s",
+                start_time.isoformat(), end_time.isoformat(),
+            )
+
+        # Single SQL query up front; the session is released before streaming starts,
+        # so only the (pure Python) sliding window runs inside the response body.
+        bucket_counters = _load_word_buckets(
             db=db,
             start_time=start_time,
             end_time=end_time,
@@ -154,34 +246,164 @@ def get_word_frequency_snapshots(
             video_id=video_id,
             excluded=excluded,
             replace_dict=replace_dict,
+        )
+        snapshot_iter = _iter_snapshots(
+            bucket_counters=bucket_counters,
+            start_time=start_time,
+            end_time=end_time,
+            step_seconds=step_seconds,
+            window_hours=window_hours,
             word_limit=word_limit,
         )
+        metadata = _build_metadata(
+            start_time, end_time, step_seconds, window_hours, word_limit, video_id,
+            _count_snapshots(start_time, end_time, step_seconds), encoding,
+            requested_end_time=requested_end_time if end_time != requested_end_time else None,
+        )
+
+        if format == "ndjson":
+            logger.info(
+                "word-frequency-snapshots streaming: snapshots=%d prepare=%.3fs",
+                metadata["total_snapshots"], time.monotonic() - t_total,
+            )
+            return StreamingResponse(
+                _iter_ndjson(metadata, snapshot_iter, encoding),
+                media_type=NDJSON_MEDIA_TYPE,
+            )
+
+        snapshots = list(snapshot_iter)
 
         logger.info(
             "word-frequency-snapshots done: snapshots=%d total=%.3fs",
             len(snapshots), time.monotonic() - t_total,
         )
 
-        return {
-            "snapshots": snapshots,
-            "metadata": {
-                "start_time": start_time.isoformat(),
-                "end_time": end_time.isoformat(),
-                "step_seconds": step_seconds,
-                "window_hours": window_hours,
-                "total_snapshots": len(snapshots),
-                "word_limit": word_limit,
-                "video_id": video_id
-            }
-        }
+        return _build_response(snapshots, metadata, encoding)
 
     except HTTPException:
         raise
     except Exception as e:
+        if is_statement_timeout(e):
+            logger.warning("word-frequency-snapshots query timed out")
+            raise QueryTimedOut(WORD_FREQUENCY_SNAPSHOTS)
         logger.error(f"Error generating word frequency snapshots: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _count_snapshots(start_time: datetime, end_time: datetime, step_seconds: int) -> int:
+    """Number of snapshots at start_time, start_time + step, ... <= end_time."""
+    if end_time < start_time:
+        return 0
+    return int((end_time - start_time).total_seconds()) // step_seconds + 1
+
+
+def _build_metadata(
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    window_hours: int,
+    word_limit: int,
+    video_id: Optional[str],
+    total_snapshots: int,
+    encoding: str = "full",
+    cached: bool = False,
+    requested_end_time: Optional[datetime] = None,
+) -> dict:
+    """requested_end_time: original end of a range cut short by the cost guard."""
+    metadata = {
+        "start_time": start_time.isoformat(),
+        "end_time": end_time.isoformat(),
+        "step_seconds": step_seconds,
+        "window_hours": window_hours,
+        "total_snapshots": total_snapshots,
+        "word_limit": word_limit,
+        "video_id": video_id,
+        "cached": cached,
+        "encoding": encoding,
+        "partial": requested_end_time is not None,
+    }
+    if requested_end_time is not None:
+        metadata["requested_end_time"] = requested_end_time.isoformat()
+    return metadata
+
+
+class ColumnarEncoder:
+    """
+    Encode snapshots against a shared word table.
+
+    Each word is assigned an index the first time it appears; a snapshot then
+    becomes two parallel arrays (word_ids, sizes) instead of a list of objects,
+    which removes the repeated word strings and keys from the payload.
+    """
+
+    def __init__(self):
+        self.word_table: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def encode(self, snapshot: dict) -> Tuple[dict, List[str]]:
+        """
+        Returns:
+            (encoded snapshot, words added to the table by this snapshot)
+        """
+        new_words: List[str] = []
+        word_ids: List[int] = []
+        sizes: List[int] = []
+        for item in snapshot["words"]:
+            word = item["word"]
+            idx = self._index.get(word)
+            if idx is None:
+                idx = len(self.word_table)
+                self._index[word] = idx
+                self.word_table.append(word)
+                new_words.append(word)
+            word_ids.append(idx)
+            sizes.append(item["size"])
+        encoded = {
+            "timestamp": snapshot["timestamp"],
+            "word_ids": word_ids,
+            "sizes": sizes,
+        }
+        return encoded, new_words
+
+
+def _build_response(snapshots: List[dict], metadata: dict, encoding: str = "full") -> dict:
+    if encoding == "columnar":
+        encoder = ColumnarEncoder()
+        encoded = [encoder.encode(snapshot)[0] for snapshot in snapshots]
+        return {
+            "word_table": encoder.word_table,
+            "snapshots": encoded,
+            "metadata": metadata,
+        }
+    return {
+        "snapshots": snapshots,
+        "metadata": metadata,
+    }
+
+
+def _iter_ndjson(metadata: dict, snapshots: Iterable[dict], encoding: str = "full") -> Iterator[bytes]:
+    """
+    Stream snapshots as newline-delimited JSON.
+
+    The first line is {"type": "metadata", ...}; each following line is one
+    snapshot ({"type": "snapshot", ...}). In columnar encoding every snapshot
+    line carries the new_words it appends to the client's word table, so the
+    table is rebuilt incrementally without a trailing index.
+    """
+    def dump(obj: dict) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    yield dump({"type": "metadata", **metadata})
+
+    encoder = ColumnarEncoder() if encoding == "columnar" else None
+    for snapshot in snapshots:
+        if encoder is not None:
+            encoded, new_words = encoder.encode(snapshot)
+            yield dump({"type": "snapshot", "new_words": new_words, **encoded})
+        else:
+            yield dump({"type": "snapshot", **snapshot})
+
+
 def _compute_all_snapshots(
     db: Session,
     start_time: datetime,
@@ -198,13 +420,35 @@ def _compute_all_snapshots(
     and a sliding-window algorithm over time buckets.
 
     Complexity: O(N_total + S * k) where N_total = total rows,
-    S = number of snapshots, k = word_limit.
+    S = number of snapshots, k = word_limit; each step only touches the
+    words of the entering and leaving buckets.
     """
-    window_seconds = window_hours * 3600
-    query_start = start_time - timedelta(seconds=window_seconds)
-
-    # Step 1: Single SQL query for the entire range
-    t_query = time.monotonic()
+    bucket_counters = _load_word_buckets(
+        db=db,
+        start_time=start_time,
+        end_time=end_time,
+        step_seconds=step_seconds,
+        window_hours=window_hours,
+        video_id=video_id,
+        excluded=excluded,
+        replace_dict=replace_dict,
+    )
+    return list(_iter_snapshots(
+        bucket_counters=bucket_counters,
+        start_time=start_time,
+        end_time=end_time,
+        step_seconds=step_seconds,
+        window_hours=window_hours,
+        word_limit=word_limit,
+    ))
+
+
+def _word_rows_query(
+    query_start: datetime,
+    end_time: datetime,
+    video_id: Optional[str],
+) -> Tuple[str, dict]:
+    """SQL and params for the (message_id, published_at, word) rows of [query_start, end_time)."""
     query = """
         SELECT DISTINCT message_id, published_at, unnest(tokens) AS word
         FROM processed_chat_messages
@@ -216,7 +460,67 @@ def _compute_all_snapshots(
         query += " AND live_stream_id = :video_id"
         params["video_id"] = video_id
     query += " ORDER BY published_at"
+    return query, params
+
+
+def _fit_cost_budget(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    window_hours: int,
+    video_id: Optional[str],
+) -> datetime:
+    """
+    Latest end time (on a step boundary) whose word query fits the cost budget.
+
+    The range is shrunk in proportion to the EXPLAIN estimate and re-checked,
+    since sort costs grow faster than linearly; every shrunk range is
+    estimated again, down to a single snapshot. When the proportional guess
+    undershoots the first snapshot, the remaining steps are halved instead.
+
+    Raises:
+        QueryTooExpensive: not even the first snapshot fits
+    """
+    guard = WORD_FREQUENCY_SNAPSHOTS
+    query_start = start_time - timedelta(hours=window_hours)
+    while True:
+        cost = estimate_cost(db, *_word_rows_query(query_start, end_time, video_id))
+        if cost <= guard.max_cost:
+            return end_time
+        current_steps = math.ceil((end_time - start_time).total_seconds() / step_seconds)
+        if current_steps <= 0:
+            break
+        allowed_seconds = (end_time - query_start).total_seconds() * guard.max_cost / cost
+        steps = int((allowed_seconds - window_hours * 3600) // step_seconds)
+        # Always drop at least one step so the loop ends at the first snapshot
+        steps = min(steps if steps >= 0 else current_steps // 2, current_steps - 1)
+        end_time = start_time + timedelta(seconds=steps * step_seconds)
+    raise QueryTooExpensive(
+        guard, cost, "Time range is too large; shorten it or use a smaller window_hours"
+    )
 
+
+def _load_word_buckets(
+    db: Session,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    window_hours: int,
+    video_id: Optional[str],
+    excluded: set,
+    replace_dict: Dict[str, str],
+) -> Dict[int, Counter]:
+    """
+    Run the single SQL query for [start_time - window, end_time) and fold the
+    rows into per-step word counters keyed by bucket index from query_start.
+    """
+    window_seconds = window_hours * 3600
+    query_start = start_time - timedelta(seconds=window_seconds)
+
+    # Step 1: Single SQL query for the entire range
+    t_query = time.monotonic()
+    query, params = _word_rows_query(query_start, end_time, video_id)
     result = db.execute(text(query), params)
     logger.info("wordcloud SQL executed: %.3fs", time.monotonic() - t_query)
 
@@ -247,10 +551,24 @@ def _compute_all_snapshots(
         row_count, len(seen_pairs), len(bucket_counters),
         time.monotonic() - t_process,
     )
+    return bucket_counters
 
+
+def _iter_snapshots(
+    bucket_counters: Dict[int, Counter],
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    window_hours: int,
+    word_limit: int,
+) -> Iterator[dict]:
+    """
+    Slide the window over the buckets from _load_word_buckets, yielding each
+    snapshot as soon as it is computed so callers can stream them.
+    """
     # Step 3: Sliding window over buckets
     t_slide = time.monotonic()
-    window_buckets = window_seconds // step_seconds
+    window_buckets = (window_hours * 3600) // step_seconds
     # Generate snapshot timestamps
     step_delta = timedelta(seconds=step_seconds)
     snapshot_times: List[datetime] = []
@@ -260,42 +578,42 @@ def _compute_all_snapshots(
         t += step_delta
 
     if not snapshot_times:
-        return []
+        return
 
     # Snapshot i at time T = start_time + i*step covers window [T-window, T).
     # In bucket space: T-window = query_start + i*step → bucket i
     #                  T = query_start + window + i*step → bucket window_buckets + i
     # So snapshot i covers buckets [i, window_buckets + i) (exclusive upper).
 
-    # Initialize running counter for first snapshot: buckets [0, window_buckets)
-    running = Counter()
+    # Initialize running counts for first snapshot: buckets [0, window_buckets).
+    # SlidingTopK updates only the words in the entering/leaving buckets and
+    # extracts the top k without scanning the whole window vocabulary.
+    running = SlidingTopK()
     for b in range(0, window_buckets):
         if b in bucket_counters:
-            running += bucket_counters[b]
+            running.add(bucket_counters[b])
 
-    snapshots: List[dict] = []
     for i, snap_time in enumerate(snapshot_times):
         # Extract top words
-        top_words = running.most_common(word_limit)
-        snapshots.append({
+        top_words = running.top(word_limit)
+        yield {
             "timestamp": snap_time.isoformat(),
             "words": [{"word": w, "size": c} for w, c in top_words],
-        })
+        }
 
         # Slide window for next snapshot: [i+1, window_buckets+i+1)
         if i + 1 < len(snapshot_times):
             # Add entering bucket (was just past the old window's end)
             entering = window_buckets + i
             if entering in bucket_counters:
-                running += bucket_counters[entering]
+                running.add(bucket_counters[entering])
             # Subtract leaving bucket (was the old window's start)
             leaving = i
             if leaving in bucket_counters:
-                running -= bucket_counters[leaving]
+                running.subtract(bucket_counters[leaving])
 
     logger.info(
         "wordcloud sliding-window: snapshots=%d elapsed=%.3fs",
-        len(snapshots), time.monotonic() - t_slide,
+        len(snapshot_times), time.monotonic() - t_slide,
     )
-    return snapshots
 
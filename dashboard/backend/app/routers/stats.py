@@ -1,12 +1,13 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, text
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 import logging
 
-from app.core.database import get_db
-from app.core.settings import get_current_video_id
-from app.models import StreamStats, ChatMessage, CurrencyRate, PAID_MESSAGE_TYPES
+from app.core.database import get_read_db
+from app.core.dependencies import current_video_id
+from app.models import StreamStats, ChatMessage
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/stats", tags=["stats"])
@@ -17,14 +18,14 @@ def get_viewer_stats(
     hours: int = None, 
     start_time: datetime = None, 
     end_time: datetime = None, 
-    db: Session = Depends(get_db)
+    video_id: Optional[str] = Depends(current_video_id),
+    db: Session = Depends(get_read_db)
 ):
     try:
         query = db.query(
             StreamStats.collected_at, StreamStats.concurrent_viewers
         ).order_by(StreamStats.collected_at.desc())
 
-        video_id = get_current_video_id(db)
         if video_id:
             query = query.filter(StreamStats.live_stream_id == video_id)
 
@@ -50,12 +51,39 @@ def get_viewer_stats(
         logger.error(f"Error fetching viewer stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _archived_hourly_counts(db: Session, start_time: datetime, end_time: Optional[datetime],
+                            video_id: Optional[str]):
+    """(hour, count) of archived streams, read from stream_hourly_rollups.
+
+    The raw rows of an archived stream are gone, so its hours come from the
+    rollup; an hour is included when it overlaps the range. Restored streams
+    have their raw rows back and are skipped.
+    """
+    conditions = ["a.status = 'archived'", "r.hour >= date_trunc('hour', CAST(:start_time AS timestamptz))"]
+    params = {"start_time": start_time}
+    if end_time:
+        conditions.append("r.hour <= :end_time")
+        params["end_time"] = end_time
+    if video_id:
+        conditions.append("r.live_stream_id = :video_id")
+        params["video_id"] = video_id
+
+    return db.execute(text(f"""
+        SELECT r.hour, SUM(r.message_count)
+        FROM stream_hourly_rollups r
+        JOIN stream_archives a ON a.live_stream_id = r.live_stream_id
+        WHERE {" AND ".join(conditions)}
+        GROUP BY r.hour
+    """), params).fetchall()
+
+
 @router.get("/comments")
 def get_comment_stats_hourly(
     hours: int = 24, 
     start_time: datetime = None, 
     end_time: datetime = None, 
-    db: Session = Depends(get_db)
+    video_id: Optional[str] = Depends(current_video_id),
+    db: Session = Depends(get_read_db)
 ):
     try:
         if start_time and end_time:
@@ -69,12 +97,12 @@ def get_comment_stats_hourly(
         
         query = db.query(
             trunc_func.label('hour'),
-            func.count(ChatMessage.message_id).label('count')
+            # COUNT(*) keeps this an Index Only Scan on the covering (live_stream_id, published_at) index
+            func.count().label('count')
         ).filter(
             ChatMessage.published_at >= start_time
         )
         
-        video_id = get_current_video_id(db)
         if video_id:
             query = query.filter(ChatMessage.live_stream_id == video_id)
         
@@ -86,13 +114,16 @@ def get_comment_stats_hourly(
         ).order_by(
             trunc_func
         ).all()
-        
+
+        counts = {r.hour: r.count for r in results}
+        for hour, count in _archived_hourly_counts(db, start_time, end_time, video_id):
+            counts[hour] = counts.get(hour, 0) + count
+
         data = []
-        for r in results:
-            dt = r.hour
+        for dt in sorted(counts):
             data.append({
                 "hour": dt.isoformat(), 
-                "count": r.count
+                "count": counts[dt]
             })
             
         return data
@@ -104,110 +135,76 @@ def get_comment_stats_hourly(
 def get_money_summary(
     start_time: datetime = None,
     end_time: datetime = None,
-    db: Session = Depends(get_db)
+    video_id: Optional[str] = Depends(current_video_id),
+    db: Session = Depends(get_read_db)
 ):
+    """Paid message totals in TWD, aggregated from paid_message_ledger.
+
+    The ledger holds each paid message's parsed amount and its TWD value at
+    the current rate (NULL for currencies without a rate), so the summary is
+    plain SQL aggregation.
+    """
     try:
-        query = db.query(
-            ChatMessage.author_id,
-            ChatMessage.author_name,
-            ChatMessage.timestamp,
-            ChatMessage.raw_data
-        ).filter(
-            ChatMessage.message_type.in_(PAID_MESSAGE_TYPES)
-        )
+        conditions = ["TRUE"]
+        params = {}
 
-        video_id = get_current_video_id(db)
         if video_id:
-            query = query.filter(ChatMessage.live_stream_id == video_id)
-
+            conditions.append("live_stream_id = :video_id")
+            params["video_id"] = video_id
         if start_time:
-            query = query.filter(ChatMessage.published_at >= start_time)
+            conditions.append("published_at >= :start_time")
+            params["start_time"] = start_time
         if end_time:
-            query = query.filter(ChatMessage.published_at <= end_time)
+            conditions.append("published_at <= :end_time")
+            params["end_time"] = end_time
+        where_clause = " AND ".join(conditions)
+
+        totals = db.execute(text(f"""
+            SELECT COALESCE(SUM(amount_twd), 0) AS total_twd,
+                   COUNT(amount_twd) AS paid_count,
+                   ARRAY_AGG(DISTINCT currency) FILTER (WHERE amount_twd IS NULL) AS unknown_currencies
+            FROM paid_message_ledger
+            WHERE {where_clause}
+        """), params).one()
+
+        # Top 5 payers; RANK() <= 5 keeps everyone tied with the 5th amount
+        author_rows = db.execute(text(f"""
+            WITH per_author AS (
+                SELECT author_id,
+                       (ARRAY_AGG(author_name ORDER BY timestamp DESC))[1] AS author_name,
+                       ROUND(SUM(amount_twd), 2) AS amount_twd,
+                       COUNT(*) AS message_count
+                FROM paid_message_ledger
+                WHERE {where_clause} AND amount_twd IS NOT NULL
+                GROUP BY author_id
+            ),
+            ranked AS (
+                SELECT *, RANK() OVER (ORDER BY amount_twd DESC) AS rnk
+                FROM per_author
+            )
+            SELECT author_id, author_name, amount_twd, message_count
+            FROM ranked
+            WHERE rnk <= 5
+            ORDER BY amount_twd DESC, author_id ASC
+        """), params).fetchall()
+
+        top_authors = [
+            {
+                'author_id': row.author_id or 'Unknown',
+                'author': row.author_name or 'Unknown',
+                'amount_twd': float(row.amount_twd),
+                'message_count': row.message_count
+            }
+            for row in author_rows
+        ]
 
-        messages = query.all()
-        
-        rates_query = db.query(CurrencyRate).all()
-        rate_map = {rate.currency: float(rate.rate_to_twd) if rate.rate_to_twd else 0.0 for rate in rates_query}
-        
-        total_twd = 0.0
-        author_amounts = {}
-        unknown_currencies = set()
-        paid_count = 0
-        
-        for row in messages:
-            if not row.raw_data or 'money' not in row.raw_data:
-                continue
-
-            money_data = row.raw_data.get('money')
-            if not money_data:
-                continue
-
-            currency = money_data.get('currency')
-            amount_str = money_data.get('amount')
-
-            if not currency or not amount_str:
-                continue
-
-            try:
-                amount_str = str(amount_str).replace(',', '').replace('$', '').strip()
-                amount = float(amount_str)
-            except (ValueError, TypeError):
-                logger.warning(f"Could not parse amount: {amount_str}")
-                continue
-
-            if currency in rate_map:
-                amount_twd = amount * rate_map[currency]
-                total_twd += amount_twd
-
-                author_id = row.author_id or 'Unknown'
-                author_name = row.author_name or 'Unknown'
-                latest_timestamp = row.timestamp or 0
-
-                if author_id not in author_amounts:
-                    author_amounts[author_id] = {
-                        'amount_twd': 0.0,
-                        'count': 0,
-                        'latest_author_name': author_name,
-                        'latest_timestamp': latest_timestamp
-                    }
-
-                author_amounts[author_id]['amount_twd'] += amount_twd
-                author_amounts[author_id]['count'] += 1
-                if latest_timestamp >= author_amounts[author_id]['latest_timestamp']:
-                    author_amounts[author_id]['latest_author_name'] = author_name
-                    author_amounts[author_id]['latest_timestamp'] = latest_timestamp
-                paid_count += 1
-            else:
-                unknown_currencies.add(currency)
-        
-        sorted_authors = sorted(
-            [
-                {
-                    'author_id': author_id,
-                    'author': data['latest_author_name'] or 'Unknown',
-                    'amount_twd': round(data['amount_twd'], 2),
-                    'message_count': data['count']
-                }
-                for author_id, data in author_amounts.items()
-            ],
-            key=lambda x: (-x['amount_twd'], x['author_id'])
-        )
-        
-        if len(sorted_authors) > 5:
-            fifth_amount = sorted_authors[4]['amount_twd']
-            top_authors = [a for a in sorted_authors if a['amount_twd'] >= fifth_amount]
-        else:
-            top_authors = sorted_authors
-
-        
         return {
-            "total_amount_twd": round(total_twd, 2),
-            "paid_message_count": paid_count,
+            "total_amount_twd": round(float(totals.total_twd), 2),
+            "paid_message_count": totals.paid_count,
             "top_authors": top_authors,
-            "unknown_currencies": list(unknown_currencies)
+            "unknown_currencies": sorted(totals.unknown_currencies or [])
         }
-        
+
     except Exception as e:
         logger.error(f"Error calculating money summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Dict, List, Optional
+from typing import Dict, List
 import logging
-import re
 
-from app.core.database import get_db
+from app.core.database import get_read_db
+from app.services.text_mining_index import Corpus, get_text_mining_index
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/text-mining", tags=["text-mining"])
@@ -77,153 +76,28 @@ def find_extensions(
         Dictionary with 'forward' and 'backward' keys, each containing
         results for extension lengths 1-5
     """
-    forward_counts: Dict[int, Dict[str, int]] = {i: {} for i in range(1, 6)}
-    backward_counts: Dict[int, Dict[str, int]] = {i: {} for i in range(1, 6)}
-
-    def starts_with_whitespace(text: str) -> bool:
-        return bool(text) and text[0].isspace()
-
-    def ends_with_whitespace(text: str) -> bool:
-        return bool(text) and text[-1].isspace()
-    
-    for message in messages:
-        # Message-level deduplication:
-        # the same extension in the same message counts once.
-        message_forward_seen: Dict[int, set[str]] = {i: set() for i in range(1, 6)}
-        message_backward_seen: Dict[int, set[str]] = {i: set() for i in range(1, 6)}
-
-        # Find all occurrences of target word
-        start = 0
-        while True:
-            idx = message.find(target_word, start)
-            if idx == -1:
-                break
-            
-            # Forward extension (after target word)
-            end_idx = idx + len(target_word)
-            for length in range(1, 6):
-                if end_idx + length <= len(message):
-                    ext = message[end_idx:end_idx + length]
-                    # For forward extension, skip only when the last char is whitespace.
-                    if not ends_with_whitespace(ext):
-                        message_forward_seen[length].add(ext)
-            
-            # Backward extension (before target word)
-            for length in range(1, 6):
-                if idx - length >= 0:
-                    ext = message[idx - length:idx]
-                    # For backward extension, skip only when the first char is whitespace.
-                    if not starts_with_whitespace(ext):
-                        message_backward_seen[length].add(ext)
-            
-            start = idx + 1
-
-        for length in range(1, 6):
-            for ext in message_forward_seen[length]:
-                forward_counts[length][ext] = forward_counts[length].get(ext, 0) + 1
-            for ext in message_backward_seen[length]:
-                backward_counts[length][ext] = backward_counts[length].get(ext, 0) + 1
-    
-    # Convert to sorted top-N results
-    forward_result = {}
-    backward_result = {}
-    
-    for length in range(1, 6):
-        # Forward
-        sorted_forward = sorted(
-            forward_counts[length].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:top_n]
-        forward_result[str(length)] = [
-            {"text": text, "count": count}
-            for text, count in sorted_forward
-        ]
-        
-        # Backward
-        sorted_backward = sorted(
-            backward_counts[length].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:top_n]
-        backward_result[str(length)] = [
-            {"text": text, "count": count}
-            for text, count in sorted_backward
-        ]
-    
-    return {
-        "forward": forward_result,
-        "backward": backward_result
-    }
+    _, result = Corpus(messages).extensions(target_word, top_n)
+    return result
 
 
 @router.post("/analyze", response_model=TextMiningResponse)
 def analyze_text_mining(
     request: TextMiningRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Analyze text mining patterns for a target word.
     
     Finds the most frequent character extensions before and after
-    the target word in both original and processed messages.
+    the target word in both original and processed messages. The window's
+    messages are indexed once and cached, so further target words over the
+    same window do not touch the database again.
     """
     try:
-        # Get total messages count for statistics
-        count_query = """
-            SELECT count(*)
-            FROM processed_chat_messages
-            WHERE published_at >= :start_time
-              AND published_at <= :end_time
-        """
-        total_messages = db.execute(
-            text(count_query),
-            {
-                "start_time": request.start_time,
-                "end_time": request.end_time
-            }
-        ).scalar()
-
-        # Query matching messages efficiently
-        query = """
-            SELECT original_message, processed_message
-            FROM processed_chat_messages
-            WHERE published_at >= :start_time
-              AND published_at <= :end_time
-              AND (original_message LIKE :pattern OR processed_message LIKE :pattern)
-        """
-        
-        result = db.execute(
-            text(query),
-            {
-                "start_time": request.start_time,
-                "end_time": request.end_time,
-                "pattern": f"%{request.target_word}%"
-            }
-        )
-        rows = result.fetchall()
-        
-        # Separate original and processed messages
-        original_messages = []
-        processed_messages = []
-        matched_original = 0
-        matched_processed = 0
-        
-        for row in rows:
-            original_msg = row[0] or ""
-            processed_msg = row[1] or ""
-            
-            if request.target_word in original_msg:
-                original_messages.append(original_msg)
-                matched_original += 1
-            
-            if request.target_word in processed_msg:
-                processed_messages.append(processed_msg)
-                matched_processed += 1
-        
-        # Analyze extensions
-        original_result = find_extensions(original_messages, request.target_word)
-        processed_result = find_extensions(processed_messages, request.target_word)
+        index = get_text_mining_index(db, request.start_time, request.end_time)
+
+        matched_original, original_result = index.original.extensions(request.target_word)
+        matched_processed, processed_result = index.processed.extensions(request.target_word)
         
         return TextMiningResponse(
             original_message=MessageTypeResult(
@@ -235,7 +109,7 @@ def analyze_text_mining(
                 backward=processed_result["backward"]
             ),
             stats=TextMiningStats(
-                total_messages=total_messages,
+                total_messages=index.total_messages,
                 matched_original=matched_original,
                 matched_processed=matched_processed
             )
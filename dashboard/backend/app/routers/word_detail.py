@@ -6,12 +6,25 @@ from pydantic import BaseModel
 from typing import List, Optional
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.models import ChatMessage
+from app.services.hourly_rollup import ceil_hour
+from app.services.query_guard import (
+    WORD_OCCURRENCES,
+    QueryTimedOut,
+    QueryTooExpensive,
+    apply_statement_timeout,
+    estimate_cost,
+    is_statement_timeout,
+)
+from app.services.search import SEARCH_COUNT_CAP, contains_filter, count_matches
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin", tags=["admin-word-detail"])
 
+# When searching all history is over the cost budget, only this many recent days are searched
+WORD_OCCURRENCE_FALLBACK_DAYS = 30
+
 
 class MessageOccurrence(BaseModel):
     """Single message occurrence."""
@@ -24,6 +37,8 @@ class WordOccurrenceResponse(BaseModel):
     """Response for word occurrence endpoint."""
     word: str
     total_occurrences: int
+    total_is_estimate: bool = False
+    searched_since: Optional[datetime] = None  # None: all history was searched
     messages: List[MessageOccurrence]
     text_mining_available: bool
     seven_day_start: Optional[datetime]
@@ -35,23 +50,42 @@ def get_word_occurrences(
     word: str = Query(..., description="Word to search for"),
     limit: int = Query(10, ge=1, le=100, description="Number of messages to return"),
     word_type: Optional[str] = Query(None, description="Type of word: 'replace' or 'special'"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get recent messages containing a specific word.
     
     Returns the most recent messages (up to limit) that contain the word,
     along with metadata about text mining availability.
+
+    Words too short for the trigram index scan all of chat_messages; when
+    the planner's cost estimate exceeds the budget only the last
+    WORD_OCCURRENCE_FALLBACK_DAYS days are searched (searched_since is set),
+    and a 422 is returned if even that is over budget.
     """
     try:
-        # Search for messages containing the word (case-insensitive)
-        # Using ILIKE for case-insensitive search
+        apply_statement_timeout(db, WORD_OCCURRENCES)
+        now = datetime.now(tz=timezone.utc)
+
+        # Search for messages containing the word (case-insensitive),
+        # served by the lower(message) trigram index
         query = db.query(ChatMessage).filter(
-            ChatMessage.message.ilike(f"%{word}%")
+            contains_filter(ChatMessage.message, word)
         ).order_by(ChatMessage.published_at.desc())
+
+        searched_since = None
+        cost = estimate_cost(db, query.order_by(None).limit(SEARCH_COUNT_CAP + 1))
+        if cost > WORD_OCCURRENCES.max_cost:
+            searched_since = ceil_hour(now) - timedelta(days=WORD_OCCURRENCE_FALLBACK_DAYS)
+            query = query.filter(ChatMessage.published_at >= searched_since)
+            cost = estimate_cost(db, query.order_by(None).limit(SEARCH_COUNT_CAP + 1))
+            if cost > WORD_OCCURRENCES.max_cost:
+                raise QueryTooExpensive(
+                    WORD_OCCURRENCES, cost, "Search term is too broad; try a longer word"
+                )
         
-        # Get total count
-        total_count = query.count()
+        # Get total count (exact up to SEARCH_COUNT_CAP, estimated above)
+        total_count, total_is_estimate = count_matches(db, query)
         
         # Get limited messages
         messages = query.limit(limit).all()
@@ -67,35 +101,43 @@ def get_word_occurrences(
         ]
         
         # Calculate 7-day range for text mining
-        # Use the current time as the end of the range
-        now = datetime.now(tz=timezone.utc)
-        seven_day_start = now - timedelta(days=7)
-        seven_day_end = now
+        # End at the next whole hour so lookups within the same hour share
+        # one cached text-mining index (see app/services/text_mining_index.py)
+        seven_day_end = ceil_hour(now)
+        seven_day_start = seven_day_end - timedelta(days=7)
         
-        # Check if there are any messages in the 7-day range
-        text_mining_query = db.query(ChatMessage).filter(
-            ChatMessage.message.ilike(f"%{word}%"),
-            ChatMessage.published_at >= seven_day_start,
-            ChatMessage.published_at <= seven_day_end
-        )
-        text_mining_count = text_mining_query.count()
-        text_mining_available = text_mining_count > 0
+        # Check if there are any messages in the 7-day range (existence only)
+        text_mining_available = db.query(
+            db.query(ChatMessage).filter(
+                contains_filter(ChatMessage.message, word),
+                ChatMessage.published_at >= seven_day_start,
+                ChatMessage.published_at <= seven_day_end
+            ).exists()
+        ).scalar()
         
         logger.info(
             f"Word occurrence query for '{word}': "
-            f"total={total_count}, returned={len(messages)}, "
-            f"7-day count={text_mining_count}"
+            f"total={total_count} (estimate={total_is_estimate}), returned={len(messages)}, "
+            f"searched_since={searched_since}, "
+            f"7-day available={text_mining_available}"
         )
         
         return WordOccurrenceResponse(
             word=word,
             total_occurrences=total_count,
+            total_is_estimate=total_is_estimate,
+            searched_since=searched_since,
             messages=message_occurrences,
             text_mining_available=text_mining_available,
             seven_day_start=seven_day_start if text_mining_available else None,
             seven_day_end=seven_day_end if text_mining_available else None
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
+        if is_statement_timeout(e):
+            logger.warning(f"Word occurrence query for '{word}' timed out")
+            raise QueryTimedOut(WORD_OCCURRENCES, "Search took too long; try a longer word")
         logger.error(f"Error fetching word occurrences for '{word}': {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch word occurrences: {str(e)}")
@@ -1,14 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, Iterable, List, Dict, Tuple
 from collections import defaultdict
 import logging
 
-from app.core.database import get_db
+from app.core.database import get_analytics_db, run_analytics_in_thread
 from app.core.settings import get_current_video_id
 from app.models import ReplacementWordlist
+from app.services.query_guard import (
+    WORDCLOUD,
+    QueryTimedOut,
+    QueryTooExpensive,
+    apply_statement_timeout_async,
+    estimate_cost,
+    is_statement_timeout,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/wordcloud", tags=["wordcloud"])
@@ -46,7 +54,8 @@ def count_words_with_replacement(
     rows: List[Tuple[str, str]],
     replace_dict: Dict[str, str],
     excluded: set,
-    limit: int
+    limit: int,
+    archived_counts: Iterable[Tuple[str, int]] = ()
 ) -> List[Dict]:
     """
     Count word frequencies with post-replacement per-message deduplication.
@@ -56,6 +65,8 @@ def count_words_with_replacement(
         replace_dict: Replacement dictionary
         excluded: Set of words to exclude
         limit: Maximum number of words to return
+        archived_counts: (word, message count) pairs of archived streams,
+            already deduplicated per message before replacement
     
     Returns:
         List of {word, count} dictionaries
@@ -77,6 +88,11 @@ def count_words_with_replacement(
         if pair not in seen_pairs:
             seen_pairs.add(pair)
             word_counts[replaced_word] += 1
+
+    for word, count in archived_counts:
+        replaced_word = apply_replacement(word, replace_dict) if replace_dict else word
+        if replaced_word not in excluded:
+            word_counts[replaced_word] += count
     
     # Sort by count descending and limit
     sorted_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
@@ -84,15 +100,57 @@ def count_words_with_replacement(
     return [{"word": word, "count": count} for word, count in sorted_words]
 
 
+def _fetch_word_rows(session, statement, params) -> List[Tuple[str, str]]:
+    """Fetch (message_id, word) rows in batches; on the async engine each batch yields to the event loop."""
+    return session.execute(statement.execution_options(yield_per=10000), params).fetchall()
+
+
+def _fetch_archived_tokens(session, start_time: Optional[datetime], end_time: Optional[datetime],
+                           video_id: Optional[str]) -> Tuple[List[Tuple[str, int]], int]:
+    """
+    Token counts of archived streams that lie entirely inside the range.
+
+    Their processed rows are gone and stream_token_counts only holds
+    whole-stream counts, so a stream that only partly overlaps the range is
+    left out. Returns ((token, message count) pairs, archived message count).
+    """
+    conditions = ["status = 'archived'"]
+    params = {}
+    if start_time:
+        conditions.append("first_published_at >= :start_time")
+        params["start_time"] = start_time
+    if end_time:
+        conditions.append("last_published_at <= :end_time")
+        params["end_time"] = end_time
+    if video_id:
+        conditions.append("live_stream_id = :video_id")
+        params["video_id"] = video_id
+
+    streams = session.execute(text(f"""
+        SELECT live_stream_id, COALESCE((row_counts->>'processed_chat_messages')::int, 0)
+        FROM stream_archives
+        WHERE {" AND ".join(conditions)}
+    """), params).fetchall()
+    if not streams:
+        return [], 0
+
+    tokens = session.execute(text("""
+        SELECT token, SUM(count) FROM stream_token_counts
+        WHERE live_stream_id = ANY(:video_ids)
+        GROUP BY token
+    """), {"video_ids": [row[0] for row in streams]}).fetchall()
+    return [(token, int(count)) for token, count in tokens], sum(row[1] for row in streams)
+
+
 @router.get("/word-frequency")
-def get_word_frequency(
+async def get_word_frequency(
     start_time: datetime = None,
     end_time: datetime = None,
     exclude_words: str = Query(default="", description="Comma-separated words to exclude"),
     replacement_wordlist_id: Optional[int] = Query(default=None, description="Replacement wordlist ID to use"),
     replacements: Optional[str] = Query(default=None, description="JSON string of ad-hoc replacements"),
     limit: int = Query(default=100, ge=1, le=500),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_analytics_db)
 ):
     """
     計算詞頻統計，用於文字雲繪製
@@ -104,6 +162,10 @@ def get_word_frequency(
         replacement_wordlist_id: 後取代字詞列表 ID
         replacements: 自定義取代規則 (JSON 字串，優先順序高於 ID)
         limit: 返回詞數上限 (1-500)
+
+    查詢走分析用的 async 連線池，詞頻計算在 threadpool 執行，不阻塞 event loop。
+    未指定時間範圍時會掃描全部留言；預估成本超過預算時回傳 422（query_too_expensive）。
+    已封存的直播由 stream_token_counts 計入，只有整場都落在時間範圍內的才會算進去。
     """
     try:
         import json
@@ -130,9 +192,9 @@ def get_word_frequency(
         
         # 若無 Ad-hoc 且有 ID，則載入 DB 規則
         if not replace_dict and replacement_wordlist_id:
-            wordlist = db.query(ReplacementWordlist).filter(
-                ReplacementWordlist.id == replacement_wordlist_id
-            ).first()
+            wordlist = (await db.execute(
+                select(ReplacementWordlist).where(ReplacementWordlist.id == replacement_wordlist_id)
+            )).scalars().first()
             if wordlist and wordlist.replacements:
                 replace_dict = build_replace_dict(wordlist.replacements)
         
@@ -156,16 +218,26 @@ def get_word_frequency(
             params["end_time"] = end_time
         
         # 添加 video_id 篩選
-        video_id = get_current_video_id(db)
+        video_id = await db.run_sync(get_current_video_id)
         if video_id:
             base_query += " AND live_stream_id = :video_id"
             params["video_id"] = video_id
         
-        result = db.execute(text(base_query), params)
-        rows = result.fetchall()
+        await apply_statement_timeout_async(db, WORDCLOUD)
+        cost = await db.run_sync(estimate_cost, base_query, params)
+        if cost > WORDCLOUD.max_cost:
+            raise QueryTooExpensive(WORDCLOUD, cost, "Time range is too large; narrow start_time / end_time")
+
+        rows = await db.run_sync(_fetch_word_rows, text(base_query), params)
+        # 已封存直播的原始留言已刪除，改讀 stream_token_counts
+        archived_tokens, archived_messages = await db.run_sync(
+            _fetch_archived_tokens, start_time, end_time, video_id
+        )
         
         # 套用取代並計算詞頻（含 per-message 去重）
-        words = count_words_with_replacement(rows, replace_dict, excluded, limit)
+        words = await run_analytics_in_thread(
+            count_words_with_replacement, rows, replace_dict, excluded, limit, archived_tokens
+        )
         
         # 取得統計資訊
         stats_query = """
@@ -191,11 +263,15 @@ def get_word_frequency(
         
         stats_query += ") AS stats"
         
-        stats_result = db.execute(text(stats_query), stats_params)
+        stats_result = await db.execute(text(stats_query), stats_params)
         stats_row = stats_result.fetchone()
         
         total_messages = stats_row[0] if stats_row else 0
         unique_words = stats_row[1] if stats_row else 0
+        if archived_tokens:
+            total_messages += archived_messages
+            raw_words = {word for _, word in rows}
+            unique_words += sum(1 for token, _ in archived_tokens if token not in raw_words)
         
         return {
             "words": words,
@@ -204,7 +280,12 @@ def get_word_frequency(
             "excluded_words": list(excluded)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        if is_statement_timeout(e):
+            logger.warning("word-frequency query timed out")
+            raise QueryTimedOut(WORDCLOUD)
         logger.error(f"Error fetching word frequency: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,142 @@
+"""Hourly author activity (author_activity_hourly).
+
+For each (stream, hour, author_id, author_name) the rollup stores the message
+count, the paid message count and the first / last message time. Keeping the
+name in the key lets the author summary list aliases, and the latest display
+name is the name with the greatest last_seen. The chat ETL adds each batch's
+counts in the transaction that inserts the batch, so the rollup always
+matches processed_chat_messages.
+
+``author_activity_source`` returns a SELECT over the same columns for any
+time range: whole hours the ETL has covered come from the rollup, the edges
+from chat_messages.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models import PAID_MESSAGE_TYPES
+from app.services.hourly_rollup import hour_bucket, split_rollup_ranges, time_ranges_condition
+
+# (live_stream_id, hour, author_id, author_name)
+AuthorKey = Tuple[str, datetime, str, str]
+
+
+def count_author_activity(messages: Iterable[Dict[str, Any]]) -> Dict[AuthorKey, List]:
+    """
+    Count messages per author per stream-hour.
+
+    Args:
+        messages: messages with live_stream_id, author_id, author_name,
+            message_type and published_at (datetime or ISO string)
+
+    Returns:
+        {key: [message_count, paid_count, first_seen, last_seen]}
+    """
+    counts: Dict[AuthorKey, List] = {}
+    for msg in messages:
+        published_at = msg['published_at']
+        if isinstance(published_at, str):
+            published_at = datetime.fromisoformat(published_at)
+        key = (msg['live_stream_id'], hour_bucket(published_at), msg['author_id'], msg['author_name'] or '')
+        entry = counts.get(key)
+        if entry is None:
+            entry = counts[key] = [0, 0, published_at, published_at]
+        entry[0] += 1
+        if msg.get('message_type') in PAID_MESSAGE_TYPES:
+            entry[1] += 1
+        entry[2] = min(entry[2], published_at)
+        entry[3] = max(entry[3], published_at)
+    return counts
+
+
+def add_author_activity(conn, counts: Dict[AuthorKey, List]) -> int:
+    """Add author counts onto author_activity_hourly. Returns rows touched."""
+    if not counts:
+        return 0
+    conn.execute(
+        text("""
+            INSERT INTO author_activity_hourly
+                (live_stream_id, hour, author_id, author_name,
+                 message_count, paid_count, first_seen, last_seen)
+            VALUES (:live_stream_id, :hour, :author_id, :author_name,
+                    :message_count, :paid_count, :first_seen, :last_seen)
+            ON CONFLICT (live_stream_id, hour, author_id, author_name)
+            DO UPDATE SET
+                message_count = author_activity_hourly.message_count + EXCLUDED.message_count,
+                paid_count = author_activity_hourly.paid_count + EXCLUDED.paid_count,
+                first_seen = LEAST(author_activity_hourly.first_seen, EXCLUDED.first_seen),
+                last_seen = GREATEST(author_activity_hourly.last_seen, EXCLUDED.last_seen);
+        """),
+        [
+            {
+                "live_stream_id": stream,
+                "hour": hour,
+                "author_id": author_id,
+                "author_name": author_name,
+                "message_count": message_count,
+                "paid_count": paid_count,
+                "first_seen": first_seen,
+                "last_seen": last_seen,
+            }
+            for (stream, hour, author_id, author_name), (message_count, paid_count, first_seen, last_seen)
+            in counts.items()
+        ],
+    )
+    return len(counts)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive API timestamps are UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def author_activity_source(
+    db: Session,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    video_id: Optional[str],
+    params: dict,
+    author_id: Optional[str] = None,
+) -> str:
+    """
+    SELECT of hourly author activity rows within [start_time, end_time].
+
+    Columns: author_id, author_name, hour, message_count, paid_count,
+    first_seen, last_seen. Bind values are added to params.
+    """
+    start_time, end_time = _as_utc(start_time), _as_utc(end_time)
+    hour_range, raw_ranges = split_rollup_ranges(db, start_time, end_time)
+
+    filters = ""
+    if video_id:
+        filters += " AND {alias}.live_stream_id = :video_id"
+        params["video_id"] = video_id
+    if author_id is not None:
+        filters += " AND {alias}.author_id = :author_id"
+        params["author_id"] = author_id
+    params["paid_types"] = list(PAID_MESSAGE_TYPES)
+
+    sources = []
+    if hour_range:
+        params["rollup_lo"], params["rollup_hi"] = hour_range
+        sources.append(f"""
+            SELECT r.author_id, r.author_name, r.hour, r.message_count::bigint AS message_count,
+                   r.paid_count::bigint AS paid_count, r.first_seen, r.last_seen
+            FROM author_activity_hourly r
+            WHERE r.hour >= :rollup_lo AND r.hour < :rollup_hi{filters.format(alias='r')}
+        """)
+    sources.append(f"""
+        SELECT c.author_id, COALESCE(c.author_name, '') AS author_name, date_trunc('hour', c.published_at) AS hour,
+               COUNT(*) AS message_count,
+               COUNT(*) FILTER (WHERE c.message_type = ANY(:paid_types)) AS paid_count,
+               MIN(c.published_at) AS first_seen, MAX(c.published_at) AS last_seen
+        FROM chat_messages c
+        WHERE {time_ranges_condition("c.published_at", raw_ranges, params)}{filters.format(alias='c')}
+        GROUP BY c.author_id, COALESCE(c.author_name, ''), date_trunc('hour', c.published_at)
+    """)
+    return " UNION ALL ".join(sources)
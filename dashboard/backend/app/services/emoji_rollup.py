@@ -0,0 +1,86 @@
+"""Hourly emoji counts (emoji_counts_by_hour).
+
+For each (stream, hour, emoji) the rollup stores how many processed messages
+contained the emoji, the same COUNT(DISTINCT message_id) the emoji stats
+endpoint used to compute by unnesting every message in range. The chat ETL
+adds each batch's counts in the transaction that inserts the batch, so the
+rollup always matches processed_chat_messages.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.services.hourly_rollup import hour_bucket
+
+# (live_stream_id, hour, is_youtube, emoji)
+EmojiKey = Tuple[str, datetime, bool, str]
+
+
+def count_emojis(messages: Iterable[Dict[str, Any]]) -> Dict[EmojiKey, List]:
+    """
+    Count messages per emoji per stream-hour.
+
+    Args:
+        messages: processed messages with live_stream_id, published_at
+            (datetime or ISO string), unicode_emojis and youtube_emotes
+
+    Returns:
+        {key: [message_count, image_url]}; image_url is the greatest URL seen
+        for a YouTube emote (None for Unicode emojis)
+    """
+    counts: Dict[EmojiKey, List] = {}
+    for msg in messages:
+        published_at = msg['published_at']
+        if isinstance(published_at, str):
+            published_at = datetime.fromisoformat(published_at)
+        hour = hour_bucket(published_at)
+        stream = msg['live_stream_id']
+
+        for emoji in set(msg.get('unicode_emojis') or []):
+            entry = counts.setdefault((stream, hour, False, emoji), [0, None])
+            entry[0] += 1
+
+        urls: Dict[str, Optional[str]] = {}
+        for emote in msg.get('youtube_emotes') or []:
+            name = emote.get('name')
+            if name is None:
+                continue
+            url = emote.get('url')
+            if name not in urls or (url is not None and (urls[name] is None or url > urls[name])):
+                urls[name] = url
+        for name, url in urls.items():
+            entry = counts.setdefault((stream, hour, True, name), [0, None])
+            entry[0] += 1
+            if url is not None and (entry[1] is None or url > entry[1]):
+                entry[1] = url
+    return counts
+
+
+def add_emoji_counts(conn, counts: Dict[EmojiKey, List]) -> int:
+    """Add emoji counts onto emoji_counts_by_hour. Returns rows touched."""
+    if not counts:
+        return 0
+    conn.execute(
+        text("""
+            INSERT INTO emoji_counts_by_hour
+                (live_stream_id, hour, is_youtube, emoji, image_url, message_count)
+            VALUES (:live_stream_id, :hour, :is_youtube, :emoji, :image_url, :message_count)
+            ON CONFLICT (live_stream_id, hour, is_youtube, emoji)
+            DO UPDATE SET
+                message_count = emoji_counts_by_hour.message_count + EXCLUDED.message_count,
+                image_url = GREATEST(emoji_counts_by_hour.image_url, EXCLUDED.image_url);
+        """),
+        [
+            {
+                "live_stream_id": stream,
+                "hour": hour,
+                "is_youtube": is_youtube,
+                "emoji": emoji,
+                "image_url": image_url,
+                "message_count": message_count,
+            }
+            for (stream, hour, is_youtube, emoji), (message_count, image_url) in counts.items()
+        ],
+    )
+    return len(counts)
@@ -0,0 +1,107 @@
+"""Helpers shared by the hourly rollups the chat ETL maintains.
+
+Rollups such as word_group_hourly_counts and emoji_counts_by_hour are
+written in the same transaction that inserts a batch into
+processed_chat_messages, so they hold exactly the processed messages. An
+endpoint can serve the whole hours the ETL has covered from the rollup and
+aggregate only the remaining edges of its range from raw rows;
+``rollup_hour_range`` finds that covered span. Archiving a stream deletes its
+processed rows but keeps its rollup rows, so archived streams stay covered.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+ONE_HOUR = timedelta(hours=1)
+
+
+def hour_bucket(value: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour."""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime) -> datetime:
+    """Smallest hour boundary >= value."""
+    floor = hour_bucket(value)
+    return floor if floor == value else floor + ONE_HOUR
+
+
+def rollup_hour_range(
+    db: Session,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Whole hours [lo, hi) inside [start_time, end_time] covered by the rollups.
+
+    Coverage starts at the first hour fully after the oldest processed or
+    archived message (stream_archives keeps first_published_at after the raw
+    rows are gone) and ends at the hour containing the ETL checkpoint (that hour may
+    still be partly unprocessed). A missing start_time / end_time leaves that
+    side bounded by coverage only. Returns None if no whole hour qualifies.
+    """
+    row = db.execute(text("""
+        SELECT
+            LEAST(
+                (SELECT MIN(published_at) FROM processed_chat_messages),
+                (SELECT MIN(first_published_at) FROM stream_archives)
+            ),
+            (SELECT last_processed_timestamp FROM processed_chat_checkpoint
+             ORDER BY updated_at DESC LIMIT 1)
+    """)).fetchone()
+    if not row or row[0] is None or row[1] is None:
+        return None
+
+    lo = ceil_hour(row[0])
+    hi = hour_bucket(row[1])
+    if start_time is not None:
+        lo = max(lo, ceil_hour(start_time))
+    if end_time is not None:
+        hi = min(hi, hour_bucket(end_time))
+    if hi <= lo:
+        return None
+    return lo, hi
+
+
+# (start, end, include_end); None = unbounded
+TimeRange = Tuple[Optional[datetime], Optional[datetime], bool]
+
+
+def split_rollup_ranges(
+    db: Session,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> Tuple[Optional[Tuple[datetime, datetime]], List[TimeRange]]:
+    """
+    Split [start_time, end_time] into rollup hours and raw edges.
+
+    Returns:
+        (hour_range, raw_ranges): hour_range as from ``rollup_hour_range``
+        (or None), and the parts of the range that must still be aggregated
+        from raw rows
+    """
+    hour_range = rollup_hour_range(db, start_time, end_time)
+    if hour_range is None:
+        return None, [(start_time, end_time, True)]
+    lo, hi = hour_range
+    raw_ranges: List[TimeRange] = [(hi, end_time, True)]
+    if start_time is None or start_time < lo:
+        raw_ranges.insert(0, (start_time, lo, False))
+    return hour_range, raw_ranges
+
+
+def time_ranges_condition(column: str, ranges: List[TimeRange], params: dict) -> str:
+    """SQL OR of time ranges on column; bind values are added to params."""
+    parts = []
+    for i, (range_start, range_end, include_end) in enumerate(ranges):
+        conds = []
+        if range_start is not None:
+            conds.append(f"{column} >= :raw_start_{i}")
+            params[f"raw_start_{i}"] = range_start
+        if range_end is not None:
+            conds.append(f"{column} {'<=' if include_end else '<'} :raw_end_{i}")
+            params[f"raw_end_{i}"] = range_end
+        parts.append("(" + (" AND ".join(conds) or "TRUE") + ")")
+    return "(" + " OR ".join(parts) + ")"
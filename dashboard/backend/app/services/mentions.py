@@ -0,0 +1,63 @@
+"""Extracted mentions (extracted_mentions).
+
+A mention extractor is a regex saved in mention_extractors (e.g. the incense
+map's ``XX代表上香``) or a builtin Python extractor registered in
+``app.etl.processors.extractors``. Its matches are stored once per message
+in extracted_mentions, so endpoints aggregate a small indexed table instead
+of running the pattern over every chat message of a stream on each request.
+
+The table mirrors processed_chat_messages: the chat ETL extracts the
+mentions of each batch in the same transaction that inserts the batch, and a
+new, edited or re-enabled extractor is marked pending (backfilled_at = NULL)
+until the backfill task has re-extracted it from processed_chat_messages.
+Endpoints read the table up to ``mention_coverage`` and match only the newer
+tail (or everything, while the extractor is pending) from chat_messages.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+# Tables with the extracted_mentions columns that extractors may write to
+MENTION_TABLES = ('extracted_mentions',)
+
+
+def add_mentions(conn, mentions: List[Dict], table: str = 'extracted_mentions') -> int:
+    """Insert mentions (re-processed messages are skipped). Returns rows given."""
+    if table not in MENTION_TABLES:
+        raise ValueError(f"Unknown mention table: {table}")
+    if not mentions:
+        return 0
+    conn.execute(
+        text(f"""
+            INSERT INTO {table} (extractor, message_id, published_at, live_stream_id, value)
+            VALUES (:extractor, :message_id, :published_at, :live_stream_id, :value)
+            ON CONFLICT (extractor, message_id, published_at) DO NOTHING;
+        """),
+        mentions,
+    )
+    return len(mentions)
+
+
+def add_mention_tables(conn, mentions_by_table: Dict[str, List[Dict]]) -> int:
+    """Insert the output of ``ExtractorSet.extract``. Returns rows given."""
+    return sum(add_mentions(conn, mentions, table) for table, mentions in mentions_by_table.items())
+
+
+def mention_coverage(db, extractor: str) -> Optional[datetime]:
+    """
+    Latest published_at whose mentions are in extracted_mentions.
+
+    That is the chat ETL checkpoint, once the extractor has been backfilled;
+    None if the extractor is missing, disabled, pending, or nothing was
+    processed yet.
+    """
+    row = db.execute(text("""
+        SELECT
+            (SELECT backfilled_at FROM mention_extractors WHERE name = :name AND enabled),
+            (SELECT last_processed_timestamp FROM processed_chat_checkpoint
+             ORDER BY updated_at DESC LIMIT 1)
+    """), {"name": extractor}).fetchone()
+    if not row or row[0] is None:
+        return None
+    return row[1]
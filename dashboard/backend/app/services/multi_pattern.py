@@ -0,0 +1,134 @@
+"""Multi-pattern substring matching (Aho-Corasick).
+
+Word trend stats need to know, for every chat message in a range, which of
+many group words it contains. Testing each word separately costs
+O(len(text) * words) per message; the automaton finds every contained word
+in a single left-to-right pass, O(len(text) + matches), however many words
+are loaded.
+"""
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+class MultiPatternMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of literal patterns.
+
+    ``find(text)`` returns the indices (into the pattern list given to the
+    constructor) of every pattern occurring in ``text`` as a substring,
+    including overlapping and nested occurrences ("哈哈" inside "哈哈哈").
+    Matching is exact; callers lowercase both sides for case-insensitivity.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[int]] = [frozenset()]
+        self._matches_empty = False
+
+        outputs: List[set] = [set()]
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                # The empty string occurs in every text
+                self._matches_empty = True
+                outputs[0].add(idx)
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append(set())
+                node = nxt
+            outputs[node].add(idx)
+
+        # Breadth-first: fail links point to the longest proper suffix that is
+        # also a trie prefix; outputs inherit everything along the fail chain.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                outputs[child] |= outputs[self._fail[child]]
+
+        self._out = [frozenset(o) for o in outputs]
+
+    def find(self, text: str) -> FrozenSet[int]:
+        """Indices of all patterns contained in text."""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        node = 0
+        found = set(out[0]) if self._matches_empty else None
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                if found is None:
+                    found = set(out[node])
+                else:
+                    found |= out[node]
+        return frozenset(found) if found else frozenset()
+
+
+class GroupMatcher:
+    """
+    Match text against many word groups' include/exclude lists at once.
+
+    Each group is ``(group_id, words, exclude_words)``. ``match(text)``
+    returns the ids of the groups whose words occur in the text (case-
+    insensitive substring) and none of whose exclude_words do. Groups without
+    words never match.
+    """
+
+    def __init__(self, groups: Iterable[Tuple[int, Iterable[str], Optional[Iterable[str]]]]):
+        word_index: Dict[str, int] = {}
+        self._include: List[Set[int]] = []
+        self._exclude: List[Set[int]] = []
+
+        def index_of(word: str) -> int:
+            word = word.lower()
+            if word not in word_index:
+                word_index[word] = len(word_index)
+                self._include.append(set())
+                self._exclude.append(set())
+            return word_index[word]
+
+        for group_id, words, exclude_words in groups:
+            if not words:
+                continue
+            for word in words:
+                self._include[index_of(word)].add(group_id)
+            for word in exclude_words or []:
+                self._exclude[index_of(word)].add(group_id)
+
+        self._matcher = MultiPatternMatcher(word_index) if word_index else None
+
+    @property
+    def empty(self) -> bool:
+        """True when no group has any word, so nothing can ever match."""
+        return self._matcher is None
+
+    def match(self, text: str) -> Set[int]:
+        """Ids of the groups matched by text."""
+        if self._matcher is None or not text:
+            return set()
+        found = self._matcher.find(text.lower())
+        if not found:
+            return set()
+        matched: Set[int] = set()
+        excluded: Set[int] = set()
+        for idx in found:
+            matched |= self._include[idx]
+            excluded |= self._exclude[idx]
+        return matched - excluded
@@ -0,0 +1,60 @@
+"""Keyset (cursor) pagination for chat message lists.
+
+Pages are ordered by (published_at DESC, message_id DESC). A cursor is the
+opaque, URL-safe encoding of the last row's (published_at, message_id); the
+next page is everything strictly after that key, which the
+(live_stream_id, published_at) index serves with a range scan regardless of
+how deep the page is.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import and_, tuple_
+
+from app.models import ChatMessage
+
+# Pagination modes
+PAGINATION_OFFSET = 'offset'
+PAGINATION_CURSOR = 'cursor'
+VALID_PAGINATION = [PAGINATION_OFFSET, PAGINATION_CURSOR]
+
+# Total modes: exact COUNT, capped count with planner estimate, or no total at all
+TOTAL_EXACT = 'exact'
+TOTAL_APPROXIMATE = 'approximate'
+TOTAL_NONE = 'none'
+VALID_TOTAL_MODES = [TOTAL_EXACT, TOTAL_APPROXIMATE, TOTAL_NONE]
+
+
+def encode_cursor(published_at: datetime, message_id: str) -> str:
+    """Encode a row's sort key as an opaque cursor."""
+    raw = json.dumps([published_at.isoformat(), message_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_at, message_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(published_at), str(message_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def apply_keyset(query, cursor: str = None):
+    """Order a ChatMessage query newest first and, with a cursor, start after it."""
+    if cursor:
+        published_at, message_id = decode_cursor(cursor)
+        query = query.filter(and_(
+            # Plain range predicate so the planner can use the published_at index
+            ChatMessage.published_at <= published_at,
+            tuple_(ChatMessage.published_at, ChatMessage.message_id) < tuple_(published_at, message_id),
+        ))
+    return query.order_by(ChatMessage.published_at.desc(), ChatMessage.message_id.desc())
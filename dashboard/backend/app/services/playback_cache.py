@@ -0,0 +1,210 @@
+"""Playback snapshot cache.
+
+Finished streams never change, so their playback timelines are materialized
+once by the ETL (``build_playback_cache``) and stored gzip-compressed in
+``playback_snapshot_cache``. Requests whose timestamps fall on a materialized
+grid are served by resampling the coarsest timeline that contains them.
+"""
+import gzip
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any
+
+from sqlalchemy.orm import Session
+
+from app.models import PlaybackSnapshotCache
+
+KIND_STATS = 'stats'
+KIND_WORDCLOUD = 'wordcloud'
+
+# Finest resolution first; coarser steps are resampled from it at build time
+MATERIALIZED_STEPS = (60, 300)
+
+# Word clouds are cached at the endpoint's max word_limit and truncated on read
+CACHE_WORD_LIMIT = 100
+
+
+def _normalize_dt(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def encode_payload(snapshots: List[Dict[str, Any]]) -> bytes:
+    """Serialize a snapshot timeline to gzip-compressed JSON."""
+    raw = json.dumps(snapshots, ensure_ascii=False, separators=(',', ':'))
+    return gzip.compress(raw.encode('utf-8'))
+
+
+def decode_payload(payload: bytes) -> List[Dict[str, Any]]:
+    """Inverse of encode_payload."""
+    return json.loads(gzip.decompress(payload).decode('utf-8'))
+
+
+def compute_etag(payload: bytes) -> str:
+    """Content hash of a stored payload."""
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+def build_response_etag(entry: PlaybackSnapshotCache, **params) -> str:
+    """ETag for a response derived from a cache entry and the request parameters."""
+    key = json.dumps([entry.etag, params], sort_keys=True, default=str)
+    return '"' + hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+
+def resample_timeline(
+    snapshots: List[Dict[str, Any]],
+    source_start: datetime,
+    source_step: int,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+) -> List[Dict[str, Any]]:
+    """
+    Pick the snapshots at start_time, start_time + step, ... <= end_time from
+    a timeline materialized every source_step seconds from source_start.
+
+    Timestamps are re-rendered from start_time so the output is identical in
+    shape to a live computation for the same request.
+    """
+    stride = step_seconds // source_step
+    index = (_normalize_dt(start_time) - _normalize_dt(source_start)) // timedelta(seconds=source_step)
+    step_delta = timedelta(seconds=step_seconds)
+
+    result = []
+    current_time = start_time
+    while current_time <= end_time and index < len(snapshots):
+        snapshot = dict(snapshots[index])
+        snapshot['timestamp'] = current_time.isoformat()
+        result.append(snapshot)
+        current_time += step_delta
+        index += stride
+    return result
+
+
+def find_cache_entry(
+    db: Session,
+    video_id: Optional[str],
+    kind: str,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    window_hours: int = 0,
+) -> Optional[PlaybackSnapshotCache]:
+    """
+    Find the coarsest materialized timeline whose grid contains every snapshot
+    timestamp of the request. Returns None when the request must be computed live.
+    """
+    if not video_id:
+        return None
+
+    entries = db.query(PlaybackSnapshotCache).filter(
+        PlaybackSnapshotCache.live_stream_id == video_id,
+        PlaybackSnapshotCache.kind == kind,
+        PlaybackSnapshotCache.window_hours == window_hours,
+    ).all()
+
+    start = _normalize_dt(start_time)
+    step_delta = timedelta(seconds=step_seconds)
+    last = start + ((_normalize_dt(end_time) - start) // step_delta) * step_delta
+
+    best = None
+    for entry in entries:
+        if step_seconds % entry.step_seconds:
+            continue
+        entry_start = _normalize_dt(entry.start_time)
+        if start < entry_start or last > _normalize_dt(entry.end_time):
+            continue
+        if (start - entry_start) % timedelta(seconds=entry.step_seconds):
+            continue
+        if best is None or entry.step_seconds > best.step_seconds:
+            best = entry
+    return best
+
+
+def load_stats_snapshots(
+    entry: PlaybackSnapshotCache,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+) -> List[Dict[str, Any]]:
+    """
+    Serve /api/playback/snapshots from a cached stats timeline.
+
+    The cached timeline accumulates paid messages and hourly counts from the
+    stream's first message, whereas a live request counts from start_time, so
+    both are rebased onto start_time here. A paid message stamped exactly on
+    start_time is attributed to the preceding step.
+    """
+    cached = decode_payload(entry.payload)
+    snapshots = resample_timeline(
+        cached, entry.start_time, entry.step_seconds, start_time, end_time, step_seconds
+    )
+    if not snapshots:
+        return snapshots
+
+    base_paid = snapshots[0]['paid_message_count']
+    base_revenue = snapshots[0]['revenue_twd']
+
+    start = _normalize_dt(start_time)
+    start_hour = start.replace(minute=0, second=0, microsecond=0)
+    next_hour = start_hour + timedelta(hours=1)
+    # Messages between the top of the hour and start_time are outside the request
+    hour_offset = 0 if start == start_hour else snapshots[0]['hourly_messages']
+
+    for snapshot in snapshots:
+        ts = _normalize_dt(datetime.fromisoformat(snapshot['timestamp']))
+        if ts == start:
+            snapshot['hourly_messages'] = 0
+        elif ts <= next_hour:
+            snapshot['hourly_messages'] -= hour_offset
+        snapshot['paid_message_count'] -= base_paid
+        snapshot['revenue_twd'] = round(snapshot['revenue_twd'] - base_revenue, 2)
+    return snapshots
+
+
+def load_wordcloud_snapshots(
+    entry: PlaybackSnapshotCache,
+    start_time: datetime,
+    end_time: datetime,
+    step_seconds: int,
+    word_limit: int,
+) -> List[Dict[str, Any]]:
+    """Serve /api/playback/word-frequency-snapshots from a cached timeline."""
+    cached = decode_payload(entry.payload)
+    snapshots = resample_timeline(
+        cached, entry.start_time, entry.step_seconds, start_time, end_time, step_seconds
+    )
+    for snapshot in snapshots:
+        snapshot['words'] = snapshot['words'][:word_limit]
+    return snapshots
+
+
+def invalidate_playback_cache(db: Session, kind: Optional[str] = None) -> int:
+    """
+    Drop cached timelines so the ETL rebuilds them on its next run.
+
+    Args:
+        kind: KIND_STATS / KIND_WORDCLOUD, or None for everything
+
+    Returns:
+        Number of deleted rows
+    """
+    query = db.query(PlaybackSnapshotCache)
+    if kind:
+        query = query.filter(PlaybackSnapshotCache.kind == kind)
+    return query.delete(synchronize_session=False)
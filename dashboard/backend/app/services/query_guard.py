@@ -0,0 +1,126 @@
+"""Statement timeouts and planner-cost budgets for analytics endpoints.
+
+Each guarded endpoint has a ``QueryGuard``:
+
+- ``timeout_ms`` is applied as ``statement_timeout`` for the request's
+  transaction only (``set_config(..., is_local => true)``), so pooled
+  connections keep the server default. A query that runs past it is
+  cancelled by Postgres and reported as a structured 422 (``query_timeout``)
+  instead of holding a connection for minutes.
+- ``max_cost`` is a budget for the planner's estimated total cost, read
+  with ``EXPLAIN (FORMAT JSON)`` before the query runs. Over budget, the
+  endpoint narrows the query (a partial result over a shorter range) or
+  rejects it with a 422 (``query_too_expensive``).
+
+Costs are in planner units (one sequential page read = 1), so budgets scale
+with the data; both limits can be overridden per guard with
+``QUERY_GUARD_<NAME>_TIMEOUT_MS`` / ``QUERY_GUARD_<NAME>_MAX_COST``.
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Query, Session
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE of a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+
+@dataclass(frozen=True)
+class QueryGuard:
+    name: str
+    timeout_ms: int
+    max_cost: float
+
+
+def _guard(name: str, timeout_ms: int, max_cost: float) -> QueryGuard:
+    prefix = f"QUERY_GUARD_{name.upper()}_"
+    return QueryGuard(
+        name=name,
+        timeout_ms=int(os.getenv(prefix + "TIMEOUT_MS", timeout_ms)),
+        max_cost=float(os.getenv(prefix + "MAX_COST", max_cost)),
+    )
+
+
+PLAYBACK_SNAPSHOTS = _guard("playback_snapshots", 30000, 5_000_000)
+WORDCLOUD = _guard("wordcloud", 30000, 5_000_000)
+WORD_FREQUENCY_SNAPSHOTS = _guard("word_frequency_snapshots", 60000, 10_000_000)
+WORD_OCCURRENCES = _guard("word_occurrences", 10000, 1_000_000)
+
+
+class QueryTooExpensive(HTTPException):
+    """422 for a query whose estimated cost exceeds its guard's budget."""
+
+    def __init__(self, guard: QueryGuard, estimated_cost: float, message: str):
+        super().__init__(status_code=422, detail={
+            "error": "query_too_expensive",
+            "guard": guard.name,
+            "estimated_cost": round(estimated_cost),
+            "max_cost": round(guard.max_cost),
+            "message": message,
+        })
+
+
+class QueryTimedOut(HTTPException):
+    """422 for a query cancelled by its guard's statement_timeout."""
+
+    def __init__(self, guard: QueryGuard, message: str = "Query took too long; narrow the time range"):
+        super().__init__(status_code=422, detail={
+            "error": "query_timeout",
+            "guard": guard.name,
+            "timeout_ms": guard.timeout_ms,
+            "message": message,
+        })
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    """Whether exc is a query cancelled by statement_timeout (psycopg2 or asyncpg)."""
+    if not isinstance(exc, DBAPIError):
+        return False
+    orig = exc.orig
+    return (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) == QUERY_CANCELED
+
+
+_SET_TIMEOUT_SQL = text("SELECT set_config('statement_timeout', :timeout, true)")
+
+
+def apply_statement_timeout(db: Session, guard: QueryGuard) -> None:
+    """Set statement_timeout for the rest of the session's transaction."""
+    db.execute(_SET_TIMEOUT_SQL, {"timeout": str(guard.timeout_ms)})
+
+
+async def apply_statement_timeout_async(db, guard: QueryGuard) -> None:
+    """apply_statement_timeout for an AsyncSession."""
+    await db.execute(_SET_TIMEOUT_SQL, {"timeout": str(guard.timeout_ms)})
+
+
+def explain_plan(db: Session, statement: Any, params: Optional[Dict[str, Any]] = None) -> dict:
+    """
+    Top plan node from EXPLAIN (FORMAT JSON).
+
+    Args:
+        statement: raw SQL string (with :name binds) or an ORM Query
+    """
+    if isinstance(statement, Query):
+        compiled = statement.statement.compile(dialect=db.get_bind().dialect)
+        row = db.connection().exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + compiled.string, compiled.params
+        ).fetchone()
+    else:
+        row = db.execute(text("EXPLAIN (FORMAT JSON) " + statement), params or {}).fetchone()
+    plan = row[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def estimate_cost(db: Session, statement: Any, params: Optional[Dict[str, Any]] = None) -> float:
+    """Planner's estimated total cost of a query."""
+    return float(explain_plan(db, statement, params)["Total Cost"])
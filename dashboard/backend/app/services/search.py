@@ -0,0 +1,61 @@
+"""Chat message search helpers.
+
+Substring filters on chat_messages are served by the pg_trgm GIN indexes on
+``lower(message)`` / ``lower(author_name)`` (see database/init/10_create_gin_indexes.sql
+and database/migrations/24_create_search_indexes.sql).
+Those are expression indexes, so filters must be written as
+``lower(column) LIKE lower(pattern)`` for the planner to pick them up; use
+``contains_filter`` rather than ``column.ilike(...)``.
+
+Counting every match of a broad filter still visits every matching row, so
+``count_matches`` counts exactly only up to a cap and falls back to the
+planner's row estimate above it.
+"""
+import logging
+from typing import Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Query, Session
+
+from app.services.query_guard import explain_plan
+
+logger = logging.getLogger(__name__)
+
+# Exact counting stops here; larger totals are reported as estimates
+SEARCH_COUNT_CAP = 10000
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE metacharacters so user input is treated as literal text."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def contains_filter(column, term: str):
+    """Case-insensitive substring match that can use the lower() trigram indexes."""
+    return func.lower(column).like(func.lower(f'%{escape_like(term)}%'), escape='\\')
+
+
+def estimate_row_count(db: Session, query: Query) -> int:
+    """Planner row estimate for a query, from EXPLAIN (FORMAT JSON)."""
+    return int(explain_plan(db, query)["Plan Rows"])
+
+
+def count_matches(db: Session, query: Query, cap: int = SEARCH_COUNT_CAP) -> Tuple[int, bool]:
+    """
+    Count the rows of a query, exactly up to ``cap``.
+
+    Returns:
+        (total, is_estimate). When more than ``cap`` rows match, the planner's
+        estimate is returned (never less than cap + 1) with is_estimate=True.
+    """
+    limited = query.order_by(None).limit(cap + 1).subquery()
+    total = db.query(func.count()).select_from(limited).scalar() or 0
+    if total <= cap:
+        return total, False
+
+    try:
+        estimate = estimate_row_count(db, query.order_by(None))
+    except Exception as e:
+        logger.warning(f"Row estimate failed, using cap: {e}")
+        estimate = 0
+    return max(estimate, cap + 1), True
@@ -0,0 +1,98 @@
+"""Incremental top-k word counts for sliding windows.
+
+The playback word cloud slides a window across time buckets and needs the
+top ``word_limit`` words at every step. Keeping the window in a Counter costs
+O(V) per step (``Counter.__iadd__``/``__isub__`` rescan every key to drop
+non-positive counts, and ``most_common`` scans every key again).
+
+``SlidingTopK`` instead groups words by count ("count buckets") and keeps the
+distinct counts sorted, so an update only touches the words that changed and
+extracting the top k walks down from the highest count until k words are
+collected.
+"""
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, List, Mapping, Tuple
+
+
+class SlidingTopK:
+    """
+    Word counter with in-place add/subtract and cheap top-k extraction.
+
+    ``top(k)`` returns exactly what ``Counter.most_common(k)`` would return for
+    a Counter receiving the same ``+=`` / ``-=`` sequence, including the order
+    of ties: Counter breaks ties by key insertion order, and a key dropped at
+    zero is re-inserted at the end, so each word carries the sequence number
+    of its latest insertion.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, int] = {}
+        self._seq: Dict[str, int] = {}
+        # count -> words currently at that count
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        # distinct counts present, ascending
+        self._levels: List[int] = []
+        self._next_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __getitem__(self, word: str) -> int:
+        return self._counts.get(word, 0)
+
+    def add(self, counts: Mapping[str, int]):
+        """Add a bucket's counts (equivalent to ``Counter += counts``)."""
+        for word, delta in counts.items():
+            self._update(word, delta)
+
+    def subtract(self, counts: Mapping[str, int]):
+        """Subtract a bucket's counts (equivalent to ``Counter -= counts``)."""
+        for word, delta in counts.items():
+            self._update(word, -delta)
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """Return the k most common (word, count) pairs, highest first."""
+        result: List[Tuple[str, int]] = []
+        seq = self._seq.__getitem__
+        for level in reversed(self._levels):
+            need = k - len(result)
+            if need <= 0:
+                break
+            words = self._buckets[level]
+            if len(words) <= need:
+                ordered = sorted(words, key=seq)
+            else:
+                ordered = heapq.nsmallest(need, words, key=seq)
+            result.extend((word, level) for word in ordered)
+        return result
+
+    def _update(self, word: str, delta: int):
+        old = self._counts.get(word, 0)
+        new = old + delta
+        if old > 0:
+            self._unlink(word, old)
+
+        if new > 0:
+            if old <= 0:
+                self._seq[word] = self._next_seq
+                self._next_seq += 1
+            self._counts[word] = new
+            self._link(word, new)
+        elif old > 0:
+            del self._counts[word]
+            del self._seq[word]
+
+    def _link(self, word: str, count: int):
+        bucket = self._buckets.get(count)
+        if bucket is None:
+            bucket = self._buckets[count] = {}
+            insort(self._levels, count)
+        bucket[word] = None
+
+    def _unlink(self, word: str, count: int):
+        bucket = self._buckets[count]
+        del bucket[word]
+        if not bucket:
+            del self._buckets[count]
+            del self._levels[bisect_left(self._levels, count)]
@@ -0,0 +1,168 @@
+"""Cold archive files for finished streams.
+
+The retention job (``archive_streams``) exports a stream's raw rows to one
+file per table under ``<ARCHIVE_DIR>/<video_id>/`` before deleting them from
+Postgres, and ``scripts/archive_streams.py restore`` loads them back.
+
+Two formats are supported:
+
+- ``parquet``: zstd-compressed Parquet (needs ``pyarrow``); JSONB columns are
+  stored as JSON text so every file has a fixed schema
+- ``jsonl``: gzip-compressed JSON Lines, one row per line, stdlib only
+
+``manifest.json`` records the format, row counts and time range and is
+written last, so a directory without it is an incomplete export.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import Boolean, DateTime, Integer, JSON, Table
+from sqlalchemy.dialects.postgresql import ARRAY
+
+FORMAT_PARQUET = 'parquet'
+FORMAT_JSONL = 'jsonl'
+FORMAT_EXTENSIONS = {FORMAT_PARQUET: 'parquet', FORMAT_JSONL: 'jsonl.gz'}
+
+MANIFEST_NAME = 'manifest.json'
+BATCH_SIZE = 10000
+
+
+def table_path(stream_dir: str, table: Table, file_format: str) -> str:
+    """Path of one table's archive file."""
+    return os.path.join(stream_dir, f"{table.name}.{FORMAT_EXTENSIONS[file_format]}")
+
+
+def _is_json(column) -> bool:
+    return isinstance(column.type, JSON)  # JSONB subclasses JSON
+
+
+def _is_datetime(column) -> bool:
+    return isinstance(column.type, DateTime)
+
+
+def _arrow_schema(table: Table):
+    import pyarrow as pa
+
+    fields = []
+    for column in table.columns:
+        if _is_json(column):
+            arrow_type = pa.string()
+        elif isinstance(column.type, ARRAY):
+            arrow_type = pa.list_(pa.string())
+        elif _is_datetime(column):
+            arrow_type = pa.timestamp('us', tz='UTC')
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _batches(rows: Iterable[Dict[str, Any]], size: int = BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_table_file(path: str, table: Table, rows: Iterable[Dict[str, Any]], file_format: str) -> int:
+    """
+    Write rows (column name -> value, as returned by SQLAlchemy) to path.
+
+    Writes to ``<path>.tmp`` and renames on success. Returns the row count.
+    """
+    tmp_path = path + '.tmp'
+    count = 0
+    if file_format == FORMAT_PARQUET:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _arrow_schema(table)
+        json_columns = [c.name for c in table.columns if _is_json(c)]
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            for batch in _batches(rows):
+                for row in batch:
+                    for name in json_columns:
+                        if row[name] is not None:
+                            row[name] = json.dumps(row[name], ensure_ascii=False)
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+            if count == 0:
+                writer.write_table(schema.empty_table())
+    elif file_format == FORMAT_JSONL:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=_json_default) + '\n')
+                count += 1
+    else:
+        raise ValueError(f"Unknown archive format: {file_format}")
+
+    os.replace(tmp_path, path)
+    return count
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def read_table_file(path: str, table: Table, file_format: str) -> Iterator[List[Dict[str, Any]]]:
+    """Read an archive file back as batches of rows ready for ``table.insert()``."""
+    json_columns = [c.name for c in table.columns if _is_json(c)]
+    datetime_columns = [c.name for c in table.columns if _is_datetime(c)]
+
+    if file_format == FORMAT_PARQUET:
+        import pyarrow.parquet as pq
+
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE):
+            batch = record_batch.to_pylist()
+            for row in batch:
+                for name in json_columns:
+                    if row[name] is not None:
+                        row[name] = json.loads(row[name])
+            yield batch
+    elif file_format == FORMAT_JSONL:
+        def rows():
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    row = json.loads(line)
+                    for name in datetime_columns:
+                        if row[name] is not None:
+                            row[name] = datetime.fromisoformat(row[name])
+                    yield row
+        yield from _batches(rows())
+    else:
+        raise ValueError(f"Unknown archive format: {file_format}")
+
+
+def count_file_rows(path: str, file_format: str) -> int:
+    """Row count of a written archive file (used to verify before deleting)."""
+    if file_format == FORMAT_PARQUET:
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return sum(1 for _ in f)
+
+
+def write_manifest(stream_dir: str, manifest: Dict[str, Any]) -> None:
+    with open(os.path.join(stream_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=_json_default)
+
+
+def read_manifest(stream_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(stream_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,218 @@
+"""In-memory text-mining index over a time window of processed messages.
+
+Text mining is typically run for many target words in a row over the same
+window (the admin page, or the word detail modal's 7-day range). Instead of
+a ``LIKE '%target%'`` scan plus a per-message rescan for every word, the
+window's original and processed texts are loaded once into a ``Corpus``:
+all messages joined into one string with a NUL separator (Postgres text can
+never contain NUL), plus the start offset of each message. Finding a target
+is then a C-level ``str.find`` sweep over that string, and the 1-5 character
+contexts are slices bounded by the owning message's offsets.
+
+Built indexes are kept in a small LRU keyed by the window. A window that
+ends after the ETL checkpoint can still gain messages, so its key also
+carries the checkpoint's update time, and entries expire after a TTL.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+EXTENSION_LENGTHS = range(1, 6)
+SEPARATOR = '\x00'
+
+# LRU capacity (windows) and lifetime of a cached index
+INDEX_CACHE_SIZE = 4
+INDEX_CACHE_TTL_SECONDS = 1800
+
+
+class Corpus:
+    """Messages concatenated for fast substring search."""
+
+    def __init__(self, messages: List[str]):
+        self.text = SEPARATOR.join(messages)
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        offset = 0
+        for message in messages:
+            self.starts.append(offset)
+            offset += len(message)
+            self.ends.append(offset)
+            offset += len(SEPARATOR)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def occurrences(self, target: str):
+        """
+        Yield (message_start, message_end, [positions]) per message containing target.
+
+        Positions are absolute offsets into ``text``; overlapping occurrences
+        are included, as in a ``find(target, idx + 1)`` loop.
+        """
+        if not target or SEPARATOR in target:
+            return
+        haystack = self.text
+        find = haystack.find
+        starts = self.starts
+        ends = self.ends
+
+        pos = find(target)
+        current = -1
+        positions: List[int] = []
+        while pos != -1:
+            msg = bisect_right(starts, pos) - 1
+            if msg != current:
+                if positions:
+                    yield starts[current], ends[current], positions
+                current = msg
+                positions = []
+            positions.append(pos)
+            pos = find(target, pos + 1)
+        if positions:
+            yield starts[current], ends[current], positions
+
+    def extensions(self, target: str, top_n: int = 5) -> Tuple[int, Dict[str, Dict[str, List[dict]]]]:
+        """
+        Most frequent 1-5 character contexts after and before target.
+
+        The same context in one message counts once. Forward contexts ending
+        in whitespace and backward contexts starting with whitespace are
+        skipped.
+
+        Returns:
+            (matched_messages, {'forward': {...}, 'backward': {...}}) where each
+            side maps the length ("1".."5") to [{"text", "count"}, ...]
+        """
+        haystack = self.text
+        target_len = len(target)
+
+        # Most messages contain the target once and need no per-message
+        # de-duplication; their contexts are counted straight from slices.
+        singles: List[Tuple[int, int, int]] = []  # (position, room after, room before)
+        multiples: List[Tuple[int, int, List[int]]] = []
+        for msg_start, msg_end, positions in self.occurrences(target):
+            if len(positions) == 1:
+                pos = positions[0]
+                singles.append((pos, msg_end - pos - target_len, pos - msg_start))
+            else:
+                multiples.append((msg_start, msg_end, positions))
+
+        forward: Dict[str, List[dict]] = {}
+        backward: Dict[str, List[dict]] = {}
+        for length in EXTENSION_LENGTHS:
+            forward_counts = Counter(
+                haystack[pos + target_len:pos + target_len + length]
+                for pos, after, _ in singles if after >= length
+            )
+            backward_counts = Counter(
+                haystack[pos - length:pos]
+                for pos, _, before in singles if before >= length
+            )
+            for msg_start, msg_end, positions in multiples:
+                forward_counts.update({
+                    haystack[pos + target_len:pos + target_len + length]
+                    for pos in positions if pos + target_len + length <= msg_end
+                })
+                backward_counts.update({
+                    haystack[pos - length:pos]
+                    for pos in positions if pos - length >= msg_start
+                })
+
+            # Whitespace rules depend only on the context text, so apply them per distinct key
+            forward[str(length)] = _top(
+                ((ext, count) for ext, count in forward_counts.items() if not ext[-1].isspace()),
+                top_n,
+            )
+            backward[str(length)] = _top(
+                ((ext, count) for ext, count in backward_counts.items() if not ext[0].isspace()),
+                top_n,
+            )
+
+        return len(singles) + len(multiples), {"forward": forward, "backward": backward}
+
+
+def _top(items, top_n: int) -> List[dict]:
+    """Top-N (text, count) pairs by count as response items."""
+    return [
+        {"text": ext, "count": count}
+        for ext, count in heapq.nlargest(top_n, items, key=lambda x: x[1])
+    ]
+
+
+class TextMiningIndex:
+    """Original and processed corpora of one time window."""
+
+    def __init__(self, original: List[str], processed: List[str]):
+        self.total_messages = len(original)
+        self.original = Corpus(original)
+        self.processed = Corpus(processed)
+        self.built_at = time.monotonic()
+
+
+_cache: "OrderedDict[tuple, TextMiningIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def clear_text_mining_cache():
+    """Drop all cached indexes."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _cache_key(db: Session, start_time: datetime, end_time: datetime) -> tuple:
+    """Window key; open-ended windows also depend on the ETL checkpoint."""
+    row = db.execute(text("""
+        SELECT last_processed_timestamp, updated_at
+        FROM processed_chat_checkpoint
+        ORDER BY updated_at DESC
+        LIMIT 1
+    """)).fetchone()
+    version: Optional[datetime] = None
+    aware_end = end_time if end_time.tzinfo else end_time.replace(tzinfo=timezone.utc)
+    if row is None or row[0] is None or aware_end >= row[0]:
+        version = row[1] if row else None
+    return (start_time, end_time, version)
+
+
+def _build_index(db: Session, start_time: datetime, end_time: datetime) -> TextMiningIndex:
+    rows = db.execute(
+        text("""
+            SELECT original_message, processed_message
+            FROM processed_chat_messages
+            WHERE published_at >= :start_time
+              AND published_at <= :end_time
+        """).execution_options(stream_results=True, yield_per=10000),
+        {"start_time": start_time, "end_time": end_time},
+    )
+    original: List[str] = []
+    processed: List[str] = []
+    for original_msg, processed_msg in rows:
+        original.append(original_msg or "")
+        processed.append(processed_msg or "")
+    return TextMiningIndex(original, processed)
+
+
+def get_text_mining_index(db: Session, start_time: datetime, end_time: datetime) -> TextMiningIndex:
+    """Cached index for a window, built on first use."""
+    key = _cache_key(db, start_time, end_time)
+    now = time.monotonic()
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None and now - index.built_at < INDEX_CACHE_TTL_SECONDS:
+            _cache.move_to_end(key)
+            return index
+
+    index = _build_index(db, start_time, end_time)
+    with _cache_lock:
+        _cache[key] = index
+        _cache.move_to_end(key)
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
@@ -0,0 +1,101 @@
+"""Word group hit index (word_group_hourly_counts).
+
+Every saved word trend group's hourly hit counts are kept per stream in
+word_group_hourly_counts, so trend charts over long ranges are index lookups
+instead of re-scanning chat text.
+
+The table mirrors processed_chat_messages: the chat ETL adds the hits of each
+batch in the same transaction that inserts the batch, and a group whose
+words/exclude_words change is marked pending (hits_indexed_at = NULL) until
+the backfill task has recounted it from processed_chat_messages. Pending
+groups, and the edges of the range outside ``rollup_hour_range``, are still
+counted from chat_messages by the stats endpoint.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.hourly_rollup import hour_bucket
+from app.services.multi_pattern import GroupMatcher
+
+HitKey = Tuple[int, str, datetime]  # (group_id, live_stream_id, hour)
+
+
+def load_group_matcher(conn, indexed_only: bool = True) -> GroupMatcher:
+    """Build a matcher over saved groups (by default only those already backfilled)."""
+    query = "SELECT id, words, exclude_words FROM word_trend_groups"
+    if indexed_only:
+        query += " WHERE hits_indexed_at IS NOT NULL"
+    return GroupMatcher((row[0], row[1], row[2]) for row in conn.execute(text(query)))
+
+
+def count_group_hits(
+    matcher: GroupMatcher,
+    rows: Iterable[Tuple[str, datetime, str]],
+) -> Counter:
+    """
+    Count hits per (group_id, live_stream_id, hour).
+
+    Args:
+        rows: (live_stream_id, published_at, message) tuples
+    """
+    counts: Counter = Counter()
+    if matcher.empty:
+        return counts
+    for live_stream_id, published_at, message in rows:
+        groups = matcher.match(message)
+        if not groups:
+            continue
+        hour = hour_bucket(published_at)
+        for group_id in groups:
+            counts[(group_id, live_stream_id, hour)] += 1
+    return counts
+
+
+def add_group_hits(conn, counts: Dict[HitKey, int]) -> int:
+    """Add hit counts onto word_group_hourly_counts. Returns rows touched."""
+    if not counts:
+        return 0
+    conn.execute(
+        text("""
+            INSERT INTO word_group_hourly_counts (group_id, live_stream_id, hour, count)
+            VALUES (:group_id, :live_stream_id, :hour, :count)
+            ON CONFLICT (group_id, live_stream_id, hour)
+            DO UPDATE SET count = word_group_hourly_counts.count + EXCLUDED.count;
+        """),
+        [
+            {"group_id": g, "live_stream_id": s, "hour": h, "count": c}
+            for (g, s, h), c in counts.items()
+        ],
+    )
+    return len(counts)
+
+
+def query_indexed_counts(
+    db: Session,
+    group_ids: List[int],
+    lo: datetime,
+    hi: datetime,
+    video_id: Optional[str],
+) -> Dict[int, Counter]:
+    """Hourly counts per group for hours in [lo, hi) from the index."""
+    query = """
+        SELECT group_id, hour, SUM(count)
+        FROM word_group_hourly_counts
+        WHERE group_id = ANY(:group_ids)
+          AND hour >= :lo
+          AND hour < :hi
+    """
+    params: dict = {"group_ids": list(group_ids), "lo": lo, "hi": hi}
+    if video_id:
+        query += " AND live_stream_id = :video_id"
+        params["video_id"] = video_id
+    query += " GROUP BY group_id, hour"
+
+    counts: Dict[int, Counter] = {}
+    for group_id, hour, count in db.execute(text(query), params):
+        counts.setdefault(group_id, Counter())[hour] += int(count)
+    return counts
@@ -5,21 +5,24 @@ from fastapi import FastAPI
 import logging
 
 from app.core.config import setup_cors
-from app.core.database import get_db_manager
+from app.core.database import close_async_db, get_db_manager
 from app.routers import (
     stats, chat, admin_words, admin_currency, admin_settings,
     wordcloud, playback, exclusion_wordlist, playback_wordcloud,
     text_mining, replacement_wordlist, emojis, word_trends, word_detail,
-    etl_jobs, prompt_templates, auth, stream_info, incense_map
+    etl_jobs, prompt_templates, auth, stream_info, incense_map, admin_extractors
 )
 from app.etl import init_scheduler, shutdown_scheduler, ETLConfig
+from app.etl.processors.extractors import sync_builtin_extractors
 from app.etl.scheduler import register_jobs, start_scheduler
+from app.etl.worker import start_queue_runner, stop_queue_runner
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 是否啟用 ETL Scheduler（可透過環境變數控制）
+# 是否在 API 程序內執行 ETL（排程器與手動觸發佇列）
+# 設為 false 時由獨立的 ETL worker（python -m app.etl.worker）執行，API 只寫入 etl_job_queue
 ENABLE_ETL_SCHEDULER = os.getenv('ENABLE_ETL_SCHEDULER', 'true').lower() == 'true'
 
 
@@ -34,6 +37,9 @@ async def lifespan(app: FastAPI):
     try:
         db_manager.create_tables()
         logger.info("✓ Database tables created/verified successfully")
+        # 建立程式內註冊的 builtin 擷取器紀錄（列表 API 維持唯讀）
+        with db_manager.engine.begin() as conn:
+            sync_builtin_extractors(conn)
     except Exception as e:
         logger.error(f"Error creating tables on startup: {e}")
         raise
@@ -55,22 +61,37 @@ async def lifespan(app: FastAPI):
                 # 啟動排程器
                 start_scheduler()
 
+                # 執行手動觸發的佇列任務
+                start_queue_runner()
+
                 logger.info("✓ ETL Scheduler initialized and started")
             else:
                 logger.warning("DATABASE_URL not set, ETL Scheduler disabled")
         except Exception as e:
             logger.error(f"Error initializing ETL Scheduler: {e}")
             # 不拋出異常，讓 API 服務繼續運行
+    else:
+        # ETL 由獨立的 worker 執行：只連接 jobstore 供管理介面查看、暫停與恢復排程
+        try:
+            database_url = os.getenv('DATABASE_URL')
+            if database_url:
+                init_scheduler(database_url)
+                start_scheduler(paused=True)
+        except Exception as e:
+            logger.error(f"Error attaching to ETL Scheduler jobstore: {e}")
 
     yield
 
     # Shutdown
-    if ENABLE_ETL_SCHEDULER:
-        try:
-            shutdown_scheduler(wait=False)
-            logger.info("✓ ETL Scheduler shutdown completed")
-        except Exception as e:
-            logger.error(f"Error shutting down ETL Scheduler: {e}")
+    try:
+        if ENABLE_ETL_SCHEDULER:
+            stop_queue_runner(timeout=5)
+        shutdown_scheduler(wait=False)
+        logger.info("✓ ETL Scheduler shutdown completed")
+    except Exception as e:
+        logger.error(f"Error shutting down ETL Scheduler: {e}")
+
+    await close_async_db()
 
 
 app = FastAPI(
@@ -106,3 +127,4 @@ app.include_router(etl_jobs.router)
 app.include_router(prompt_templates.router)
 app.include_router(stream_info.router)
 app.include_router(incense_map.router)
+app.include_router(admin_extractors.router)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Stream Archive CLI
+==================
+冷封存的手動操作：列出已封存直播、立即封存指定直播、把封存檔還原回資料庫，
+以及匯出直播的 Parquet 供離線分析（不刪除資料）。
+排程封存由 ETL 任務 archive_streams 執行（需開啟 RETENTION_ENABLED）。
+
+使用方式：
+    cd dashboard/backend
+    python scripts/archive_streams.py list
+    python scripts/archive_streams.py archive dQw4w9WgXcQ --format jsonl
+    python scripts/archive_streams.py restore dQw4w9WgXcQ
+    python scripts/archive_streams.py export dQw4w9WgXcQ abcdefghijk --output ./exports
+
+匯出目錄與 ARCHIVE_DIR 結構相同（<video_id>/<table>.parquet），
+可直接交給 analysis/duckdb_runner.py 或 analysis 腳本的 --parquet 參數。
+
+還原後 stream_archives.status 會變成 restored，回放與各 API 可再次查詢原始留言；
+RETENTION_RESTORE_HOLD_DAYS 天後排程會再次封存（封存檔會被覆寫成相同內容）。
+
+選用參數：
+    --database-url  預設讀取 DATABASE_URL
+    --archive-dir   預設讀取 ARCHIVE_DIR（/data/archive）
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.etl.processors.stream_archiver import StreamArchiver  # noqa: E402
+from app.services.stream_archive import FORMAT_JSONL, FORMAT_PARQUET  # noqa: E402
+
+
+def list_archives(archiver: StreamArchiver):
+    with Session(archiver.get_engine()) as session:
+        rows = session.execute(text("""
+            SELECT live_stream_id, status, file_format, row_counts, size_bytes,
+                   archived_at, restored_at
+            FROM stream_archives
+            ORDER BY archived_at
+        """)).fetchall()
+    print(f"{'video_id':<16} {'status':<9} {'format':<8} {'chat rows':>10} {'MB':>8}  archived_at")
+    for row in rows:
+        print(
+            f"{row.live_stream_id:<16} {row.status:<9} {row.file_format:<8} "
+            f"{row.row_counts.get('chat_messages', 0):>10} {row.size_bytes / 1024 / 1024:>8.1f}  "
+            f"{row.archived_at:%Y-%m-%d %H:%M}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive or restore finished streams")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--archive-dir", default=None)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="List archived streams")
+
+    archive = sub.add_parser("archive", help="Archive one stream now")
+    archive.add_argument("video_id")
+    archive.add_argument("--format", choices=[FORMAT_PARQUET, FORMAT_JSONL], default=FORMAT_PARQUET)
+
+    restore = sub.add_parser("restore", help="Load an archived stream back into the database")
+    restore.add_argument("video_id")
+
+    export = sub.add_parser("export", help="Export streams to Parquet for offline analysis (no delete)")
+    export.add_argument("video_ids", nargs="+")
+    export.add_argument("--output", required=True)
+    export.add_argument("--format", choices=[FORMAT_PARQUET, FORMAT_JSONL], default=FORMAT_PARQUET)
+
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    archiver = StreamArchiver(database_url=args.database_url, archive_dir=args.archive_dir)
+    if args.command == "list":
+        list_archives(archiver)
+    elif args.command == "archive":
+        manifest = archiver.archive_stream(args.video_id, args.format)
+        print(f"Archived {args.video_id} to {archiver.stream_dir(args.video_id)}: {manifest['row_counts']}")
+    elif args.command == "export":
+        for video_id in args.video_ids:
+            manifest = archiver.export_stream(video_id, args.output, args.format)
+            print(f"Exported {video_id} to {os.path.join(args.output, video_id)}: {manifest['row_counts']}")
+    else:
+        restored = archiver.restore_stream(args.video_id)
+        print(f"Restored {args.video_id}: {restored}")
+
+
+if __name__ == "__main__":
+    main()
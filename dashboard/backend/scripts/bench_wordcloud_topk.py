@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Word Cloud Top-K Benchmark
+==========================
+比較回放文字雲 sliding window 的兩種 top-k 實作：
+
+    counter   原本的 Counter += / -= + most_common(k)
+    sliding   app.services.sliding_topk.SlidingTopK（count bucket，只更新變動的字）
+
+以合成資料（Zipf 分佈的高詞彙量聊天室）模擬 24h window、60s step，
+並確認兩者每個 snapshot 的輸出完全相同。
+
+使用方式：
+    cd dashboard/backend
+    python scripts/bench_wordcloud_topk.py
+    python scripts/bench_wordcloud_topk.py --vocab 300000 --messages-per-bucket 800 --snapshots 720
+
+選用參數：
+    --vocab                 詞彙量（預設 200000）
+    --messages-per-bucket   每個 bucket 的 token 數（預設 400）
+    --window-hours          window 長度（預設 24）
+    --step-seconds          snapshot 間隔（預設 60）
+    --snapshots             snapshot 數量（預設 360）
+    --word-limit            每個 snapshot 的字數（預設 100）
+    --seed                  亂數種子（預設 42）
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+from itertools import accumulate
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.services.sliding_topk import SlidingTopK  # noqa: E402
+
+
+def build_buckets(args) -> List[Counter]:
+    rng = random.Random(args.seed)
+    vocab = [f"w{i}" for i in range(args.vocab)]
+    cum_weights = list(accumulate(1 / (i + 1) for i in range(args.vocab)))
+    window_buckets = args.window_hours * 3600 // args.step_seconds
+    total = window_buckets + args.snapshots
+    return [
+        Counter(rng.choices(vocab, cum_weights=cum_weights, k=args.messages_per_bucket))
+        for _ in range(total)
+    ]
+
+
+def run_counter(buckets: List[Counter], window_buckets: int, snapshots: int, k: int):
+    running = Counter()
+    for b in buckets[:window_buckets]:
+        running += b
+    out = []
+    for i in range(snapshots):
+        out.append(running.most_common(k))
+        running += buckets[window_buckets + i]
+        running -= buckets[i]
+    return out
+
+
+def run_sliding(buckets: List[Counter], window_buckets: int, snapshots: int, k: int):
+    running = SlidingTopK()
+    for b in buckets[:window_buckets]:
+        running.add(b)
+    out = []
+    for i in range(snapshots):
+        out.append(running.top(k))
+        running.add(buckets[window_buckets + i])
+        running.subtract(buckets[i])
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark playback word cloud top-k")
+    parser.add_argument("--vocab", type=int, default=200000)
+    parser.add_argument("--messages-per-bucket", type=int, default=400)
+    parser.add_argument("--window-hours", type=int, default=24)
+    parser.add_argument("--step-seconds", type=int, default=60)
+    parser.add_argument("--snapshots", type=int, default=360)
+    parser.add_argument("--word-limit", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    window_buckets = args.window_hours * 3600 // args.step_seconds
+
+    t0 = time.perf_counter()
+    buckets = build_buckets(args)
+    print(f"generated {len(buckets)} buckets in {time.perf_counter() - t0:.2f}s")
+
+    results = {}
+    for name, fn in (("counter", run_counter), ("sliding", run_sliding)):
+        t0 = time.perf_counter()
+        results[name] = fn(buckets, window_buckets, args.snapshots, args.word_limit)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"{name:8s} total={elapsed:.2f}s "
+            f"per_snapshot={elapsed / args.snapshots * 1000:.2f}ms"
+        )
+
+    if results["counter"] != results["sliding"]:
+        print("MISMATCH: implementations disagree")
+        sys.exit(1)
+    window_vocab = len(set().union(*buckets[-window_buckets:]))
+    print(f"outputs identical; window vocabulary at end={window_vocab}")
+
+
+if __name__ == "__main__":
+    main()
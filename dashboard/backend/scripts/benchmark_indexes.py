@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Index Benchmark Harness
+=======================
+自動化 database/migrations/19_benchmark_indexes.sql 的 before / after 比較：
+
+    snapshot  執行 benchmark SQL 檔內每一個 EXPLAIN ANALYZE 查詢（改用
+              EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)），記錄執行時間中位數、
+              使用的索引與 buffer 數，加上各表索引大小與寫入成本
+              （在 transaction 內寫入合成留言後 rollback），輸出成 JSON
+    compare   比較兩份 snapshot，列出每個查詢的耗時變化、索引變化、
+              索引大小與寫入速度；有查詢明顯變慢時 exit code 1
+
+SQL 檔中的 'YOUR_VIDEO_ID' 會替換成 --video-id（預設為最新留言所屬的直播），
+NOW() 會替換成 --now（預設為 chat_messages 最新一筆的 published_at），
+讓同一份查詢在 migration 前後、在舊資料上也能比較。
+
+使用方式：
+    cd dashboard/backend
+    python scripts/benchmark_indexes.py snapshot --database-url "postgresql://..." --output before.json
+    psql -f ../../database/migrations/30_brin_covering_indexes.sql
+    python scripts/benchmark_indexes.py snapshot --database-url "postgresql://..." --output after.json
+    python scripts/benchmark_indexes.py compare before.json after.json
+
+選用參數（snapshot）：
+    --sql          benchmark SQL 檔（預設 database/migrations/19_benchmark_indexes.sql）
+    --video-id     替換 'YOUR_VIDEO_ID' 的直播 ID
+    --now          替換 NOW() 的時間（ISO 格式）
+    --repeat       每個查詢執行次數，取中位數（預設 5）
+    --insert-rows  寫入成本量測的合成留言數（預設 5000，0 = 不量測）
+
+選用參數（compare）：
+    --max-regression  耗時比值超過此值（且慢超過 5ms）視為退步（預設 1.5）
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+
+DEFAULT_SQL = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "..",
+    "database", "migrations", "19_benchmark_indexes.sql",
+)
+BENCH_TABLES = ["chat_messages", "processed_chat_messages", "etl_execution_log"]
+SECTION_RE = re.compile(r"^--\s*(\d+)\.\s*(.+?)\s*$")
+MIN_REGRESSION_MS = 5.0
+
+
+def parse_benchmark_sql(sql: str) -> List[Tuple[str, str]]:
+    """
+    取出 SQL 檔中的 EXPLAIN ANALYZE 查詢
+
+    Returns:
+        [(label, query)]，label 為「節次. 標題 #序號」，query 已去掉 EXPLAIN ANALYZE
+    """
+    queries = []
+    section, index, buffer = "0", 0, []
+    for line in sql.splitlines():
+        match = SECTION_RE.match(line)
+        if match:
+            section, index = f"{match.group(1)}. {match.group(2)}", 0
+            continue
+        stripped = line.split("--", 1)[0].rstrip()
+        if not stripped and not buffer:
+            continue
+        buffer.append(stripped)
+        if stripped.endswith(";"):
+            statement = "\n".join(buffer).strip().rstrip(";")
+            buffer = []
+            if statement.upper().startswith("EXPLAIN ANALYZE"):
+                index += 1
+                queries.append((f"{section} #{index}", statement[len("EXPLAIN ANALYZE"):].strip()))
+    return queries
+
+
+def plan_indexes(plan: Dict[str, Any]) -> List[str]:
+    """計畫中用到的掃描方式（Seq Scan on x / Index Only Scan using idx）"""
+    found = []
+    node = plan.get("Node Type", "")
+    if "Index Name" in plan:
+        found.append(f"{node} using {plan['Index Name']}")
+    elif node == "Seq Scan":
+        found.append(f"Seq Scan on {plan.get('Relation Name')}")
+    for child in plan.get("Plans", []):
+        found.extend(plan_indexes(child))
+    return found
+
+
+def _collapse_partitions(scans: List[str]) -> List[str]:
+    """分區表每個分區各一個掃描節點；去掉分區後綴後合併"""
+    collapsed = []
+    for scan in scans:
+        scan = re.sub(r"_\d{4}_\d{2}(?=_|$)", "", scan)
+        if scan not in collapsed:
+            collapsed.append(scan)
+    return collapsed
+
+
+def run_query(conn, query: str, repeat: int) -> Dict[str, Any]:
+    timings, plan = [], None
+    for _ in range(repeat):
+        result = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query).scalar()
+        if isinstance(result, str):
+            result = json.loads(result)
+        timings.append(result[0]["Execution Time"])
+        plan = result[0]["Plan"]
+    return {
+        "ms": statistics.median(timings),
+        "scans": _collapse_partitions(plan_indexes(plan)),
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "rows": plan.get("Actual Rows", 0),
+    }
+
+
+def index_sizes(conn) -> Dict[str, int]:
+    """各表所有索引（含分區）的大小，bytes"""
+    rows = conn.execute(text("""
+        WITH RECURSIVE tree AS (
+            SELECT c.oid, c.relname AS root
+            FROM pg_class c WHERE c.relname = ANY(:tables) AND c.relkind IN ('r', 'p')
+            UNION ALL
+            SELECT i.inhrelid, t.root FROM pg_inherits i JOIN tree t ON i.inhparent = t.oid
+        )
+        SELECT ic.relname, tree.root, pg_relation_size(ic.oid)
+        FROM tree
+        JOIN pg_index x ON x.indrelid = tree.oid
+        JOIN pg_class ic ON ic.oid = x.indexrelid
+    """), {"tables": BENCH_TABLES}).fetchall()
+    sizes: Dict[str, int] = {}
+    for name, root, size in rows:
+        name = re.sub("^" + re.escape(root) + r"_\d{4}_\d{2}_", "(partitions) ", name)
+        key = f"{root}: {name}"
+        sizes[key] = sizes.get(key, 0) + size
+    return sizes
+
+
+def insert_cost(conn, rows: int, now: datetime) -> Dict[str, float]:
+    """寫入 rows 筆合成留言（及其處理結果）的速度，rows/s；結束後 rollback"""
+    costs = {}
+    statements = {
+        "chat_messages": """
+            INSERT INTO chat_messages
+                (message_id, live_stream_id, message, timestamp, published_at,
+                 author_name, author_id, message_type)
+            SELECT 'bench_index_' || g, 'bench_index_video', 'benchmark message ' || g, g,
+                   :now - (g * INTERVAL '10 milliseconds'), 'bench', 'bench_' || (g % 500), 'text_message'
+            FROM generate_series(1, :rows) g
+        """,
+        "processed_chat_messages": """
+            INSERT INTO processed_chat_messages
+                (message_id, live_stream_id, original_message, processed_message, tokens,
+                 unicode_emojis, author_name, author_id, published_at)
+            SELECT 'bench_index_' || g, 'bench_index_video', 'benchmark message', 'benchmark message',
+                   ARRAY['benchmark', 'message', 'w' || (g % 1000)], ARRAY[]::text[],
+                   'bench', 'bench_' || (g % 500), :now - (g * INTERVAL '10 milliseconds')
+            FROM generate_series(1, :rows) g
+        """,
+    }
+    transaction = conn.begin()
+    try:
+        for table, statement in statements.items():
+            started = time.perf_counter()
+            conn.execute(text(statement), {"rows": rows, "now": now})
+            costs[table] = rows / (time.perf_counter() - started)
+    finally:
+        transaction.rollback()
+    return costs
+
+
+def snapshot(args) -> Dict[str, Any]:
+    engine = create_engine(args.database_url)
+    with open(args.sql, encoding="utf-8") as f:
+        queries = parse_benchmark_sql(f.read())
+
+    with engine.connect() as conn:
+        latest = conn.execute(text(
+            "SELECT live_stream_id, published_at FROM chat_messages ORDER BY published_at DESC LIMIT 1"
+        )).fetchone()
+        video_id = args.video_id or (latest[0] if latest else "")
+        now = datetime.fromisoformat(args.now.replace("Z", "+00:00")) if args.now \
+            else (latest[1] if latest else datetime.now(timezone.utc))
+        conn.commit()
+
+        results = {}
+        for label, query in queries:
+            query = query.replace("'YOUR_VIDEO_ID'", "'" + video_id.replace("'", "''") + "'")
+            query = re.sub(r"\bNOW\(\)", f"'{now.isoformat()}'::timestamptz", query, flags=re.IGNORECASE)
+            results[label] = run_query(conn, query, args.repeat)
+            conn.rollback()
+            print(f"  {label:<48} {results[label]['ms']:9.2f}ms  {', '.join(results[label]['scans'])}")
+
+        sizes = index_sizes(conn)
+        conn.rollback()
+        inserts = insert_cost(conn, args.insert_rows, now + timedelta(seconds=1)) if args.insert_rows else {}
+
+    engine.dispose()
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "video_id": video_id,
+        "now": now.isoformat(),
+        "queries": results,
+        "index_sizes": sizes,
+        "insert_rows_per_second": inserts,
+    }
+
+
+def _mb(size: Optional[int]) -> str:
+    return "-" if size is None else f"{size / 1024 / 1024:.1f}MB"
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], max_regression: float) -> List[str]:
+    """印出比較表，回傳退步的查詢"""
+    regressions = []
+    print(f"{'query':<48} {'before':>10} {'after':>10} {'ratio':>6}")
+    for label, old in before["queries"].items():
+        new = after["queries"].get(label)
+        if new is None:
+            print(f"{label:<48} {old['ms']:9.2f}ms {'(missing)':>10}")
+            continue
+        ratio = new["ms"] / old["ms"] if old["ms"] else float("inf")
+        flag = ""
+        if ratio > max_regression and new["ms"] - old["ms"] > MIN_REGRESSION_MS:
+            regressions.append(label)
+            flag = "  REGRESSED"
+        print(f"{label:<48} {old['ms']:9.2f}ms {new['ms']:9.2f}ms {ratio:6.2f}{flag}")
+        if old["scans"] != new["scans"]:
+            print(f"    {', '.join(old['scans'])}\n -> {', '.join(new['scans'])}")
+
+    print(f"\n{'index':<64} {'before':>9} {'after':>9}")
+    for name in sorted(set(before["index_sizes"]) | set(after["index_sizes"])):
+        print(f"{name:<64} {_mb(before['index_sizes'].get(name)):>9} {_mb(after['index_sizes'].get(name)):>9}")
+    print(f"{'total':<64} {_mb(sum(before['index_sizes'].values())):>9} "
+          f"{_mb(sum(after['index_sizes'].values())):>9}")
+
+    if before["insert_rows_per_second"] and after["insert_rows_per_second"]:
+        print(f"\n{'insert rows/s':<64} {'before':>9} {'after':>9}")
+        for table, old_rate in before["insert_rows_per_second"].items():
+            new_rate = after["insert_rows_per_second"].get(table, 0)
+            print(f"{table:<64} {old_rate:9.0f} {new_rate:9.0f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index before/after benchmark harness")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="Run the benchmark queries and save the results")
+    snap.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    snap.add_argument("--output", required=True)
+    snap.add_argument("--sql", default=DEFAULT_SQL)
+    snap.add_argument("--video-id", default=None)
+    snap.add_argument("--now", default=None)
+    snap.add_argument("--repeat", type=int, default=5)
+    snap.add_argument("--insert-rows", type=int, default=5000)
+
+    cmp_parser = sub.add_parser("compare", help="Compare two snapshots")
+    cmp_parser.add_argument("before")
+    cmp_parser.add_argument("after")
+    cmp_parser.add_argument("--max-regression", type=float, default=1.5)
+
+    args = parser.parse_args()
+    if args.command == "snapshot":
+        if not args.database_url:
+            parser.error("--database-url or DATABASE_URL is required")
+        result = snapshot(args)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Saved {len(result['queries'])} queries to {args.output}")
+    else:
+        with open(args.before, encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.after, encoding="utf-8") as f:
+            after = json.load(f)
+        regressions = compare(before, after, args.max_regression)
+        if regressions:
+            print(f"\nFAIL: {len(regressions)} queries regressed: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nOK: no query regressed")
+
+
+if __name__ == "__main__":
+    main()
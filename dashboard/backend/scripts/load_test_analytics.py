@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Analytics Concurrency Load Test
+===============================
+對執行中的 API 發送大量重型分析請求（回放 snapshots、文字雲詞頻），
+同時持續量測短請求（/health、/api/stream-info）的延遲，
+確認長查詢不會拖慢短請求（分析查詢走獨立的 async 連線池）。
+
+流程：
+    1. baseline：無負載時量測短請求延遲
+    2. load：以 --concurrency 個 worker 持續打重型端點 --duration 秒，
+       期間同時量測短請求延遲
+    3. 輸出兩個階段的 p50 / p95 / max 與重型請求的吞吐量
+
+使用方式：
+    cd dashboard/backend
+    python scripts/load_test_analytics.py --base-url http://localhost:8000
+    python scripts/load_test_analytics.py --concurrency 32 --duration 60 \\
+        --start-time 2026-01-10T00:00:00Z --end-time 2026-01-12T00:00:00Z
+
+選用參數：
+    --base-url       API 位址（預設 http://localhost:8000）
+    --concurrency    重型請求 worker 數（預設 16）
+    --duration       負載持續秒數（預設 30）
+    --start-time     重型請求的開始時間（預設 end-time 前 3 天）
+    --end-time       重型請求的結束時間（預設現在）
+    --probe-interval 短請求量測間隔秒數（預設 0.2）
+    --max-p95-ms     負載下短請求 p95 上限，超過則 exit code 1（預設 500）
+"""
+import argparse
+import itertools
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import requests
+
+SHORT_PATHS = ["/health", "/api/stream-info"]
+PROBE_TIMEOUT = 30
+
+
+def heavy_requests(args):
+    """Rotate over the heavy analytics endpoints."""
+    window = {"start_time": args.start_time, "end_time": args.end_time}
+    return itertools.cycle([
+        ("/api/playback/snapshots", {**window, "step_seconds": 60}),
+        ("/api/wordcloud/word-frequency", {**window, "limit": 100}),
+    ])
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def probe(base_url: str, stop: threading.Event, interval: float) -> Dict[str, List[float]]:
+    """Time the short endpoints until stop is set (in ms); failures count as PROBE_TIMEOUT."""
+    latencies: Dict[str, List[float]] = {path: [] for path in SHORT_PATHS}
+    session = requests.Session()
+    while not stop.is_set():
+        for path in SHORT_PATHS:
+            started = time.perf_counter()
+            try:
+                session.get(base_url + path, timeout=PROBE_TIMEOUT).raise_for_status()
+                latencies[path].append((time.perf_counter() - started) * 1000)
+            except requests.RequestException:
+                latencies[path].append(PROBE_TIMEOUT * 1000)
+        stop.wait(interval)
+    return latencies
+
+
+def heavy_worker(base_url: str, requests_iter, lock: threading.Lock, deadline: float, results: List):
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        with lock:
+            path, params = next(requests_iter)
+        started = time.perf_counter()
+        try:
+            status = session.get(base_url + path, params=params, timeout=300).status_code
+        except requests.RequestException:
+            status = None
+        results.append((path, status, time.perf_counter() - started))
+
+
+def run_phase(args, with_load: bool) -> Dict[str, List[float]]:
+    stop = threading.Event()
+    heavy_results: List = []
+    duration = args.duration if with_load else min(args.duration, 5)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency + 1) as pool:
+        probe_future = pool.submit(probe, args.base_url, stop, args.probe_interval)
+        if with_load:
+            deadline = time.monotonic() + duration
+            requests_iter, lock = heavy_requests(args), threading.Lock()
+            workers = [
+                pool.submit(heavy_worker, args.base_url, requests_iter, lock, deadline, heavy_results)
+                for _ in range(args.concurrency)
+            ]
+            for worker in workers:
+                worker.result()
+        else:
+            time.sleep(duration)
+        stop.set()
+        latencies = probe_future.result()
+
+    if with_load:
+        ok = sum(1 for _, status, _ in heavy_results if status == 200)
+        seconds = [s for _, status, s in heavy_results if status == 200]
+        print(f"  heavy requests: {len(heavy_results)} sent, {ok} ok, "
+              f"{len(heavy_results) / duration:.1f} req/s, "
+              f"p50={statistics.median(seconds) if seconds else float('nan'):.2f}s")
+    return latencies
+
+
+def report(name: str, latencies: Dict[str, List[float]]):
+    print(f"[{name}]")
+    for path, values in latencies.items():
+        print(f"  {path:<20} n={len(values):<5} p50={percentile(values, 50):7.1f}ms "
+              f"p95={percentile(values, 95):7.1f}ms max={max(values, default=float('nan')):7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics concurrency load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--start-time", default=None)
+    parser.add_argument("--end-time", default=None)
+    parser.add_argument("--probe-interval", type=float, default=0.2)
+    parser.add_argument("--max-p95-ms", type=float, default=500)
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip("/")
+
+    end_time = datetime.fromisoformat(args.end_time.replace("Z", "+00:00")) if args.end_time \
+        else datetime.now(timezone.utc).replace(microsecond=0)
+    if not args.start_time:
+        args.start_time = (end_time - timedelta(days=3)).isoformat()
+    args.end_time = end_time.isoformat()
+
+    print(f"Target: {args.base_url}  range={args.start_time} ~ {args.end_time}")
+    baseline = run_phase(args, with_load=False)
+    report("baseline", baseline)
+
+    print(f"Running {args.concurrency} heavy workers for {args.duration:.0f}s ...")
+    loaded = run_phase(args, with_load=True)
+    report("under load", loaded)
+
+    worst = max(percentile(values, 95) for values in loaded.values())
+    if worst > args.max_p95_ms:
+        print(f"FAIL: short request p95 {worst:.1f}ms > {args.max_p95_ms:.0f}ms")
+        sys.exit(1)
+    print(f"OK: short request p95 {worst:.1f}ms <= {args.max_p95_ms:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
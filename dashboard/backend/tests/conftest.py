@@ -14,10 +14,17 @@ from app.models import (
     ProcessedChatMessage, ProcessedChatCheckpoint,
     LiveStream
 )
-from app.core.database import get_db
+from app.core.database import get_analytics_db, get_db, get_read_db
 from app.core.security import create_access_token
 from main import app
 
+# Database-side objects (triggers, partition functions) are defined only in the init SQL
+INIT_SQL_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'database', 'init')
+INIT_SQL_AFTER_CREATE_ALL = (
+    '20_create_paid_message_ledger.sql',
+    '21_partition_chat_messages.sql',
+)
+
 # Use environment variable for DATABASE_URL
 DATABASE_URL = os.environ.get(
     "DATABASE_URL",
@@ -38,6 +45,22 @@ else:
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+class AsyncSessionAdapter:
+    """The AsyncSession calls async routes use, over the transactional test session.
+
+    Lets async analytics endpoints see rows added in the test transaction.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, *args, **kwargs):
+        return self.session.execute(*args, **kwargs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+
 def terminate_other_connections():
     """Terminate all other connections to hermes_test database.
     
@@ -76,6 +99,11 @@ def setup_database():
     # Now create tables
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            for name in INIT_SQL_AFTER_CREATE_ALL:
+                with open(os.path.join(INIT_SQL_DIR, name), encoding='utf-8') as f:
+                    conn.exec_driver_sql(f.read())
     
     yield
     
@@ -103,6 +131,8 @@ def db(setup_database):
             pass  # Don't close here, we'll rollback
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_analytics_db] = lambda: AsyncSessionAdapter(session)
     
     yield session
     
@@ -111,6 +141,16 @@ def db(setup_database):
     connection.close()
 
 
+@pytest.fixture
+def queued_jobs(db):
+    """Job ids queued in etl_job_queue by the request under test (API endpoints only enqueue ETL tasks)."""
+    # Integration tests elsewhere commit queue rows; start from a clean slate
+    db.execute(text("DELETE FROM etl_job_queue"))
+    return lambda: [
+        row[0] for row in db.execute(text("SELECT job_id FROM etl_job_queue WHERE status = 'queued' ORDER BY id"))
+    ]
+
+
 @pytest.fixture(scope="function")
 def client(db):
     """Provide test client."""
@@ -250,3 +290,12 @@ def sample_currency_rates(db):
     db.add_all(rates)
     db.flush()
     return rates
+
+
+@pytest.fixture(autouse=True)
+def clear_settings_cache():
+    """The current video ID is cached per process; start every test from the database."""
+    from app.core.settings import invalidate_settings_cache
+    invalidate_settings_cache()
+    yield
+    invalidate_settings_cache()
@@ -0,0 +1,109 @@
+"""Tests for the mention extractor admin API."""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import text
+
+from app.etl.processors.extractors import sync_builtin_extractors
+from app.models import ExtractedMention, MentionExtractor
+
+BASE = datetime(2026, 2, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def incense(db):
+    # Integration tests elsewhere commit ETL state (e.g. synced builtin rows); start from a clean slate
+    db.execute(text("DELETE FROM mention_extractors"))
+    extractor = MentionExtractor(name="incense", pattern=r"([一-鿿]{2,6})代表上香", backfilled_at=BASE)
+    db.add(extractor)
+    db.flush()
+    db.add(ExtractedMention(
+        extractor="incense", message_id="m1", published_at=BASE, live_stream_id="s", value="台中",
+    ))
+    db.flush()
+    return extractor
+
+
+def test_list_includes_builtins_and_counts(client, incense, db):
+    sync_builtin_extractors(db.connection())  # done at startup
+    response = client.get("/api/admin/extractors")
+    assert response.status_code == 200
+    by_name = {e["name"]: e for e in response.json()}
+    assert by_name["incense"]["status"] == "ready"
+    assert by_name["incense"]["mention_count"] == 1
+    assert by_name["editor"]["kind"] == "builtin"
+    assert by_name["editor"]["status"] == "pending"
+
+
+def test_create_regex_extractor_queues_backfill(admin_client, db, queued_jobs):
+    response = admin_client.post("/api/admin/extractors", json={"name": "laugh", "pattern": "(w{3,})"})
+    assert response.status_code == 201
+    assert response.json()["status"] == "pending"
+    assert db.get(MentionExtractor, "laugh").kind == "regex"
+    assert queued_jobs() == ['backfill_mentions']
+
+    # A second change while the backfill is still queued does not queue another
+    admin_client.post("/api/admin/extractors", json={"name": "clap", "pattern": "(8{3,})"})
+    assert queued_jobs() == ['backfill_mentions']
+
+
+@pytest.mark.parametrize("payload", [
+    {"name": "bad", "pattern": "("},
+    {"name": "Bad Name", "pattern": "a"},
+    {"name": "editor", "pattern": "a"},
+])
+def test_create_rejects_invalid(admin_client, db, payload):
+    response = admin_client.post("/api/admin/extractors", json=payload)
+    assert response.status_code in (400, 422)
+
+
+def test_create_requires_admin(client, db):
+    response = client.post("/api/admin/extractors", json={"name": "laugh", "pattern": "w+"})
+    assert response.status_code == 401
+
+
+def test_update_pattern_marks_pending(admin_client, incense, db, queued_jobs):
+    response = admin_client.put("/api/admin/extractors/incense", json={"pattern": "(台中)代表上香"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+    db.refresh(incense)
+    assert incense.backfilled_at is None
+    assert queued_jobs() == ['backfill_mentions']
+
+
+def test_update_description_keeps_index(admin_client, incense, db, queued_jobs):
+    response = admin_client.put("/api/admin/extractors/incense", json={"description": "上香地圖"})
+    assert response.json()["status"] == "ready"
+    assert queued_jobs() == []
+
+
+def test_disable_and_reenable(admin_client, incense, db, queued_jobs):
+    assert admin_client.put("/api/admin/extractors/incense", json={"enabled": False}).json()["status"] == "disabled"
+    assert queued_jobs() == []
+    assert admin_client.put("/api/admin/extractors/incense", json={"enabled": True}).json()["status"] == "pending"
+    assert queued_jobs() == ['backfill_mentions']
+
+
+def test_list_is_read_only(client, incense, db):
+    response = client.get("/api/admin/extractors")
+    assert [e["name"] for e in response.json()] == ["incense"]
+    assert db.query(MentionExtractor).count() == 1
+
+
+def test_builtin_pattern_is_not_editable_or_deletable(admin_client, db):
+    sync_builtin_extractors(db.connection())
+    assert admin_client.put("/api/admin/extractors/editor", json={"pattern": "x"}).status_code == 400
+    assert admin_client.delete("/api/admin/extractors/editor").status_code == 400
+
+
+def test_delete_removes_mentions(admin_client, incense, db):
+    response = admin_client.delete("/api/admin/extractors/incense")
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(MentionExtractor, "incense") is None
+    assert db.query(ExtractedMention).count() == 0
+
+
+def test_missing_extractor_404(admin_client, db):
+    assert admin_client.put("/api/admin/extractors/nope", json={"enabled": False}).status_code == 404
+    assert admin_client.delete("/api/admin/extractors/nope").status_code == 404
@@ -0,0 +1,100 @@
+"""Heavy analytics endpoints run on the async analytics pool.
+
+While slow playback / word cloud queries are in flight, /health and
+/api/stream-info (sync pool) must still answer quickly.
+"""
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.core.database import get_analytics_db, get_db
+from tests.conftest import AsyncSessionAdapter
+
+QUERY_SECONDS = 0.5
+HEAVY_REQUESTS = 12
+# Upper bound on database calls per request (statement timeout, lookups, queries)
+CALLS_PER_REQUEST = 5
+
+
+class SlowAnalyticsSession(AsyncSessionAdapter):
+    """Every query takes QUERY_SECONDS without blocking the event loop."""
+
+    async def execute(self, *args, **kwargs):
+        await asyncio.sleep(QUERY_SECONDS)
+        return await super().execute(*args, **kwargs)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        await asyncio.sleep(QUERY_SECONDS)
+        return await super().run_sync(fn, *args, **kwargs)
+
+
+@pytest.fixture
+def slow_app(db):
+    from main import app
+    app.dependency_overrides[get_analytics_db] = lambda: SlowAnalyticsSession(db)
+    with patch('app.routers.playback.get_current_video_id', return_value=None), \
+         patch('app.routers.wordcloud.get_current_video_id', return_value=None), \
+         patch('app.routers.stream_info.get_current_video_id', return_value=None):
+        yield app
+
+
+PLAYBACK_PARAMS = {
+    "start_time": "2026-01-12T10:00:00Z",
+    "end_time": "2026-01-12T12:00:00Z",
+    "step_seconds": 300,
+}
+
+
+async def _timed_get(client, path, params=None):
+    started = time.monotonic()
+    response = await client.get(path, params=params)
+    return response.status_code, time.monotonic() - started
+
+
+def test_short_endpoints_stay_fast_under_heavy_load(slow_app):
+    async def scenario():
+        transport = httpx.ASGITransport(app=slow_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.monotonic()
+            heavy = [
+                asyncio.create_task(_timed_get(client, "/api/playback/snapshots", PLAYBACK_PARAMS))
+                for _ in range(HEAVY_REQUESTS // 2)
+            ] + [
+                asyncio.create_task(_timed_get(client, "/api/wordcloud/word-frequency"))
+                for _ in range(HEAVY_REQUESTS // 2)
+            ]
+            await asyncio.sleep(0.05)  # heavy queries are now in flight
+            probes = [await _timed_get(client, path) for path in ("/health", "/api/stream-info")]
+            heavy_results = await asyncio.gather(*heavy)
+            return probes, heavy_results, time.monotonic() - started
+
+    probes, heavy_results, elapsed = asyncio.run(scenario())
+
+    assert all(status == 200 for status, _ in heavy_results)
+    for status, seconds in probes:
+        assert status == 200
+        assert seconds < QUERY_SECONDS / 2
+    # Heavy requests overlap instead of queueing one after another
+    # (serially this would take HEAVY_REQUESTS * CALLS_PER_REQUEST * QUERY_SECONDS)
+    assert elapsed < 2 * CALLS_PER_REQUEST * QUERY_SECONDS
+
+
+def test_heavy_endpoints_do_not_use_the_request_pool(client):
+    from main import app
+
+    def no_sync_session():
+        raise AssertionError("analytics endpoints must not check out a sync connection")
+        yield
+
+    original_override = app.dependency_overrides[get_db]
+    app.dependency_overrides[get_db] = no_sync_session
+    try:
+        with patch('app.routers.playback.get_current_video_id', return_value=None), \
+             patch('app.routers.wordcloud.get_current_video_id', return_value=None):
+            assert client.get("/api/playback/snapshots", params=PLAYBACK_PARAMS).status_code == 200
+            assert client.get("/api/wordcloud/word-frequency").status_code == 200
+    finally:
+        app.dependency_overrides[get_db] = original_override
@@ -0,0 +1,156 @@
+"""Tests for the hourly author activity rollup and the author endpoints it serves."""
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.core.dependencies import current_video_id
+from app.models import AuthorActivityHourly, ChatMessage, ProcessedChatMessage
+from app.services.author_activity import add_author_activity, count_author_activity
+
+VIDEO_ID = "activity_stream"
+BASE = datetime(2026, 4, 1, 10, 0, 0, tzinfo=timezone.utc)
+CHECKPOINT = BASE + timedelta(hours=3, minutes=45)
+# (author_id, author_name, message_type); fan_a renames to "A2" halfway through
+AUTHORS = [
+    ("fan_a", "A1", "text_message"),
+    ("fan_b", "B", "paid_message"),
+    ("fan_a", "A1", "text_message"),
+    ("fan_c", "C", "text_message"),
+    ("fan_d", "D", "ticker_paid_message_item"),
+]
+
+
+@pytest.fixture
+def activity_messages(db):
+    """Messages 10:05 ~ 14:55 in two streams; rollup rows up to the 13:45 checkpoint."""
+    # Integration tests elsewhere commit ETL state; start from a clean slate
+    db.execute(text("DELETE FROM processed_chat_messages"))
+    db.execute(text("DELETE FROM processed_chat_checkpoint"))
+
+    rows = []
+    for i in range(30):
+        published_at = BASE + timedelta(minutes=5 + i * 10)
+        author_id, name, message_type = AUTHORS[i % len(AUTHORS)]
+        if author_id == "fan_a" and i >= 15:
+            name = "A2"
+        rows.append(dict(
+            message_id=f"activity_{i}",
+            live_stream_id=VIDEO_ID if i % 7 else "other_stream",
+            published_at=published_at,
+            author_name=name,
+            author_id=author_id,
+            message_type=message_type,
+        ))
+    for r in rows:
+        db.add(ChatMessage(
+            message=f"m{r['message_id']}", timestamp=int(r["published_at"].timestamp() * 1000000), **r,
+        ))
+    processed = [r for r in rows if r["published_at"] <= CHECKPOINT]
+    for r in processed:
+        db.add(ProcessedChatMessage(
+            message_id=r["message_id"], live_stream_id=r["live_stream_id"], original_message="m",
+            processed_message="m", tokens=[], author_name=r["author_name"], author_id=r["author_id"],
+            published_at=r["published_at"],
+        ))
+    db.flush()
+    add_author_activity(db.connection(), count_author_activity(processed))
+    return db
+
+
+def _set_checkpoint(db):
+    db.execute(text("""
+        INSERT INTO processed_chat_checkpoint (last_processed_message_id, last_processed_timestamp)
+        VALUES ('activity', :ts)
+    """), {"ts": CHECKPOINT})
+    db.flush()
+
+
+@pytest.fixture(autouse=True)
+def current_stream():
+    from main import app
+    app.dependency_overrides[current_video_id] = lambda: VIDEO_ID
+    yield app
+    app.dependency_overrides.pop(current_video_id, None)
+
+
+def _get(client, path, **params):
+    response = client.get(path, params={
+        "start_time": (BASE + timedelta(minutes=20)).isoformat(),
+        "end_time": (BASE + timedelta(hours=4, minutes=50)).isoformat(),
+        **params,
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_count_author_activity_splits_names_and_paid():
+    counts = count_author_activity([
+        {"live_stream_id": "s", "author_id": "a", "author_name": "Old", "message_type": "paid_message",
+         "published_at": "2026-04-01T10:10:00+00:00"},
+        {"live_stream_id": "s", "author_id": "a", "author_name": "Old", "message_type": "text_message",
+         "published_at": "2026-04-01T10:50:00+00:00"},
+        {"live_stream_id": "s", "author_id": "a", "author_name": "New", "message_type": "text_message",
+         "published_at": "2026-04-01T10:55:00+00:00"},
+    ])
+    old = counts[("s", BASE, "a", "Old")]
+    assert old[:2] == [2, 1]
+    assert (old[2].minute, old[3].minute) == (10, 50)
+    assert counts[("s", BASE, "a", "New")][:2] == [1, 0]
+
+
+def test_rollup_matches_raw_aggregation(client, activity_messages):
+    db = activity_messages
+    paths = [
+        ("/api/chat/top-authors", {"include_meta": "true"}),
+        ("/api/chat/authors/fan_a/summary", {}),
+        ("/api/chat/authors/fan_b/summary", {}),
+        ("/api/chat/authors/fan_a/trend", {}),
+    ]
+    raw = [_get(client, path, **params) for path, params in paths]
+    assert raw[0]["total_authors"] == 4
+    assert [a["name"] for a in raw[1]["aliases"]] == ["A1", "A2"]
+
+    _set_checkpoint(db)
+    assert [_get(client, path, **params) for path, params in paths] == raw
+
+
+def test_covered_hours_are_read_from_rollup(client, activity_messages):
+    db = activity_messages
+    _set_checkpoint(db)
+    db.query(AuthorActivityHourly).filter(
+        AuthorActivityHourly.live_stream_id == VIDEO_ID,
+        AuthorActivityHourly.hour == BASE + timedelta(hours=1),
+        AuthorActivityHourly.author_id == "fan_c",
+    ).update({"message_count": 50, "paid_count": 7})
+    db.flush()
+
+    top = _get(client, "/api/chat/top-authors")
+    assert top[0]["author_id"] == "fan_c"
+    summary = _get(client, "/api/chat/authors/fan_c/summary")
+    assert summary["paid_messages"] == 7
+    trend = {row["hour"]: row["count"] for row in _get(client, "/api/chat/authors/fan_c/trend")}
+    assert trend[(BASE + timedelta(hours=1)).isoformat()] == 50
+
+
+def test_top_authors_ties_from_rollup(client, activity_messages, current_stream):
+    db = activity_messages
+    _set_checkpoint(db)
+    # Six authors with one message each in a covered hour: all tie at 5th place
+    for i in range(6):
+        db.add(AuthorActivityHourly(
+            live_stream_id="tie_stream", hour=BASE + timedelta(hours=2), author_id=f"tie_{i}",
+            author_name=f"T{i}", message_count=1, paid_count=0,
+            first_seen=BASE + timedelta(hours=2, minutes=i), last_seen=BASE + timedelta(hours=2, minutes=i),
+        ))
+    db.flush()
+
+    current_stream.dependency_overrides[current_video_id] = lambda: "tie_stream"
+    data = client.get("/api/chat/top-authors", params={
+        "include_meta": "true",
+        "start_time": BASE.isoformat(),
+        "end_time": (BASE + timedelta(hours=5)).isoformat(),
+    }).json()
+    assert data["total_authors"] == 6
+    assert data["tie_extended"] is True
+    assert [a["author"] for a in data["top_authors"]] == [f"T{i}" for i in range(6)]
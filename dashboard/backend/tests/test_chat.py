@@ -390,3 +390,90 @@ def test_get_author_summary_includes_badges_icon_url(client, db):
     assert len(data["badges"]) == 1
     assert data["badges"][0]["title"] == "Member (6 months)"
     assert data["badges"][0]["icon_url"] == "https://example.com/16.png"
+
+
+def _add_tied_messages(db, author_id="cursor_author"):
+    """12 messages where pairs share the same published_at, to exercise the message_id tiebreak."""
+    msgs = [
+        ChatMessage(
+            message_id=f"cursor_{i:02d}",
+            live_stream_id="test_stream",
+            message=f"cursor message {i}",
+            timestamp=1704067200000000 + i,
+            published_at=datetime(2026, 1, 12, 10, i // 2, 0, tzinfo=timezone.utc),
+            author_name="CursorAuthor",
+            author_id=author_id,
+            message_type="text_message",
+            raw_data=None,
+        )
+        for i in range(12)
+    ]
+    db.add_all(msgs)
+    db.flush()
+    return msgs
+
+
+def _walk_cursor(client, path, **params):
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, pagination="cursor")
+        if cursor:
+            query["cursor"] = cursor
+        data = client.get(path, params=query).json()
+        pages.append(data)
+        if not data["has_more"]:
+            return pages
+        cursor = data["next_cursor"]
+
+
+def test_get_chat_messages_cursor_pagination_walks_all_rows(client, db):
+    _add_tied_messages(db)
+    pages = _walk_cursor(
+        client, "/api/chat/messages",
+        limit=5, start_time="2026-01-12T09:00:00Z", end_time="2026-01-12T11:00:00Z",
+    )
+
+    assert [len(p["messages"]) for p in pages] == [5, 5, 2]
+    ids = [m["id"] for p in pages for m in p["messages"]]
+    assert ids == [f"cursor_{i:02d}" for i in reversed(range(12))]
+    assert pages[0]["cursor"] is None
+    assert pages[-1]["next_cursor"] is None
+    # Cursor mode skips the count unless asked for
+    assert pages[0]["total"] is None
+    assert "offset" not in pages[0]
+
+
+def test_get_chat_messages_cursor_with_total_modes(client, db):
+    _add_tied_messages(db)
+    params = {"pagination": "cursor", "limit": 5, "start_time": "2026-01-12T09:00:00Z"}
+
+    exact = client.get("/api/chat/messages", params={**params, "total_mode": "exact"}).json()
+    assert exact["total"] == 12
+    assert exact["total_is_estimate"] is False
+
+    approx = client.get("/api/chat/messages", params={**params, "total_mode": "approximate"}).json()
+    assert approx["total"] == 12
+
+    none = client.get("/api/chat/messages", params={"limit": 5, "total_mode": "none"}).json()
+    assert none["total"] is None
+    assert none["offset"] == 0
+
+
+def test_get_chat_messages_invalid_pagination_params(client):
+    assert client.get("/api/chat/messages?cursor=not-a-cursor").status_code == 400
+    assert client.get("/api/chat/messages?pagination=page").status_code == 400
+    assert client.get("/api/chat/messages?total_mode=maybe").status_code == 400
+
+
+def test_get_author_messages_cursor_pagination(client, db):
+    _add_tied_messages(db)
+    pages = _walk_cursor(
+        client, "/api/chat/authors/cursor_author/messages",
+        limit=4, start_time="2026-01-12T09:00:00Z", end_time="2026-01-12T11:00:00Z",
+    )
+
+    assert [len(p["messages"]) for p in pages] == [4, 4, 4]
+    ids = [m["id"] for p in pages for m in p["messages"]]
+    assert len(set(ids)) == 12
+    assert all(p["author_id"] == "cursor_author" for p in pages)
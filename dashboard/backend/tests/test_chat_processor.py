@@ -64,6 +64,8 @@ def setup_integration_data(setup_database):
     with engine.connect() as conn:
         conn.execute(text("TRUNCATE TABLE chat_messages CASCADE;"))
         conn.execute(text("TRUNCATE TABLE processed_chat_messages CASCADE;")) 
+        conn.execute(text("TRUNCATE TABLE processed_chat_checkpoint CASCADE;"))
+        conn.execute(text("TRUNCATE TABLE word_group_hourly_counts, emoji_counts_by_hour, author_activity_hourly;"))
         conn.commit()
 
 def test_chat_processor_case_insensitive(setup_integration_data):
@@ -141,3 +143,58 @@ def test_chat_processor_integration(setup_integration_data):
         row = result.fetchone()
         assert row is not None
         assert row[0] == "msg_test_1"
+
+
+def test_chat_processor_counts_word_group_hits(setup_integration_data):
+    """Backfilled groups get their hits added in the same run; pending groups are backfilled first."""
+    engine = create_engine(TEST_DB_URL)
+    with engine.connect() as conn:
+        conn.execute(text("TRUNCATE TABLE word_trend_groups CASCADE;"))
+        conn.execute(text("""
+            INSERT INTO word_trend_groups (name, words, exclude_words, hits_indexed_at)
+            VALUES ('indexed', '["KUSA"]', NULL, NOW()),
+                   ('pending', '["hololive"]', NULL, NULL),
+                   ('excluded', '["kusa"]', '["holo"]', NOW())
+        """))
+        conn.commit()
+
+    try:
+        result = ChatProcessor(database_url=TEST_DB_URL).run()
+        assert result["status"] == "completed"
+
+        with engine.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT g.name, c.live_stream_id, c.count, g.hits_indexed_at IS NOT NULL
+                FROM word_group_hourly_counts c
+                JOIN word_trend_groups g ON g.id = c.group_id
+                ORDER BY g.name
+            """)).fetchall()
+            pending_indexed = conn.execute(text(
+                "SELECT hits_indexed_at IS NOT NULL FROM word_trend_groups WHERE name = 'pending'"
+            )).scalar()
+
+        # The pending group was backfilled (nothing processed yet) before the batch,
+        # so the new message is counted exactly once for it too
+        assert [(r[0], r[1], r[2]) for r in rows] == [
+            ("indexed", "stream_1", 1),
+            ("pending", "stream_1", 1),
+        ]
+        assert pending_indexed
+    finally:
+        with engine.connect() as conn:
+            conn.execute(text("TRUNCATE TABLE word_trend_groups CASCADE;"))
+            conn.commit()
+
+
+def test_chat_processor_counts_author_activity(setup_integration_data):
+    """Each processed batch is added to author_activity_hourly."""
+    result = ChatProcessor(database_url=TEST_DB_URL).run()
+    assert result["status"] == "completed"
+
+    engine = create_engine(TEST_DB_URL)
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT live_stream_id, author_id, author_name, message_count, paid_count
+            FROM author_activity_hourly
+        """)).fetchall()
+    assert [tuple(r) for r in rows] == [("stream_1", "user_1", "User1", 1, 0)]
@@ -223,3 +223,26 @@ class TestDatabaseFunctions:
         
         mock_session.rollback.assert_called_once()
         mock_session.close.assert_called_once()
+
+
+class TestAsyncDatabaseManager:
+    """Tests for the asyncpg analytics engine."""
+
+    def test_to_async_database_url(self):
+        from app.core.database import to_async_database_url
+
+        assert to_async_database_url('postgresql://u:p@h:5432/db') == 'postgresql+asyncpg://u:p@h:5432/db'
+        assert to_async_database_url('postgresql+psycopg2://h/db') == 'postgresql+asyncpg://h/db'
+        assert to_async_database_url('sqlite:///x.db') == 'sqlite:///x.db'
+
+    @patch.dict(os.environ, {'ANALYTICS_DB_POOL_SIZE': '3', 'ANALYTICS_DB_MAX_OVERFLOW': '1'})
+    @patch('app.core.database.create_async_engine')
+    def test_separate_pool_settings(self, mock_create_async_engine):
+        from app.core.database import AsyncDatabaseManager
+
+        manager = AsyncDatabaseManager(database_url='postgresql://host/db')
+
+        assert manager.database_url == 'postgresql+asyncpg://host/db'
+        kwargs = mock_create_async_engine.call_args[1]
+        assert kwargs['pool_size'] == 3
+        assert kwargs['max_overflow'] == 1
@@ -227,3 +227,100 @@ class TestEmojiStats:
 
         # 😀 and 🎉
         assert len(data["emojis"]) == 2
+
+
+ROLLUP_BASE = datetime(2026, 3, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def rollup_messages(db):
+    """Messages 10:20 ~ 13:40 in two streams; the ETL rollup covers up to 12:40."""
+    from sqlalchemy import text
+    from app.models import ProcessedChatMessage
+    from app.services.emoji_rollup import count_emojis, add_emoji_counts
+
+    db.execute(text("DELETE FROM processed_chat_messages"))
+    db.execute(text("DELETE FROM processed_chat_checkpoint"))
+
+    rows = []
+    for i in range(12):
+        published_at = ROLLUP_BASE + timedelta(minutes=20 + i * 17)
+        rows.append(dict(
+            message_id=f"rollup_{i}",
+            live_stream_id="test_stream" if i % 4 else "other_stream",
+            original_message="x",
+            processed_message="x",
+            tokens=[],
+            unicode_emojis=["😀", "😀"] if i % 2 else ["🎉"],
+            youtube_emotes=[{"name": ":yt:", "url": f"https://example.com/{i % 3}.png"}] if i % 3 == 0 else [],
+            published_at=published_at,
+            author_name="User",
+            author_id="user",
+        ))
+    db.add_all(ProcessedChatMessage(**r) for r in rows)
+    db.flush()
+
+    checkpoint = ROLLUP_BASE + timedelta(hours=2, minutes=40)
+    add_emoji_counts(db.connection(), count_emojis(r for r in rows if r["published_at"] <= checkpoint))
+    return db, checkpoint
+
+
+class TestEmojiRollup:
+    """Tests for /api/emojis/stats served from emoji_counts_by_hour."""
+
+    @staticmethod
+    def _stats(client, **params):
+        from unittest.mock import patch
+        with patch('app.routers.emojis.get_current_video_id', return_value='test_stream'):
+            response = client.get("/api/emojis/stats", params={
+                "start_time": (ROLLUP_BASE + timedelta(minutes=5)).isoformat(),
+                "end_time": (ROLLUP_BASE + timedelta(hours=4)).isoformat(),
+                **params,
+            })
+        assert response.status_code == 200
+        return response.json()
+
+    @staticmethod
+    def _set_checkpoint(db, checkpoint):
+        from sqlalchemy import text
+        db.execute(text("""
+            INSERT INTO processed_chat_checkpoint (last_processed_message_id, last_processed_timestamp)
+            VALUES ('rollup', :ts)
+        """), {"ts": checkpoint})
+        db.flush()
+
+    def test_rollup_matches_raw_aggregation(self, client, rollup_messages):
+        db, checkpoint = rollup_messages
+        raw = self._stats(client)
+        raw_youtube = self._stats(client, type_filter="youtube")
+        assert {e["name"] for e in raw["emojis"]} == {"😀", "🎉", ":yt:"}
+
+        self._set_checkpoint(db, checkpoint)
+        assert self._stats(client) == raw
+        assert self._stats(client, type_filter="youtube") == raw_youtube
+
+    def test_rollup_hours_are_read_from_table(self, client, rollup_messages):
+        from app.models import EmojiCountByHour
+        db, checkpoint = rollup_messages
+        self._set_checkpoint(db, checkpoint)
+        before = {e["name"]: e["message_count"] for e in self._stats(client)["emojis"]}
+
+        db.query(EmojiCountByHour).filter(
+            EmojiCountByHour.live_stream_id == "test_stream",
+            EmojiCountByHour.hour == ROLLUP_BASE + timedelta(hours=1),
+            EmojiCountByHour.emoji == "😀",
+        ).update({"message_count": 100})
+        db.flush()
+
+        after = {e["name"]: e["message_count"] for e in self._stats(client)["emojis"]}
+        assert after["😀"] > before["😀"]
+        assert after["🎉"] == before["🎉"]
+
+    def test_offset_past_end_still_reports_total(self, client, rollup_messages):
+        data = self._stats(client, offset=50)
+        assert data["emojis"] == []
+        assert data["total"] == 3
+
+    def test_filter_treats_wildcards_literally(self, client, rollup_messages):
+        assert self._stats(client, filter="%")["total"] == 0
+        assert [e["name"] for e in self._stats(client, filter="YT")["emojis"]] == [":yt:"]
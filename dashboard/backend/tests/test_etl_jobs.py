@@ -6,6 +6,8 @@ import pytest
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timezone
 
+from sqlalchemy import text
+
 
 @pytest.fixture
 def sample_etl_settings(db):
@@ -88,6 +90,9 @@ def test_list_jobs(mock_get_all_jobs, client, db):
     assert 'scheduled' in data
     assert 'manual' in data
     assert len(data['scheduled']) == 1
+    pipeline = {node['id']: node for node in data['pipeline']}
+    assert pipeline['discover_new_words']['upstream'] == ['process_chat_messages']
+    assert pipeline['process_chat_messages']['downstream'] == ['discover_new_words']
     # manual jobs come from MANUAL_TASKS in the router, which we didn't mock here
 
 
@@ -121,26 +126,52 @@ def test_get_job_detail_not_found(mock_get_job, client, db):
 
 # ============ Job Trigger Tests ============
 
-@patch('app.routers.etl_jobs.TASK_REGISTRY')
-@patch('app.etl.tasks.create_etl_log')
-@patch('concurrent.futures.ThreadPoolExecutor')
-def test_trigger_job_success(mock_executor, mock_create_log, mock_task_registry, admin_client, db):
-    """Test triggering a job successfully."""
-    # Setup mock registry
-    mock_task_registry.__contains__ = Mock(return_value=True)
-    mock_task_registry.__getitem__ = Mock(return_value=Mock())
-
-    # Setup mock create_log
-    mock_create_log.return_value = 123
+def test_trigger_job_enqueues(admin_client, db):
+    """Triggering a job only queues it for the ETL worker."""
+    from app.models import ETLExecutionLog, ETLJobQueue
+    db.execute(text("DELETE FROM etl_job_queue WHERE job_id = 'import_dicts'"))
 
-    response = admin_client.post("/api/admin/etl/jobs/test_job/trigger")
+    with patch('app.etl.tasks.run_import_dicts') as mock_task:
+        response = admin_client.post("/api/admin/etl/jobs/import_dicts/trigger")
 
     assert response.status_code == 200
     data = response.json()
-    assert data['status'] == 'running'
-    assert data['etl_log_id'] == 123
-    mock_create_log.assert_called_once_with('test_job', trigger_type='manual')
-    mock_executor.return_value.submit.assert_called_once()
+    assert data['status'] == 'queued'
+    mock_task.assert_not_called()
+
+    queued = db.get(ETLJobQueue, data['queue_id'])
+    assert queued.job_id == 'import_dicts' and queued.status == 'queued'
+    assert queued.etl_log_id == data['etl_log_id']
+    log = db.get(ETLExecutionLog, data['etl_log_id'])
+    assert (log.status, log.trigger_type, log.job_name) == ('queued', 'manual', '匯入字典')
+
+    # A second trigger while the first is still queued is not queued again
+    response = admin_client.post("/api/admin/etl/jobs/import_dicts/trigger")
+    data2 = response.json()
+    assert data2['status'] == 'already_queued'
+    assert data2['queue_id'] == data['queue_id']
+    assert db.query(ETLJobQueue).filter_by(job_id='import_dicts').count() == 1
+
+
+def test_cancel_run(admin_client, db):
+    """Cancelling a queued run cancels it; a finished run cannot be cancelled."""
+    from app.etl.job_queue import enqueue_job
+    from app.models import ETLExecutionLog, ETLJobQueue
+    db.execute(text("DELETE FROM etl_job_queue WHERE job_id = 'import_dicts'"))
+    queued = enqueue_job(db, 'import_dicts', '匯入字典')
+
+    response = admin_client.post(f"/api/admin/etl/logs/{queued['etl_log_id']}/cancel")
+    assert response.status_code == 200
+    assert response.json()['status'] == 'cancelled'
+    assert db.get(ETLJobQueue, queued['queue_id']).status == 'cancelled'
+    assert db.get(ETLExecutionLog, queued['etl_log_id']).status == 'cancelled'
+
+    response = admin_client.post(f"/api/admin/etl/logs/{queued['etl_log_id']}/cancel")
+    assert response.json() == {
+        "success": False, "status": "finished", "etl_log_id": queued['etl_log_id'],
+        "message": "任務已結束，無法取消",
+    }
+    assert admin_client.post("/api/admin/etl/logs/999999999/cancel").status_code == 404
 
 
 @patch('app.routers.etl_jobs.TASK_REGISTRY')
@@ -0,0 +1,151 @@
+"""Tests for the dependency-aware ETL pipeline (watermarks and chained triggering)."""
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.etl import pipeline
+from app.etl.pipeline import PIPELINE, PipelineJob, Watermark, check_job, run_pipeline_job
+from app.models import ChatMessage, ETLExecutionLog, ETLSetting
+
+BASE = datetime(2026, 3, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def chat_state(db):
+    """One raw message at 10:30; the chat ETL has processed up to 10:00, discovery up to 09:00."""
+    # Integration tests elsewhere commit ETL state; start from a clean slate
+    db.execute(text("DELETE FROM processed_chat_checkpoint"))
+    db.execute(text("DELETE FROM word_analysis_checkpoint"))
+    db.execute(text("DELETE FROM etl_execution_log WHERE job_id IN ('process_chat_messages', 'discover_new_words')"))
+    db.execute(text("DELETE FROM etl_settings WHERE key = 'PROCESS_CHAT_RESET'"))
+    published_at = BASE + timedelta(minutes=30)
+    db.add(ChatMessage(
+        message_id="pipe_1", live_stream_id="pipe_stream", message="hi",
+        timestamp=int(published_at.timestamp() * 1000000), published_at=published_at,
+        author_name="User", author_id="user", message_type="text_message",
+    ))
+    db.execute(text("INSERT INTO processed_chat_checkpoint (last_processed_timestamp, updated_at) VALUES (:ts, NOW())"),
+               {"ts": BASE})
+    db.execute(text("INSERT INTO word_analysis_checkpoint (last_analyzed_timestamp, updated_at) VALUES (:ts, NOW())"),
+               {"ts": BASE - timedelta(hours=1)})
+    db.flush()
+
+
+@pytest.fixture
+def engine(db):
+    """An engine whose connections share the test transaction."""
+    mock_engine = MagicMock()
+    mock_engine.connect.return_value.__enter__.return_value = db.connection()
+    with patch('app.etl.pipeline.ETLConfig.get_engine', return_value=mock_engine):
+        yield mock_engine
+
+
+def test_pipeline_dag():
+    assert pipeline.root_jobs() == ['process_chat_messages']
+    assert pipeline.downstream_jobs('process_chat_messages') == ['discover_new_words']
+
+
+def test_validate_rejects_cycles_and_unknown_upstreams():
+    with pytest.raises(ValueError):
+        pipeline._validate({'a': PipelineJob('a', upstream=('b',)), 'b': PipelineJob('b', upstream=('a',))})
+    with pytest.raises(ValueError):
+        pipeline._validate({'a': PipelineJob('a', upstream=('missing',))})
+
+
+def test_check_job_watermarks(chat_state, db):
+    state = check_job(db, PIPELINE['process_chat_messages'])
+    assert state['ready'] is True
+    assert state['source'] == BASE + timedelta(minutes=30)
+    assert state['checkpoint'] == BASE
+
+    db.execute(text("UPDATE processed_chat_checkpoint SET last_processed_timestamp = :ts"),
+               {"ts": BASE + timedelta(minutes=30)})
+    state = check_job(db, PIPELINE['process_chat_messages'])
+    # Only messages after the checkpoint are read: none left means no source watermark
+    assert state == {'ready': False, 'reason': 'no new data',
+                     'source': None, 'checkpoint': BASE + timedelta(minutes=30)}
+
+    # A pending reset reprocesses everything
+    db.add(ETLSetting(key='PROCESS_CHAT_RESET', value='true', value_type='boolean'))
+    db.flush()
+    assert check_job(db, PIPELINE['process_chat_messages'])['ready'] is True
+
+
+def test_check_job_min_interval(chat_state, db):
+    job = PIPELINE['discover_new_words']
+    assert check_job(db, job)['ready'] is True
+
+    db.add(ETLExecutionLog(job_id='discover_new_words', job_name='AI 詞彙發現', status='completed',
+                           started_at=datetime.now(timezone.utc) - timedelta(hours=1)))
+    db.flush()
+    state = check_job(db, job)
+    assert state['ready'] is False and state['reason'].startswith('last run started at')
+    assert check_job(db, job, now=datetime.now(timezone.utc) + timedelta(hours=3))['ready'] is True
+
+
+def test_check_job_watermark_failure_runs_anyway(db):
+    job = PipelineJob('broken', watermark=Watermark(source="SELECT MAX(x) FROM no_such_table", checkpoint="SELECT NULL"))
+    assert check_job(db, job)['ready'] is True
+    # The failed query did not abort the caller's transaction
+    assert db.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_run_pipeline_job_chains_downstream(chat_state, engine):
+    process = MagicMock(return_value={'status': 'completed'})
+    discover = MagicMock(return_value={'status': 'completed'})
+    with patch.dict('app.etl.tasks.TASK_REGISTRY',
+                    {'process_chat_messages': process, 'discover_new_words': discover}):
+        result = run_pipeline_job('process_chat_messages')
+
+    assert result == {'status': 'completed'}
+    process.assert_called_once_with()
+    discover.assert_called_once_with()
+
+
+def test_run_pipeline_job_skips_without_new_data(chat_state, engine, db):
+    db.execute(text("UPDATE processed_chat_checkpoint SET last_processed_timestamp = :ts"),
+               {"ts": BASE + timedelta(minutes=30)})
+    process = MagicMock(return_value={'status': 'completed'})
+    with patch.dict('app.etl.tasks.TASK_REGISTRY', {'process_chat_messages': process}):
+        result = run_pipeline_job('process_chat_messages')
+
+    assert result == {'status': 'skipped', 'reason': 'no new data'}
+    process.assert_not_called()
+
+
+def test_manual_run_ignores_watermark_and_chains(chat_state, engine, db):
+    db.execute(text("UPDATE processed_chat_checkpoint SET last_processed_timestamp = :ts"),
+               {"ts": BASE + timedelta(minutes=30)})
+    process = MagicMock(return_value={'status': 'completed'})
+    discover = MagicMock(return_value={'status': 'completed'})
+    with patch.dict('app.etl.tasks.TASK_REGISTRY',
+                    {'process_chat_messages': process, 'discover_new_words': discover}):
+        result = run_pipeline_job('process_chat_messages', etl_log_id=42)
+
+    assert result == {'status': 'completed'}
+    process.assert_called_once_with(etl_log_id=42)
+    discover.assert_called_once_with()
+
+
+def test_run_pipeline_job_does_not_chain_when_upstream_skipped(chat_state, engine):
+    # Another worker holds the advisory lock
+    process = MagicMock(return_value={'status': 'skipped', 'reason': 'another worker is executing this task'})
+    discover = MagicMock()
+    with patch.dict('app.etl.tasks.TASK_REGISTRY',
+                    {'process_chat_messages': process, 'discover_new_words': discover}):
+        run_pipeline_job('process_chat_messages')
+    discover.assert_not_called()
+
+
+def test_trigger_pipeline_job_uses_running_scheduler():
+    scheduler = MagicMock()
+    scheduler.running = True
+    with patch('app.etl.scheduler.get_scheduler', return_value=scheduler):
+        pipeline.trigger_pipeline_job('discover_new_words')
+
+    args, kwargs = scheduler.add_job.call_args
+    assert args == (run_pipeline_job, 'date')
+    assert kwargs['args'] == ['discover_new_words']
+    assert kwargs['id'] == 'discover_new_words'
@@ -0,0 +1,94 @@
+"""Tests for ETL progress reporting and cooperative cancellation."""
+import pytest
+from unittest.mock import MagicMock
+
+from sqlalchemy import text
+
+from app.etl.progress import JobCancelled, ProgressReporter
+from app.models import ETLExecutionLog
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def etl_log(db):
+    log = ETLExecutionLog(job_id='process_chat_messages', job_name='處理聊天訊息', status='running')
+    db.add(log)
+    db.flush()
+    return log
+
+
+@pytest.fixture
+def engine(db):
+    """An engine whose connections share the test transaction."""
+    engine = MagicMock()
+    engine.connect.return_value.__enter__.return_value = db
+    return engine
+
+
+def test_snapshot_rate_and_eta():
+    clock = FakeClock()
+    reporter = ProgressReporter(1, engine=MagicMock(), clock=clock)
+    assert reporter.snapshot()['rows_per_sec'] is None
+
+    reporter.total = 1000
+    reporter.rows, reporter.batches = 200, 2
+    clock.now += 10
+    assert reporter.snapshot() == {
+        'batches_done': 2,
+        'rows_done': 200,
+        'rows_total': 1000,
+        'rows_per_sec': 20.0,
+        'eta_seconds': 40,
+        'elapsed_seconds': 10,
+    }
+
+
+def test_advance_flushes_at_most_once_per_interval():
+    clock = FakeClock()
+    reporter = ProgressReporter(1, interval=5, engine=MagicMock(), clock=clock)
+    reporter.flush = MagicMock(side_effect=lambda: setattr(reporter, '_last_flush', clock()))
+
+    reporter.advance(100)  # first batch is always reported
+    clock.now += 1
+    reporter.advance(100)
+    assert reporter.flush.call_count == 1
+    clock.now += 5
+    reporter.advance(100)
+    assert reporter.flush.call_count == 2
+    assert (reporter.batches, reporter.rows) == (3, 300)
+
+
+def test_flush_writes_progress_to_log(db, engine, etl_log):
+    db.execute(text("UPDATE etl_execution_log SET metadata = '{\"note\": 1}' WHERE id = :id"), {"id": etl_log.id})
+    reporter = ProgressReporter(etl_log.id, interval=0, engine=engine)
+    reporter.set_total(500)
+    reporter.advance(120)
+
+    db.refresh(etl_log)
+    assert etl_log.records_processed == 120
+    assert etl_log.log_metadata['note'] == 1
+    progress = etl_log.log_metadata['progress']
+    assert (progress['batches_done'], progress['rows_done'], progress['rows_total']) == (1, 120, 500)
+
+
+def test_flush_raises_when_cancel_requested(db, engine, etl_log):
+    reporter = ProgressReporter(etl_log.id, interval=0, engine=engine)
+    reporter.advance(10)
+    db.execute(text("UPDATE etl_execution_log SET cancel_requested_at = NOW() WHERE id = :id"), {"id": etl_log.id})
+
+    reporter.flush(check_cancel=False)
+    with pytest.raises(JobCancelled):
+        reporter.advance(10)
+
+
+def test_flush_ignores_write_errors():
+    engine = MagicMock()
+    engine.connect.side_effect = RuntimeError("db down")
+    ProgressReporter(1, engine=engine).flush()
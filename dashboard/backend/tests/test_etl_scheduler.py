@@ -50,11 +50,15 @@ def test_register_jobs():
         
         # Easier way: Let it import, but mock the add_job call
          scheduler.register_jobs()
-         assert scheduler._scheduler.add_job.call_count == 3
+         assert scheduler._scheduler.add_job.call_count == 5
          args_list = scheduler._scheduler.add_job.call_args_list
          assert args_list[0][1]['id'] == 'process_chat_messages'
-         assert args_list[1][1]['id'] == 'discover_new_words'
-         assert args_list[2][1]['id'] == 'monitor_collector'
+         assert args_list[0][1]['args'] == ['process_chat_messages']
+         assert args_list[1][1]['id'] == 'monitor_collector'
+         assert args_list[3][1]['id'] == 'maintain_partitions'
+         assert args_list[4][1]['id'] == 'archive_streams'
+         # discover_new_words is triggered by process_chat_messages, not scheduled
+         assert 'discover_new_words' not in [call[1]['id'] for call in args_list]
 
 def test_start_scheduler():
     scheduler._scheduler = MagicMock()
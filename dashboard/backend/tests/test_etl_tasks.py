@@ -110,6 +110,29 @@ def test_run_process_chat_messages_failure(mock_create, mock_update, mock_proces
     mock_update.assert_called_with(100, 'failed', error_message='Task failed')
 
 
+@patch('app.etl.processors.chat_processor.ChatProcessor')
+@patch('app.etl.tasks.update_etl_log_status')
+@patch('app.etl.tasks.create_etl_log')
+def test_run_process_chat_messages_cancelled(mock_create, mock_update, mock_processor_class):
+    """A manual run reports progress and stops when cancelled."""
+    from app.etl.progress import JobCancelled, ProgressReporter
+
+    progress = ProgressReporter(999, engine=MagicMock())
+    progress.rows = 3000
+    mock_processor = MagicMock(progress=progress)
+    mock_processor_class.return_value = mock_processor
+    mock_processor.run.side_effect = JobCancelled("Cancelled after 3 batches (3000 rows)")
+
+    with patch('app.etl.tasks.ProgressReporter', return_value=progress):
+        result = run_process_chat_messages(etl_log_id=999)
+
+    assert result == {'status': 'cancelled', 'reason': 'Cancelled after 3 batches (3000 rows)', 'total_processed': 3000}
+    mock_processor_class.assert_called_once_with(progress=progress)
+    mock_update.assert_called_once_with(
+        999, 'cancelled', records_processed=3000, error_message='Cancelled after 3 batches (3000 rows)'
+    )
+
+
 # ============ run_discover_new_words Tests ============
 
 @patch('app.etl.processors.word_discovery.WordDiscoveryProcessor')
@@ -0,0 +1,101 @@
+"""Tests for the mention extractor registry."""
+import re
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+
+from app.etl.processors.extractors import (
+    BUILTIN_EXTRACTORS, Extractor, ExtractorSet, MessageRow,
+    build_extractor, load_extractor_set, sync_builtin_extractors,
+)
+from app.models import MentionExtractor
+
+BASE = datetime(2026, 2, 1, 10, 0, 0, tzinfo=timezone.utc)
+INCENSE_PATTERN = r'([一-鿿]{2,6})代表上香'
+
+
+@pytest.fixture
+def no_extractors(db):
+    # Integration tests elsewhere commit ETL state (e.g. synced builtin rows); start from a clean slate
+    db.execute(text("DELETE FROM mention_extractors"))
+    return db
+
+
+def _row(i, message, author_id="user"):
+    return MessageRow(f"m{i}", "stream", BASE, message, author_id)
+
+
+def _values(mentions):
+    return [(m["extractor"], m["message_id"], m["value"]) for m in mentions.get("extracted_mentions", [])]
+
+
+def test_first_group_or_whole_match():
+    extractors = ExtractorSet([
+        Extractor("incense", pattern=re.compile(INCENSE_PATTERN)),
+        Extractor("laugh", pattern=re.compile(r"w{3,}")),
+    ])
+    rows = [_row(1, "台中代表上香 wwww"), _row(2, "nothing here"), _row(3, None)]
+    assert sorted(_values(extractors.extract(rows))) == [("incense", "m1", "台中"), ("laugh", "m1", "wwww")]
+
+
+def test_combined_prefilter_matches_separate_extractors():
+    patterns = {
+        "incense": INCENSE_PATTERN,
+        "laugh": r"(w{3,}|笑死)",
+        "gg": r"(?i)\bgg\b",        # inline global flag: cannot be combined
+        "repeat": r"(\S)\1{4,}",      # backreference: always matched separately
+        "plus_one": r"\+1",
+    }
+    rows = [
+        _row(i, message) for i, message in enumerate([
+            "台中代表上香", "wwww 台北代表上香", "GG", "好好好好好", "+1", "笑死 +1", "nothing", "",
+        ])
+    ]
+    extractors = [Extractor(name, pattern=re.compile(p)) for name, p in patterns.items()]
+    separately = [ExtractorSet([e]).extract(rows) for e in extractors]
+    expected = sorted(v for mentions in separately for v in _values(mentions))
+
+    combined = ExtractorSet(extractors)
+    # "gg" breaks the combined regex, so nothing is prefiltered
+    assert combined.prefilter is None
+    assert sorted(_values(combined.extract(rows))) == expected
+
+    combinable = ExtractorSet([e for e in extractors if e.name != "gg"])
+    assert combinable.prefilter is not None
+    assert {e.name for e in combinable._always} == {"repeat"}
+    assert sorted(_values(combinable.extract(rows))) == sorted(v for v in expected if v[0] != "gg")
+
+
+def test_builtin_editor_extractor_reads_tracked_authors():
+    with patch('app.etl.processors.extractors.ETLConfig.get', return_value="UCeditor, UCother"):
+        editor = build_extractor("editor", "builtin", None)
+    rows = [_row(1, "hi", "UCeditor"), _row(2, "hi", "UCviewer")]
+    assert _values(ExtractorSet([editor]).extract(rows)) == [("editor", "m1", "UCeditor")]
+
+
+def test_unknown_builtin_and_invalid_pattern_are_skipped():
+    assert build_extractor("removed_builtin", "builtin", None) is None
+    assert build_extractor("broken", "regex", "(") is None
+
+
+def test_load_extractor_set_only_enabled_and_backfilled(no_extractors, db):
+    db.add_all([
+        MentionExtractor(name="ok", pattern="a+", backfilled_at=BASE),
+        MentionExtractor(name="broken", pattern="(", backfilled_at=BASE),
+        MentionExtractor(name="pending", pattern="b+"),
+        MentionExtractor(name="off", pattern="c+", backfilled_at=BASE, enabled=False),
+    ])
+    db.flush()
+    conn = db.connection()
+    assert load_extractor_set(conn).names == ["ok"]
+    assert load_extractor_set(conn, backfilled_only=False).names == ["ok", "pending"]
+
+
+def test_sync_builtin_extractors_creates_pending_rows(no_extractors, db):
+    sync_builtin_extractors(db.connection())
+    sync_builtin_extractors(db.connection())
+    rows = db.query(MentionExtractor).filter(MentionExtractor.kind == "builtin").all()
+    assert {r.name for r in rows} == set(BUILTIN_EXTRACTORS)
+    assert all(r.enabled and r.backfilled_at is None and r.pattern is None for r in rows)
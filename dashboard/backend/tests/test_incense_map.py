@@ -1,6 +1,7 @@
 """Tests for incense map router.
 
-Uses real PostgreSQL (hermes_test) to validate regexp_match SQL,
+Uses real PostgreSQL (hermes_test); without an incense extractor row the
+default pattern is matched against chat_messages,
 with get_current_video_id patched to return a known video_id.
 """
 import pytest
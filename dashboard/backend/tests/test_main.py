@@ -43,6 +43,8 @@ class TestAppConfiguration:
 class TestLifespan:
     """Tests for application lifespan events."""
 
+    @patch('main.stop_queue_runner')
+    @patch('main.start_queue_runner')
     @patch('main.shutdown_scheduler')
     @patch('main.start_scheduler')
     @patch('main.register_jobs')
@@ -52,22 +54,34 @@ class TestLifespan:
     @patch.dict('os.environ', {'DATABASE_URL': 'postgresql://test/db', 'ENABLE_ETL_SCHEDULER': 'true'})
     def test_lifespan_startup_with_scheduler(
         self, mock_get_db, mock_etl_config, mock_init_scheduler,
-        mock_register_jobs, mock_start_scheduler, mock_shutdown
+        mock_register_jobs, mock_start_scheduler, mock_shutdown,
+        mock_start_runner, mock_stop_runner
     ):
         """Test lifespan startup initializes scheduler when enabled."""
         mock_db_manager = MagicMock()
         mock_get_db.return_value = mock_db_manager
         
+        import main
+        main.ENABLE_ETL_SCHEDULER = True
         from main import app
         
         with TestClient(app):
             # Startup should have been called
             mock_db_manager.create_tables.assert_called()
+            mock_start_scheduler.assert_called_once_with()
+            mock_start_runner.assert_called_once()
+        mock_stop_runner.assert_called_once()
 
+    @patch('main.shutdown_scheduler')
+    @patch('main.start_scheduler')
+    @patch('main.init_scheduler')
+    @patch('main.start_queue_runner')
     @patch('main.get_db_manager')
-    @patch.dict('os.environ', {'ENABLE_ETL_SCHEDULER': 'false'})
-    def test_lifespan_startup_without_scheduler(self, mock_get_db):
-        """Test lifespan startup skips scheduler when disabled."""
+    @patch.dict('os.environ', {'DATABASE_URL': 'postgresql://test/db', 'ENABLE_ETL_SCHEDULER': 'false'})
+    def test_lifespan_startup_without_scheduler(
+        self, mock_get_db, mock_start_runner, mock_init_scheduler, mock_start_scheduler, mock_shutdown
+    ):
+        """Test lifespan startup leaves ETL to the worker when disabled."""
         mock_db_manager = MagicMock()
         mock_get_db.return_value = mock_db_manager
         
@@ -79,6 +93,9 @@ class TestLifespan:
         
         with TestClient(app):
             mock_db_manager.create_tables.assert_called()
+            # Attached to the jobstore only; queued jobs run in the ETL worker
+            mock_start_scheduler.assert_called_once_with(paused=True)
+            mock_start_runner.assert_not_called()
 
     @patch('main.get_db_manager')
     def test_lifespan_handles_db_error(self, mock_get_db):
@@ -0,0 +1,184 @@
+"""Tests for extracted mentions (extraction, backfill and the index-backed incense map)."""
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.models import ChatMessage, ProcessedChatMessage, MentionExtractor, ExtractedMention
+from app.etl.processors.mention_backfill import MentionBackfiller
+from app.services.mentions import mention_coverage
+
+VIDEO_ID = "mention_stream"
+BASE = datetime(2026, 2, 1, 10, 0, 0, tzinfo=timezone.utc)
+INCENSE_PATTERN = r'([一-鿿]{2,6})代表上香'
+
+
+def _add_message(db, i, message, published_at, processed=True):
+    db.add(ChatMessage(
+        message_id=f"men_{i}", live_stream_id=VIDEO_ID, message=message,
+        timestamp=int(published_at.timestamp() * 1000000), published_at=published_at,
+        author_name="User", author_id="user", message_type="text_message",
+    ))
+    if processed:
+        db.add(ProcessedChatMessage(
+            message_id=f"men_{i}", live_stream_id=VIDEO_ID, original_message=message,
+            processed_message=message, tokens=[], author_name="User",
+            author_id="user", published_at=published_at,
+        ))
+
+
+@pytest.fixture
+def incense(db):
+    """Incense messages 10:00 ~ 10:50; the ETL has processed everything up to 10:30."""
+    # Integration tests elsewhere commit ETL state; start from a clean slate
+    db.execute(text("DELETE FROM processed_chat_messages"))
+    db.execute(text("DELETE FROM processed_chat_checkpoint"))
+    db.execute(text("DELETE FROM mention_extractors"))
+    texts = ["台中代表上香\\|/", "高雄代表上香", "上香", "台中代表上香!", "其他訊息", "台北代表上香"]
+    for i, message in enumerate(texts):
+        published_at = BASE + timedelta(minutes=10 * i)
+        _add_message(db, i, message, published_at, processed=i <= 3)
+    db.execute(text("""
+        INSERT INTO processed_chat_checkpoint (last_processed_message_id, last_processed_timestamp)
+        VALUES ('men_3', :ts)
+    """), {"ts": BASE + timedelta(minutes=30)})
+    extractor = MentionExtractor(name="incense", pattern=INCENSE_PATTERN)
+    db.add(extractor)
+    db.flush()
+    return extractor
+
+
+@pytest.fixture
+def backfiller(db):
+    # Share the test transaction so mention rows roll back with the test
+    return MentionBackfiller(database_url="postgresql://unused/db", engine=db.connection())
+
+
+def _candidates(client, **params):
+    with patch('app.routers.incense_map.get_current_video_id', return_value=VIDEO_ID):
+        response = client.get("/api/incense-map/candidates", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_backfill_extracts_processed_messages(incense, backfiller, db):
+    assert mention_coverage(db, "incense") is None
+
+    result = backfiller.backfill_pending()
+    # incense and the builtin editor extractor (no tracked authors configured)
+    assert result == {'extractors_backfilled': 2, 'messages_scanned': 4, 'mentions_written': 3}
+
+    db.refresh(incense)
+    assert incense.backfilled_at is not None
+    assert mention_coverage(db, "incense") == BASE + timedelta(minutes=30)
+    values = sorted(m.value for m in db.query(ExtractedMention).filter_by(extractor="incense"))
+    assert values == ["台中", "台中", "高雄"]
+    assert backfiller.backfill_pending()["extractors_backfilled"] == 0
+
+
+def test_backfill_drops_extractor_edited_meanwhile(incense, backfiller, db):
+    real_advance = MentionBackfiller._advance_cursors
+
+    def edit_then_advance(session, active, cursor):
+        # What PUT /api/admin/extractors/incense does
+        session.execute(text("""
+            UPDATE mention_extractors
+            SET pattern = '(台中)', backfill_cursor = NULL, updated_at = NOW() + interval '1 second'
+            WHERE name = 'incense'
+        """))
+        return real_advance(session, active, cursor)
+
+    with patch.object(MentionBackfiller, "_advance_cursors", staticmethod(edit_then_advance)):
+        backfiller.backfill_pending()
+
+    db.refresh(incense)
+    assert incense.backfilled_at is None and incense.backfill_cursor is None
+
+    # The next run starts over with the new pattern
+    assert backfiller.backfill_pending()["extractors_backfilled"] == 1
+    values = sorted(m.value for m in db.query(ExtractedMention).filter_by(extractor="incense"))
+    assert values == ["台中", "台中"]
+
+
+def test_backfill_resumes_from_cursor(incense, backfiller, db):
+    # A second day of processed messages: the backfill takes two windows
+    _add_message(db, 10, "高雄代表上香", BASE + timedelta(days=1, minutes=5))
+    db.flush()
+    real_advance = MentionBackfiller._advance_cursors
+
+    def interrupt_after_first_window(session, active, cursor):
+        real_advance(session, active, cursor)
+        session.commit()
+        raise RuntimeError("worker stopped")
+
+    with patch.object(MentionBackfiller, "_advance_cursors", staticmethod(interrupt_after_first_window)):
+        with pytest.raises(RuntimeError):
+            backfiller.backfill_pending()
+
+    db.refresh(incense)
+    assert incense.backfilled_at is None
+    assert incense.backfill_cursor == BASE + timedelta(days=1)
+    assert db.query(ExtractedMention).filter_by(extractor="incense").count() == 3
+
+    result = backfiller.backfill_pending()
+    assert result["messages_scanned"] == 1  # only the second window
+    db.refresh(incense)
+    assert incense.backfilled_at is not None and incense.backfill_cursor is None
+    assert db.query(ExtractedMention).filter_by(extractor="incense").count() == 4
+
+
+def test_candidates_from_index_match_full_scan(client, incense, backfiller, db):
+    scanned = _candidates(client)
+    assert scanned["total_matched"] == 4
+
+    backfiller.backfill_pending()
+    db.expire_all()
+    # Processed messages come from extracted_mentions, the 10:50 tail from chat_messages
+    indexed = _candidates(client)
+    assert indexed == scanned
+    assert {c["word"]: c["count"] for c in indexed["candidates"]} == {"台中": 2, "高雄": 1, "台北": 1}
+
+
+def test_candidates_time_filter_spans_index_and_tail(client, incense, backfiller, db):
+    backfiller.backfill_pending()
+    db.expire_all()
+    data = _candidates(client, start_time="2026-02-01T10:10:00+00:00", end_time="2026-02-01T10:50:00+00:00")
+    assert {c["word"]: c["count"] for c in data["candidates"]} == {"台中": 1, "高雄": 1, "台北": 1}
+
+
+def test_candidates_use_the_stored_pattern(client, incense, backfiller, db):
+    backfiller.backfill_pending()
+    # What PUT /api/admin/extractors/incense does: the extractor is pending until backfilled again
+    db.execute(text("""
+        UPDATE mention_extractors
+        SET pattern = '(台北|高雄)代表上香', backfilled_at = NULL, backfill_cursor = NULL
+        WHERE name = 'incense'
+    """))
+    db.expire_all()
+    assert {c["word"]: c["count"] for c in _candidates(client)["candidates"]} == {"高雄": 1, "台北": 1}
+
+    backfiller.backfill_pending()
+    db.expire_all()
+    # Covered range from extracted_mentions, 10:50 tail matched with the same pattern
+    assert {c["word"]: c["count"] for c in _candidates(client)["candidates"]} == {"高雄": 1, "台北": 1}
+
+
+def test_candidates_prefilter_the_raw_tail_in_sql(client, incense, db):
+    # Not backfilled yet: the stored pattern is pushed into the chat_messages query
+    from app.routers.incense_map import _raw_prefilter, _incense_extractor
+
+    assert _raw_prefilter(db, _incense_extractor(db)) == " AND message ~ :pattern"
+    assert _candidates(client)["total_matched"] == 4
+
+
+def test_candidates_pending_python_only_pattern_is_409(client, incense, backfiller, db):
+    db.execute(text("UPDATE mention_extractors SET pattern = '(?P<city>台北|高雄)代表上香' WHERE name = 'incense'"))
+    db.expire_all()
+    with patch('app.routers.incense_map.get_current_video_id', return_value=VIDEO_ID):
+        assert client.get("/api/incense-map/candidates").status_code == 409
+
+    # Once backfilled only the short tail is matched in Python
+    backfiller.backfill_pending()
+    db.expire_all()
+    assert {c["word"]: c["count"] for c in _candidates(client)["candidates"]} == {"高雄": 1, "台北": 1}
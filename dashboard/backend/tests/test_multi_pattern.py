@@ -0,0 +1,49 @@
+"""Tests for the Aho-Corasick multi-pattern matcher."""
+import random
+
+import pytest
+
+from app.services.multi_pattern import GroupMatcher, MultiPatternMatcher
+
+
+def test_finds_overlapping_and_nested_patterns():
+    matcher = MultiPatternMatcher(["哈哈", "哈哈哈", "he", "she", "hers"])
+    found = matcher.find("ushers 哈哈哈")
+    assert {matcher.patterns[i] for i in found} == {"哈哈", "哈哈哈", "he", "she", "hers"}
+
+
+def test_no_match_returns_empty():
+    matcher = MultiPatternMatcher(["abc"])
+    assert matcher.find("ab bc") == frozenset()
+    assert matcher.find("") == frozenset()
+
+
+def test_empty_pattern_matches_everything():
+    matcher = MultiPatternMatcher(["", "x"])
+    assert matcher.find("yyy") == {0}
+    assert matcher.find("x") == {0, 1}
+
+
+@pytest.mark.parametrize("seed", [7, 8])
+def test_matches_naive_substring_search(seed):
+    rng = random.Random(seed)
+    alphabet = "ab哈c"
+    patterns = list({"".join(rng.choices(alphabet, k=rng.randint(1, 4))) for _ in range(30)})
+    matcher = MultiPatternMatcher(patterns)
+    for _ in range(200):
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, 20)))
+        expected = {i for i, p in enumerate(patterns) if p in text}
+        assert matcher.find(text) == expected
+
+
+def test_group_matcher_applies_include_and_exclude():
+    matcher = GroupMatcher([
+        (1, ["Holo", "cover"], None),
+        (2, ["holo"], ["cover"]),
+        (3, [], ["holo"]),
+    ])
+    assert matcher.match("HOLO live") == {1, 2}
+    assert matcher.match("holo cover") == {1}
+    assert matcher.match("nothing") == set()
+    assert not matcher.empty
+    assert GroupMatcher([(1, [], None)]).empty
@@ -0,0 +1,18 @@
+"""Tests for keyset pagination cursors."""
+import pytest
+from datetime import datetime, timezone
+
+from app.services.pagination import encode_cursor, decode_cursor
+
+
+def test_cursor_roundtrip():
+    ts = datetime(2026, 1, 12, 10, 0, 0, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(ts, "msg/with=odd+chars")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (ts, "msg/with=odd+chars")
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", "W10", "bm90IGpzb24"])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
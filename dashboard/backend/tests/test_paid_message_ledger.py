@@ -0,0 +1,98 @@
+"""Tests for paid_message_ledger, kept in sync by database triggers."""
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.models import ChatMessage, CurrencyRate, PaidMessageLedger
+
+PUBLISHED_AT = datetime(2026, 5, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _paid(message_id, currency, amount, message_type="paid_message", author_id="payer"):
+    return ChatMessage(
+        message_id=message_id,
+        live_stream_id="ledger_stream",
+        message="thanks",
+        timestamp=int(PUBLISHED_AT.timestamp() * 1000000),
+        published_at=PUBLISHED_AT,
+        author_name="Payer",
+        author_id=author_id,
+        message_type=message_type,
+        raw_data={"money": {"currency": currency, "amount": amount}},
+    )
+
+
+def _ledger(db):
+    db.expire_all()
+    return {row.message_id: row for row in db.query(PaidMessageLedger)}
+
+
+def test_paid_messages_are_parsed_at_insert(db, sample_currency_rates):
+    db.add_all([
+        _paid("usd", "USD", "$1,000.50"),
+        _paid("ticker", "JPY", "500", message_type="ticker_paid_message_item"),
+        _paid("eur", "EUR", "20"),
+        _paid("bad_amount", "USD", "n/a"),
+        _paid("not_paid", "USD", "10", message_type="text_message"),
+    ])
+    db.flush()
+
+    ledger = _ledger(db)
+    assert set(ledger) == {"usd", "ticker", "eur"}
+    assert ledger["usd"].amount == Decimal("1000.50")
+    assert ledger["usd"].amount_twd == Decimal("1000.50") * Decimal("31.5")
+    assert ledger["ticker"].amount_twd == Decimal("105")
+    # No rate yet: tracked as unknown
+    assert ledger["eur"].amount_twd is None
+
+
+def test_rate_changes_re_derive_twd_amounts(client, db, sample_currency_rates):
+    db.add_all([_paid("eur", "EUR", "20"), _paid("usd", "USD", "10")])
+    db.flush()
+
+    unknown = client.get("/api/admin/currency-rates/unknown").json()
+    assert unknown["unknown_currencies"] == [{"currency": "EUR", "message_count": 1}]
+
+    db.add(CurrencyRate(currency="EUR", rate_to_twd=35.0))
+    db.query(CurrencyRate).filter(CurrencyRate.currency == "USD").update({"rate_to_twd": 30.0})
+    db.flush()
+
+    ledger = _ledger(db)
+    assert ledger["eur"].amount_twd == Decimal("700")
+    assert ledger["usd"].amount_twd == Decimal("300")
+    assert client.get("/api/admin/currency-rates/unknown").json()["total"] == 0
+
+    db.query(CurrencyRate).filter(CurrencyRate.currency == "EUR").delete()
+    db.flush()
+    assert _ledger(db)["eur"].amount_twd is None
+
+
+def test_message_updates_keep_ledger_in_sync(db, sample_currency_rates):
+    message = _paid("edited", "USD", "10")
+    db.add(message)
+    db.flush()
+
+    message.raw_data = {"money": {"currency": "TWD", "amount": "75"}}
+    db.flush()
+    assert _ledger(db)["edited"].amount_twd == Decimal("75")
+
+    message = db.get(ChatMessage, "edited")
+    message.message_type = "text_message"
+    db.flush()
+    assert _ledger(db) == {}
+
+
+def test_money_summary_reads_ledger(client, db, sample_currency_rates):
+    db.add_all([
+        _paid("a1", "USD", "10", author_id="a"),
+        _paid("a2", "TWD", "100", author_id="a"),
+        _paid("b1", "EUR", "5", author_id="b"),
+    ])
+    db.flush()
+
+    data = client.get("/api/stats/money-summary").json()
+    assert data["total_amount_twd"] == 415.0
+    assert data["paid_message_count"] == 2
+    assert data["top_authors"] == [
+        {"author_id": "a", "author": "Payer", "amount_twd": 415.0, "message_count": 2},
+    ]
+    assert data["unknown_currencies"] == ["EUR"]
@@ -0,0 +1,134 @@
+"""Tests for monthly partitions of chat_messages / processed_chat_messages."""
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import text
+
+from app.etl.processors.partition_manager import (
+    PartitionManager,
+    create_monthly_partition,
+    month_starts,
+)
+from app.etl.tasks import run_maintain_partitions
+from app.models import ChatMessage, ProcessedChatMessage
+from app.services.query_guard import explain_plan
+
+MONTHS = [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)]
+
+
+def _scanned_tables(plan):
+    """Partitions a plan reads, from EXPLAIN (FORMAT JSON)."""
+    tables = {plan["Relation Name"]} if "Relation Name" in plan else set()
+    for child in plan.get("Plans", []):
+        tables |= _scanned_tables(child)
+    return tables
+
+
+def _message(i, published_at, stream="s"):
+    return ChatMessage(
+        message_id=f"part_{i}", live_stream_id=stream, message="m", timestamp=i,
+        published_at=published_at, author_name="a", author_id="a", message_type="text_message",
+    )
+
+
+@pytest.fixture
+def partitioned(db):
+    """Jan ~ Mar 2026 partitions, each with a message and its processed row."""
+    for table in ("chat_messages", "processed_chat_messages"):
+        for month in MONTHS:
+            create_monthly_partition(db, table, month)
+    for i, month in enumerate(MONTHS):
+        published_at = datetime(month.year, month.month, 15, tzinfo=timezone.utc)
+        db.add(_message(i, published_at))
+        db.add(ProcessedChatMessage(
+            message_id=f"part_{i}", live_stream_id="s", original_message="m", processed_message="m",
+            tokens=["m"], author_name="a", author_id="a", published_at=published_at,
+        ))
+    db.flush()
+    return db
+
+
+def test_month_starts_rolls_over_year():
+    assert month_starts(date(2026, 11, 20), 3) == [date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1)]
+
+
+def test_rows_are_routed_by_month(partitioned):
+    rows = partitioned.execute(text(
+        "SELECT message_id, tableoid::regclass::text FROM chat_messages ORDER BY message_id"
+    )).fetchall()
+    assert rows == [
+        ("part_0", "chat_messages_2026_01"),
+        ("part_1", "chat_messages_2026_02"),
+        ("part_2", "chat_messages_2026_03"),
+    ]
+
+
+@pytest.mark.parametrize("table", ["chat_messages", "processed_chat_messages"])
+def test_time_range_prunes_to_one_partition(partitioned, table):
+    plan = explain_plan(partitioned, f"""
+        SELECT COUNT(*) FROM {table}
+        WHERE live_stream_id = :stream AND published_at >= :start AND published_at < :end
+    """, {
+        "stream": "s",
+        "start": datetime(2026, 2, 10, tzinfo=timezone.utc),
+        "end": datetime(2026, 2, 20, tzinfo=timezone.utc),
+    })
+    assert _scanned_tables(plan) == {f"{table}_2026_02"}
+
+
+def test_range_across_month_boundary_reads_both_months(partitioned):
+    plan = explain_plan(partitioned, "SELECT * FROM chat_messages WHERE published_at BETWEEN :start AND :end", {
+        "start": datetime(2026, 1, 31, 20, tzinfo=timezone.utc),
+        "end": datetime(2026, 2, 1, 4, tzinfo=timezone.utc),
+    })
+    assert _scanned_tables(plan) == {"chat_messages_2026_01", "chat_messages_2026_02"}
+
+
+def test_orm_lookup_by_message_id(partitioned):
+    partitioned.expire_all()
+    assert partitioned.get(ChatMessage, "part_1").published_at.month == 2
+
+
+def test_new_partition_takes_rows_from_default(partitioned):
+    partitioned.add(_message(9, datetime(2026, 4, 2, tzinfo=timezone.utc)))
+    partitioned.flush()
+    where = text("SELECT tableoid::regclass::text FROM chat_messages WHERE message_id = 'part_9'")
+    assert partitioned.execute(where).scalar() == "chat_messages_default"
+
+    assert create_monthly_partition(partitioned, "chat_messages", date(2026, 4, 1)) == "chat_messages_2026_04"
+    assert partitioned.execute(where).scalar() == "chat_messages_2026_04"
+    assert create_monthly_partition(partitioned, "chat_messages", date(2026, 4, 1)) is None
+
+
+def test_partition_manager_creates_months_ahead(db):
+    manager = PartitionManager(database_url="postgresql://unused/db")
+    # Share the test transaction so the partitions roll back with the test
+    manager._engine = db.connection()
+
+    with patch('app.etl.processors.partition_manager.ETLConfig.get', return_value=2):
+        result = manager.run(today=date(2031, 5, 20))
+        assert result["status"] == "completed"
+        assert result["created"] == [
+            f"{table}_{month}"
+            for table in ("chat_messages", "processed_chat_messages")
+            for month in ("2031_05", "2031_06", "2031_07")
+        ]
+        assert result["default_rows"] == {"chat_messages": 0, "processed_chat_messages": 0}
+
+        assert manager.run(today=date(2031, 5, 21))["partitions_created"] == 0
+
+
+@patch('app.etl.tasks.update_etl_log_status')
+@patch('app.etl.tasks.create_etl_log', return_value=42)
+@patch('app.etl.processors.partition_manager.PartitionManager')
+def test_run_maintain_partitions_logs_result(mock_manager_class, mock_create, mock_update):
+    mock_manager_class.return_value = MagicMock(run=MagicMock(return_value={
+        'status': 'completed', 'partitions_created': 2,
+    }))
+
+    result = run_maintain_partitions()
+
+    assert result['partitions_created'] == 2
+    mock_create.assert_called_once_with('maintain_partitions', 'scheduled')
+    mock_update.assert_called_once_with(42, 'completed', records_processed=2, error_message=None)
@@ -0,0 +1,272 @@
+"""Tests for the playback snapshot cache (service, ETL builder and cached endpoints)."""
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from app.models import (
+    ChatMessage, ProcessedChatMessage, StreamStats, CurrencyRate,
+    SystemSetting, LiveStream, PlaybackSnapshotCache,
+)
+from app.etl.processors.playback_cache import PlaybackCacheBuilder
+from app.services.playback_cache import (
+    KIND_STATS,
+    KIND_WORDCLOUD,
+    encode_payload,
+    decode_payload,
+    etag_matches,
+    resample_timeline,
+    invalidate_playback_cache,
+)
+
+VIDEO_ID = "cachevid001"
+STREAM_START = datetime(2024, 3, 1, 9, 40, 0, tzinfo=timezone.utc)
+
+
+# ============ Service helpers ============
+
+def test_payload_roundtrip():
+    snapshots = [{"timestamp": "2024-01-01T00:00:00+00:00", "words": [{"word": "草", "size": 3}]}]
+    payload = encode_payload(snapshots)
+    assert isinstance(payload, bytes)
+    assert decode_payload(payload) == snapshots
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_resample_timeline_picks_stride():
+    start = datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc)
+    timeline = [
+        {"timestamp": (start + timedelta(minutes=i)).isoformat(), "value": i}
+        for i in range(10)
+    ]
+    result = resample_timeline(
+        timeline, start, 60,
+        start + timedelta(minutes=2), start + timedelta(minutes=9), 180,
+    )
+    assert [s["value"] for s in result] == [2, 5, 8]
+    assert result[0]["timestamp"] == (start + timedelta(minutes=2)).isoformat()
+
+
+# ============ Builder + endpoints ============
+
+@pytest.fixture
+def finished_stream(db):
+    """A finished stream spanning 09:40 ~ 11:20 with chat, paid messages and tokens."""
+    db.add(SystemSetting(key="youtube_url", value=f"https://www.youtube.com/watch?v={VIDEO_ID}"))
+    db.add(LiveStream(video_id=VIDEO_ID, title="Finished", live_broadcast_content="none"))
+    db.add(CurrencyRate(currency="TWD", rate_to_twd=1.0))
+    db.add(CurrencyRate(currency="USD", rate_to_twd=31.5))
+
+    for i in range(0, 100, 5):
+        db.add(StreamStats(
+            live_stream_id=VIDEO_ID,
+            concurrent_viewers=1000 + i,
+            collected_at=STREAM_START + timedelta(minutes=i, seconds=10),
+        ))
+
+    words = ["草", "好", "讚", "哈哈", "笑死"]
+    for i in range(200):
+        pub = STREAM_START + timedelta(seconds=17 + i * 29)
+        is_paid = i % 23 == 0
+        db.add(ChatMessage(
+            message_id=f"cache_msg_{i}",
+            live_stream_id=VIDEO_ID,
+            message=f"message {i}",
+            timestamp=int(pub.timestamp() * 1000000),
+            published_at=pub,
+            author_name=f"User{i % 7}",
+            author_id=f"user_{i % 7}",
+            message_type="paid_message" if is_paid else "text_message",
+            raw_data={"money": {"currency": "USD" if i % 2 else "TWD", "amount": "1,000.50"}} if is_paid else None,
+        ))
+        db.add(ProcessedChatMessage(
+            message_id=f"cache_msg_{i}",
+            live_stream_id=VIDEO_ID,
+            original_message=f"message {i}",
+            processed_message=f"message {i}",
+            tokens=[words[i % 5], words[(i * 3) % 5], "!"],
+            author_name=f"User{i % 7}",
+            author_id=f"user_{i % 7}",
+            published_at=pub,
+        ))
+    db.flush()
+    return db
+
+
+@pytest.fixture
+def builder(db):
+    b = PlaybackCacheBuilder(database_url="postgresql://unused/db")
+    # Share the test transaction so cached rows roll back with the test
+    b._engine = db.connection()
+    return b
+
+
+def _get(client, path, **params):
+    return client.get(path, params=params)
+
+
+def test_build_stream_materializes_all_timelines(finished_stream, builder, db):
+    built = builder.build_stream(VIDEO_ID)
+
+    assert built == len(PlaybackCacheBuilder.expected_keys())
+    entries = db.query(PlaybackSnapshotCache).filter_by(live_stream_id=VIDEO_ID).all()
+    assert {(e.kind, e.step_seconds, e.window_hours) for e in entries} == PlaybackCacheBuilder.expected_keys()
+
+    stats_60 = next(e for e in entries if e.kind == KIND_STATS and e.step_seconds == 60)
+    assert stats_60.start_time == STREAM_START
+    assert stats_60.snapshot_count == len(decode_payload(stats_60.payload))
+
+    # Second run has nothing left to build
+    assert builder.build_stream(VIDEO_ID) == 0
+
+
+@pytest.mark.parametrize("start_offset,duration,step", [
+    (timedelta(0), timedelta(minutes=95), 60),
+    (timedelta(minutes=7), timedelta(minutes=80), 120),
+    (timedelta(minutes=20), timedelta(minutes=75), 300),
+    (timedelta(minutes=25), timedelta(minutes=60), 900),
+])
+def test_cached_stats_match_live(client, finished_stream, builder, start_offset, duration, step):
+    start = STREAM_START + start_offset
+    params = dict(
+        start_time=start.isoformat(),
+        end_time=(start + duration).isoformat(),
+        step_seconds=step,
+    )
+    live = _get(client, "/api/playback/snapshots", **params).json()
+    assert live["metadata"]["cached"] is False
+
+    builder.build_stream(VIDEO_ID)
+    response = _get(client, "/api/playback/snapshots", **params)
+    cached = response.json()
+
+    assert response.headers.get("etag")
+    assert cached["metadata"]["cached"] is True
+    assert cached["snapshots"] == live["snapshots"]
+
+
+@pytest.mark.parametrize("window_hours,step,word_limit", [
+    (1, 60, 10),
+    (4, 300, 30),
+    (1, 600, 100),
+])
+def test_cached_wordcloud_matches_live(client, finished_stream, builder, window_hours, step, word_limit):
+    start = STREAM_START + timedelta(minutes=10)
+    params = dict(
+        start_time=start.isoformat(),
+        end_time=(start + timedelta(minutes=70)).isoformat(),
+        step_seconds=step,
+        window_hours=window_hours,
+        word_limit=word_limit,
+    )
+    live = _get(client, "/api/playback/word-frequency-snapshots", **params).json()
+
+    builder.build_stream(VIDEO_ID)
+    cached = _get(client, "/api/playback/word-frequency-snapshots", **params).json()
+
+    assert cached["metadata"]["cached"] is True
+    assert cached["snapshots"] == live["snapshots"]
+
+
+def test_cached_wordcloud_streams_ndjson(client, finished_stream, builder):
+    import json
+
+    builder.build_stream(VIDEO_ID)
+    params = dict(
+        start_time=STREAM_START.isoformat(),
+        end_time=(STREAM_START + timedelta(hours=1)).isoformat(),
+        step_seconds=300,
+        window_hours=1,
+    )
+    full = _get(client, "/api/playback/word-frequency-snapshots", **params).json()
+    response = _get(client, "/api/playback/word-frequency-snapshots", format="ndjson", **params)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers.get("etag")
+    assert lines[0]["cached"] is True
+    assert [{k: v for k, v in l.items() if k != "type"} for l in lines[1:]] == full["snapshots"]
+
+
+def test_cached_response_not_modified(client, finished_stream, builder):
+    builder.build_stream(VIDEO_ID)
+    params = dict(
+        start_time=STREAM_START.isoformat(),
+        end_time=(STREAM_START + timedelta(hours=1)).isoformat(),
+        step_seconds=300,
+    )
+    first = _get(client, "/api/playback/snapshots", **params)
+    etag = first.headers["etag"]
+
+    second = client.get("/api/playback/snapshots", params=params, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+
+
+def test_cache_bypassed_for_unaligned_or_filtered_requests(client, finished_stream, builder):
+    builder.build_stream(VIDEO_ID)
+
+    # Start time not on the 60s grid
+    unaligned = _get(
+        client, "/api/playback/snapshots",
+        start_time=(STREAM_START + timedelta(seconds=30)).isoformat(),
+        end_time=(STREAM_START + timedelta(hours=1)).isoformat(),
+        step_seconds=300,
+    )
+    assert unaligned.json()["metadata"]["cached"] is False
+
+    # Range extends past the end of the stream
+    beyond = _get(
+        client, "/api/playback/snapshots",
+        start_time=STREAM_START.isoformat(),
+        end_time=(STREAM_START + timedelta(hours=5)).isoformat(),
+        step_seconds=300,
+    )
+    assert beyond.json()["metadata"]["cached"] is False
+
+    # Custom exclusions are not materialized
+    filtered = _get(
+        client, "/api/playback/word-frequency-snapshots",
+        start_time=STREAM_START.isoformat(),
+        end_time=(STREAM_START + timedelta(hours=1)).isoformat(),
+        step_seconds=300,
+        exclude_words="草",
+    )
+    assert filtered.json()["metadata"]["cached"] is False
+
+
+def test_currency_update_invalidates_stats_cache(admin_client, finished_stream, builder, db):
+    builder.build_stream(VIDEO_ID)
+
+    response = admin_client.post(
+        "/api/admin/currency-rates",
+        json={"currency": "USD", "rate_to_twd": 32.0, "notes": ""},
+    )
+    assert response.status_code == 200
+
+    kinds = {e.kind for e in db.query(PlaybackSnapshotCache).filter_by(live_stream_id=VIDEO_ID)}
+    assert kinds == {KIND_WORDCLOUD}
+
+
+def test_invalidate_playback_cache_all(finished_stream, builder, db):
+    builder.build_stream(VIDEO_ID)
+    deleted = invalidate_playback_cache(db)
+    assert deleted == len(PlaybackCacheBuilder.expected_keys())
+
+
+@patch('app.etl.processors.playback_cache.ETLConfig')
+def test_run_skipped_when_disabled(mock_config):
+    mock_config.get.side_effect = lambda key, default=None: {
+        'DATABASE_URL': 'postgresql://test/db',
+        'PLAYBACK_CACHE_ENABLED': False,
+    }.get(key, default)
+
+    result = PlaybackCacheBuilder().run()
+
+    assert result == {'status': 'skipped', 'reason': 'playback_cache_disabled'}
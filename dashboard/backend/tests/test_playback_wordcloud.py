@@ -8,6 +8,14 @@ from unittest.mock import patch, MagicMock
 from datetime import datetime, timezone, timedelta
 
 
+def _data_queries(mock_db):
+    """execute() calls that fetched word rows (not the timeout / EXPLAIN guard statements)."""
+    return [
+        c for c in mock_db.execute.call_args_list
+        if "unnest(tokens)" in str(c.args[0]) and "EXPLAIN" not in str(c.args[0])
+    ]
+
+
 def _make_mock_result(rows):
     """Create a mock DB result that supports both iteration and fetchall."""
     mock_result = MagicMock()
@@ -101,7 +109,7 @@ class TestWordFrequencySnapshots:
         with patch('app.routers.playback_wordcloud.get_current_video_id', return_value=None):
             mock_result = _make_mock_result([])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -111,8 +119,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -131,9 +139,9 @@ class TestWordFrequencySnapshots:
                 assert all(len(s["words"]) == 0 for s in data["snapshots"])
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_with_word_data(self, client):
         """Test endpoint returns word frequency data correctly."""
@@ -150,7 +158,7 @@ class TestWordFrequencySnapshots:
                 ("msg1", pub, "讚"),
             ])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -160,8 +168,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -186,9 +194,9 @@ class TestWordFrequencySnapshots:
                 assert words[0] == {"word": "哈哈", "size": 3}
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_excludes_punctuation(self, client):
         """Test endpoint excludes punctuation from results."""
@@ -202,7 +210,7 @@ class TestWordFrequencySnapshots:
                 ("msg1", pub, "好"),
             ])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -212,8 +220,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -233,9 +241,9 @@ class TestWordFrequencySnapshots:
                 assert "。" not in words
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_with_custom_exclude_words(self, client):
         """Test endpoint with custom exclude_words parameter."""
@@ -248,7 +256,7 @@ class TestWordFrequencySnapshots:
                 ("msg1", pub, "讚"),
             ])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -258,8 +266,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -279,9 +287,9 @@ class TestWordFrequencySnapshots:
                 assert "讚" in words
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_with_wordlist_id(self, client, db):
         """Test endpoint with wordlist_id parameter."""
@@ -305,7 +313,7 @@ class TestWordFrequencySnapshots:
                 ("msg1", pub, "讚"),
             ])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             # Create a mock db that returns the real wordlist but mocks the text query
@@ -316,8 +324,8 @@ class TestWordFrequencySnapshots:
                 mock_db.query.return_value.filter.return_value.first.return_value = wordlist
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -338,16 +346,16 @@ class TestWordFrequencySnapshots:
                 assert "讚" in words
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_metadata_response(self, client):
         """Test metadata in response is correct."""
         with patch('app.routers.playback_wordcloud.get_current_video_id', return_value="video123"):
             mock_result = _make_mock_result([])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -357,8 +365,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -382,14 +390,14 @@ class TestWordFrequencySnapshots:
                 assert meta["total_snapshots"] == 7  # 60 min / 10 min + 1
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_database_error_handling(self, client):
         """Test endpoint handles database errors gracefully."""
         with patch('app.routers.playback_wordcloud.get_current_video_id', return_value=None):
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -399,8 +407,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -415,9 +423,9 @@ class TestWordFrequencySnapshots:
                 assert "detail" in response.json()
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_sliding_window_words_enter_and_leave(self, client):
         """Verify words appear/disappear as the sliding window moves."""
@@ -435,7 +443,7 @@ class TestWordFrequencySnapshots:
                 ("msg2", late, "late_word"),
             ])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -445,8 +453,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -473,16 +481,16 @@ class TestWordFrequencySnapshots:
                 assert "late_word" in words_1
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
 
     def test_single_query_execution(self, client):
         """Assert db.execute is called exactly once (not per-snapshot)."""
         with patch('app.routers.playback_wordcloud.get_current_video_id', return_value=None):
             mock_result = _make_mock_result([])
 
-            from app.core.database import get_db
+            from app.core.database import get_read_db
             from main import app
 
             mock_db = MagicMock()
@@ -492,8 +500,8 @@ class TestWordFrequencySnapshots:
             def mock_db_override():
                 yield mock_db
 
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_read_db)
+            app.dependency_overrides[get_read_db] = mock_db_override
 
             try:
                 response = client.get(
@@ -505,10 +513,126 @@ class TestWordFrequencySnapshots:
                     }
                 )
                 assert response.status_code == 200
-                # Only 1 execute call regardless of snapshot count
-                assert mock_db.execute.call_count == 1
+                # Only 1 word query regardless of snapshot count
+                assert len(_data_queries(mock_db)) == 1
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_read_db] = original_override
                 else:
-                    app.dependency_overrides.pop(get_db, None)
+                    app.dependency_overrides.pop(get_read_db, None)
+
+
+class TestWordFrequencySnapshotFormats:
+    """Tests for the ndjson streaming format and columnar encoding."""
+
+    PARAMS = {
+        "start_time": "2024-01-02T10:00:00",
+        "end_time": "2024-01-02T10:05:00",
+        "step_seconds": 300,
+        "window_hours": 1,
+    }
+
+    @pytest.fixture
+    def word_db(self):
+        """Override get_read_db with a mock returning words that change between snapshots."""
+        from app.core.database import get_read_db
+        from main import app
+
+        early = datetime(2024, 1, 2, 9, 2, 0, tzinfo=timezone.utc)
+        late = datetime(2024, 1, 2, 10, 1, 0, tzinfo=timezone.utc)
+        mock_db = MagicMock()
+        mock_db.execute.return_value = _make_mock_result([
+            ("msg1", early, "哈哈"),
+            ("msg2", early, "哈哈"),
+            ("msg2", early, "好"),
+            ("msg3", late, "讚"),
+            ("msg4", late, "哈哈"),
+        ])
+        mock_db.query.return_value.filter.return_value.first.return_value = None
+
+        def mock_db_override():
+            yield mock_db
+
+        original_override = app.dependency_overrides.get(get_read_db)
+        app.dependency_overrides[get_read_db] = mock_db_override
+        with patch('app.routers.playback_wordcloud.get_current_video_id', return_value=None):
+            yield mock_db
+        if original_override:
+            app.dependency_overrides[get_read_db] = original_override
+        else:
+            app.dependency_overrides.pop(get_read_db, None)
+
+    def _ndjson_lines(self, response):
+        import json
+        return [json.loads(line) for line in response.text.splitlines() if line]
+
+    def test_ndjson_streams_metadata_then_snapshots(self, client, word_db):
+        full = client.get("/api/playback/word-frequency-snapshots", params=self.PARAMS).json()
+
+        response = client.get(
+            "/api/playback/word-frequency-snapshots",
+            params={**self.PARAMS, "format": "ndjson"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = self._ndjson_lines(response)
+        assert lines[0]["type"] == "metadata"
+        assert lines[0]["total_snapshots"] == 2
+        assert lines[0]["encoding"] == "full"
+
+        snapshots = [{k: v for k, v in line.items() if k != "type"} for line in lines[1:]]
+        assert all(line["type"] == "snapshot" for line in lines[1:])
+        assert snapshots == full["snapshots"]
+        assert len(_data_queries(word_db)) == 2
+
+    def test_columnar_json_matches_full(self, client, word_db):
+        full = client.get("/api/playback/word-frequency-snapshots", params=self.PARAMS).json()
+        response = client.get(
+            "/api/playback/word-frequency-snapshots",
+            params={**self.PARAMS, "encoding": "columnar"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+
+        table = data["word_table"]
+        assert len(table) == len(set(table))
+        assert data["metadata"]["encoding"] == "columnar"
+        decoded = [
+            {
+                "timestamp": s["timestamp"],
+                "words": [{"word": table[i], "size": c} for i, c in zip(s["word_ids"], s["sizes"])],
+            }
+            for s in data["snapshots"]
+        ]
+        assert decoded == full["snapshots"]
+
+    def test_columnar_ndjson_builds_word_table_incrementally(self, client, word_db):
+        full = client.get("/api/playback/word-frequency-snapshots", params=self.PARAMS).json()
+        response = client.get(
+            "/api/playback/word-frequency-snapshots",
+            params={**self.PARAMS, "format": "ndjson", "encoding": "columnar"},
+        )
+        lines = self._ndjson_lines(response)[1:]
+
+        table = []
+        decoded = []
+        for line in lines:
+            table.extend(line["new_words"])
+            decoded.append({
+                "timestamp": line["timestamp"],
+                "words": [{"word": table[i], "size": c} for i, c in zip(line["word_ids"], line["sizes"])],
+            })
+        assert decoded == full["snapshots"]
+        # 讚 first appears in the second snapshot
+        assert "讚" in lines[1]["new_words"]
+        assert "哈哈" not in lines[1]["new_words"]
+
+    @pytest.mark.parametrize("param,value", [("format", "csv"), ("encoding", "binary")])
+    def test_invalid_format_or_encoding(self, client, param, value):
+        response = client.get(
+            "/api/playback/word-frequency-snapshots",
+            params={**self.PARAMS, param: value},
+        )
+        assert response.status_code == 400
+        assert param in response.json()["detail"]
@@ -0,0 +1,147 @@
+"""Tests for statement timeouts and EXPLAIN cost guards on analytics endpoints."""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.models import ChatMessage
+from app.services.query_guard import (
+    QueryGuard,
+    apply_statement_timeout,
+    estimate_cost,
+    is_statement_timeout,
+)
+
+SNAPSHOT_PARAMS = {
+    "start_time": "2026-02-01T10:00:00Z",
+    "end_time": "2026-02-01T14:00:00Z",
+    "step_seconds": 300,
+    "window_hours": 1,
+}
+
+
+class _Canceled(Exception):
+    pgcode = "57014"
+
+
+def _span_cost(db, sql, params):
+    """Fake planner: cost = seconds of data scanned."""
+    return (params["end_time"] - params["query_start"]).total_seconds()
+
+
+def _cubic_cost(db, sql, params):
+    """Fake planner whose cost grows much faster than the range (sort-heavy plans)."""
+    return _span_cost(db, sql, params) ** 3 / 3600 ** 2
+
+
+def test_statement_timeout_cancels_query(db):
+    apply_statement_timeout(db, QueryGuard("test", timeout_ms=50, max_cost=0))
+    with pytest.raises(OperationalError) as exc_info:
+        db.execute(text("SELECT pg_sleep(1)"))
+    assert is_statement_timeout(exc_info.value)
+    assert not is_statement_timeout(ValueError("boom"))
+
+
+def test_estimate_cost_for_sql_and_query(db):
+    assert estimate_cost(db, "SELECT * FROM chat_messages WHERE published_at >= :t", {
+        "t": datetime(2026, 1, 1, tzinfo=timezone.utc),
+    }) > 0
+    assert estimate_cost(db, db.query(ChatMessage)) > 0
+
+
+class TestWordFrequencySnapshotsGuard:
+    @pytest.fixture(autouse=True)
+    def no_video(self):
+        with patch('app.routers.playback_wordcloud.get_current_video_id', return_value=None):
+            yield
+
+    def _guard(self, max_cost):
+        return patch(
+            'app.routers.playback_wordcloud.WORD_FREQUENCY_SNAPSHOTS',
+            QueryGuard("word_frequency_snapshots", timeout_ms=60000, max_cost=max_cost),
+        )
+
+    def test_over_budget_range_is_cut_short(self, client):
+        # Budget covers 3h of data: 1h window + 2h of snapshots
+        with self._guard(3 * 3600), \
+             patch('app.routers.playback_wordcloud.estimate_cost', side_effect=_span_cost):
+            data = client.get("/api/playback/word-frequency-snapshots", params=SNAPSHOT_PARAMS).json()
+
+        metadata = data["metadata"]
+        assert metadata["partial"] is True
+        assert metadata["requested_end_time"] == "2026-02-01T14:00:00+00:00"
+        assert metadata["end_time"] == "2026-02-01T12:00:00+00:00"
+        assert len(data["snapshots"]) == metadata["total_snapshots"] == 25
+
+    def test_budget_that_fits_only_the_first_snapshot(self, client):
+        # Only the 1h window fits; the proportional guesses overshoot and must be re-estimated
+        with self._guard(3600), \
+             patch('app.routers.playback_wordcloud.estimate_cost', side_effect=_cubic_cost) as estimate:
+            response = client.get("/api/playback/word-frequency-snapshots", params=SNAPSHOT_PARAMS)
+
+        assert response.status_code == 200
+        metadata = response.json()["metadata"]
+        assert metadata["end_time"] == "2026-02-01T10:00:00+00:00"
+        assert metadata["total_snapshots"] == 1
+        last_params = estimate.call_args_list[-1].args[2]
+        assert last_params["end_time"] == datetime(2026, 2, 1, 10, 0, tzinfo=timezone.utc)
+
+    def test_within_budget_is_complete(self, client):
+        with self._guard(10 * 3600), \
+             patch('app.routers.playback_wordcloud.estimate_cost', side_effect=_span_cost):
+            metadata = client.get(
+                "/api/playback/word-frequency-snapshots", params=SNAPSHOT_PARAMS
+            ).json()["metadata"]
+        assert metadata["partial"] is False
+        assert "requested_end_time" not in metadata
+
+    def test_rejected_when_window_alone_is_over_budget(self, client):
+        with self._guard(1800), \
+             patch('app.routers.playback_wordcloud.estimate_cost', side_effect=_span_cost):
+            response = client.get("/api/playback/word-frequency-snapshots", params=SNAPSHOT_PARAMS)
+
+        assert response.status_code == 422
+        detail = response.json()["detail"]
+        assert detail["error"] == "query_too_expensive"
+        assert detail["max_cost"] == 1800
+
+    def test_statement_timeout_is_a_structured_422(self, client):
+        canceled = OperationalError("SELECT ...", {}, _Canceled())
+        with patch('app.routers.playback_wordcloud._load_word_buckets', side_effect=canceled):
+            response = client.get("/api/playback/word-frequency-snapshots", params=SNAPSHOT_PARAMS)
+
+        assert response.status_code == 422
+        assert response.json()["detail"]["error"] == "query_timeout"
+
+
+class TestWordOccurrencesGuard:
+    @pytest.fixture
+    def messages(self, db):
+        now = datetime.now(timezone.utc)
+        for i, age in enumerate([timedelta(days=2), timedelta(days=90)]):
+            db.add(ChatMessage(
+                message_id=f"guard_{i}", live_stream_id="s", message="好耶", timestamp=i,
+                published_at=now - age, author_name="a", author_id="a", message_type="text_message",
+            ))
+        db.flush()
+
+    def test_over_budget_searches_recent_days(self, client, messages):
+        with patch('app.routers.word_detail.estimate_cost', side_effect=[1e12, 1.0]):
+            data = client.get("/api/admin/word-occurrences", params={"word": "好"}).json()
+
+        assert data["searched_since"] is not None
+        assert data["total_occurrences"] == 1
+
+    def test_unbounded_when_within_budget(self, client, messages):
+        data = client.get("/api/admin/word-occurrences", params={"word": "好"}).json()
+        assert data["searched_since"] is None
+        assert data["total_occurrences"] == 2
+
+    def test_rejected_when_recent_days_are_over_budget(self, client, messages):
+        with patch('app.routers.word_detail.estimate_cost', return_value=1e12):
+            response = client.get("/api/admin/word-occurrences", params={"word": "好"})
+
+        assert response.status_code == 422
+        assert response.json()["detail"]["error"] == "query_too_expensive"
@@ -0,0 +1,108 @@
+"""Tests for DATABASE_READ_URL routing and the replica lag guard.
+
+The test database doubles as the replica: a primary always reports zero lag.
+"""
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import app.core.database as database
+from app.core.database import ReplicaLagGuard
+from tests.conftest import DATABASE_URL, engine
+
+
+@pytest.fixture
+def read_url(monkeypatch):
+    """Configure DATABASE_READ_URL with fresh managers and guard."""
+    monkeypatch.setenv("DATABASE_READ_URL", DATABASE_URL)
+    monkeypatch.setattr(database, "read_db_manager", None)
+    monkeypatch.setattr(database, "async_read_db_manager", None)
+    monkeypatch.setattr(database, "async_db_manager", None)
+    monkeypatch.setattr(database, "replica_guard", ReplicaLagGuard(max_lag_seconds=30, check_interval=60))
+    yield database.replica_guard
+    if database.read_db_manager is not None:
+        database.read_db_manager.close()
+
+
+def test_guard_threshold():
+    guard = ReplicaLagGuard(max_lag_seconds=10, check_interval=60)
+    guard.record(3.0)
+    assert guard.usable
+    guard.record(11.0)
+    assert not guard.usable
+    guard.record(None)
+    assert not guard.usable
+
+
+def test_guard_measures_primary_as_zero_lag():
+    guard = ReplicaLagGuard(max_lag_seconds=0, check_interval=60)
+    assert guard.check(engine) is True
+    assert guard.lag_seconds == 0
+
+
+def test_guard_caches_result_and_handles_unreachable_replica():
+    broken = MagicMock()
+    broken.connect.side_effect = OperationalError("SELECT 1", {}, Exception("down"))
+    guard = ReplicaLagGuard(max_lag_seconds=30, check_interval=60)
+
+    assert guard.check(broken) is False
+    assert guard.check(broken) is False
+    assert broken.connect.call_count == 1
+
+
+def test_read_db_uses_read_only_replica(read_url):
+    dependency = database.get_read_db()
+    session = next(dependency)
+    try:
+        assert session.get_bind() is database.read_db_manager.engine
+        assert session.execute(text("SHOW default_transaction_read_only")).scalar() == "on"
+    finally:
+        dependency.close()
+
+
+def test_read_db_falls_back_to_primary_when_lagging(read_url):
+    read_url.record(120.0)
+    primary = MagicMock()
+
+    def fake_get_db():
+        yield primary
+
+    with patch.object(database, "get_db", fake_get_db):
+        dependency = database.get_read_db()
+        assert next(dependency) is primary
+
+
+def test_read_db_without_replica_uses_primary(monkeypatch):
+    monkeypatch.delenv("DATABASE_READ_URL", raising=False)
+    monkeypatch.setattr(database, "read_db_manager", None)
+    primary = MagicMock()
+
+    def fake_get_db():
+        yield primary
+
+    with patch.object(database, "get_db", fake_get_db):
+        assert next(database.get_read_db()) is primary
+
+
+def test_analytics_db_routes_to_replica_then_primary(read_url):
+    async def read_only_setting():
+        dependency = database.get_analytics_db()
+        session = await dependency.__anext__()
+        try:
+            return (await session.execute(text("SHOW default_transaction_read_only"))).scalar()
+        finally:
+            await dependency.aclose()
+
+    async def scenario():
+        try:
+            on_replica = await read_only_setting()
+            read_url.record(None)
+            on_primary = await read_only_setting()
+            return on_replica, on_primary
+        finally:
+            await database.close_async_db()
+
+    assert asyncio.run(scenario()) == ("on", "off")
@@ -0,0 +1,166 @@
+"""Tests for chat search helpers (trigram-indexed filters and capped counts)."""
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.models import ChatMessage
+from app.routers.chat import _build_chat_scope_query
+from app.services.search import (
+    escape_like,
+    contains_filter,
+    count_matches,
+    estimate_row_count,
+)
+
+BASE_TIME = datetime(2026, 2, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _add_messages(db, count, message="hello world", author="Someone", prefix="s"):
+    db.add_all([
+        ChatMessage(
+            message_id=f"{prefix}_{i}",
+            live_stream_id="search_stream",
+            message=message if isinstance(message, str) else message(i),
+            timestamp=1767000000000000 + i,
+            published_at=BASE_TIME + timedelta(seconds=i),
+            author_name=author if isinstance(author, str) else author(i),
+            author_id=f"author_{i % 5}",
+            message_type="text_message",
+        )
+        for i in range(count)
+    ])
+    db.flush()
+
+
+def test_escape_like():
+    assert escape_like("100%_off\\") == "100\\%\\_off\\\\"
+
+
+def test_contains_filter_is_case_insensitive_and_literal(db):
+    _add_messages(db, 1, message="GG 100% WIN", prefix="a")
+    _add_messages(db, 1, message="gg 1000 win", prefix="b")
+
+    def match(term):
+        return {m.message_id for m in db.query(ChatMessage).filter(contains_filter(ChatMessage.message, term))}
+
+    assert match("gg") == {"a_0", "b_0"}
+    assert match("100% w") == {"a_0"}
+    assert match("10_0") == set()
+
+
+def test_count_matches_exact_below_cap(db):
+    _add_messages(db, 12)
+    query = db.query(ChatMessage).filter(contains_filter(ChatMessage.message, "HELLO"))
+    assert count_matches(db, query, cap=20) == (12, False)
+    assert count_matches(db, query, cap=12) == (12, False)
+
+
+def test_count_matches_estimates_above_cap(db):
+    _add_messages(db, 30)
+    query = db.query(ChatMessage).filter(contains_filter(ChatMessage.message, "hello"))
+    total, is_estimate = count_matches(db, query, cap=10)
+    assert is_estimate is True
+    assert total >= 11
+
+
+def test_estimate_row_count_returns_plan_rows(db):
+    query = db.query(ChatMessage).filter(ChatMessage.published_at >= BASE_TIME)
+    assert estimate_row_count(db, query) >= 1
+
+
+def test_chat_messages_reports_estimated_total(client, db):
+    from unittest.mock import patch
+
+    _add_messages(db, 25, message=lambda i: f"keyword {i}")
+    with patch("app.routers.chat.count_matches", return_value=(5, True)):
+        response = client.get("/api/chat/messages", params={
+            "message_filter": "KEYWORD",
+            "start_time": BASE_TIME.isoformat(),
+            "limit": 10,
+        })
+    data = response.json()
+    assert data["total_is_estimate"] is True
+    # Never below what the page proves exists, and a full page keeps pagination going
+    assert data["total"] == 11
+    assert len(data["messages"]) == 10
+
+
+def test_chat_messages_exact_total_on_full_last_page(client, db):
+    """An exact capped count is not bumped when the last page happens to be full."""
+    _add_messages(db, 40, message=lambda i: f"keyword {i}")
+    response = client.get("/api/chat/messages", params={
+        "message_filter": "keyword",
+        "start_time": BASE_TIME.isoformat(),
+        "limit": 20,
+        "offset": 20,
+    })
+    data = response.json()
+    assert len(data["messages"]) == 20
+    assert data["total"] == 40
+    assert data["total_is_estimate"] is False
+
+
+def test_chat_messages_exact_total_without_text_filters(client, db):
+    _add_messages(db, 7)
+    data = client.get("/api/chat/messages", params={"start_time": BASE_TIME.isoformat()}).json()
+    assert data["total"] == 7
+    assert data["total_is_estimate"] is False
+
+
+# ============ EXPLAIN regression (mirrors 24_benchmark_search_indexes.sql) ============
+
+@pytest.fixture
+def trgm_indexes(db):
+    """Create the lower() trigram indexes from 10_create_gin_indexes.sql inside the test transaction."""
+    try:
+        with db.begin_nested():
+            db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError:
+        pytest.skip("pg_trgm extension is not available")
+    db.execute(text(
+        "CREATE INDEX idx_chat_messages_author_lower_trgm "
+        "ON chat_messages USING GIN (lower(author_name) gin_trgm_ops)"
+    ))
+    db.execute(text(
+        "CREATE INDEX idx_chat_messages_message_lower_trgm "
+        "ON chat_messages USING GIN (lower(message) gin_trgm_ops)"
+    ))
+    _add_messages(
+        db, 300,
+        message=lambda i: f"message number {i} {'superchat' if i % 50 == 0 else 'hello'}",
+        author=lambda i: f"Viewer{i}",
+    )
+    db.execute(text("ANALYZE chat_messages"))
+    # Small test tables always favour a seq scan; force the planner to consider indexes
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    return db
+
+
+def _explain(db, query):
+    compiled = query.statement.compile(dialect=db.get_bind().dialect)
+    rows = db.connection().exec_driver_sql("EXPLAIN " + compiled.string, compiled.params).fetchall()
+    return "\n".join(r[0] for r in rows)
+
+
+def test_message_filter_uses_trigram_index(trgm_indexes):
+    db = trgm_indexes
+    query = _build_chat_scope_query(db, message_filter="SuperChat")
+    assert "idx_chat_messages_message_lower_trgm" in _explain(db, query)
+
+
+def test_author_filter_uses_trigram_index(trgm_indexes):
+    db = trgm_indexes
+    query = _build_chat_scope_query(db, author_filter="viewer12")
+    assert "idx_chat_messages_author_lower_trgm" in _explain(db, query)
+
+
+def test_word_trend_conditions_use_trigram_index(trgm_indexes):
+    from sqlalchemy import or_
+
+    db = trgm_indexes
+    query = db.query(ChatMessage.message_id).filter(or_(
+        contains_filter(ChatMessage.message, "superchat"),
+        contains_filter(ChatMessage.message, "number 1"),
+    ))
+    assert "idx_chat_messages_message_lower_trgm" in _explain(db, query)
@@ -1,6 +1,8 @@
 import pytest
+from unittest.mock import patch
+
 from app.models import SystemSetting
-from app.core.settings import get_current_video_id, get_video_id_from_url
+from app.core.settings import get_current_video_id, get_video_id_from_url, invalidate_settings_cache
 
 
 class TestGetCurrentVideoId:
@@ -63,6 +65,45 @@ class TestGetCurrentVideoId:
         assert result is None
 
 
+class TestVideoIdCache:
+    URL = 'https://www.youtube.com/watch?v=CachedId001'
+
+    def test_value_is_cached_until_invalidated(self, db):
+        assert get_current_video_id(db) is None
+        db.add(SystemSetting(key='youtube_url', value=self.URL))
+        db.flush()
+
+        assert get_current_video_id(db) is None
+        invalidate_settings_cache()
+        assert get_current_video_id(db) == 'CachedId001'
+
+    def test_value_expires_after_ttl(self, db):
+        assert get_current_video_id(db) is None
+        db.add(SystemSetting(key='youtube_url', value=self.URL))
+        db.flush()
+
+        with patch('app.core.settings.VIDEO_ID_CACHE_TTL_SECONDS', 0):
+            assert get_current_video_id(db) == 'CachedId001'
+
+    def test_admin_settings_write_invalidates(self, admin_client, db):
+        assert admin_client.get("/api/stats/viewers").status_code == 200
+        assert get_current_video_id(db) is None
+
+        response = admin_client.post("/api/admin/settings", json={"key": "youtube_url", "value": self.URL})
+        assert response.status_code == 200
+        assert get_current_video_id(db) == 'CachedId001'
+
+        assert admin_client.delete("/api/admin/settings/youtube_url").status_code == 200
+        assert get_current_video_id(db) is None
+
+    def test_lookup_errors_are_not_cached(self, db):
+        with patch('app.core.settings._load_current_video_id', side_effect=RuntimeError("db down")):
+            assert get_current_video_id(db) is None
+        db.add(SystemSetting(key='youtube_url', value=self.URL))
+        db.flush()
+        assert get_current_video_id(db) == 'CachedId001'
+
+
 class TestGetVideoIdFromUrl:
     """Tests for the standalone get_video_id_from_url helper."""
 
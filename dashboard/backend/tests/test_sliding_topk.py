@@ -0,0 +1,69 @@
+"""Tests for SlidingTopK (incremental top-k used by the playback word cloud)."""
+import random
+from collections import Counter
+
+import pytest
+
+from app.services.sliding_topk import SlidingTopK
+
+
+def test_top_orders_by_count():
+    topk = SlidingTopK()
+    topk.add({"a": 1, "b": 3, "c": 2})
+    assert topk.top(2) == [("b", 3), ("c", 2)]
+    assert topk.top(10) == [("b", 3), ("c", 2), ("a", 1)]
+    assert topk.top(0) == []
+
+
+def test_subtract_drops_words_at_zero():
+    topk = SlidingTopK()
+    topk.add({"a": 2, "b": 1})
+    topk.subtract({"a": 2, "c": 5})
+    assert len(topk) == 1
+    assert topk["a"] == 0
+    assert topk.top(5) == [("b", 1)]
+
+
+def test_ties_follow_counter_insertion_order():
+    running = Counter()
+    topk = SlidingTopK()
+    steps = [
+        ("add", {"x": 1, "y": 1, "z": 1}),
+        ("sub", {"x": 1}),
+        ("add", {"x": 1}),
+        ("add", {"w": 1}),
+    ]
+    for op, bucket in steps:
+        if op == "add":
+            running += Counter(bucket)
+            topk.add(bucket)
+        else:
+            running -= Counter(bucket)
+            topk.subtract(bucket)
+    # x was dropped and re-inserted, so it now ties behind y and z
+    assert topk.top(4) == running.most_common(4) == [("y", 1), ("z", 1), ("x", 1), ("w", 1)]
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_matches_counter_on_sliding_window(seed):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(300)]
+    buckets = [
+        Counter(rng.choices(vocab, weights=[1 / (i + 1) for i in range(len(vocab))], k=rng.randint(0, 40)))
+        for _ in range(200)
+    ]
+    window = 12
+
+    running = Counter()
+    topk = SlidingTopK()
+    for b in buckets[:window]:
+        running += b
+        topk.add(b)
+
+    for i in range(len(buckets) - window):
+        for k in (1, 10, 30):
+            assert topk.top(k) == running.most_common(k)
+        running += buckets[window + i]
+        topk.add(buckets[window + i])
+        running -= buckets[i]
+        topk.subtract(buckets[i])
@@ -0,0 +1,277 @@
+"""Tests for the cold archive of finished streams."""
+import os
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import text
+
+from app.etl.processors.partition_manager import create_monthly_partition
+from app.etl.processors.stream_archiver import StreamArchiver
+from app.etl.tasks import run_archive_streams
+from app.models import (
+    ChatMessage, CurrencyRate, ETLExecutionLog, LiveStream, PlaybackSnapshotCache,
+    ProcessedChatMessage, StreamArchive, StreamHourlyRollup, StreamStats, StreamTokenCount,
+)
+
+VIDEO_ID = "archive_vid"
+START = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+NOW = datetime(2025, 9, 1, tzinfo=timezone.utc)
+
+SETTINGS = {
+    'RETENTION_ENABLED': True,
+    'RETENTION_ARCHIVE_AFTER_DAYS': 90,
+    'RETENTION_MAX_STREAMS_PER_RUN': 5,
+    'RETENTION_RESTORE_HOLD_DAYS': 7,
+    'RETENTION_TOKEN_MIN_COUNT': 2,
+    'ETL_LOG_RETENTION_DAYS': 90,
+    'PLAYBACK_CACHE_ENABLED': True,
+}
+
+
+def _setting(key, default=None):
+    return SETTINGS.get(key, default)
+
+
+def _add_stream(db, video_id, start, processed=True, broadcast='none'):
+    db.add(LiveStream(video_id=video_id, title=video_id, live_broadcast_content=broadcast))
+    db.add(PlaybackSnapshotCache(
+        live_stream_id=video_id, kind='stats', step_seconds=60, window_hours=0,
+        start_time=start, end_time=start, payload=b'', etag='e',
+    ))
+    for i in range(3):
+        published_at = start + timedelta(minutes=40 * i)
+        paid = i == 2
+        db.add(ChatMessage(
+            message_id=f"{video_id}_{i}", live_stream_id=video_id, message=f"hello {i}",
+            timestamp=i, published_at=published_at, author_name=f"a{i % 2}", author_id=f"a{i % 2}",
+            message_type='paid_message' if paid else 'text_message',
+            raw_data={"money": {"currency": "TWD", "amount": "75"}} if paid else {"n": i},
+        ))
+        if processed:
+            db.add(ProcessedChatMessage(
+                message_id=f"{video_id}_{i}", live_stream_id=video_id,
+                original_message=f"hello {i}", processed_message="hello",
+                tokens=["hello", f"t{i}"], unicode_emojis=[], youtube_emotes=[{"name": ":wave:"}],
+                author_name=f"a{i % 2}", author_id=f"a{i % 2}", published_at=published_at,
+            ))
+    db.add(StreamStats(live_stream_id=video_id, concurrent_viewers=10, collected_at=start))
+    db.flush()
+
+
+@pytest.fixture
+def archiver(db, tmp_path):
+    archiver = StreamArchiver(database_url="postgresql://unused/db", archive_dir=str(tmp_path / "archive"))
+    archiver.backup_dir = str(tmp_path / "backup")
+    # Share the test transaction so everything rolls back with the test
+    archiver._engine = db.connection()
+    with patch('app.etl.processors.stream_archiver.ETLConfig.get', side_effect=_setting):
+        yield archiver
+
+
+@pytest.fixture
+def stream(db):
+    db.add(CurrencyRate(currency='TWD', rate_to_twd=1))
+    _add_stream(db, VIDEO_ID, START)
+    return VIDEO_ID
+
+
+def _count(db, table, video_id=VIDEO_ID):
+    return db.execute(
+        text(f"SELECT COUNT(*) FROM {table} WHERE live_stream_id = :v"), {"v": video_id}
+    ).scalar()
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "jsonl"])
+def test_archive_exports_rollups_and_deletes(db, archiver, stream, file_format):
+    manifest = archiver.archive_stream(stream, file_format)
+
+    assert manifest['row_counts'] == {'chat_messages': 3, 'processed_chat_messages': 3, 'stream_stats': 1}
+    for table in ('chat_messages', 'processed_chat_messages', 'stream_stats', 'paid_message_ledger'):
+        assert _count(db, table) == 0
+
+    rollups = db.query(StreamHourlyRollup).filter_by(live_stream_id=stream).order_by(StreamHourlyRollup.hour).all()
+    assert [(r.message_count, r.paid_message_count, r.author_count) for r in rollups] == [(2, 0, 2), (1, 1, 1)]
+    assert float(rollups[1].revenue_twd) == 75
+    tokens = {t.token: t.count for t in db.query(StreamTokenCount).filter_by(live_stream_id=stream)}
+    assert tokens == {'hello': 3}  # t0..t2 are below RETENTION_TOKEN_MIN_COUNT
+
+    entry = db.get(StreamArchive, stream)
+    assert entry.status == 'archived' and entry.file_format == file_format
+    assert entry.size_bytes > 0
+    assert os.path.exists(os.path.join(archiver.stream_dir(stream), 'manifest.json'))
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "jsonl"])
+def test_restore_round_trips_rows(db, archiver, stream, file_format):
+    archiver.archive_stream(stream, file_format)
+    restored = archiver.restore_stream(stream)
+
+    assert restored == {'chat_messages': 3, 'processed_chat_messages': 3, 'stream_stats': 1}
+    db.expire_all()
+    message = db.get(ChatMessage, f"{stream}_1")
+    assert message.raw_data == {"n": 1}
+    assert message.published_at == START + timedelta(minutes=40)
+    processed = db.get(ProcessedChatMessage, f"{stream}_1")
+    assert processed.tokens == ["hello", "t1"]
+    assert processed.youtube_emotes == [{"name": ":wave:"}]
+    # The insert trigger rebuilds the paid ledger
+    assert _count(db, 'paid_message_ledger') == 1
+    assert db.get(StreamArchive, stream).status == 'restored'
+
+    # Restoring twice does not duplicate rows
+    assert archiver.restore_stream(stream) == {'chat_messages': 0, 'processed_chat_messages': 0, 'stream_stats': 0}
+
+
+def test_archived_hours_are_served_from_rollups(db, client, archiver, stream):
+    from app.services.emoji_rollup import add_emoji_counts, count_emojis
+
+    processed = db.query(ProcessedChatMessage).filter_by(live_stream_id=stream).all()
+    add_emoji_counts(db.connection(), count_emojis(
+        {'published_at': p.published_at, 'live_stream_id': p.live_stream_id,
+         'youtube_emotes': p.youtube_emotes}
+        for p in processed
+    ))
+    db.execute(text("DELETE FROM processed_chat_checkpoint"))
+    db.execute(text("""
+        INSERT INTO processed_chat_checkpoint (last_processed_message_id, last_processed_timestamp)
+        VALUES ('archive', :ts)
+    """), {"ts": START + timedelta(hours=3)})
+    db.flush()
+
+    archiver.archive_stream(stream)
+
+    # The processed rows are gone; the archived hours must still count as covered
+    with patch('app.routers.emojis.get_current_video_id', return_value=stream):
+        response = client.get("/api/emojis/stats", params={
+            "start_time": START.isoformat(),
+            "end_time": (START + timedelta(hours=2)).isoformat(),
+        })
+    assert response.status_code == 200
+    assert [(e['name'], e['message_count']) for e in response.json()['emojis']] == [(':wave:', 3)]
+
+
+def test_archived_stream_is_served_from_stream_rollups(db, client, archiver, stream):
+    archiver.archive_stream(stream)
+    params = {"start_time": START.isoformat(), "end_time": (START + timedelta(hours=2)).isoformat()}
+
+    with patch('app.core.dependencies.get_current_video_id', return_value=stream):
+        comments = client.get("/api/stats/comments", params=params).json()
+    assert [(c['hour'], c['count']) for c in comments] == [
+        (START.isoformat(), 2), ((START + timedelta(hours=1)).isoformat(), 1),
+    ]
+
+    with patch('app.routers.wordcloud.get_current_video_id', return_value=stream), \
+         patch('app.routers.wordcloud.estimate_cost', return_value=0.0):
+        words = client.get("/api/wordcloud/word-frequency", params=params).json()
+        # A range that cuts the stream cannot use its whole-stream token counts
+        partial = client.get("/api/wordcloud/word-frequency", params={
+            **params, "start_time": (START + timedelta(minutes=30)).isoformat(),
+        }).json()
+    assert words['words'] == [{'word': 'hello', 'count': 3}]
+    assert (words['total_messages'], words['unique_words']) == (3, 1)
+    assert partial['words'] == []
+
+
+def test_export_keeps_rows_and_writes_parquet(db, archiver, stream, tmp_path):
+    import pyarrow.parquet as pq
+
+    manifest = archiver.export_stream(stream, str(tmp_path / "exports"))
+
+    assert manifest['row_counts'] == {'chat_messages': 3, 'processed_chat_messages': 3, 'stream_stats': 1}
+    assert _count(db, 'chat_messages') == 3
+    assert db.get(StreamArchive, stream) is None
+    table = pq.read_table(tmp_path / "exports" / stream / "processed_chat_messages.parquet")
+    assert table.column('tokens').to_pylist()[0] == ["hello", "t0"]
+    assert str(table.schema.field('published_at').type) == 'timestamp[us, tz=UTC]'
+
+
+def test_restore_without_archive_raises(archiver):
+    with pytest.raises(FileNotFoundError):
+        archiver.restore_stream("never_archived")
+
+
+def test_candidates_only_finished_old_processed_streams(db, archiver, stream):
+    _add_stream(db, "live_vid", START, broadcast='live')
+    _add_stream(db, "recent_vid", NOW - timedelta(days=10))
+    _add_stream(db, "unprocessed_vid", START, processed=False)
+    _add_stream(db, "pending_backup_vid", START)
+    os.makedirs(os.path.join(archiver.backup_dir, "pending_backup_vid"))
+    open(os.path.join(archiver.backup_dir, "pending_backup_vid", "chat_buffer_backup_1.json"), "w").close()
+
+    candidates = archiver.get_candidates(NOW - timedelta(days=90), NOW, limit=10)
+    assert candidates == [stream]
+
+
+def test_restored_stream_is_held_before_rearchiving(db, archiver, stream):
+    archiver.archive_stream(stream)
+    archiver.restore_stream(stream)
+    cutoff = NOW - timedelta(days=90)
+
+    assert archiver.get_candidates(cutoff, datetime.now(timezone.utc), limit=10) == []
+    assert archiver.get_candidates(cutoff, datetime.now(timezone.utc) + timedelta(days=8), limit=10) == [stream]
+
+
+def test_backup_files_move_into_archive(archiver, stream):
+    backup = os.path.join(archiver.backup_dir, stream)
+    os.makedirs(backup)
+    open(os.path.join(backup, "filtered_messages_2025-03-10.jsonl"), "w").close()
+
+    archiver.archive_stream(stream)
+
+    assert not os.path.exists(backup)
+    assert os.path.exists(os.path.join(archiver.stream_dir(stream), "backup", "filtered_messages_2025-03-10.jsonl"))
+
+
+def test_empty_old_partitions_are_dropped_and_recreated_on_restore(db, archiver):
+    for table in ("chat_messages", "processed_chat_messages"):
+        create_monthly_partition(db, table, date(2025, 3, 1))
+    _add_stream(db, VIDEO_ID, START)
+
+    assert archiver.drop_empty_partitions(db, date(2025, 6, 1)) == []
+    archiver.archive_stream(VIDEO_ID)
+    dropped = archiver.drop_empty_partitions(db, date(2025, 6, 1))
+    assert dropped == ["chat_messages_2025_03", "processed_chat_messages_2025_03"]
+
+    archiver.restore_stream(VIDEO_ID)
+    where = text("SELECT DISTINCT tableoid::regclass::text FROM chat_messages WHERE live_stream_id = :v")
+    assert db.execute(where, {"v": VIDEO_ID}).scalars().all() == ["chat_messages_2025_03"]
+
+
+def test_prune_etl_logs_keeps_recent_and_running(db, archiver):
+    old = NOW - timedelta(days=200)
+    for status, started_at in (('completed', old), ('running', old), ('completed', NOW)):
+        db.add(ETLExecutionLog(job_id='prune_test', job_name='t', status=status, started_at=started_at))
+    db.flush()
+
+    assert archiver.prune_etl_logs(db, NOW) >= 1
+    remaining = db.query(ETLExecutionLog.status).filter_by(job_id='prune_test').order_by(ETLExecutionLog.id).all()
+    assert [r.status for r in remaining] == ['running', 'completed']
+
+
+def test_run_archives_candidates(db, archiver, stream):
+    result = archiver.run(now=NOW)
+
+    assert result['status'] == 'completed'
+    assert result['archived'] == [stream]
+    assert _count(db, 'chat_messages') == 0
+
+
+def test_run_skipped_when_disabled(archiver):
+    with patch('app.etl.processors.stream_archiver.ETLConfig.get', return_value=False):
+        assert archiver.run() == {'status': 'skipped', 'reason': 'retention_disabled'}
+
+
+@patch('app.etl.tasks.update_etl_log_status')
+@patch('app.etl.tasks.create_etl_log', return_value=42)
+@patch('app.etl.processors.stream_archiver.StreamArchiver')
+def test_run_archive_streams_logs_result(mock_archiver_class, mock_create, mock_update):
+    mock_archiver_class.return_value = MagicMock(run=MagicMock(return_value={
+        'status': 'completed', 'streams_archived': 3,
+    }))
+
+    result = run_archive_streams()
+
+    assert result['streams_archived'] == 3
+    mock_create.assert_called_once_with('archive_streams', 'scheduled')
+    mock_update.assert_called_once_with(42, 'completed', records_processed=3, error_message=None)
@@ -5,6 +5,15 @@ from fastapi.testclient import TestClient
 from sqlalchemy import text
 
 
+@pytest.fixture(autouse=True)
+def clear_index_cache():
+    """Each test builds its own text-mining index."""
+    from app.services.text_mining_index import clear_text_mining_cache
+    clear_text_mining_cache()
+    yield
+    clear_text_mining_cache()
+
+
 @pytest.fixture
 def processed_chat_messages_table(db):
     """Create the processed_chat_messages table for testing."""
@@ -292,3 +301,111 @@ class TestTextMiningAnalyze:
         forward_1 = data["original_message"]["forward"]["1"]
         count_by_text = {item["text"]: item["count"] for item in forward_1}
         assert count_by_text.get("好") == 2
+
+
+def _reference_extensions(messages, target_word, top_n=5):
+    """Straightforward per-message find loop the index must agree with."""
+    forward = {i: {} for i in range(1, 6)}
+    backward = {i: {} for i in range(1, 6)}
+    for message in messages:
+        f_seen = {i: set() for i in range(1, 6)}
+        b_seen = {i: set() for i in range(1, 6)}
+        idx = message.find(target_word)
+        while idx != -1:
+            end = idx + len(target_word)
+            for length in range(1, 6):
+                if end + length <= len(message) and not message[end + length - 1].isspace():
+                    f_seen[length].add(message[end:end + length])
+                if idx - length >= 0 and not message[idx - length].isspace():
+                    b_seen[length].add(message[idx - length:idx])
+            idx = message.find(target_word, idx + 1)
+        for length in range(1, 6):
+            for ext in f_seen[length]:
+                forward[length][ext] = forward[length].get(ext, 0) + 1
+            for ext in b_seen[length]:
+                backward[length][ext] = backward[length].get(ext, 0) + 1
+    return forward, backward
+
+
+class TestTextMiningIndex:
+    """Tests for the cached per-window text-mining index."""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_corpus_matches_reference(self, seed):
+        import random
+        from app.services.text_mining_index import Corpus
+
+        rng = random.Random(seed)
+        alphabet = "老師好哈 a"
+        messages = ["".join(rng.choices(alphabet, k=rng.randint(0, 15))) for _ in range(300)]
+        corpus = Corpus(messages)
+        for target in ["老師", "哈哈", "a", " ", "好老"]:
+            matched, result = corpus.extensions(target, top_n=1000)
+            assert matched == sum(1 for m in messages if target in m)
+            forward, backward = _reference_extensions(messages, target)
+            for length in range(1, 6):
+                assert {i["text"]: i["count"] for i in result["forward"][str(length)]} == forward[length]
+                assert {i["text"]: i["count"] for i in result["backward"][str(length)]} == backward[length]
+
+    def test_extensions_never_cross_message_boundaries(self):
+        from app.services.text_mining_index import Corpus
+
+        matched, result = Corpus(["ab", "cd"]).extensions("b")
+        assert matched == 1
+        assert result["forward"]["1"] == []
+        assert Corpus(["ab", "cd"]).extensions("bc")[0] == 0
+
+    def test_repeated_targets_reuse_window_index(self, client, db, processed_chat_messages_table):
+        from unittest.mock import patch
+        from app.services import text_mining_index
+
+        now = datetime.now(timezone.utc)
+        db.execute(
+            text("""
+            INSERT INTO processed_chat_messages
+            (message_id, live_stream_id, original_message, processed_message,
+             author_name, author_id, published_at)
+            VALUES ('msg_tm_cache', 'stream1', '草草 笑死', '草草 笑死', 'user1', 'uid1', :time)
+            """),
+            {"time": now - timedelta(minutes=5)}
+        )
+        db.commit()
+
+        window = {
+            "start_time": (now - timedelta(hours=1)).isoformat(),
+            "end_time": now.isoformat(),
+        }
+        with patch.object(
+            text_mining_index, "_build_index", wraps=text_mining_index._build_index
+        ) as build:
+            for word in ["草", "笑", "死"]:
+                response = client.post("/api/text-mining/analyze", json={**window, "target_word": word})
+                assert response.status_code == 200
+                assert response.json()["stats"]["matched_original"] == 1
+        assert build.call_count == 1
+
+    def test_open_window_rebuilt_after_etl_checkpoint_moves(self, client, db, processed_chat_messages_table):
+        from unittest.mock import patch
+        from app.services import text_mining_index
+
+        now = datetime.now(timezone.utc)
+        db.execute(text("DELETE FROM processed_chat_checkpoint"))
+        window = {
+            "start_time": (now - timedelta(hours=1)).isoformat(),
+            "end_time": now.isoformat(),
+            "target_word": "草",
+        }
+        with patch.object(
+            text_mining_index, "_build_index", wraps=text_mining_index._build_index
+        ) as build:
+            client.post("/api/text-mining/analyze", json=window)
+            db.execute(
+                text("""
+                INSERT INTO processed_chat_checkpoint (last_processed_timestamp, updated_at)
+                VALUES (:ts, :ts)
+                """),
+                {"ts": now - timedelta(minutes=1)}
+            )
+            db.flush()
+            client.post("/api/text-mining/analyze", json=window)
+        assert build.call_count == 2
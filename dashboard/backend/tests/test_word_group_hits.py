@@ -0,0 +1,158 @@
+"""Tests for the word group hit index (backfill and index-backed trend stats)."""
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.models import (
+    ChatMessage, ProcessedChatMessage, WordTrendGroup, WordGroupHourlyCount,
+)
+from app.etl.processors.word_group_hits import WordGroupHitIndexer
+from app.services.hourly_rollup import ceil_hour, hour_bucket, rollup_hour_range
+
+VIDEO_ID = "hits_stream"
+BASE = datetime(2026, 2, 1, 10, 0, 0, tzinfo=timezone.utc)
+
+
+def _add_message(db, i, message, published_at, processed=True, stream=VIDEO_ID):
+    db.add(ChatMessage(
+        message_id=f"hit_{i}", live_stream_id=stream, message=message,
+        timestamp=int(published_at.timestamp() * 1000000), published_at=published_at,
+        author_name="User", author_id="user", message_type="text_message",
+    ))
+    if processed:
+        db.add(ProcessedChatMessage(
+            message_id=f"hit_{i}", live_stream_id=stream, original_message=message,
+            processed_message=message.lower(), tokens=[], author_name="User",
+            author_id="user", published_at=published_at,
+        ))
+
+
+@pytest.fixture
+def hit_messages(db):
+    """Messages 10:10 ~ 14:50; the ETL has processed everything up to 13:50."""
+    # Integration tests elsewhere commit ETL state; start from a clean slate
+    db.execute(text("DELETE FROM processed_chat_messages"))
+    db.execute(text("DELETE FROM processed_chat_checkpoint"))
+    texts = ["草 holo", "holo live", "kusa", "HOLO cover", "nothing"]
+    i = 0
+    for hour in range(5):
+        for minute in (10, 30, 50):
+            published_at = BASE + timedelta(hours=hour, minutes=minute)
+            processed = published_at <= BASE + timedelta(hours=3, minutes=50)
+            _add_message(db, i, texts[i % len(texts)], published_at, processed)
+            i += 1
+    db.execute(text("""
+        INSERT INTO processed_chat_checkpoint (last_processed_message_id, last_processed_timestamp)
+        VALUES ('hit_11', :ts)
+    """), {"ts": BASE + timedelta(hours=3, minutes=50)})
+    db.flush()
+    return db
+
+
+@pytest.fixture
+def indexer(db):
+    # Share the test transaction so index rows roll back with the test
+    return WordGroupHitIndexer(database_url="postgresql://unused/db", engine=db.connection())
+
+
+def _stats(client, group_ids, start, end):
+    with patch('app.routers.word_trends.get_current_video_id', return_value=VIDEO_ID):
+        response = client.post("/api/word-trends/stats", json={
+            "group_ids": group_ids,
+            "start_time": start.isoformat(),
+            "end_time": end.isoformat(),
+        })
+    assert response.status_code == 200
+    return {g["group_id"]: {d["hour"]: d["count"] for d in g["data"]} for g in response.json()["groups"]}
+
+
+def test_hour_helpers():
+    assert hour_bucket(BASE + timedelta(minutes=59)) == BASE
+    assert ceil_hour(BASE) == BASE
+    assert ceil_hour(BASE + timedelta(seconds=1)) == BASE + timedelta(hours=1)
+
+
+def test_rollup_hour_range_stops_at_checkpoint_hour(hit_messages, db):
+    # Processed 10:10 ~ 13:50: whole hours 11:00 and 12:00 are covered
+    assert rollup_hour_range(db, BASE, BASE + timedelta(hours=6)) == (
+        BASE + timedelta(hours=1), BASE + timedelta(hours=3),
+    )
+    assert rollup_hour_range(db, BASE + timedelta(hours=2, minutes=5), BASE + timedelta(hours=6)) is None
+
+
+def test_backfill_counts_processed_messages(hit_messages, indexer, db):
+    group = WordTrendGroup(name="holo", words=["holo"], exclude_words=["cover"])
+    db.add(group)
+    db.flush()
+
+    result = indexer.backfill_pending()
+    assert result["groups_indexed"] == 1
+    assert result["messages_scanned"] == 12
+
+    db.refresh(group)
+    assert group.hits_indexed_at is not None
+    rows = {
+        r.hour: r.count
+        for r in db.query(WordGroupHourlyCount).filter(WordGroupHourlyCount.group_id == group.id)
+    }
+    # "草 holo" / "holo live" match, "HOLO cover" is excluded
+    assert sum(rows.values()) == 6
+    assert indexer.backfill_pending()["groups_indexed"] == 0
+
+
+def test_backfill_leaves_group_edited_meanwhile_pending(hit_messages, indexer, db):
+    group = WordTrendGroup(name="holo", words=["holo"])
+    db.add(group)
+    db.flush()
+
+    real_mark = WordGroupHitIndexer._mark_indexed
+
+    def edit_then_mark(session, pending):
+        session.execute(
+            text("UPDATE word_trend_groups SET words = '[\"kusa\"]', updated_at = NOW() + interval '1 second'")
+        )
+        return real_mark(session, pending)
+
+    with patch.object(WordGroupHitIndexer, "_mark_indexed", staticmethod(edit_then_mark)):
+        result = indexer.backfill_pending()
+
+    assert result["groups_indexed"] == 0
+    db.refresh(group)
+    assert group.hits_indexed_at is None
+    assert db.query(WordGroupHourlyCount).count() == 0
+
+
+def test_stats_from_index_match_full_scan(client, hit_messages, indexer, db):
+    holo = WordTrendGroup(name="holo", words=["holo"], exclude_words=["cover"])
+    kusa = WordTrendGroup(name="kusa", words=["kusa", "草"])
+    db.add_all([holo, kusa])
+    db.flush()
+
+    start, end = BASE + timedelta(minutes=20), BASE + timedelta(hours=4, minutes=40)
+    scanned = _stats(client, [holo.id, kusa.id], start, end)
+
+    indexer.backfill_pending()
+    db.expire_all()
+    assert _stats(client, [holo.id, kusa.id], start, end) == scanned
+
+
+def test_stats_read_index_for_covered_hours(client, hit_messages, indexer, db):
+    group = WordTrendGroup(name="holo", words=["holo"])
+    db.add(group)
+    db.flush()
+    indexer.backfill_pending()
+
+    # Tamper with a covered hour: the endpoint must return the indexed value
+    db.query(WordGroupHourlyCount).filter(
+        WordGroupHourlyCount.group_id == group.id,
+        WordGroupHourlyCount.hour == BASE + timedelta(hours=1),
+    ).update({"count": 99})
+    db.flush()
+    db.expire_all()
+
+    result = _stats(client, [group.id], BASE, BASE + timedelta(hours=5))[group.id]
+    assert result[(BASE + timedelta(hours=1)).isoformat()] == 99
+    # 14:00 is past the checkpoint and still comes from chat_messages
+    assert (BASE + timedelta(hours=4)).isoformat() in result
@@ -484,3 +484,87 @@ def test_get_trend_stats_empty_exclude_words_no_effect(mock_get_video_id, client
 
     hourly_counts = {item["hour"]: item["count"] for item in data["groups"][0]["data"]}
     assert hourly_counts.get("2026-01-12T10:00:00+00:00") == 3  # unchanged
+
+
+@pytest.mark.parametrize("per_group_max, raw_reader", [
+    (2, '_sql_group_hourly_counts'),
+    (0, '_scan_group_hourly_counts'),
+])
+@patch('app.routers.word_trends.get_current_video_id')
+def test_get_trend_stats_overlapping_groups(mock_get_video_id, client, db, sample_messages_for_trends,
+                                            per_group_max, raw_reader):
+    """Overlapping words, shared words and case differences across groups, per-group SQL or one scan."""
+    from app.models import ChatMessage, WordTrendGroup
+    from app.routers import word_trends
+    from datetime import datetime, timezone
+    mock_get_video_id.return_value = 'test_stream'
+
+    db.add_all([
+        ChatMessage(
+            message_id=f'laugh_{i}', live_stream_id='test_stream', message=text_,
+            timestamp=1768212000000000 + i,
+            published_at=datetime(2026, 1, 12, 12, 40 + i, 0, tzinfo=timezone.utc),
+            author_name='TestUser', author_id='user_1', message_type='text_message',
+        )
+        for i, text_ in enumerate(["哈哈哈 WORD1", "哈哈", "Word5 哈"])
+    ])
+    laugh = WordTrendGroup(name='Laugh', words=['哈哈', '哈哈哈'], color='#111111')
+    mixed = WordTrendGroup(name='Mixed', words=['WORD1', 'word5'], exclude_words=['哈哈'], color='#222222')
+    db.add_all([laugh, mixed])
+    db.flush()
+
+    with patch.object(word_trends, 'PER_GROUP_QUERY_MAX_GROUPS', per_group_max), \
+         patch.object(word_trends, raw_reader, wraps=getattr(word_trends, raw_reader)) as reader:
+        response = client.post("/api/word-trends/stats", json={
+            "group_ids": [laugh.id, mixed.id],
+            "start_time": "2026-01-12T09:00:00Z",
+            "end_time": "2026-01-12T13:00:00Z",
+        })
+    assert response.status_code == 200
+    assert reader.called
+    by_id = {g["group_id"]: {d["hour"]: d["count"] for d in g["data"]} for g in response.json()["groups"]}
+
+    # "哈哈哈 WORD1" contains both laugh words but is counted once
+    assert by_id[laugh.id] == {"2026-01-12T12:00:00+00:00": 2}
+    # word1 x4 in hours 10/11, word5 x2 + "Word5 哈" in hour 12; "哈哈哈 WORD1" is excluded
+    assert by_id[mixed.id] == {
+        "2026-01-12T10:00:00+00:00": 3,
+        "2026-01-12T11:00:00+00:00": 1,
+        "2026-01-12T12:00:00+00:00": 3,
+    }
+
+
+def test_create_word_group_schedules_backfill(admin_client, db, queued_jobs):
+    """New groups start unindexed and queue a backfill for the ETL worker."""
+    from app.models import WordTrendGroup
+
+    response = admin_client.post("/api/word-trends/groups", json={"name": "Fresh", "words": ["abc"]})
+    assert response.status_code == 201
+    group = db.query(WordTrendGroup).filter(WordTrendGroup.id == response.json()["id"]).one()
+    assert group.hits_indexed_at is None
+    assert queued_jobs() == ['backfill_word_group_hits']
+
+
+def test_update_word_group_invalidates_hit_index_on_word_change(admin_client, db, queued_jobs):
+    """Editing words/exclude_words resets the hit index; name/color edits keep it."""
+    from app.models import WordTrendGroup
+    from datetime import datetime, timezone
+
+    group = WordTrendGroup(
+        name='Indexed', words=['a'], color='#000000',
+        hits_indexed_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+    )
+    db.add(group)
+    db.flush()
+
+    response = admin_client.put(f"/api/word-trends/groups/{group.id}", json={"color": "#FFFFFF", "words": ["a"]})
+    assert response.status_code == 200
+    db.refresh(group)
+    assert group.hits_indexed_at is not None
+    assert queued_jobs() == []
+
+    response = admin_client.put(f"/api/word-trends/groups/{group.id}", json={"exclude_words": ["b"]})
+    assert response.status_code == 200
+    db.refresh(group)
+    assert group.hits_indexed_at is None
+    assert queued_jobs() == ['backfill_word_group_hits']
@@ -1,10 +1,23 @@
 """Tests for wordcloud router.
 
 Note: The wordcloud router uses PostgreSQL-specific features (unnest for arrays),
-so we mock the database execute calls to test the endpoint logic.
+so we mock the database execute calls to test the endpoint logic. The endpoint
+reads from the async analytics session, so the mock is wrapped in AsyncSessionAdapter.
 """
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from tests.conftest import AsyncSessionAdapter
+
+
+@pytest.fixture(autouse=True)
+def no_query_guard():
+    """The mocked sessions only answer the word queries; guards are covered in test_query_guard.py
+    and archived streams in test_stream_archiver.py."""
+    with patch('app.routers.wordcloud.apply_statement_timeout_async', new=AsyncMock()), \
+         patch('app.routers.wordcloud.estimate_cost', return_value=0.0), \
+         patch('app.routers.wordcloud._fetch_archived_tokens', return_value=([], 0)):
+        yield
 
 
 class TestGetWordFrequency:
@@ -18,17 +31,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = (0, 0)
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency")
@@ -40,7 +53,7 @@ class TestGetWordFrequency:
                 assert "excluded_words" in data
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_with_data(self, client):
         """Test endpoint returns word frequency data."""
@@ -58,17 +71,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = (100, 50)
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency")
@@ -83,7 +96,7 @@ class TestGetWordFrequency:
                 assert data["unique_words"] == 50
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_with_limit(self, client):
         """Test endpoint respects limit parameter."""
@@ -100,17 +113,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = (50, 25)
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency?limit=3")
@@ -120,7 +133,7 @@ class TestGetWordFrequency:
                 assert len(data["words"]) <= 3
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_excludes_punctuation(self, client):
         """Test endpoint excludes punctuation from results."""
@@ -137,17 +150,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = (100, 50)
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency")
@@ -160,7 +173,7 @@ class TestGetWordFrequency:
                 assert "。" not in words
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_with_custom_exclude(self, client):
         """Test endpoint excludes custom words from results."""
@@ -175,17 +188,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = (100, 50)
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency?exclude_words=哈哈,好")
@@ -197,7 +210,7 @@ class TestGetWordFrequency:
                 assert "讚" in words
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_with_video_id_filter(self, client):
         """Test endpoint filters by current video ID."""
@@ -207,17 +220,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = (10, 5)
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency")
@@ -227,7 +240,7 @@ class TestGetWordFrequency:
                 assert mock_db.execute.called
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_with_time_filter(self, client):
         """Test endpoint accepts time filter parameters."""
@@ -237,17 +250,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = (20, 10)
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get(
@@ -261,22 +274,22 @@ class TestGetWordFrequency:
                 assert data["words"][0]["word"] == "時間詞"
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_database_error(self, client):
         """Test endpoint handles database errors gracefully."""
         with patch('app.routers.wordcloud.get_current_video_id', return_value=None):
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = Exception("Database connection failed")
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency")
@@ -285,7 +298,7 @@ class TestGetWordFrequency:
                 assert "detail" in data
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
 
     def test_word_frequency_limit_validation(self, client):
         """Test endpoint validates limit parameter."""
@@ -305,17 +318,17 @@ class TestGetWordFrequency:
             mock_stats_result = MagicMock()
             mock_stats_result.fetchone.return_value = None  # No stats row
             
-            from app.core.database import get_db
+            from app.core.database import get_analytics_db
             from main import app
             
             mock_db = MagicMock()
             mock_db.execute.side_effect = [mock_result, mock_stats_result]
             
             def mock_db_override():
-                yield mock_db
+                yield AsyncSessionAdapter(mock_db)
             
-            original_override = app.dependency_overrides.get(get_db)
-            app.dependency_overrides[get_db] = mock_db_override
+            original_override = app.dependency_overrides.get(get_analytics_db)
+            app.dependency_overrides[get_analytics_db] = mock_db_override
             
             try:
                 response = client.get("/api/wordcloud/word-frequency")
@@ -325,5 +338,16 @@ class TestGetWordFrequency:
                 assert data["unique_words"] == 0
             finally:
                 if original_override:
-                    app.dependency_overrides[get_db] = original_override
+                    app.dependency_overrides[get_analytics_db] = original_override
+
+
+def test_count_words_adds_archived_counts():
+    """Archived (word, message count) pairs go through the same replacement and exclusion."""
+    from app.routers.wordcloud import count_words_with_replacement
+
+    rows = [("msg1", "哈哈"), ("msg2", "哈")]
+    words = count_words_with_replacement(
+        rows, {"哈": "哈哈"}, {"~"}, 10, archived_counts=[("哈", 5), ("好", 2), ("~", 9)]
+    )
 
+    assert words == [{"word": "哈哈", "count": 7}, {"word": "好", "count": 2}]
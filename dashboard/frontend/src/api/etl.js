@@ -65,6 +65,17 @@ export const fetchETLLogs = async ({ jobId, status, limit = 50 } = {}) => {
     return res.json();
 };
 
+/**
+ * 取消排隊中或執行中的 ETL 任務
+ */
+export const cancelETLRun = async (logId) => {
+    const res = await authFetch(`${API_BASE_URL}/api/admin/etl/logs/${logId}/cancel`, {
+        method: 'POST',
+    });
+    if (!res.ok) throw new Error(`API error: ${res.status}`);
+    return res.json();
+};
+
 /**
  * 取得 ETL 設定
  */
@@ -1,5 +1,9 @@
 import API_BASE_URL from './client';
 
+// Query guard errors carry a structured detail ({ error, message, ... })
+const errorMessage = (errorData, status) =>
+    errorData.detail?.message || errorData.detail || `HTTP error! status: ${status}`;
+
 export const fetchPlaybackSnapshots = async ({ startTime, endTime, stepSeconds }) => {
     const params = new URLSearchParams({
         start_time: startTime,
@@ -10,7 +14,7 @@ export const fetchPlaybackSnapshots = async ({ startTime, endTime, stepSeconds }
     const response = await fetch(`${API_BASE_URL}/api/playback/snapshots?${params}`);
     if (!response.ok) {
         const errorData = await response.json();
-        throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
+        throw new Error(errorMessage(errorData, response.status));
     }
     return response.json();
 };
@@ -34,7 +38,7 @@ export const fetchPlaybackWordCloudSnapshots = async ({ startTime, endTime, step
     const response = await fetch(`${API_BASE_URL}/api/playback/word-frequency-snapshots?${params}`);
     if (!response.ok) {
         const errorData = await response.json();
-        throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
+        throw new Error(errorMessage(errorData, response.status));
     }
     return response.json();
 };
@@ -18,17 +18,20 @@ import {
     pauseETLJob,
     resumeETLJob,
     fetchETLLogs,
+    cancelETLRun,
 } from '../../api/etl';
 import ETLSettingsManager from './ETLSettingsManager';
 import PromptTemplatesManager from './PromptTemplatesManager';
 
 const StatusBadge = ({ status }) => {
     const styles = {
+        queued: 'bg-yellow-100 text-yellow-800',
         running: 'bg-blue-100 text-blue-800',
         completed: 'bg-green-100 text-green-800',
         failed: 'bg-red-100 text-red-800',
         pending: 'bg-yellow-100 text-yellow-800',
         skipped: 'bg-orange-100 text-orange-800',
+        cancelled: 'bg-gray-200 text-gray-700',
     };
 
     return (
@@ -38,6 +41,17 @@ const StatusBadge = ({ status }) => {
     );
 };
 
+const formatProgress = (progress) => {
+    if (!progress) return null;
+    const parts = [`${progress.batches_done} batches`];
+    parts.push(progress.rows_total != null
+        ? `${progress.rows_done}/${progress.rows_total} rows`
+        : `${progress.rows_done} rows`);
+    if (progress.rows_per_sec != null) parts.push(`${progress.rows_per_sec}/s`);
+    if (progress.eta_seconds != null) parts.push(`ETA ${progress.eta_seconds}s`);
+    return parts.join(' · ');
+};
+
 const ETLJobsManager = () => {
     const [activeTab, setActiveTab] = useState('jobs');
     const [jobs, setJobs] = useState({ scheduled: [], manual: [] });
@@ -68,18 +82,39 @@ const ETLJobsManager = () => {
         }
     }, []);
 
+    const hasActiveRuns = logs.some((log) => log.status === 'queued' || log.status === 'running');
+
     useEffect(() => {
         loadData();
-        // 每 30 秒自動刷新
-        const interval = setInterval(loadData, 30000);
-        return () => clearInterval(interval);
     }, [loadData]);
 
+    useEffect(() => {
+        // 有排隊或執行中的任務時每 5 秒刷新以顯示進度，否則每 30 秒
+        const interval = setInterval(loadData, hasActiveRuns ? 5000 : 30000);
+        return () => clearInterval(interval);
+    }, [loadData, hasActiveRuns]);
+
+    const handleCancel = async (logId) => {
+        try {
+            const result = await cancelETLRun(logId);
+            setSuccessMessage(result.status === 'cancelling'
+                ? 'Cancellation requested; the task will stop after its current batch'
+                : result.success === false ? 'Task has already finished' : 'Task has been cancelled');
+            setTimeout(() => setSuccessMessage(null), 3000);
+            await loadData();
+        } catch (err) {
+            console.error('Error cancelling run:', err);
+            setError(`Failed to cancel run: ${err.message}`);
+        }
+    };
+
     const handleTrigger = async (jobId) => {
         try {
             setTriggeringJob(jobId);
-            await triggerETLJob(jobId);
-            setSuccessMessage(`Task "${jobId}" has been triggered`);
+            const result = await triggerETLJob(jobId);
+            setSuccessMessage(result.success === false
+                ? `Task "${jobId}" is already queued or running`
+                : `Task "${jobId}" has been queued`);
             setTimeout(() => setSuccessMessage(null), 3000);
             // 立即刷新一次
             await loadData();
@@ -368,6 +403,7 @@ const ETLJobsManager = () => {
                                         <th className="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                                             Records
                                         </th>
+                                        <th className="px-4 py-3" />
                                     </tr>
                                 </thead>
                                 <tbody className="bg-white divide-y divide-gray-200">
@@ -389,6 +425,11 @@ const ETLJobsManager = () => {
                                             </td>
                                             <td className="px-4 py-3 whitespace-nowrap">
                                                 <StatusBadge status={log.status} />
+                                                {log.status === 'running' && log.progress && (
+                                                    <div className="mt-1 text-xs text-gray-500">
+                                                        {formatProgress(log.progress)}
+                                                    </div>
+                                                )}
                                             </td>
                                             <td className="px-4 py-3 whitespace-nowrap text-sm text-gray-500">
                                                 {formatDateTime(log.started_at)}
@@ -399,11 +440,22 @@ const ETLJobsManager = () => {
                                             <td className="px-4 py-3 whitespace-nowrap text-sm text-gray-500">
                                                 {log.records_processed || 0}
                                             </td>
+                                            <td className="px-4 py-3 whitespace-nowrap text-right">
+                                                {(log.status === 'queued' || log.status === 'running') && (
+                                                    <button
+                                                        onClick={() => handleCancel(log.id)}
+                                                        disabled={log.cancel_requested}
+                                                        className="px-2 py-1 text-xs text-red-600 hover:bg-red-50 rounded disabled:opacity-50"
+                                                    >
+                                                        {log.cancel_requested ? 'Cancelling…' : 'Cancel'}
+                                                    </button>
+                                                )}
+                                            </td>
                                         </tr>
                                     ))}
                                     {logs.length === 0 && (
                                         <tr>
-                                            <td colSpan="6" className="px-4 py-8 text-center text-gray-500">
+                                            <td colSpan="7" className="px-4 py-8 text-center text-gray-500">
                                                 No execution logs yet
                                             </td>
                                         </tr>
@@ -2,8 +2,10 @@
 -- YouTube Live Chat Collection and Analysis System
 
 -- Create chat_messages table
+-- Range-partitioned by month on published_at; partitions are created by
+-- 21_partition_chat_messages.sql and the maintain_partitions ETL task
 CREATE TABLE chat_messages (
-    message_id VARCHAR(255) PRIMARY KEY,
+    message_id VARCHAR(255) NOT NULL,
     live_stream_id VARCHAR(255) NOT NULL,
     message TEXT NOT NULL,
     timestamp BIGINT NOT NULL,
@@ -15,8 +17,9 @@ CREATE TABLE chat_messages (
     message_type VARCHAR(50),
     action_type VARCHAR(50),
     raw_data JSONB,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (message_id, published_at)
+) PARTITION BY RANGE (published_at);
 
 -- Create stream_stats table
 CREATE TABLE stream_stats (
@@ -36,10 +39,17 @@ CREATE TABLE stream_stats (
 );
 
 -- Create indexes for performance
-CREATE INDEX idx_chat_messages_live_stream_published ON chat_messages(live_stream_id, published_at);
+-- Rows arrive in published_at order: BRIN serves time-range scans at a fraction
+-- of a B-tree's size and insert cost. BRIN has no order, so the B-tree stays for
+-- latest-message lookups and MIN/MAX. The covering index makes per-stream
+-- timelines and paid/non-paid counts Index Only Scans.
+-- Benchmark: database/migrations/19_benchmark_indexes.sql + scripts/benchmark_indexes.py
 CREATE INDEX idx_chat_messages_published_at ON chat_messages(published_at);
+CREATE INDEX idx_chat_messages_published_at_brin ON chat_messages USING BRIN (published_at)
+    WITH (pages_per_range = 32);
+CREATE INDEX idx_chat_messages_stream_published_covering ON chat_messages(live_stream_id, published_at)
+    INCLUDE (message_type);
 CREATE INDEX idx_chat_messages_author_id ON chat_messages(author_id);
-CREATE INDEX idx_chat_messages_timestamp ON chat_messages(timestamp);
 
 -- Partial indexes for Super Chat (paid_message + ticker_paid_message_item) queries — compact and fast
 CREATE INDEX idx_chat_messages_paid ON chat_messages(live_stream_id, published_at)
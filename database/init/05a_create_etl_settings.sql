@@ -21,14 +21,15 @@ CREATE TABLE IF NOT EXISTS etl_execution_log (
     id SERIAL PRIMARY KEY,
     job_id VARCHAR(100) NOT NULL,
     job_name VARCHAR(255) NOT NULL,
-    status VARCHAR(20) DEFAULT 'running',  -- running, completed, failed
+    status VARCHAR(20) DEFAULT 'running',  -- queued, running, completed, failed, skipped, cancelled
     trigger_type VARCHAR(20) DEFAULT 'scheduled',  -- scheduled, manual
     started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP WITH TIME ZONE,
     duration_seconds INTEGER,
     records_processed INTEGER DEFAULT 0,
     error_message TEXT,
-    metadata JSONB
+    metadata JSONB,                        -- progress: 執行中任務的進度（批次、筆數、每秒筆數、預估剩餘秒數）
+    cancel_requested_at TIMESTAMP WITH TIME ZONE  -- 管理員要求取消，任務於下一次回報進度時停止
 );
 
 -- Composite index for (job_id, started_at DESC) — covers filtered + sorted queries.
@@ -61,7 +62,25 @@ INSERT INTO etl_settings (key, value, value_type, description, category, is_sens
 ('DISCORD_WEBHOOK_URL', '', 'string', 'Discord Webhook URL（用於 Collector 監控告警）', 'monitor', true),
 ('MONITOR_ENABLED', 'true', 'boolean', '啟用 Collector 監控', 'monitor', false),
 ('MONITOR_NO_DATA_THRESHOLD_MINUTES', '10', 'integer', '無新資料告警閾值（分鐘）', 'monitor', false),
-('MONITOR_ALERT_STATE', '{}', 'string', 'Collector 監控告警狀態（系統內部使用）', 'monitor', true)
+('MONITOR_ALERT_STATE', '{}', 'string', 'Collector 監控告警狀態（系統內部使用）', 'monitor', true),
+
+-- 回放快取設定
+('PLAYBACK_CACHE_ENABLED', 'true', 'boolean', '直播結束後預先計算回放快照 timeline', 'etl', false),
+
+-- 分區維護設定
+('PARTITION_MONTHS_AHEAD', '3', 'integer', '聊天留言分區表預先建立的月份數', 'etl', false),
+
+-- 資料保留 / 冷封存設定
+('RETENTION_ENABLED', 'false', 'boolean', '啟用冷封存：已結束直播的原始留言匯出到 ARCHIVE_DIR 後從資料庫刪除', 'etl', false),
+('RETENTION_ARCHIVE_AFTER_DAYS', '90', 'integer', '最後一則留言超過幾天的已結束直播會被封存', 'etl', false),
+('RETENTION_ARCHIVE_FORMAT', 'parquet', 'string', '封存檔格式（parquet 或 jsonl）', 'etl', false),
+('RETENTION_MAX_STREAMS_PER_RUN', '5', 'integer', '每次執行最多封存的直播數', 'etl', false),
+('RETENTION_RESTORE_HOLD_DAYS', '7', 'integer', '還原的直播保留幾天後才會再次封存', 'etl', false),
+('RETENTION_TOKEN_MIN_COUNT', '2', 'integer', '封存時保留的斷詞次數下限（stream_token_counts）', 'etl', false),
+('ETL_LOG_RETENTION_DAYS', '90', 'integer', 'ETL 執行記錄保留天數', 'etl', false),
+
+-- 留言擷取器設定
+('MENTION_EDITOR_AUTHOR_IDS', 'UCeMjhoCCvujpObnt6yeZeNg', 'string', 'editor 擷取器追蹤的作者 ID（逗號分隔）', 'etl', false)
 ON CONFLICT (key) DO NOTHING;
 
 
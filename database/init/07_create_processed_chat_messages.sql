@@ -1,9 +1,9 @@
 -- Processed Chat Messages Table
 -- 用於存放經過 ETL 處理後的留言資料，支援文字分析
 
--- 處理後的留言表
+-- 處理後的留言表（依 published_at 每月分區，見 21_partition_chat_messages.sql）
 CREATE TABLE IF NOT EXISTS processed_chat_messages (
-    message_id VARCHAR(255) PRIMARY KEY,
+    message_id VARCHAR(255) NOT NULL,
     live_stream_id VARCHAR(255) NOT NULL,
     original_message TEXT NOT NULL,
     processed_message TEXT NOT NULL,
@@ -13,8 +13,9 @@ CREATE TABLE IF NOT EXISTS processed_chat_messages (
     author_name VARCHAR(255) NOT NULL,
     author_id VARCHAR(255) NOT NULL,
     published_at TIMESTAMP WITH TIME ZONE NOT NULL,
-    processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (message_id, published_at)
+) PARTITION BY RANGE (published_at);
 
 -- ETL 檢查點表
 CREATE TABLE IF NOT EXISTS processed_chat_checkpoint (
@@ -28,12 +29,12 @@ CREATE TABLE IF NOT EXISTS processed_chat_checkpoint (
 -- Composite index for (live_stream_id, published_at) — covers most wordcloud/playback queries.
 -- Also serves as an index on live_stream_id alone (prefix matching).
 CREATE INDEX IF NOT EXISTS idx_processed_chat_stream_published ON processed_chat_messages(live_stream_id, published_at);
+-- 全域 MIN(published_at)（每小時彙總的涵蓋範圍）需要 B-tree：BRIN 沒有順序，只能掃描所有分區
 CREATE INDEX IF NOT EXISTS idx_processed_chat_published_at ON processed_chat_messages(published_at);
-CREATE INDEX IF NOT EXISTS idx_processed_chat_author_id ON processed_chat_messages(author_id);
-
--- GIN 索引用於陣列查詢（詞頻、emoji 統計）
-CREATE INDEX IF NOT EXISTS idx_processed_chat_tokens ON processed_chat_messages USING GIN(tokens);
-CREATE INDEX IF NOT EXISTS idx_processed_chat_emojis ON processed_chat_messages USING GIN(unicode_emojis);
+-- 依 published_at 順序寫入，時間範圍掃描用 BRIN 即可
+-- （詞頻、emoji 統計都是先以時間範圍篩選再 unnest，不需要 tokens / unicode_emojis 的 GIN 索引）
+CREATE INDEX IF NOT EXISTS idx_processed_chat_published_at_brin ON processed_chat_messages USING BRIN (published_at)
+    WITH (pages_per_range = 32);
 
 -- 添加註釋
 COMMENT ON TABLE processed_chat_messages IS '處理後的聊天留言表，包含斷詞結果和 emoji 解析';
@@ -1,16 +1,22 @@
 -- ============================================================
--- GIN Indexes for ILIKE Optimization (New Environment)
+-- GIN Indexes for Chat Search (New Environment)
 -- ============================================================
 -- This script creates GIN indexes using pg_trgm extension to
--- significantly speed up ILIKE '%keyword%' pattern queries.
+-- significantly speed up substring ('%keyword%') search queries.
 --
 -- GIN (Generalized Inverted Index) with trigram operators allows
--- PostgreSQL to use indexes for ILIKE queries that would otherwise
+-- PostgreSQL to use indexes for LIKE queries that would otherwise
 -- require full table scans.
 --
+-- The indexes are on lower(column) expressions. The backend search
+-- helpers (app/services/search.py) filter with
+--   lower(column) LIKE lower('%keyword%')
+-- so one index serves every case-insensitive search.
+--
 -- Target columns:
 --   - author_name: Used for filtering chat messages by author
 --   - message: Used for filtering chat messages by content
+--              and word occurrences
 --
 -- Performance improvement:
 --   Without GIN: O(n) full table scan
@@ -20,10 +26,10 @@
 -- Enable pg_trgm extension (required for gin_trgm_ops)
 CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
--- Create GIN index on author_name for ILIKE queries
-CREATE INDEX IF NOT EXISTS idx_chat_messages_author_trgm 
-    ON chat_messages USING GIN (author_name gin_trgm_ops);
+-- Create GIN index on lower(author_name) for author search
+CREATE INDEX IF NOT EXISTS idx_chat_messages_author_lower_trgm
+    ON chat_messages USING GIN (lower(author_name) gin_trgm_ops);
 
--- Create GIN index on message content for ILIKE queries
-CREATE INDEX IF NOT EXISTS idx_chat_messages_message_trgm 
-    ON chat_messages USING GIN (message gin_trgm_ops);
+-- Create GIN index on lower(message) for message search
+CREATE INDEX IF NOT EXISTS idx_chat_messages_message_lower_trgm
+    ON chat_messages USING GIN (lower(message) gin_trgm_ops);
@@ -7,6 +7,7 @@ CREATE TABLE IF NOT EXISTS word_trend_groups (
     words JSON NOT NULL,  -- Array of strings: ["holo", "cover", "星街"]
     exclude_words JSON,
     color VARCHAR(20) DEFAULT '#5470C6',
+    hits_indexed_at TIMESTAMPTZ,  -- NULL until word_group_hourly_counts is backfilled (see 17_create_word_group_hourly_counts.sql)
     created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
 );
@@ -18,3 +19,4 @@ COMMENT ON TABLE word_trend_groups IS 'Stores user-defined word groups for trend
 COMMENT ON COLUMN word_trend_groups.words IS 'JSON array of strings to match against chat messages using ILIKE contains logic';
 COMMENT ON COLUMN word_trend_groups.color IS 'Hex color code for the line chart, e.g. #5470C6';
 COMMENT ON COLUMN word_trend_groups.exclude_words IS 'Optional JSON array of strings; messages matching any exclude word are not counted even if they match an include word';
+COMMENT ON COLUMN word_trend_groups.hits_indexed_at IS 'When word_group_hourly_counts was last backfilled for this group; NULL means the counts are pending and stats fall back to scanning chat_messages';
@@ -0,0 +1,20 @@
+-- Playback snapshot cache
+-- 已結束直播的回放 timeline（/api/playback/snapshots 與 word-frequency-snapshots）
+-- 由 ETL build_playback_cache 任務預先計算，payload 為 gzip 壓縮的 JSON 陣列
+
+CREATE TABLE IF NOT EXISTS playback_snapshot_cache (
+    id SERIAL PRIMARY KEY,
+    live_stream_id VARCHAR(255) NOT NULL,
+    kind VARCHAR(20) NOT NULL,                 -- 'stats' or 'wordcloud'
+    step_seconds INTEGER NOT NULL,
+    window_hours INTEGER NOT NULL DEFAULT 0,   -- 0 for stats timelines
+    start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    end_time TIMESTAMP WITH TIME ZONE NOT NULL,
+    snapshot_count INTEGER NOT NULL DEFAULT 0,
+    payload BYTEA NOT NULL,
+    etag VARCHAR(64) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_playback_snapshot_cache_key UNIQUE (live_stream_id, kind, step_seconds, window_hours)
+);
+
+-- Note: the UNIQUE constraint's implicit index covers lookups by (live_stream_id, kind).
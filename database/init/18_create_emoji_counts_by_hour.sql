@@ -0,0 +1,17 @@
+-- Emoji counts by hour
+-- 每小時各 emoji 出現的留言數（COUNT(DISTINCT message_id)），/api/emojis/stats 直接查表
+-- 由 ETL process_chat_messages 在寫入 processed_chat_messages 時同一個 transaction 累加
+
+CREATE TABLE IF NOT EXISTS emoji_counts_by_hour (
+    live_stream_id VARCHAR(255) NOT NULL,
+    hour TIMESTAMPTZ NOT NULL,
+    is_youtube BOOLEAN NOT NULL,
+    emoji TEXT NOT NULL,            -- Unicode emoji character or YouTube emote name
+    image_url TEXT,                 -- YouTube emotes only
+    message_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (live_stream_id, hour, is_youtube, emoji)
+);
+
+-- Stats without a stream filter read every stream's rows in the hour range
+CREATE INDEX IF NOT EXISTS idx_emoji_counts_by_hour_hour
+    ON emoji_counts_by_hour (hour);
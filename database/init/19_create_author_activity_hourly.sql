@@ -0,0 +1,24 @@
+-- Author activity by hour
+-- 每小時各作者（依顯示名稱）的留言數 / 付費留言數與首末留言時間
+-- /api/chat/top-authors 與作者摘要、趨勢直接查表，不再聚合整段 chat_messages
+-- 由 ETL process_chat_messages 在寫入 processed_chat_messages 時同一個 transaction 累加
+
+CREATE TABLE IF NOT EXISTS author_activity_hourly (
+    live_stream_id VARCHAR(255) NOT NULL,
+    hour TIMESTAMPTZ NOT NULL,
+    author_id VARCHAR(255) NOT NULL,
+    author_name VARCHAR(255) NOT NULL,  -- 同一作者改名會分成多列；最新名稱取 last_seen 最大者
+    message_count INTEGER NOT NULL DEFAULT 0,
+    paid_count INTEGER NOT NULL DEFAULT 0,
+    first_seen TIMESTAMPTZ NOT NULL,
+    last_seen TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (live_stream_id, hour, author_id, author_name)
+);
+
+-- Author summary / trend look up one author over a time range
+CREATE INDEX IF NOT EXISTS idx_author_activity_hourly_author_hour
+    ON author_activity_hourly (author_id, hour);
+
+-- Leaderboards without a stream filter read every stream's rows in the hour range
+CREATE INDEX IF NOT EXISTS idx_author_activity_hourly_hour
+    ON author_activity_hourly (hour);
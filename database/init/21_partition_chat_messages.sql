@@ -0,0 +1,47 @@
+-- Monthly partitions for chat_messages / processed_chat_messages
+-- 兩張留言表依 published_at 每月分區（UTC 月界），時間範圍查詢只掃描相關月份
+--
+-- create_monthly_partition(parent, month) 建立 <parent>_YYYY_MM 分區；
+-- ETL 任務 maintain_partitions 每天預先建立未來 PARTITION_MONTHS_AHEAD 個月的分區。
+-- 不在任何月份分區範圍內的資料會寫入 <parent>_default，
+-- 建立該月分區時會被搬進新分區。
+
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent TEXT, month DATE) RETURNS TEXT AS $fn$
+DECLARE
+    month_start DATE := date_trunc('month', month)::date;
+    lower_bound TIMESTAMPTZ := month_start::timestamp AT TIME ZONE 'UTC';
+    upper_bound TIMESTAMPTZ := (month_start + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC';
+    partition_name TEXT := parent || '_' || to_char(month_start, 'YYYY_MM');
+    default_name TEXT := parent || '_default';
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    EXECUTE 'CREATE TABLE ' || quote_ident(partition_name)
+         || ' (LIKE ' || quote_ident(parent) || ' INCLUDING DEFAULTS)';
+
+    -- Rows of this month already routed to the default partition must move
+    -- first, or ATTACH fails its range check
+    IF to_regclass(default_name) IS NOT NULL THEN
+        EXECUTE 'LOCK TABLE ' || quote_ident(default_name) || ' IN ACCESS EXCLUSIVE MODE';
+        EXECUTE 'WITH moved AS (DELETE FROM ' || quote_ident(default_name)
+             || ' WHERE published_at >= $1 AND published_at < $2 RETURNING *)'
+             || ' INSERT INTO ' || quote_ident(partition_name) || ' SELECT * FROM moved'
+            USING lower_bound, upper_bound;
+    END IF;
+
+    -- ATTACH builds the parent's indexes on the new partition
+    EXECUTE 'ALTER TABLE ' || quote_ident(parent) || ' ATTACH PARTITION ' || quote_ident(partition_name)
+         || ' FOR VALUES FROM (' || quote_literal(lower_bound) || ') TO (' || quote_literal(upper_bound) || ')';
+    RETURN partition_name;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS chat_messages_default PARTITION OF chat_messages DEFAULT;
+CREATE TABLE IF NOT EXISTS processed_chat_messages_default PARTITION OF processed_chat_messages DEFAULT;
+
+-- 本月起 4 個月的分區（之後由 maintain_partitions 接手）
+SELECT create_monthly_partition(parent, (date_trunc('month', NOW() AT TIME ZONE 'UTC') + m * INTERVAL '1 month')::date)
+FROM unnest(ARRAY['chat_messages', 'processed_chat_messages']) AS parent,
+     generate_series(0, 3) AS m;
@@ -0,0 +1,36 @@
+-- Stream retention / cold archive
+-- 已結束直播的原始留言（chat_messages / processed_chat_messages / stream_stats）
+-- 由 ETL archive_streams 匯出到 ARCHIVE_DIR/<video_id>/（Parquet 或 JSONL）後刪除，
+-- 只在資料庫保留精簡彙總；dashboard/backend/scripts/archive_streams.py restore 可還原
+
+CREATE TABLE IF NOT EXISTS stream_archives (
+    live_stream_id VARCHAR(255) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'archived',  -- archived, restored
+    archive_path TEXT NOT NULL,
+    file_format VARCHAR(20) NOT NULL,                -- parquet, jsonl
+    row_counts JSONB NOT NULL,                       -- {table: rows}
+    size_bytes BIGINT NOT NULL DEFAULT 0,
+    first_published_at TIMESTAMPTZ,
+    last_published_at TIMESTAMPTZ,
+    archived_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    restored_at TIMESTAMPTZ
+);
+
+-- 每小時留言 / 付費留言 / 作者數與台幣營收，/api/stats/comments 讀取
+CREATE TABLE IF NOT EXISTS stream_hourly_rollups (
+    live_stream_id VARCHAR(255) NOT NULL,
+    hour TIMESTAMPTZ NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    paid_message_count INTEGER NOT NULL DEFAULT 0,
+    author_count INTEGER NOT NULL DEFAULT 0,
+    revenue_twd NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (live_stream_id, hour)
+);
+
+-- 整場直播各斷詞出現的留言數（低於 RETENTION_TOKEN_MIN_COUNT 的不保留），/api/wordcloud 讀取
+CREATE TABLE IF NOT EXISTS stream_token_counts (
+    live_stream_id VARCHAR(255) NOT NULL,
+    token TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (live_stream_id, token)
+);
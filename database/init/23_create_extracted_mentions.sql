@@ -0,0 +1,36 @@
+-- Extracted mentions
+-- 留言擷取器（mention_extractors）在 ETL 斷詞時對每則留言套用一次（regex 或程式內註冊的 builtin），
+-- 命中值寫入 extracted_mentions；/api/incense-map/candidates 直接 GROUP BY 查表，
+-- 只有 ETL 尚未處理的尾段才掃描 chat_messages。
+-- 由 ETL process_chat_messages 在寫入 processed_chat_messages 時同一個 transaction 寫入；
+-- 新建擷取器或修改 pattern 時 backfilled_at 設為 NULL，
+-- 由 backfill_mentions 任務從 processed_chat_messages 重新擷取
+
+CREATE TABLE IF NOT EXISTS mention_extractors (
+    name VARCHAR(64) PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL DEFAULT 'regex',  -- regex（管理員建立）, builtin（程式內註冊）
+    pattern TEXT,                       -- regex 擷取器的 Python regex；擷取值為第一個 group（沒有 group 時取整段）
+    description TEXT,
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    backfilled_at TIMESTAMPTZ,          -- NULL = 待回填，API 改掃原始留言
+    backfill_cursor TIMESTAMPTZ,        -- 回填進度：此時間以前的已處理留言已擷取
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS extracted_mentions (
+    extractor VARCHAR(64) NOT NULL REFERENCES mention_extractors(name) ON DELETE CASCADE,
+    message_id VARCHAR(255) NOT NULL,
+    published_at TIMESTAMPTZ NOT NULL,
+    live_stream_id VARCHAR(255) NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (extractor, message_id, published_at)
+);
+
+-- 地圖查詢：單一擷取器、單一直播、時間範圍，GROUP BY value 只讀索引
+CREATE INDEX IF NOT EXISTS idx_extracted_mentions_extractor_stream_published
+    ON extracted_mentions (extractor, live_stream_id, published_at) INCLUDE (value);
+
+INSERT INTO mention_extractors (name, pattern, description) VALUES
+    ('incense', '([一-鿿]{2,6})代表上香', '上香地圖：「XX代表上香」的地區詞')
+ON CONFLICT (name) DO NOTHING;
@@ -0,0 +1,27 @@
+-- ETL job queue
+-- 手動觸發的 ETL 任務由 API 寫入 etl_job_queue（同時建立 status = 'queued' 的 etl_execution_log），
+-- 獨立的 ETL worker（python -m app.etl.worker）以 FOR UPDATE SKIP LOCKED 領取後執行，
+-- API worker 不再執行任何 ETL 任務。
+-- 執行中的任務由 worker 定期更新 heartbeat_at；過久未更新（worker 中斷）的任務標記為失敗。
+
+CREATE TABLE IF NOT EXISTS etl_job_queue (
+    id SERIAL PRIMARY KEY,
+    job_id VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',  -- queued, running, completed, failed, skipped, cancelled
+    etl_log_id INTEGER REFERENCES etl_execution_log(id),
+    enqueued_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    worker_id VARCHAR(255),                        -- 領取的 worker（hostname:pid）
+    heartbeat_at TIMESTAMPTZ,                      -- 執行中由 worker 定期更新
+    error_message TEXT
+);
+
+-- worker 領取：只索引排隊中的任務
+CREATE INDEX IF NOT EXISTS idx_etl_job_queue_queued ON etl_job_queue(enqueued_at) WHERE status = 'queued';
+
+-- 同一任務最多一筆排隊或執行中（多個 API worker 同時觸發時只會排入一次）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_etl_job_queue_pending_job ON etl_job_queue(job_id)
+    WHERE status IN ('queued', 'running');
+
+COMMENT ON TABLE etl_job_queue IS '手動觸發的 ETL 任務佇列（由 ETL worker 領取執行）';
@@ -6,10 +6,20 @@
 --   2. 執行 migration
 --   3. 再跑一次本腳本，比較 Execution Time 差異
 --
+-- 自動化比較（30_brin_covering_indexes.sql 等之後的索引調整也適用）：
+--   cd dashboard/backend
+--   python scripts/benchmark_indexes.py snapshot --output before.json
+--   (執行 migration)
+--   python scripts/benchmark_indexes.py snapshot --output after.json
+--   python scripts/benchmark_indexes.py compare before.json after.json
+--   harness 會執行本檔每一個 EXPLAIN ANALYZE，自動代入 'YOUR_VIDEO_ID' 與 NOW()，
+--   並量測索引大小與寫入速度。新增查詢時沿用「-- N. 標題」的分節格式。
+--
 -- 關注指標：
 --   - "Execution Time" (毫秒) — 實際執行耗時
 --   - "Seq Scan" vs "Index Scan" / "Bitmap Index Scan" — 有無用到索引
 --   - "Rows Removed by Filter" — 過濾掉多少無用行（越少越好）
+--   - "Heap Fetches" — Index Only Scan 仍需回表的行數（越少越好）
 --
 -- 注意：請替換下方的 :video_id 為你實際的 live_stream_id
 --       可先執行以下查詢取得：
@@ -127,7 +137,115 @@ SELECT * FROM meaningless_words WHERE word = '測試詞';
 
 
 -- ============================================================
--- 6. 索引大小對比（migration 前後各跑一次）
+-- 6. 回放 snapshots 留言時間序列 (chat_messages)
+--    受益索引: idx_chat_messages_stream_published_covering
+--    預期: Index Only Scan，不回表
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT published_at
+FROM chat_messages
+WHERE live_stream_id = 'YOUR_VIDEO_ID'
+  AND published_at >= NOW() - INTERVAL '6 hours'
+  AND published_at <= NOW()
+ORDER BY published_at;
+
+-- 每小時留言數 (/api/stats/comments)
+EXPLAIN ANALYZE
+SELECT date_trunc('hour', published_at) AS hour, COUNT(*) AS count
+FROM chat_messages
+WHERE live_stream_id = 'YOUR_VIDEO_ID'
+  AND published_at >= NOW() - INTERVAL '24 hours'
+GROUP BY 1
+ORDER BY 1;
+
+-- 留言列表總數，排除付費留言 (/api/chat/messages?paid_message_filter=non_paid_only)
+-- message_type 在 INCLUDE 欄位中，過濾不需回表
+EXPLAIN ANALYZE
+SELECT COUNT(*)
+FROM chat_messages
+WHERE live_stream_id = 'YOUR_VIDEO_ID'
+  AND published_at >= NOW() - INTERVAL '24 hours'
+  AND message_type NOT IN ('paid_message', 'ticker_paid_message_item');
+
+
+-- ============================================================
+-- 7. 不指定直播的時間範圍掃描 (chat_messages / processed_chat_messages)
+--    受益索引: idx_chat_messages_published_at_brin / idx_processed_chat_published_at_brin
+--    留言依 published_at 順序寫入，BRIN 只需幾十 KB 就能跳過範圍外的 block
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT published_at, message
+FROM chat_messages
+WHERE published_at >= NOW() - INTERVAL '3 hours'
+  AND published_at < NOW();
+
+EXPLAIN ANALYZE
+SELECT COUNT(*)
+FROM processed_chat_messages
+WHERE published_at >= NOW() - INTERVAL '3 hours'
+  AND published_at < NOW();
+
+
+-- ============================================================
+-- 8. 留言列表第一頁 (/api/chat/messages)
+--    受益索引: idx_chat_messages_stream_published_covering（倒序掃描 + LIMIT）
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT *
+FROM chat_messages
+WHERE live_stream_id = 'YOUR_VIDEO_ID'
+ORDER BY published_at DESC, message_id DESC
+LIMIT 100;
+
+
+-- ============================================================
+-- 9. ETL 待處理留言 (process_chat_messages)
+--    受益索引: BRIN 範圍 + processed_chat_messages 主鍵 (message_id, published_at)
+--    join 條件帶 published_at，才能用到完整主鍵並只探測對應月份的分區
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT cm.message_id, cm.published_at
+FROM chat_messages cm
+LEFT JOIN processed_chat_messages pcm
+  ON cm.message_id = pcm.message_id AND cm.published_at = pcm.published_at
+WHERE cm.published_at >= NOW() - INTERVAL '1 hour'
+  AND cm.published_at <= NOW()
+  AND pcm.message_id IS NULL
+ORDER BY cm.published_at ASC
+LIMIT 1000;
+
+
+-- ============================================================
+-- 10. 全域 MIN / MAX 與最新一筆留言
+--    受益索引: idx_processed_chat_published_at / idx_chat_messages_published_at
+--    BRIN 沒有順序，少了 B-tree 這些查詢會掃描所有分區；有 B-tree 時為
+--    每個分區一次 Index Only Scan（Merge Append / LIMIT 1）
+-- ============================================================
+
+-- 每小時彙總的涵蓋範圍 (hourly_rollup.rollup_hour_range；emoji / 作者活躍度 / 詞彙趨勢每個請求)
+EXPLAIN ANALYZE
+SELECT MIN(published_at) FROM processed_chat_messages;
+
+-- 最新留言所屬直播 (word_discovery)
+EXPLAIN ANALYZE
+SELECT live_stream_id
+FROM chat_messages
+ORDER BY published_at DESC
+LIMIT 1;
+
+-- 最近一小時的最新留言時間（ETL 判斷是否有新留言）
+EXPLAIN ANALYZE
+SELECT MAX(published_at)
+FROM chat_messages
+WHERE published_at > NOW() - INTERVAL '1 hour';
+
+
+-- ============================================================
+-- 11. 索引大小對比（migration 前後各跑一次）
 --    確認刪除冗餘索引後磁碟空間有減少
 -- ============================================================
 
@@ -148,7 +266,7 @@ ORDER BY pg_relation_size(indexrelid) DESC;
 
 
 -- ============================================================
--- 7. 確認無 INVALID 索引
+-- 12. 確認無 INVALID 索引
 -- ============================================================
 
 -- SELECT indexrelid::regclass AS index_name, indisvalid
@@ -0,0 +1,113 @@
+-- ============================================================
+-- Chat Search Index Benchmark Script
+-- ============================================================
+-- 使用方式：
+--   1. 在執行 24_create_search_indexes.sql 之前，先跑一次本腳本，記錄結果
+--   2. 執行 migration
+--   3. 再跑一次本腳本，比較 Execution Time 差異
+--
+-- 關注指標：
+--   - "Execution Time" (毫秒) — 實際執行耗時
+--   - "Seq Scan" vs "Bitmap Index Scan on idx_chat_messages_*_lower_trgm"
+--   - "Rows Removed by Index Recheck" — trigram 誤判後被 recheck 掉的行數
+--
+-- 注意：請替換下方的 'YOUR_VIDEO_ID' 為你實際的 live_stream_id
+--       以及 '關鍵字' / '作者' 為實際存在的搜尋字串（至少 3 個字元效果最好，
+--       少於 3 個字元無法產生 trigram，會退化為全掃描）
+--       可先執行以下查詢取得：
+--       SELECT DISTINCT live_stream_id FROM chat_messages LIMIT 5;
+--
+-- 以下查詢與後端 app/services/search.py 產生的 SQL 形式相同：
+--   lower(column) LIKE lower('%keyword%') ESCAPE '\'
+-- ============================================================
+
+
+-- ============================================================
+-- 0. 查看當前資料量與索引
+-- ============================================================
+
+SELECT 'chat_messages' AS table_name, COUNT(*) AS row_count FROM chat_messages;
+
+SELECT indexname, indexdef
+FROM pg_indexes
+WHERE tablename = 'chat_messages' AND indexname LIKE '%trgm%';
+
+
+-- ============================================================
+-- 1. 留言內容搜尋 (/api/chat/messages?message_filter=)
+--    受益索引: idx_chat_messages_message_lower_trgm
+--    預期改善: Seq Scan → Bitmap Index Scan + BitmapAnd
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT *
+FROM chat_messages
+WHERE live_stream_id = 'YOUR_VIDEO_ID'
+  AND lower(message) LIKE lower('%關鍵字%') ESCAPE '\'
+ORDER BY published_at DESC
+LIMIT 100;
+
+
+-- ============================================================
+-- 2. 作者搜尋 (/api/chat/messages?author_filter=)
+--    受益索引: idx_chat_messages_author_lower_trgm
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT *
+FROM chat_messages
+WHERE live_stream_id = 'YOUR_VIDEO_ID'
+  AND lower(author_name) LIKE lower('%作者%') ESCAPE '\'
+ORDER BY published_at DESC
+LIMIT 100;
+
+
+-- ============================================================
+-- 3. 搜尋結果總數（capped count，上限 SEARCH_COUNT_CAP = 10000）
+--    預期：命中數超過上限時，LIMIT 讓掃描提早結束
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT COUNT(*)
+FROM (
+    SELECT 1
+    FROM chat_messages
+    WHERE lower(message) LIKE lower('%關鍵字%') ESCAPE '\'
+    LIMIT 10001
+) AS capped;
+
+-- 超過上限時改用 planner 估計值（只規劃、不執行）
+EXPLAIN (FORMAT JSON)
+SELECT *
+FROM chat_messages
+WHERE lower(message) LIKE lower('%關鍵字%') ESCAPE '\';
+
+
+-- ============================================================
+-- 4. 字詞出現次數 (/api/admin/word-occurrences)
+--    受益索引: idx_chat_messages_message_lower_trgm
+--    7 天內是否存在只需 EXISTS，不需完整 COUNT
+-- ============================================================
+
+EXPLAIN ANALYZE
+SELECT EXISTS (
+    SELECT 1
+    FROM chat_messages
+    WHERE lower(message) LIKE lower('%關鍵字%') ESCAPE '\'
+      AND published_at >= NOW() - INTERVAL '7 days'
+      AND published_at <= NOW()
+);
+
+
+-- ============================================================
+-- 5. 索引大小
+-- ============================================================
+
+SELECT
+    indexname,
+    pg_size_pretty(pg_relation_size(indexrelid)) AS index_size
+FROM pg_indexes
+JOIN pg_class ON pg_class.relname = pg_indexes.indexname
+JOIN pg_index ON pg_index.indexrelid = pg_class.oid
+WHERE tablename = 'chat_messages'
+ORDER BY pg_relation_size(indexrelid) DESC;
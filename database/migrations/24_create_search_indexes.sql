@@ -0,0 +1,45 @@
+-- ============================================================
+-- Chat Search Indexes (Migration for Existing DB)
+-- ============================================================
+-- Migration: Run this on existing databases
+--
+-- Replaces the trigram indexes on raw author_name / message
+-- (11_create_gin_indexes.sql) with indexes on lower(column).
+-- The backend now searches with lower(column) LIKE lower(pattern)
+-- (app/services/search.py), which only matches expression indexes.
+--
+-- IMPORTANT: Uses CONCURRENTLY to avoid locking writes, so run each
+-- statement outside a transaction block.
+--
+-- Estimated time for 4 million rows: 5-15 minutes per index
+-- Benchmark before/after with 24_benchmark_search_indexes.sql
+-- ============================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Step 1: Create the lower() expression indexes (non-blocking)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_messages_author_lower_trgm
+    ON chat_messages USING GIN (lower(author_name) gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_chat_messages_message_lower_trgm
+    ON chat_messages USING GIN (lower(message) gin_trgm_ops);
+
+-- Step 2: Drop the raw-column indexes, no longer used by any query
+DROP INDEX CONCURRENTLY IF EXISTS idx_chat_messages_author_trgm;
+DROP INDEX CONCURRENTLY IF EXISTS idx_chat_messages_message_trgm;
+
+-- Step 3: Refresh statistics so row estimates (used for search totals) are current
+ANALYZE chat_messages;
+
+-- ============================================================
+-- Verification
+-- ============================================================
+--
+-- SELECT indexname, indexdef
+-- FROM pg_indexes
+-- WHERE tablename = 'chat_messages' AND indexname LIKE '%trgm%';
+--
+-- Expected output:
+--   idx_chat_messages_author_lower_trgm  | CREATE INDEX ... USING gin (lower((author_name)::text) gin_trgm_ops)
+--   idx_chat_messages_message_lower_trgm | CREATE INDEX ... USING gin (lower(message) gin_trgm_ops)
+-- ============================================================
@@ -0,0 +1,23 @@
+-- Word group hourly counts
+-- 詞彙群組（word_trend_groups）每小時命中的留言數，/api/word-trends/stats 直接查表
+-- 由 ETL process_chat_messages 在寫入 processed_chat_messages 時同一個 transaction 累加；
+-- 新建群組或修改 words / exclude_words 時 hits_indexed_at 設為 NULL，
+-- 由 backfill_word_group_hits 任務從 processed_chat_messages 重新計算
+-- Migration: Run this on existing databases
+
+ALTER TABLE word_trend_groups
+    ADD COLUMN IF NOT EXISTS hits_indexed_at TIMESTAMPTZ;
+
+COMMENT ON COLUMN word_trend_groups.hits_indexed_at IS 'When word_group_hourly_counts was last backfilled for this group; NULL means the counts are pending and stats fall back to scanning chat_messages';
+
+CREATE TABLE IF NOT EXISTS word_group_hourly_counts (
+    group_id INTEGER NOT NULL REFERENCES word_trend_groups(id) ON DELETE CASCADE,
+    live_stream_id VARCHAR(255) NOT NULL,
+    hour TIMESTAMPTZ NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_id, live_stream_id, hour)
+);
+
+-- Stats without a stream filter read a group's hours across all streams
+CREATE INDEX IF NOT EXISTS idx_word_group_hourly_counts_group_hour
+    ON word_group_hourly_counts (group_id, hour);
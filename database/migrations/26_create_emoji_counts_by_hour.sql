@@ -0,0 +1,39 @@
+-- Emoji counts by hour
+-- 每小時各 emoji 出現的留言數（COUNT(DISTINCT message_id)），/api/emojis/stats 直接查表
+-- 由 ETL process_chat_messages 在寫入 processed_chat_messages 時同一個 transaction 累加
+-- Migration: Run this on existing databases
+-- 會從現有 processed_chat_messages 回填；請在 process_chat_messages 未執行時套用，避免重複累加
+
+CREATE TABLE IF NOT EXISTS emoji_counts_by_hour (
+    live_stream_id VARCHAR(255) NOT NULL,
+    hour TIMESTAMPTZ NOT NULL,
+    is_youtube BOOLEAN NOT NULL,
+    emoji TEXT NOT NULL,            -- Unicode emoji character or YouTube emote name
+    image_url TEXT,                 -- YouTube emotes only
+    message_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (live_stream_id, hour, is_youtube, emoji)
+);
+
+-- Stats without a stream filter read every stream's rows in the hour range
+CREATE INDEX IF NOT EXISTS idx_emoji_counts_by_hour_hour
+    ON emoji_counts_by_hour (hour);
+
+-- Backfill from already processed messages (only when the rollup is still empty)
+INSERT INTO emoji_counts_by_hour (live_stream_id, hour, is_youtube, emoji, image_url, message_count)
+SELECT p.live_stream_id, date_trunc('hour', p.published_at), FALSE, e.emoji_char, NULL,
+       COUNT(DISTINCT p.message_id)
+FROM processed_chat_messages p,
+     unnest(p.unicode_emojis) AS e(emoji_char)
+WHERE NOT EXISTS (SELECT 1 FROM emoji_counts_by_hour)
+GROUP BY p.live_stream_id, date_trunc('hour', p.published_at), e.emoji_char;
+
+INSERT INTO emoji_counts_by_hour (live_stream_id, hour, is_youtube, emoji, image_url, message_count)
+SELECT p.live_stream_id, date_trunc('hour', p.published_at), TRUE, emote->>'name',
+       MAX(emote->>'url'), COUNT(DISTINCT p.message_id)
+FROM processed_chat_messages p,
+     jsonb_array_elements(p.youtube_emotes) AS emote
+WHERE p.youtube_emotes IS NOT NULL
+  AND jsonb_array_length(p.youtube_emotes) > 0
+  AND emote->>'name' IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM emoji_counts_by_hour WHERE is_youtube)
+GROUP BY p.live_stream_id, date_trunc('hour', p.published_at), emote->>'name';
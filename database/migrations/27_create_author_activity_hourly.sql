@@ -0,0 +1,38 @@
+-- Author activity by hour
+-- 每小時各作者（依顯示名稱）的留言數 / 付費留言數與首末留言時間
+-- /api/chat/top-authors 與作者摘要、趨勢直接查表，不再聚合整段 chat_messages
+-- 由 ETL process_chat_messages 在寫入 processed_chat_messages 時同一個 transaction 累加
+-- Migration: Run this on existing databases
+-- 會從現有 processed_chat_messages 回填；請在 process_chat_messages 未執行時套用，避免重複累加
+
+CREATE TABLE IF NOT EXISTS author_activity_hourly (
+    live_stream_id VARCHAR(255) NOT NULL,
+    hour TIMESTAMPTZ NOT NULL,
+    author_id VARCHAR(255) NOT NULL,
+    author_name VARCHAR(255) NOT NULL,  -- 同一作者改名會分成多列；最新名稱取 last_seen 最大者
+    message_count INTEGER NOT NULL DEFAULT 0,
+    paid_count INTEGER NOT NULL DEFAULT 0,
+    first_seen TIMESTAMPTZ NOT NULL,
+    last_seen TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (live_stream_id, hour, author_id, author_name)
+);
+
+-- Author summary / trend look up one author over a time range
+CREATE INDEX IF NOT EXISTS idx_author_activity_hourly_author_hour
+    ON author_activity_hourly (author_id, hour);
+
+-- Leaderboards without a stream filter read every stream's rows in the hour range
+CREATE INDEX IF NOT EXISTS idx_author_activity_hourly_hour
+    ON author_activity_hourly (hour);
+
+-- Backfill from already processed messages (only when the rollup is still empty)
+INSERT INTO author_activity_hourly
+    (live_stream_id, hour, author_id, author_name, message_count, paid_count, first_seen, last_seen)
+SELECT p.live_stream_id, date_trunc('hour', p.published_at), p.author_id, p.author_name,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE c.message_type IN ('paid_message', 'ticker_paid_message_item')),
+       MIN(p.published_at), MAX(p.published_at)
+FROM processed_chat_messages p
+LEFT JOIN chat_messages c ON c.message_id = p.message_id
+WHERE NOT EXISTS (SELECT 1 FROM author_activity_hourly)
+GROUP BY p.live_stream_id, date_trunc('hour', p.published_at), p.author_id, p.author_name;
@@ -0,0 +1,146 @@
+-- Paid message ledger
+-- 付費留言帳本：解析後的金額與換算台幣金額，/api/stats/money-summary 與回放營收曲線直接彙總
+-- Migration: Run this on existing databases
+-- 會從現有 chat_messages 回填付費留言
+
+CREATE TABLE IF NOT EXISTS paid_message_ledger (
+    message_id VARCHAR(255) PRIMARY KEY REFERENCES chat_messages(message_id) ON DELETE CASCADE,
+    live_stream_id VARCHAR(255) NOT NULL,
+    author_id VARCHAR(255) NOT NULL,
+    author_name VARCHAR(255) NOT NULL,
+    published_at TIMESTAMPTZ NOT NULL,
+    timestamp BIGINT NOT NULL,
+    message_type VARCHAR(50) NOT NULL,
+    currency VARCHAR(50) NOT NULL,
+    amount NUMERIC NOT NULL,        -- money.amount with ',' and '$' stripped
+    amount_twd NUMERIC              -- amount * currency_rates.rate_to_twd; NULL = unknown currency
+);
+
+CREATE INDEX IF NOT EXISTS idx_paid_message_ledger_stream_published
+    ON paid_message_ledger (live_stream_id, published_at);
+CREATE INDEX IF NOT EXISTS idx_paid_message_ledger_published_at
+    ON paid_message_ledger (published_at);
+-- Re-deriving amount_twd when a currency's rate changes
+CREATE INDEX IF NOT EXISTS idx_paid_message_ledger_currency
+    ON paid_message_ledger (currency);
+
+-- 入庫 trigger：付費留言寫入 chat_messages 時同步寫入帳本
+-- 匯率 trigger：currency_rates 新增 / 修改 / 刪除時重算該幣別的 amount_twd
+-- （currency_rates 原本由 dashboard 啟動時建立；在此先建立，trigger 不必等 create_all）
+-- 資料庫端物件只定義在這裡（與 migrations/28），後端與測試都不另外保存一份
+CREATE TABLE IF NOT EXISTS currency_rates (
+    currency VARCHAR(10) PRIMARY KEY,
+    rate_to_twd NUMERIC(12,4),
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    notes VARCHAR(255)
+);
+
+CREATE OR REPLACE FUNCTION parse_money_amount(amount TEXT) RETURNS NUMERIC AS $fn$
+BEGIN
+    RETURN NULLIF(btrim(replace(replace(amount, ',', ''), '$', '')), '')::numeric;
+EXCEPTION WHEN invalid_text_representation THEN
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION currency_rate_to_twd(code TEXT) RETURNS NUMERIC AS $fn$
+BEGIN
+    -- NULL when the currency has no rate; a rate row without a value counts as 0
+    RETURN (SELECT COALESCE(NULLIF(rate_to_twd::text, 'null')::numeric, 0)
+            FROM currency_rates WHERE currency = code);
+END;
+$fn$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION sync_paid_message_ledger() RETURNS trigger AS $fn$
+DECLARE
+    money_currency TEXT := NEW.raw_data->'money'->>'currency';
+    money_amount NUMERIC := parse_money_amount(NEW.raw_data->'money'->>'amount');
+BEGIN
+    IF COALESCE(NEW.message_type, '') NOT IN ('paid_message', 'ticker_paid_message_item')
+       OR COALESCE(money_currency, '') = '' OR money_amount IS NULL THEN
+        IF TG_OP = 'UPDATE' THEN
+            DELETE FROM paid_message_ledger WHERE message_id = NEW.message_id;
+        END IF;
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO paid_message_ledger
+        (message_id, live_stream_id, author_id, author_name, published_at, timestamp,
+         message_type, currency, amount, amount_twd)
+    VALUES
+        (NEW.message_id, NEW.live_stream_id, NEW.author_id, NEW.author_name, NEW.published_at,
+         NEW.timestamp, NEW.message_type, money_currency, money_amount,
+         money_amount * currency_rate_to_twd(money_currency))
+    ON CONFLICT (message_id) DO UPDATE SET
+        live_stream_id = EXCLUDED.live_stream_id,
+        author_id = EXCLUDED.author_id,
+        author_name = EXCLUDED.author_name,
+        published_at = EXCLUDED.published_at,
+        timestamp = EXCLUDED.timestamp,
+        message_type = EXCLUDED.message_type,
+        currency = EXCLUDED.currency,
+        amount = EXCLUDED.amount,
+        amount_twd = EXCLUDED.amount_twd;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reprice_paid_message_ledger() RETURNS trigger AS $fn$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.currency = NEW.currency
+       AND OLD.rate_to_twd::text IS NOT DISTINCT FROM NEW.rate_to_twd::text THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND OLD.currency IS DISTINCT FROM NEW.currency) THEN
+        UPDATE paid_message_ledger
+        SET amount_twd = amount * currency_rate_to_twd(OLD.currency)
+        WHERE currency = OLD.currency;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE paid_message_ledger
+        SET amount_twd = amount * currency_rate_to_twd(NEW.currency)
+        WHERE currency = NEW.currency;
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+DO $do$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_chat_messages_paid_ledger_insert') THEN
+        CREATE TRIGGER trg_chat_messages_paid_ledger_insert
+            AFTER INSERT ON chat_messages
+            FOR EACH ROW
+            WHEN (NEW.message_type IN ('paid_message', 'ticker_paid_message_item'))
+            EXECUTE FUNCTION sync_paid_message_ledger();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_chat_messages_paid_ledger_update') THEN
+        CREATE TRIGGER trg_chat_messages_paid_ledger_update
+            AFTER UPDATE ON chat_messages
+            FOR EACH ROW
+            EXECUTE FUNCTION sync_paid_message_ledger();
+    END IF;
+    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'trg_currency_rates_reprice_ledger') THEN
+        CREATE TRIGGER trg_currency_rates_reprice_ledger
+            AFTER INSERT OR UPDATE OR DELETE ON currency_rates
+            FOR EACH ROW
+            EXECUTE FUNCTION reprice_paid_message_ledger();
+    END IF;
+END;
+$do$;
+
+-- Backfill existing paid messages
+INSERT INTO paid_message_ledger
+    (message_id, live_stream_id, author_id, author_name, published_at, timestamp,
+     message_type, currency, amount, amount_twd)
+SELECT message_id, live_stream_id, author_id, author_name, published_at, timestamp,
+       message_type, currency, amount, amount * currency_rate_to_twd(currency)
+FROM (
+    SELECT cm.*, cm.raw_data->'money'->>'currency' AS currency,
+           parse_money_amount(cm.raw_data->'money'->>'amount') AS amount
+    FROM chat_messages cm
+    WHERE cm.message_type IN ('paid_message', 'ticker_paid_message_item')
+) paid
+WHERE COALESCE(currency, '') <> ''
+  AND amount IS NOT NULL
+ON CONFLICT (message_id) DO NOTHING;
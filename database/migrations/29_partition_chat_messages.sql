@@ -0,0 +1,251 @@
+-- ============================================================
+-- Monthly Partitions for chat_messages / processed_chat_messages
+-- ============================================================
+-- Migration: Run this on existing databases
+--
+-- Converts both tables to range partitions by month on published_at
+-- (see init/21_partition_chat_messages.sql) without stopping the
+-- collector or the ETL:
+--
+--   Step 1  create the partitioned copies (<table>_new) with every
+--           monthly partition and index the data needs
+--   Step 2  mirror trigger: writes to the old tables are replayed on
+--           the copies from now on
+--   Step 3  copy existing rows one day per transaction (CALL)
+--   Step 4  swap names in one short transaction
+--   Step 5  drop the old tables once the dashboard has been checked
+--
+-- The primary key becomes (message_id, published_at), since a unique
+-- constraint on a partitioned table must include the partition key.
+-- paid_message_ledger loses its FK to chat_messages for the same reason.
+--
+-- IMPORTANT: run with psql in autocommit mode (no surrounding
+-- transaction), otherwise Step 3 cannot commit between chunks.
+-- Expect about 1-2 minutes per million rows for Step 3; the tables
+-- stay writable throughout, Step 4 holds an exclusive lock for
+-- well under a second.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent TEXT, month DATE) RETURNS TEXT AS $fn$
+DECLARE
+    month_start DATE := date_trunc('month', month)::date;
+    lower_bound TIMESTAMPTZ := month_start::timestamp AT TIME ZONE 'UTC';
+    upper_bound TIMESTAMPTZ := (month_start + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC';
+    partition_name TEXT := parent || '_' || to_char(month_start, 'YYYY_MM');
+    default_name TEXT := parent || '_default';
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    EXECUTE 'CREATE TABLE ' || quote_ident(partition_name)
+         || ' (LIKE ' || quote_ident(parent) || ' INCLUDING DEFAULTS)';
+
+    -- Rows of this month already routed to the default partition must move
+    -- first, or ATTACH fails its range check
+    IF to_regclass(default_name) IS NOT NULL THEN
+        EXECUTE 'LOCK TABLE ' || quote_ident(default_name) || ' IN ACCESS EXCLUSIVE MODE';
+        EXECUTE 'WITH moved AS (DELETE FROM ' || quote_ident(default_name)
+             || ' WHERE published_at >= $1 AND published_at < $2 RETURNING *)'
+             || ' INSERT INTO ' || quote_ident(partition_name) || ' SELECT * FROM moved'
+            USING lower_bound, upper_bound;
+    END IF;
+
+    -- ATTACH builds the parent's indexes on the new partition
+    EXECUTE 'ALTER TABLE ' || quote_ident(parent) || ' ATTACH PARTITION ' || quote_ident(partition_name)
+         || ' FOR VALUES FROM (' || quote_literal(lower_bound) || ') TO (' || quote_literal(upper_bound) || ')';
+    RETURN partition_name;
+END;
+$fn$ LANGUAGE plpgsql;
+
+INSERT INTO etl_settings (key, value, value_type, description, category, is_sensitive) VALUES
+('PARTITION_MONTHS_AHEAD', '3', 'integer', '聊天留言分區表預先建立的月份數', 'etl', false)
+ON CONFLICT (key) DO NOTHING;
+
+
+-- ------------------------------------------------------------
+-- Step 1: partitioned copies, with final partition names
+-- ------------------------------------------------------------
+CREATE TABLE chat_messages_new (
+    LIKE chat_messages INCLUDING DEFAULTS,
+    PRIMARY KEY (message_id, published_at)
+) PARTITION BY RANGE (published_at);
+
+CREATE TABLE processed_chat_messages_new (
+    LIKE processed_chat_messages INCLUDING DEFAULTS,
+    PRIMARY KEY (message_id, published_at)
+) PARTITION BY RANGE (published_at);
+
+-- Every month from the oldest message to 3 months ahead
+DO $do$
+DECLARE
+    parent TEXT;
+    first_month DATE;
+    month DATE;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['chat_messages', 'processed_chat_messages'] LOOP
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent || '_default', parent || '_new');
+        EXECUTE format('SELECT date_trunc(''month'', min(published_at) AT TIME ZONE ''UTC'')::date FROM %I', parent)
+            INTO first_month;
+        month := COALESCE(first_month, date_trunc('month', NOW() AT TIME ZONE 'UTC')::date);
+        WHILE month <= (date_trunc('month', NOW() AT TIME ZONE 'UTC') + INTERVAL '3 months')::date LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_' || to_char(month, 'YYYY_MM'), parent || '_new',
+                month::timestamp AT TIME ZONE 'UTC', (month + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC'
+            );
+            month := (month + INTERVAL '1 month')::date;
+        END LOOP;
+    END LOOP;
+END;
+$do$;
+
+-- Indexes are built up front (temporary "_new" names, renamed in Step 4)
+-- so the swap does not wait for an index build
+CREATE INDEX idx_chat_messages_live_stream_published_new ON chat_messages_new(live_stream_id, published_at);
+CREATE INDEX idx_chat_messages_published_at_new ON chat_messages_new(published_at);
+CREATE INDEX idx_chat_messages_author_id_new ON chat_messages_new(author_id);
+CREATE INDEX idx_chat_messages_timestamp_new ON chat_messages_new(timestamp);
+CREATE INDEX idx_chat_messages_paid_new ON chat_messages_new(live_stream_id, published_at)
+    WHERE message_type = 'paid_message';
+CREATE INDEX idx_chat_messages_ticker_paid_new ON chat_messages_new(live_stream_id, published_at)
+    WHERE message_type = 'ticker_paid_message_item';
+CREATE INDEX idx_chat_messages_author_lower_trgm_new
+    ON chat_messages_new USING GIN (lower(author_name) gin_trgm_ops);
+CREATE INDEX idx_chat_messages_message_lower_trgm_new
+    ON chat_messages_new USING GIN (lower(message) gin_trgm_ops);
+
+CREATE INDEX idx_processed_chat_stream_published_new ON processed_chat_messages_new(live_stream_id, published_at);
+CREATE INDEX idx_processed_chat_published_at_new ON processed_chat_messages_new(published_at);
+CREATE INDEX idx_processed_chat_author_id_new ON processed_chat_messages_new(author_id);
+CREATE INDEX idx_processed_chat_tokens_new ON processed_chat_messages_new USING GIN(tokens);
+CREATE INDEX idx_processed_chat_emojis_new ON processed_chat_messages_new USING GIN(unicode_emojis);
+
+
+-- ------------------------------------------------------------
+-- Step 2: replay writes on the copies until the swap
+-- ------------------------------------------------------------
+CREATE OR REPLACE FUNCTION mirror_to_partitioned_copy() RETURNS trigger AS $fn$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        EXECUTE format('DELETE FROM %I WHERE message_id = $1 AND published_at = $2', TG_ARGV[0])
+            USING OLD.message_id, OLD.published_at;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        EXECUTE format('INSERT INTO %I SELECT ($1).* ON CONFLICT DO NOTHING', TG_ARGV[0])
+            USING NEW;
+    END IF;
+    RETURN NULL;
+END;
+$fn$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_chat_messages_mirror
+    AFTER INSERT OR UPDATE OR DELETE ON chat_messages
+    FOR EACH ROW EXECUTE FUNCTION mirror_to_partitioned_copy('chat_messages_new');
+
+CREATE TRIGGER trg_processed_chat_messages_mirror
+    AFTER INSERT OR UPDATE OR DELETE ON processed_chat_messages
+    FOR EACH ROW EXECUTE FUNCTION mirror_to_partitioned_copy('processed_chat_messages_new');
+
+
+-- ------------------------------------------------------------
+-- Step 3: copy existing rows, one committed chunk at a time
+-- ------------------------------------------------------------
+-- Rows written after Step 2 are already mirrored; ON CONFLICT skips them.
+-- Safe to re-run (e.g. after an interruption).
+CREATE OR REPLACE PROCEDURE copy_to_partitioned_copy(source TEXT, chunk INTERVAL DEFAULT '1 day')
+LANGUAGE plpgsql AS $proc$
+DECLARE
+    chunk_start TIMESTAMPTZ;
+    last_published TIMESTAMPTZ;
+    copied BIGINT;
+BEGIN
+    EXECUTE format('SELECT min(published_at), max(published_at) FROM %I', source)
+        INTO chunk_start, last_published;
+    WHILE chunk_start <= last_published LOOP
+        EXECUTE format(
+            'INSERT INTO %I SELECT * FROM %I WHERE published_at >= $1 AND published_at < $2 ON CONFLICT DO NOTHING',
+            source || '_new', source
+        ) USING chunk_start, chunk_start + chunk;
+        GET DIAGNOSTICS copied = ROW_COUNT;
+        RAISE NOTICE '% [%, %): % rows', source, chunk_start, chunk_start + chunk, copied;
+        chunk_start := chunk_start + chunk;
+        COMMIT;
+    END LOOP;
+END;
+$proc$;
+
+CALL copy_to_partitioned_copy('chat_messages');
+CALL copy_to_partitioned_copy('processed_chat_messages');
+
+-- Optional check before swapping (counts should match):
+-- SELECT (SELECT COUNT(*) FROM chat_messages), (SELECT COUNT(*) FROM chat_messages_new);
+-- SELECT (SELECT COUNT(*) FROM processed_chat_messages), (SELECT COUNT(*) FROM processed_chat_messages_new);
+
+
+-- ------------------------------------------------------------
+-- Step 4: swap
+-- ------------------------------------------------------------
+BEGIN;
+
+LOCK TABLE chat_messages, processed_chat_messages IN ACCESS EXCLUSIVE MODE;
+
+DROP TRIGGER trg_chat_messages_mirror ON chat_messages;
+DROP TRIGGER trg_processed_chat_messages_mirror ON processed_chat_messages;
+DROP TRIGGER IF EXISTS trg_chat_messages_paid_ledger_insert ON chat_messages;
+DROP TRIGGER IF EXISTS trg_chat_messages_paid_ledger_update ON chat_messages;
+ALTER TABLE paid_message_ledger DROP CONSTRAINT IF EXISTS paid_message_ledger_message_id_fkey;
+
+DO $do$
+DECLARE
+    parent TEXT;
+    idx TEXT;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['chat_messages', 'processed_chat_messages'] LOOP
+        -- Old table and its indexes get an "_old" suffix
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, parent || '_old');
+        FOR idx IN
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(parent || '_old')
+        LOOP
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', idx, left(idx, 59) || '_old');
+        END LOOP;
+
+        -- The copy takes the canonical names
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', parent || '_new', parent);
+        FOR idx IN
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(parent)
+              AND (c.relname LIKE '%\_new' OR c.relname = parent || '_new_pkey')
+        LOOP
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', idx,
+                           CASE WHEN idx = parent || '_new_pkey' THEN parent || '_pkey'
+                                ELSE left(idx, length(idx) - 4) END);
+        END LOOP;
+    END LOOP;
+END;
+$do$;
+
+CREATE TRIGGER trg_chat_messages_paid_ledger_insert
+    AFTER INSERT ON chat_messages
+    FOR EACH ROW
+    WHEN (NEW.message_type IN ('paid_message', 'ticker_paid_message_item'))
+    EXECUTE FUNCTION sync_paid_message_ledger();
+CREATE TRIGGER trg_chat_messages_paid_ledger_update
+    AFTER UPDATE ON chat_messages
+    FOR EACH ROW
+    EXECUTE FUNCTION sync_paid_message_ledger();
+
+COMMIT;
+
+ANALYZE chat_messages;
+ANALYZE processed_chat_messages;
+
+
+-- ------------------------------------------------------------
+-- Step 5: after checking the dashboard, drop the old tables
+-- ------------------------------------------------------------
+-- DROP TABLE chat_messages_old;
+-- DROP TABLE processed_chat_messages_old;
+-- DROP PROCEDURE copy_to_partitioned_copy(TEXT, INTERVAL);
+-- DROP FUNCTION mirror_to_partitioned_copy();
@@ -0,0 +1,35 @@
+-- Extracted mentions
+-- 留言擷取器（mention_extractors）在 ETL 斷詞時對每則留言套用一次 regex，
+-- 命中值寫入 extracted_mentions；/api/incense-map/candidates 直接 GROUP BY 查表，
+-- 只有 ETL 尚未處理的尾段才掃描 chat_messages。
+-- 由 ETL process_chat_messages 在寫入 processed_chat_messages 時同一個 transaction 寫入；
+-- 新建擷取器或修改 pattern 時 backfilled_at 設為 NULL，
+-- 由 backfill_mentions 任務從 processed_chat_messages 重新擷取
+-- Migration: Run this on existing databases
+-- 既有的 incense 擷取器為待回填，下一次 process_chat_messages（或手動 backfill_mentions）會掃描歷史留言
+
+CREATE TABLE IF NOT EXISTS mention_extractors (
+    name VARCHAR(64) PRIMARY KEY,
+    pattern TEXT NOT NULL,              -- Python regex；擷取值為第一個 group（沒有 group 時取整段）
+    description TEXT,
+    backfilled_at TIMESTAMPTZ,          -- NULL = 待回填，API 改掃原始留言
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS extracted_mentions (
+    extractor VARCHAR(64) NOT NULL REFERENCES mention_extractors(name) ON DELETE CASCADE,
+    message_id VARCHAR(255) NOT NULL,
+    published_at TIMESTAMPTZ NOT NULL,
+    live_stream_id VARCHAR(255) NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (extractor, message_id, published_at)
+);
+
+-- 地圖查詢：單一擷取器、單一直播、時間範圍，GROUP BY value 只讀索引
+CREATE INDEX IF NOT EXISTS idx_extracted_mentions_extractor_stream_published
+    ON extracted_mentions (extractor, live_stream_id, published_at) INCLUDE (value);
+
+INSERT INTO mention_extractors (name, pattern, description) VALUES
+    ('incense', '([一-鿿]{2,6})代表上香', '上香地圖：「XX代表上香」的地區詞')
+ON CONFLICT (name) DO NOTHING;
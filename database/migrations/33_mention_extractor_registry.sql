@@ -0,0 +1,19 @@
+-- Mention extractor registry
+-- mention_extractors 除了管理員建立的 regex 擷取器，也記錄程式內註冊的 builtin 擷取器
+-- （app/etl/processors/extractors.py，pattern 為 NULL），可停用；
+-- 回填改為依時間分段提交，backfill_cursor 記錄進度，中斷後從該處接續
+-- Migration: Run this on existing databases
+
+ALTER TABLE mention_extractors
+    ADD COLUMN IF NOT EXISTS kind VARCHAR(20) NOT NULL DEFAULT 'regex',
+    ADD COLUMN IF NOT EXISTS enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    ADD COLUMN IF NOT EXISTS backfill_cursor TIMESTAMPTZ;
+
+ALTER TABLE mention_extractors
+    ALTER COLUMN pattern DROP NOT NULL;
+
+COMMENT ON COLUMN mention_extractors.backfill_cursor IS 'Backfill progress: processed messages published before this time have been extracted; NULL restarts the backfill';
+
+INSERT INTO etl_settings (key, value, value_type, description, category, is_sensitive) VALUES
+('MENTION_EDITOR_AUTHOR_IDS', 'UCeMjhoCCvujpObnt6yeZeNg', 'string', 'editor 擷取器追蹤的作者 ID（逗號分隔）', 'etl', false)
+ON CONFLICT (key) DO NOTHING;
@@ -0,0 +1,28 @@
+-- ETL job progress and cancellation
+-- 長時間任務定期把進度寫入 etl_execution_log.metadata（progress），管理介面可顯示即時進度；
+-- 管理員可取消排隊中或執行中的任務（cancel_requested_at），任務於批次之間停止。
+-- etl_job_queue：同一任務最多一筆排隊或執行中；執行中的任務定期更新 heartbeat_at，
+-- 過久未更新（worker 中斷）的任務標記為失敗，同一任務才能再次排入。
+-- Migration: Run this on existing databases (after 34_create_etl_job_queue.sql)
+
+ALTER TABLE etl_execution_log
+  ADD COLUMN IF NOT EXISTS cancel_requested_at TIMESTAMP WITH TIME ZONE;
+
+ALTER TABLE etl_job_queue
+  ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+
+-- 既有的重複排隊紀錄只保留最早的一筆
+UPDATE etl_job_queue q
+SET status = 'skipped', finished_at = NOW(), error_message = 'Skipped: duplicate of an earlier queued job'
+WHERE status IN ('queued', 'running')
+  AND EXISTS (
+      SELECT 1 FROM etl_job_queue earlier
+      WHERE earlier.job_id = q.job_id
+        AND earlier.status IN ('queued', 'running')
+        AND earlier.id < q.id
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_etl_job_queue_pending_job ON etl_job_queue(job_id)
+    WHERE status IN ('queued', 'running');
+
+COMMENT ON COLUMN etl_execution_log.cancel_requested_at IS '管理員要求取消的時間；任務於下一次回報進度時停止';